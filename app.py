@@ -5,13 +5,25 @@ import math
 import os
 import re
 import sqlite3
+import time
 from collections import OrderedDict
 from datetime import datetime
 from functools import wraps
-from threading import RLock
+from threading import RLock, Thread
+from typing import TYPE_CHECKING
 from urllib.parse import urlencode
 
-from flask import Flask, g, jsonify, render_template, request, send_from_directory, url_for
+from flask import (
+    Flask,
+    g,
+    has_app_context,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_from_directory,
+    url_for,
+)
 
 try:
     from flask_compress import Compress
@@ -19,6 +31,10 @@ except Exception:
     Compress = None
 
 from forglory.schema import PARAM_TO_COLUMN, STAT_COLUMNS
+from forglory.web_queries import QUERIES
+
+if TYPE_CHECKING:
+    from forglory.sql_metrics import SqlMetrics
 
 app = Flask(__name__)
 if Compress:
@@ -29,21 +45,27 @@ logging.basicConfig(level=logging.INFO)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 DB_PATH = os.environ.get("DB_PATH", os.path.join(DATA_DIR, "db", "ratings.sqlite"))
+COLD_DB_PATH = os.environ.get("COLD_DB_PATH", os.path.join(DATA_DIR, "db", "ratings-cold.sqlite"))
 PAGE_SIZE = max(10, min(500, int(os.environ.get("PAGE_SIZE", "100"))))
 LEVEL_PAGE_SIZE = max(10, min(500, int(os.environ.get("LEVEL_PAGE_SIZE", "100"))))
 QUERY_CACHE_SIZE = max(32, min(2048, int(os.environ.get("QUERY_CACHE_SIZE", "384"))))
+SQL_METRICS_ENABLED = os.environ.get("SQL_METRICS", "").strip().lower() in {"1", "true", "yes", "on"}
+SQL_SLOW_MS = float(os.environ.get("SQL_SLOW_MS", "250"))
+WARMUP_ENABLED = os.environ.get("WARMUP", "1").strip().lower() not in {"", "0", "false", "no", "off"}
+WARMUP_POLL_SECONDS = max(1.0, float(os.environ.get("WARMUP_POLL_SECONDS", "30")))
+WARMUP_MAX_SECONDS = max(1.0, float(os.environ.get("WARMUP_MAX_SECONDS", "120")))
 DATETIME_RE = re.compile(r"heroes_(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})")
 
 stat_keys = ["Сила", "Защита", "Ловкость", "Мастерство", "Живучесть"]
 param_options = [
-    "Слава", "Побед", "Поражений", "Побед над Драконом", "Побед над Змеем", "Убито зверей",
+    "Слава", "Побед", "Поражений", "Побед над Драконом", "Побед над Змеем", "Побед над Владыкой", "Убито зверей",
     "По уровню", "Сила", "Защита", "Ловкость", "Мастерство", "Живучесть", "Сумма статов",
     "Награбил (серебро)", "Потерял (серебро)",
     "Награбил (кристаллы)", "Потерял (кристаллы)",
     "Братства по славе", "Братства по статам", "Кланы по славе", "Кланы по статам",
 ]
 PERSONAL_PARAMS = [
-    "Слава", "Побед", "Поражений", "Побед над Драконом", "Побед над Змеем", "Убито зверей",
+    "Слава", "Побед", "Поражений", "Побед над Драконом", "Побед над Змеем", "Побед над Владыкой", "Убито зверей",
     "Сила", "Защита", "Ловкость", "Мастерство", "Живучесть", "Сумма статов",
     "Награбил (серебро)", "Потерял (серебро)",
     "Награбил (кристаллы)", "Потерял (кристаллы)",
@@ -55,6 +77,17 @@ PARAM_EXCLUDE_BY_MODE = {
 
 _QUERY_CACHE: OrderedDict[tuple, object] = OrderedDict()
 _QUERY_CACHE_LOCK = RLock()
+# The newest file seen at each DB path and the open connections per file.
+# The background refresher renames a new file over DB_PATH; connections
+# opened before that keep reading the old one until their request ends.
+_DB_GENERATIONS: dict[str, tuple[str, int, int, int]] = {}
+_DB_CONNECTIONS: dict[tuple[str, int, int, int], int] = {}
+SQL_METRICS: SqlMetrics | None = None
+if SQL_METRICS_ENABLED:
+    # Only loaded when enabled, to keep it off the web tier's import path.
+    from forglory.sql_metrics import SqlMetrics
+
+    SQL_METRICS = SqlMetrics(slow_ms=SQL_SLOW_MS)
 
 
 @app.template_global()
@@ -95,8 +128,58 @@ def _db_available() -> bool:
     return os.path.exists(DB_PATH)
 
 
-def _db_signature() -> tuple[str, int, int]:
+def _db_signature() -> tuple[str, int, int, int]:
     path = os.path.abspath(DB_PATH)
+    try:
+        stat = os.stat(path)
+        return path, int(stat.st_ino), int(stat.st_mtime_ns), int(stat.st_size)
+    except OSError:
+        return path, 0, 0, 0
+
+
+def _request_db_signature() -> tuple[str, int, int, int]:
+    """Signature of the file this request reads, fixed when its connection opened."""
+    if not has_app_context():
+        return _db_signature()
+    get_db()
+    return g.db_signature
+
+
+def _enter_db_generation(signature: tuple[str, int, int, int]) -> None:
+    """Count a connection on ``signature`` and drop cached results of replaced files."""
+    path = signature[0]
+    with _QUERY_CACHE_LOCK:
+        current = _DB_GENERATIONS.get(path)
+        # A request that opened the old file just before the rename must not
+        # switch the generation back.
+        if current != signature and _db_signature() == signature:
+            _DB_GENERATIONS[path] = signature
+            if current is not None:
+                stale = [key for key in _QUERY_CACHE if key[1][0] == path and key[1] != signature]
+                for key in stale:
+                    del _QUERY_CACHE[key]
+                app.logger.info(
+                    "Database %s was replaced; dropped %d cached results, %d connections still read the old file",
+                    path, len(stale), _DB_CONNECTIONS.get(current, 0),
+                )
+        _DB_CONNECTIONS[signature] = _DB_CONNECTIONS.get(signature, 0) + 1
+
+
+def _leave_db_generation(signature: tuple[str, int, int, int]) -> None:
+    with _QUERY_CACHE_LOCK:
+        remaining = _DB_CONNECTIONS.get(signature, 0) - 1
+        if remaining > 0:
+            _DB_CONNECTIONS[signature] = remaining
+            return
+        _DB_CONNECTIONS.pop(signature, None)
+        if _DB_GENERATIONS.get(signature[0], signature) != signature:
+            app.logger.info("Database %s: the replaced file has no connections left", signature[0])
+
+
+def _history_signature() -> tuple[str, int, int] | None:
+    if not has_app_context() or not g.get("history_attached"):
+        return None
+    path = os.path.abspath(COLD_DB_PATH)
     try:
         stat = os.stat(path)
         return path, int(stat.st_mtime_ns), int(stat.st_size)
@@ -109,7 +192,8 @@ def cached_query(function):
     def wrapper(*args, **kwargs):
         key = (
             function.__name__,
-            _db_signature(),
+            _request_db_signature(),
+            _history_signature(),
             args,
             tuple(sorted(kwargs.items())),
         )
@@ -117,11 +201,18 @@ def cached_query(function):
             if key in _QUERY_CACHE:
                 value = _QUERY_CACHE.pop(key)
                 _QUERY_CACHE[key] = value
+                if SQL_METRICS is not None:
+                    SQL_METRICS.record_cache(function.__name__, True)
                 return value
 
+        if SQL_METRICS is not None:
+            SQL_METRICS.record_cache(function.__name__, False)
         value = function(*args, **kwargs)
 
         with _QUERY_CACHE_LOCK:
+            # Results read from a file that has since been replaced are not kept.
+            if _DB_GENERATIONS.get(key[1][0], key[1]) != key[1]:
+                return value
             _QUERY_CACHE[key] = value
             while len(_QUERY_CACHE) > QUERY_CACHE_SIZE:
                 _QUERY_CACHE.popitem(last=False)
@@ -133,7 +224,16 @@ def cached_query(function):
 def get_db() -> sqlite3.Connection:
     if "db" not in g:
         uri = f"file:{os.path.abspath(DB_PATH)}?mode=ro"
-        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        # The signature is taken on both sides of the open so a file renamed
+        # into place meanwhile is not attributed to the old generation.
+        for attempt in range(3):
+            signature = _db_signature()
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            if _db_signature() == signature or attempt == 2:
+                break
+            conn.close()
+        _enter_db_generation(signature)
+        g.db_signature = signature
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA query_only=ON")
         conn.execute("PRAGMA cache_size=-32768")
@@ -141,15 +241,98 @@ def get_db() -> sqlite3.Connection:
         conn.execute("PRAGMA mmap_size=134217728")
         conn.execute("PRAGMA busy_timeout=10000")
         conn.execute("PRAGMA automatic_index=ON")
-        g.db = conn
+        g.db = SQL_METRICS.wrap(conn) if SQL_METRICS is not None else conn
     return g.db
 
 
+@app.before_request
+def start_sql_metrics() -> None:
+    if SQL_METRICS is not None:
+        SQL_METRICS.start_request()
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def finish_sql_metrics(response):
+    """Fold the request's statements into the route metrics and a Server-Timing header."""
+    started = g.pop("request_started", None)
+    if SQL_METRICS is None or started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    summary = SQL_METRICS.finish_request(route, time.perf_counter() - started)
+    response.headers["Server-Timing"] = (
+        f'sql;dur={summary["sql_seconds"] * 1000:.1f};desc="{summary["statements"]} statements, '
+        f'{summary["rows"]} rows, cache {summary["cache_hits"]}/{summary["cache_hits"] + summary["cache_misses"]}"'
+    )
+    return response
+
+
 @app.teardown_appcontext
 def close_db(_exc) -> None:
+    g.pop("history_attached", None)
     conn = g.pop("db", None)
     if conn is not None:
         conn.close()
+        _leave_db_generation(g.pop("db_signature"))
+
+
+@cached_query
+def hot_window_start() -> int | None:
+    """Oldest snapshot timestamp with observations in a hot DB, or None for a full DB."""
+    try:
+        row = get_db().execute("SELECT value FROM schema_meta WHERE key='hot_min_ts'").fetchone()
+    except sqlite3.Error:
+        return None
+    return int(row[0]) if row else None
+
+
+def attach_history_db() -> bool:
+    """Make ``observations`` cover the cold archive for the rest of this request.
+
+    A temp view shadows ``main.observations`` with a UNION ALL of both files;
+    SQLite pushes snapshot and pid constraints into each arm, so lookups keep
+    using the primary keys of both databases.
+    """
+    if g.get("history_attached"):
+        return True
+    if hot_window_start() is None or not os.path.exists(COLD_DB_PATH):
+        return False
+    conn = get_db()
+    conn.execute(
+        "ATTACH DATABASE ? AS cold",
+        (f"file:{os.path.abspath(COLD_DB_PATH)}?mode=ro",),
+    )
+    cold_columns = {row[1] for row in conn.execute("PRAGMA cold.table_info(observations)")}
+    columns = [row[1] for row in conn.execute("PRAGMA main.table_info(observations)")]
+    cold_select = ",".join(
+        column if column in cold_columns else f"NULL AS {column}" for column in columns
+    )
+    conn.execute("PRAGMA query_only=OFF")
+    try:
+        conn.execute(
+            f"""
+            CREATE TEMP VIEW observations AS
+            SELECT {','.join(columns)} FROM main.observations
+            UNION ALL
+            SELECT {cold_select} FROM cold.observations
+            """
+        )
+    finally:
+        conn.execute("PRAGMA query_only=ON")
+    g.history_attached = True
+    return True
+
+
+def use_history_for(*filenames: str | None) -> bool:
+    """Attach the cold archive when any snapshot (or its predecessor) predates the hot DB."""
+    start = hot_window_start()
+    if start is None:
+        return False
+    for filename in filenames:
+        ts = snapshot_ts(filename)
+        if ts is not None and ts <= start:
+            return attach_history_db()
+    return False
 
 
 @cached_query
@@ -460,24 +643,18 @@ def query_level_balance(snapshot_id: str) -> dict[int, dict]:
         return {}
     db = get_db()
     select_stats = ",".join(f"AVG({column}) AS {column}" for column in BALANCE_STATS)
-    max_stats = ",".join(f"MAX({column}) AS {column}" for column in BALANCE_STATS)
     averages = db.execute(
         f"SELECT level,COUNT(*) cnt,{select_stats} FROM observations WHERE snapshot_id=? "
         "AND level IS NOT NULL GROUP BY level",
         (sid,),
     ).fetchall()
-    maxima = db.execute(
-        f"SELECT level,{max_stats} FROM observations WHERE snapshot_id=? "
-        "AND level IS NOT NULL GROUP BY level",
-        (sid,),
-    ).fetchall()
     average_map = {int(row["level"]): dict(row) for row in averages}
-    maximum_map = {int(row["level"]): dict(row) for row in maxima}
+    top10_map = {int(row["level"]): dict(row) for row in QUERIES["level_balance_top10"](db, sid)}
     result: dict[int, dict] = {}
     for level, current in average_map.items():
         below = average_map.get(level - 1)
-        maximum = maximum_map.get(level)
-        if not below or not maximum:
+        top10 = top10_map.get(level)
+        if not below or not top10:
             result[level] = {
                 "eligible": int(current["cnt"] or 0) >= 20,
                 "count": int(current["cnt"] or 0),
@@ -487,7 +664,7 @@ def query_level_balance(snapshot_id: str) -> dict[int, dict]:
         stats = {}
         for column in BALANCE_STATS:
             upper15 = int(round(float(below.get(column) or 0) * 1.15))
-            cap75 = int(round(float(maximum.get(column) or 0) * 0.75))
+            cap75 = int(round(float(top10.get(column) or 0) * 0.75))
             stats[column] = {"upper15": upper15, "cap75": cap75, "best": min(upper15, cap75)}
         result[level] = {
             "eligible": int(current["cnt"] or 0) >= 20,
@@ -752,112 +929,28 @@ def _row_value(row: sqlite3.Row | dict | None, param: str) -> int | None:
     return int(value) if value is not None else None
 
 
-def _overall_rank(snapshot_sid: int, pid: int, param: str, value: int | None) -> int | None:
-    if value is None:
-        return None
-    expr = _player_value_expr(param, "x")
-    row = get_db().execute(
-        f"""
-        SELECT 1+COUNT(*)
-        FROM observations x
-        WHERE x.snapshot_id=? AND {expr} IS NOT NULL
-          AND ({expr}>? OR ({expr}=? AND x.pid<?))
-        """,
-        (snapshot_sid, value, value, pid),
-    ).fetchone()
-    return int(row[0]) if row else None
-
-
-def _growth_rank(
-    from_sid: int,
-    to_sid: int,
-    pid: int,
-    param: str,
-    delta: int | None,
-) -> int | None:
-    if delta is None:
-        return None
-    current = _player_value_expr(param, "c")
-    previous = _player_value_expr(param, "p")
-    diff = f"({current}-{previous})"
-    row = get_db().execute(
-        f"""
-        SELECT 1+COUNT(*)
-        FROM observations c
-        JOIN observations p ON p.snapshot_id=? AND p.pid=c.pid
-        WHERE c.snapshot_id=?
-          AND {current} IS NOT NULL AND {previous} IS NOT NULL
-          AND ({diff}>? OR ({diff}=? AND c.pid<?))
-        """,
-        (from_sid, to_sid, delta, delta, pid),
-    ).fetchone()
-    return int(row[0]) if row else None
-
-
 @cached_query
 def query_personal_stats(pid: int, snap_from: str, snap_to: str) -> dict | None:
-    from_info = snapshot_info(snap_from)
-    to_info = snapshot_info(snap_to)
-    if not from_info or not to_info:
-        return None
-    from_sid, from_ts = from_info
-    to_sid, to_ts = to_info
-    if from_ts > to_ts:
-        from_sid, to_sid = to_sid, from_sid
-        from_ts, to_ts = to_ts, from_ts
-        snap_from, snap_to = snap_to, snap_from
-
-    db = get_db()
-    start = db.execute("SELECT * FROM observations WHERE snapshot_id=? AND pid=?", (from_sid, pid)).fetchone()
-    end = db.execute("SELECT * FROM observations WHERE snapshot_id=? AND pid=?", (to_sid, pid)).fetchone()
-    if start is None or end is None:
-        return None
-
-    latest_sid_row = db.execute("SELECT snapshot_id FROM snapshots ORDER BY ts DESC LIMIT 1").fetchone()
-    latest_sid = int(latest_sid_row[0]) if latest_sid_row else None
-    best_rows: dict[str, dict] = {}
-    if latest_sid is not None:
-        rows = db.execute(
-            """
-            SELECT bg.param,bg.diff,s.filename AS best_snapshot
-            FROM best_growth bg
-            JOIN snapshots s ON s.snapshot_id=bg.best_snapshot_id
-            WHERE bg.best_for_snapshot_id=? AND bg.pid=?
-            """,
-            (latest_sid, pid),
-        ).fetchall()
-        best_rows = {str(row["param"]): dict(row) for row in rows}
+    return QUERIES["personal_stats"](
+        get_db(),
+        pid,
+        snap_from,
+        snap_to,
+        snapshot_info=snapshot_info,
+        params=PERSONAL_PARAMS,
+        value_expr=_player_value_expr,
+        row_value=_row_value,
+    )
 
-    end_name = db.execute(
-        "SELECT value FROM text_values WHERE text_id=?", (end["name_id"],)
-    ).fetchone()
-    rows_out = []
-    for param in PERSONAL_PARAMS:
-        start_value = _row_value(start, param)
-        end_value = _row_value(end, param)
-        delta = end_value - start_value if start_value is not None and end_value is not None else None
-        best = best_rows.get(param)
-        rows_out.append(
-            {
-                "param": param,
-                "start": start_value,
-                "end": end_value,
-                "delta": delta,
-                "growth_rank": _growth_rank(from_sid, to_sid, pid, param, delta),
-                "overall_rank": _overall_rank(to_sid, pid, param, end_value),
-                "best_diff": int(best["diff"]) if best else None,
-                "best_snapshot": best["best_snapshot"] if best else None,
-            }
-        )
 
-    return {
-        "pid": pid,
-        "name": end_name[0] if end_name else str(pid),
-        "level": int(end["level"]) if end["level"] is not None else None,
-        "file1": snap_from,
-        "file2": snap_to,
-        "rows": rows_out,
-    }
+@app.route("/metrics")
+def metrics():
+    if SQL_METRICS is None:
+        return jsonify({"error": "metrics_disabled"}), 404
+    response = make_response(SQL_METRICS.render())
+    response.mimetype = "text/plain"
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
 
 
 @app.route("/robots.txt")
@@ -875,6 +968,7 @@ def api_level_players():
     page_size = max(10, min(500, request.args.get("page_size", default=LEVEL_PAGE_SIZE, type=int)))
     if not snapshot_id or level is None or page < 1:
         return jsonify({"error": "bad_request"}), 400
+    use_history_for(snapshot_id)
     offset = (page - 1) * page_size
     players = query_level_players(snapshot_id, level, page_size + 1, offset)
     has_more = len(players) > page_size
@@ -891,17 +985,10 @@ def api_player_suggest():
     sid = snapshot_num(snapshot)
     if sid is None or len(query) < 2:
         return jsonify([])
-    rows = get_db().execute(
-        """
-        SELECT DISTINCT n.value AS name
-        FROM observations o
-        JOIN text_values n ON n.text_id=o.name_id
-        WHERE o.snapshot_id=? AND n.norm LIKE ?
-        ORDER BY CASE WHEN n.norm=? THEN 0 ELSE 1 END,n.value LIMIT 20
-        """,
-        (sid, f"%{query}%", query),
-    ).fetchall()
-    return jsonify([row["name"] for row in rows])
+    use_history_for(snapshot)
+    level_raw = str(request.args.get("level") or "").strip()
+    level = int(level_raw) if level_raw.isdigit() else None
+    return jsonify(QUERIES["player_suggestions"](get_db(), query, snapshot_id=sid, level=level))
 
 
 @app.route("/api/player_suggest_all")
@@ -911,16 +998,7 @@ def api_player_suggest_all():
     query = normalize_name(request.args.get("q") or "")
     if len(query) < 2:
         return jsonify([])
-    rows = get_db().execute(
-        """
-        SELECT value
-        FROM text_values
-        WHERE norm LIKE ?
-        ORDER BY CASE WHEN norm=? THEN 0 ELSE 1 END,value LIMIT 20
-        """,
-        (f"%{query}%", query),
-    ).fetchall()
-    return jsonify([row["value"] for row in rows])
+    return jsonify(QUERIES["player_suggestions"](get_db(), query))
 
 
 @app.route("/api/player_search")
@@ -937,6 +1015,7 @@ def api_player_search():
     file = request.args.get("file")
     file1 = request.args.get("file1")
     file2 = request.args.get("file2")
+    use_history_for(file, file1, file2)
 
     if mode == "Прирост" and file1 and file2:
         rows = _search_ranked_growth(file1, file2, param, level, query)
@@ -985,6 +1064,7 @@ def profile():
     error = None
 
     if nickname and _db_available():
+        attach_history_db()
         player = find_player(nickname)
         if player is None:
             error = "Игрок с таким точным ником или ID не найден."
@@ -1084,6 +1164,7 @@ def index():
     base_args = {"mode": mode, "param": selected_param, "level": selected_level}
 
     if mode == "Общий":
+        use_history_for(file)
         previous = prev_snapshot_id(file, snapshots)
         base_args["file"] = file
         if selected_param == "По уровню":
@@ -1115,6 +1196,7 @@ def index():
             context["diff_hours"] = round((current_ts - previous_ts) / 3600)
 
     elif mode == "Прирост":
+        use_history_for(file1, file2)
         base_args.update(file1=file1, file2=file2)
         rating, total = query_growth_between(file1, file2, selected_param, level, PAGE_SIZE, offset)
         pagination = _pagination(page, total, base_args)
@@ -1146,7 +1228,94 @@ def index():
     return render_template("index.html", **context)
 
 
+WARMUP_INDEX_TABLES = ("observations", "best_growth", "text_values", "snapshots")
+
+
+def warmup_urls() -> list[str]:
+    """First page of every mode and parameter on the latest snapshots.
+
+    Between them they run the rating, growth, best-growth, group and level
+    summary queries and the snapshot catalog, and compile the templates.
+    """
+    return [
+        "/?" + urlencode({"mode": mode, "param": param})
+        for mode in ("Общий", "Прирост", "Лучшие (приросты)")
+        for param in params_for_mode(mode, param_options)
+    ]
+
+
+def _touch_indexes(conn: sqlite3.Connection) -> int:
+    """Read every index of the hot tables once so its pages are in the OS cache."""
+    placeholders = ",".join("?" for _ in WARMUP_INDEX_TABLES)
+    indexes = conn.execute(
+        f"SELECT name,tbl_name FROM sqlite_master WHERE type='index' AND tbl_name IN ({placeholders})",
+        WARMUP_INDEX_TABLES,
+    ).fetchall()
+    touched = 0
+    for name, table in indexes:
+        try:
+            conn.execute(f'SELECT COUNT(*) FROM "{table}" INDEXED BY "{name}"').fetchone()
+        except sqlite3.OperationalError:
+            # Partial indexes cannot serve an unconstrained scan.
+            continue
+        touched += 1
+    return touched
+
+
+def warm_up(max_seconds: float = WARMUP_MAX_SECONDS) -> dict[str, float | int]:
+    """Prime the query cache, templates and OS page cache for the current DB.
+
+    Pages are requested until ``max_seconds`` have passed; the hot indexes
+    are read afterwards if time remains.
+    """
+    started = time.perf_counter()
+    pages = indexes = 0
+    if _db_available():
+        client = app.test_client()
+        for url in warmup_urls():
+            if time.perf_counter() - started > max_seconds:
+                break
+            response = client.get(url)
+            if response.status_code != 200:
+                app.logger.warning("Warm-up: %s returned HTTP %d", url, response.status_code)
+            pages += 1
+        if time.perf_counter() - started <= max_seconds:
+            with app.app_context():
+                indexes = _touch_indexes(get_db())
+    seconds = time.perf_counter() - started
+    app.logger.info(
+        "Warm-up of %s: %d pages and %d indexes in %.2fs", os.path.abspath(DB_PATH), pages, indexes, seconds
+    )
+    return {"pages": pages, "indexes": indexes, "seconds": seconds}
+
+
+def start_warmup_watcher(poll_seconds: float = WARMUP_POLL_SECONDS) -> Thread:
+    """Warm up now and again whenever a new file is renamed over DB_PATH.
+
+    Each worker process has its own query cache, so every worker runs one;
+    gunicorn starts it from ``post_worker_init`` in gunicorn.conf.py.
+    """
+
+    def watch() -> None:
+        warmed = None
+        while True:
+            signature = _db_signature()
+            if signature != warmed and _db_available():
+                try:
+                    warm_up()
+                except Exception:  # a failed warm-up only costs the first users time
+                    app.logger.exception("Warm-up of %s failed", signature[0])
+                warmed = signature
+            time.sleep(poll_seconds)
+
+    thread = Thread(target=watch, name="forglory-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
 if __name__ == "__main__":
+    if WARMUP_ENABLED:
+        start_warmup_watcher()
     app.config["TEMPLATES_AUTO_RELOAD"] = True
     app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
     app.jinja_env.auto_reload = True
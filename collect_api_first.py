@@ -1,21 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import itertools
 import json
 import logging
 import re
 import sqlite3
 import time
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
 from urllib.parse import urljoin, urlparse
 
+import aiohttp
 import requests
 from bs4 import BeautifulSoup
 
 import get_data as legacy
+from forglory.adaptive_limit import AdaptiveLimiter, retry_after_seconds
+from forglory.http_metrics import RequestMetrics
 from forglory.schema import parse_int
 
 
@@ -45,6 +49,7 @@ API_NUMERIC_FIELDS: tuple[tuple[str, str], ...] = (
 OPTIONAL_API_NUMERIC_FIELDS: tuple[tuple[str, str], ...] = ()
 
 API_VALUE_PARENTS = ("achievements", "stats", "statistics", "counters", "hero")
+API_STREAM_CHUNK_BYTES = 1024 * 1024
 
 
 class ApiCollectionError(RuntimeError):
@@ -241,29 +246,47 @@ def _normalise_group_from_row(
     return group_name, group_id
 
 
-def _endpoint_group_schema(rows: list[Any]) -> dict[str, Any]:
-    all_keys: set[str] = set()
-    group_like: set[str] = set()
-    sample_shapes: dict[str, str] = {}
+class _EndpointSchema:
+    """Group-like keys and shapes of the first ``limit`` endpoint rows."""
+
     markers = ("clan", "brother", "guild", "клан", "брат")
-    for raw in rows[:200]:
-        if not isinstance(raw, dict):
-            continue
+
+    def __init__(self, limit: int = 200) -> None:
+        self.limit = limit
+        self.rows = 0
+        self.all_keys: set[str] = set()
+        self.group_like: set[str] = set()
+        self.sample_shapes: dict[str, str] = {}
+
+    def add(self, raw: Any) -> None:
+        self.rows += 1
+        if self.rows > self.limit or not isinstance(raw, dict):
+            return
         for key, value in raw.items():
             key_text = str(key)
-            all_keys.add(key_text)
-            if any(marker in key_text.casefold() for marker in markers):
-                group_like.add(key_text)
-                if key_text not in sample_shapes:
+            self.all_keys.add(key_text)
+            if any(marker in key_text.casefold() for marker in self.markers):
+                self.group_like.add(key_text)
+                if key_text not in self.sample_shapes:
                     if isinstance(value, dict):
-                        sample_shapes[key_text] = "object:" + ",".join(sorted(map(str, value.keys())))
+                        self.sample_shapes[key_text] = "object:" + ",".join(sorted(map(str, value.keys())))
                     else:
-                        sample_shapes[key_text] = type(value).__name__
-    return {
-        "group_like_keys": sorted(group_like),
-        "group_like_shapes": sample_shapes,
-        "row_keys": sorted(all_keys),
-    }
+                        self.sample_shapes[key_text] = type(value).__name__
+
+    def result(self) -> dict[str, Any]:
+        return {
+            "group_like_keys": sorted(self.group_like),
+            "group_like_shapes": self.sample_shapes,
+            "row_keys": sorted(self.all_keys),
+        }
+
+
+def _endpoint_group_schema(rows: list[Any]) -> dict[str, Any]:
+    schema = _EndpointSchema()
+    for raw in rows[:schema.limit]:
+        schema.add(raw)
+    return schema.result()
+
 
 def _api_numeric_value(raw: dict[str, Any], key: str) -> Any:
     """Read a counter from the current or a future nested endpoint shape."""
@@ -319,48 +342,55 @@ def normalise_api_hero(raw: Any, row_number: int) -> tuple[int, dict]:
     return pid, hero
 
 
-def _group_coverage(heroes: dict[int, dict]) -> dict[str, int]:
-    clan_ids = {
-        int(hero.get("clan_id") or 0)
-        for hero in heroes.values()
-        if int(hero.get("clan_id") or 0) > 0
-    }
-    brotherhood_ids = {
-        int(hero.get("brotherhood_id") or 0)
-        for hero in heroes.values()
-        if int(hero.get("brotherhood_id") or 0) > 0
-    }
-    return {
-        "clan_members": sum(1 for hero in heroes.values() if int(hero.get("clan_id") or 0) > 0),
-        "clans": len(clan_ids),
-        "brotherhood_members": sum(
-            1 for hero in heroes.values() if int(hero.get("brotherhood_id") or 0) > 0
-        ),
-        "brotherhoods": len(brotherhood_ids),
-    }
+class _GroupCoverage:
+    """Clan and brotherhood membership counts, fed one hero at a time."""
 
+    def __init__(self) -> None:
+        self.clan_ids: set[int] = set()
+        self.brotherhood_ids: set[int] = set()
+        self.clan_members = 0
+        self.brotherhood_members = 0
 
+    def add(self, hero: dict) -> None:
+        clan_id = int(hero.get("clan_id") or 0)
+        if clan_id > 0:
+            self.clan_members += 1
+            self.clan_ids.add(clan_id)
+        brotherhood_id = int(hero.get("brotherhood_id") or 0)
+        if brotherhood_id > 0:
+            self.brotherhood_members += 1
+            self.brotherhood_ids.add(brotherhood_id)
 
-def parse_api_payload(
-    payload: Any,
+    def result(self) -> dict[str, int]:
+        return {
+            "clan_members": self.clan_members,
+            "clans": len(self.clan_ids),
+            "brotherhood_members": self.brotherhood_members,
+            "brotherhoods": len(self.brotherhood_ids),
+        }
+
+
+def _group_coverage(heroes: dict[int, dict]) -> dict[str, int]:
+    coverage = _GroupCoverage()
+    for hero in heroes.values():
+        coverage.add(hero)
+    return coverage.result()
+
+
+def _check_api_envelope(
+    success: Any,
+    row_count: int,
+    raw_meta: Any,
     min_player_count: int,
-) -> tuple[dict[int, dict], dict[str, Any]]:
-    if not isinstance(payload, dict):
-        raise ApiCollectionError("API response root must be an object")
-    if payload.get("success") is not True:
+) -> dict[str, Any]:
+    if success is not True:
         raise ApiCollectionError("API response has success != true")
-
-    rows = payload.get("data")
-    if not isinstance(rows, list):
-        raise ApiCollectionError("API response field 'data' must be a list")
-    if len(rows) < max(1, min_player_count):
+    if row_count < max(1, min_player_count):
         raise ApiCollectionError(
-            f"API returned only {len(rows)} players; minimum is {max(1, min_player_count)}"
+            f"API returned only {row_count} players; minimum is {max(1, min_player_count)}"
         )
 
-    raw_meta = payload.get("meta")
     meta = dict(raw_meta) if isinstance(raw_meta, dict) else {}
-
     declared_min_level = parse_int(meta.get("min_level"))
     if declared_min_level is not None and declared_min_level != SCOPE_MIN_LEVEL:
         raise ApiCollectionError(
@@ -368,24 +398,197 @@ def parse_api_payload(
         )
 
     declared_count = parse_int(meta.get("count"))
-    if declared_count is not None and declared_count != len(rows):
+    if declared_count is not None and declared_count != row_count:
         raise ApiCollectionError(
-            f"API meta.count={declared_count!r}, but data contains {len(rows)} rows"
+            f"API meta.count={declared_count!r}, but data contains {row_count} rows"
         )
     meta.setdefault("min_level", SCOPE_MIN_LEVEL)
-    meta.setdefault("count", len(rows))
+    meta.setdefault("count", row_count)
+    return meta
+
 
-    heroes: dict[int, dict] = {}
-    for row_number, raw in enumerate(rows, 1):
-        pid, hero = normalise_api_hero(raw, row_number)
-        if pid in heroes:
+class _HeroAccumulator:
+    """Normalise endpoint rows one at a time, collecting statistics on the way."""
+
+    def __init__(self) -> None:
+        self.heroes: dict[int, dict] = {}
+        self.coverage = _GroupCoverage()
+        self.schema = _EndpointSchema()
+        self.rows = 0
+
+    def add(self, raw: Any) -> None:
+        self.rows += 1
+        pid, hero = normalise_api_hero(raw, self.rows)
+        if pid in self.heroes:
             raise ApiCollectionError(f"API contains duplicate player id {pid}")
-        heroes[pid] = hero
+        self.heroes[pid] = hero
+        self.coverage.add(hero)
+        self.schema.add(raw)
+
+    def finish(self, meta: dict[str, Any]) -> tuple[dict[int, dict], dict[str, Any]]:
+        meta["forglory_group_coverage"] = self.coverage.result()
+        meta["forglory_endpoint_schema"] = self.schema.result()
+        return self.heroes, meta
+
+
+def parse_api_payload(
+    payload: Any,
+    min_player_count: int,
+) -> tuple[dict[int, dict], dict[str, Any]]:
+    if not isinstance(payload, dict):
+        raise ApiCollectionError("API response root must be an object")
+    if payload.get("success") is not True:
+        raise ApiCollectionError("API response has success != true")
+
+    rows = payload.get("data")
+    if not isinstance(rows, list):
+        raise ApiCollectionError("API response field 'data' must be a list")
+    meta = _check_api_envelope(payload.get("success"), len(rows), payload.get("meta"), min_player_count)
 
-    group_coverage = _group_coverage(heroes)
-    meta["forglory_group_coverage"] = group_coverage
-    meta["forglory_endpoint_schema"] = _endpoint_group_schema(rows)
-    return heroes, meta
+    accumulator = _HeroAccumulator()
+    for raw in rows:
+        accumulator.add(raw)
+    return accumulator.finish(meta)
+
+
+class _JsonStream:
+    """Pull-style reader for one JSON document arriving in text chunks.
+
+    Values are decoded with ``JSONDecoder.raw_decode`` as soon as they are
+    complete, and consumed text is dropped, so only one row is buffered.
+    """
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                if self._pos:
+                    self._buffer = self._buffer[self._pos:]
+                    self._pos = 0
+                self._buffer += chunk
+                return True
+        self._eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ApiCollectionError("API response ended unexpectedly")
+
+    def expect(self, token: str) -> None:
+        found = self.peek()
+        if found != token:
+            raise ApiCollectionError(f"API response: expected {token!r}, found {found!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._eof or not self._fill():
+                    raise ApiCollectionError(f"API response is not valid JSON: {exc}") from exc
+                continue
+            # A number or literal that ends the buffer may continue in the
+            # next chunk; decode it again once a delimiter has arrived.
+            if end >= len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ApiCollectionError("API response: object key must be a string")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def finish(self) -> None:
+        while True:
+            if self._buffer[self._pos:].strip():
+                raise ApiCollectionError("API response has data after the JSON document")
+            self._buffer, self._pos = "", 0
+            if not self._fill():
+                return
+
+
+def parse_api_stream(
+    chunks: Iterable[bytes],
+    min_player_count: int,
+) -> tuple[dict[int, dict], dict[str, Any]]:
+    """Streaming ``parse_api_payload`` for the raw response body.
+
+    Rows are normalised as they are decoded, and coverage and schema
+    statistics are gathered in the same pass. The full payload and the
+    raw row list are never held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    text = (decoder.decode(chunk) for chunk in chunks)
+    stream = _JsonStream(itertools.chain(text, [decoder.decode(b"", final=True)]))
+    if stream.peek() != "{":
+        raise ApiCollectionError("API response root must be an object")
+
+    accumulator = _HeroAccumulator()
+    success: Any = None
+    raw_meta: Any = None
+    has_data = False
+    for key in stream.members():
+        if key == "data":
+            if stream.peek() != "[":
+                raise ApiCollectionError("API response field 'data' must be a list")
+            has_data = True
+            for raw in stream.items():
+                accumulator.add(raw)
+        elif key == "success":
+            success = stream.value()
+        elif key == "meta":
+            raw_meta = stream.value()
+        else:
+            stream.value()
+    stream.finish()
+
+    if success is not True:
+        raise ApiCollectionError("API response has success != true")
+    if not has_data:
+        raise ApiCollectionError("API response field 'data' must be a list")
+    meta = _check_api_envelope(success, accumulator.rows, raw_meta, min_player_count)
+    return accumulator.finish(meta)
 
 
 def fetch_from_bulk_api(
@@ -417,14 +620,18 @@ def fetch_from_bulk_api(
         for attempt in range(1, attempts + 1):
             try:
                 LOG.info("Trying bulk heroes endpoint, attempt %s/%s", attempt, attempts)
-                response = session.get(
+                with session.get(
                     endpoint,
                     timeout=timeout_seconds,
                     allow_redirects=True,
-                )
-                response.raise_for_status()
-                heroes, meta = parse_api_payload(response.json(), min_player_count)
-                coverage = _group_coverage(heroes)
+                    stream=True,
+                ) as response:
+                    response.raise_for_status()
+                    heroes, meta = parse_api_stream(
+                        response.iter_content(chunk_size=API_STREAM_CHUNK_BYTES),
+                        min_player_count,
+                    )
+                coverage = meta["forglory_group_coverage"]
                 LOG.info(
                     "Bulk heroes endpoint succeeded on attempt %s: %s players; "
                     "clan members=%s (%s clans), brotherhood members=%s (%s brotherhoods)",
@@ -586,162 +793,269 @@ def scan_group_rosters(
     the configured retries. New groups are searched only from ``max_known + 1``
     through ``max_known + discovery_window``. Individual page failures are
     logged and skipped; roster collection never invalidates player data.
+
+    This is ``scan_group_rosters_concurrently`` for one kind, one request at
+    a time.
     """
-    if group_kind not in {"clan", "brotherhood"}:
-        raise ValueError(f"Unsupported group kind: {group_kind}")
+    return scan_group_rosters_concurrently(
+        domain,
+        cookies,
+        {group_kind: known_group_ids},
+        timeout_seconds=timeout_seconds,
+        attempts=attempts,
+        retry_delay_seconds=retry_delay_seconds,
+        discovery_window=discovery_window,
+        concurrency=1,
+    )[group_kind]
+
+
+async def _fetch_group_roster(
+    session: aiohttp.ClientSession,
+    limiter: AdaptiveLimiter,
+    domain: str,
+    group_kind: str,
+    group_id: int,
+    configured_attempts: int,
+    retry_delay_seconds: float,
+) -> GroupRoster | None:
+    """Fetch one roster page; known IDs get ``configured_attempts`` tries."""
+    url = urljoin(domain, f"{group_kind}/warriors?id={group_id}")
+    attempts = max(1, configured_attempts)
+    last_error: Exception | None = None
+    for attempt in range(1, attempts + 1):
+        retry_after: float | None = None
+        try:
+            async with limiter:
+                started = time.monotonic()
+                async with session.get(url, allow_redirects=True) as response:
+                    status = int(response.status)
+                    final_url = str(response.url)
+                    text = await response.text(errors="replace")
+                    if status == 429 or 500 <= status <= 599:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        limiter.on_throttle(retry_after)
+                    else:
+                        limiter.on_success(time.monotonic() - started)
+            if status in {404, 410}:
+                return None
+            if status >= 400:
+                raise ApiCollectionError(f"HTTP {status} for url: {url}")
+            if not urlparse(final_url).path.rstrip("/").endswith(f"/{group_kind}/warriors"):
+                raise ApiCollectionError(
+                    f"{group_kind} roster {group_id}: unexpected redirect to {final_url}"
+                )
+            roster = parse_group_roster_html(text, group_kind=group_kind, group_id=group_id)
+            if roster is not None:
+                return roster
+            if attempt < attempts:
+                await asyncio.sleep(retry_delay_seconds * attempt)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ApiCollectionError) as exc:
+            if not isinstance(exc, ApiCollectionError):
+                limiter.on_throttle()
+            last_error = exc
+            if attempt < attempts:
+                await asyncio.sleep(max(retry_after or 0.0, retry_delay_seconds * attempt))
+                continue
+            raise ApiCollectionError(
+                f"{group_kind} roster {group_id} failed after "
+                f"{configured_attempts} attempts: {exc!r}"
+            ) from exc
+    if last_error is not None:
+        raise ApiCollectionError(f"{group_kind} roster {group_id} failed: {last_error}")
+    return None
 
-    attempts = max(1, int(attempts))
-    retry_delay_seconds = max(0.0, float(retry_delay_seconds))
-    timeout_seconds = max(1.0, float(timeout_seconds))
-    discovery_window = max(0, int(discovery_window))
-    known_ids = sorted({int(group_id) for group_id in known_group_ids if int(group_id) > 0})
-    rosters_by_id: dict[int, GroupRoster] = {}
-    failed_ids: list[int] = []
 
-    with requests.Session() as session:
-        session.headers.update(legacy.HEADERS)
-        session.headers.update({"Accept": "text/html", "Referer": domain})
-        session.cookies.update(cookies)
+@dataclass
+class _RosterScan:
+    """Progress of one group kind inside ``scan_group_rosters_concurrently``."""
+
+    group_kind: str
+    known_ids: list[int]
+    discovery_ids: range
+    rosters_by_id: dict[int, GroupRoster]
+    failed_ids: list[int]
+    known_checked: int = 0
+    discovery_checked: int = 0
+
+    def members(self) -> int:
+        return sum(len(item.members) for item in self.rosters_by_id.values())
+
+    def record(self, group_id: int, known: bool, roster: GroupRoster | None, error: Exception | None) -> None:
+        kind = self.group_kind
+        if known:
+            self.known_checked += 1
+            if error is not None:
+                self.failed_ids.append(group_id)
+                LOG.warning("%s known roster id=%s could not be refreshed; skipping: %s", kind, group_id, error)
+            elif roster is None:
+                LOG.info("%s known roster id=%s no longer exists; skipping", kind, group_id)
+            else:
+                self.rosters_by_id[group_id] = roster
+            if self.known_checked % 50 == 0:
+                LOG.info(
+                    "%s roster refresh progress: checked=%s/%s, valid=%s, members=%s, failed=%s",
+                    kind, self.known_checked, len(self.known_ids), len(self.rosters_by_id),
+                    self.members(), len(self.failed_ids),
+                )
+            return
+        self.discovery_checked += 1
+        if error is not None:
+            self.failed_ids.append(group_id)
+            LOG.warning(
+                "%s roster discovery id=%s failed; skipping without aborting collection: %s",
+                kind, group_id, error,
+            )
+        elif roster is not None:
+            self.rosters_by_id[group_id] = roster
+            LOG.info("%s roster scan discovered new valid id=%s (%s)", kind, group_id, roster.name)
+        if self.discovery_checked % 50 == 0:
+            LOG.info(
+                "%s roster discovery progress: checked=%s/%s, valid_total=%s, members=%s, failed=%s",
+                kind, self.discovery_checked, len(self.discovery_ids), len(self.rosters_by_id),
+                self.members(), len(self.failed_ids),
+            )
 
-        def fetch_one(group_id: int, configured_attempts: int) -> GroupRoster | None:
-            url = urljoin(domain, f"{group_kind}/warriors?id={group_id}")
-            last_error: Exception | None = None
-            for attempt in range(1, max(1, configured_attempts) + 1):
-                try:
-                    response = session.get(
-                        url,
-                        timeout=timeout_seconds,
-                        allow_redirects=True,
-                    )
-                    if response.status_code in {404, 410}:
-                        return None
-                    response.raise_for_status()
 
-                    final = urlparse(response.url)
-                    if not final.path.rstrip("/").endswith(
-                        f"/{group_kind}/warriors"
-                    ):
-                        raise ApiCollectionError(
-                            f"{group_kind} roster {group_id}: "
-                            f"unexpected redirect to {response.url}"
-                        )
-
-                    roster = parse_group_roster_html(
-                        response.text,
-                        group_kind=group_kind,
-                        group_id=group_id,
-                    )
-                    if roster is not None:
-                        return roster
-                    if attempt < max(1, configured_attempts):
-                        time.sleep(retry_delay_seconds * attempt)
-                except (requests.RequestException, ApiCollectionError) as exc:
-                    last_error = exc
-                    if attempt < max(1, configured_attempts):
-                        time.sleep(retry_delay_seconds * attempt)
-                        continue
-                    raise ApiCollectionError(
-                        f"{group_kind} roster {group_id} failed after "
-                        f"{configured_attempts} attempts: {exc}"
-                    ) from exc
-            if last_error is not None:
-                raise ApiCollectionError(
-                    f"{group_kind} roster {group_id} failed: {last_error}"
+async def _scan_group_rosters_async(
+    domain: str,
+    cookies: dict[str, str],
+    scans: list[_RosterScan],
+    *,
+    timeout_seconds: float,
+    attempts: int,
+    retry_delay_seconds: float,
+    concurrency: int,
+    max_concurrency: int | None = None,
+) -> dict[str, Any]:
+    # Interleave the kinds so neither waits for the other to finish.
+    jobs: list[tuple[_RosterScan, int, bool]] = []
+    queues = [
+        [(scan, group_id, True) for group_id in scan.known_ids]
+        + [(scan, group_id, False) for group_id in scan.discovery_ids]
+        for scan in scans
+    ]
+    for index in range(max((len(queue) for queue in queues), default=0)):
+        jobs.extend(queue[index] for queue in queues if index < len(queue))
+
+    limiter = AdaptiveLimiter(concurrency, maximum=max(concurrency, min(max_concurrency or concurrency, 64)))
+    connector = aiohttp.TCPConnector(
+        limit=limiter.maximum + 4,
+        limit_per_host=limiter.maximum,
+        ttl_dns_cache=600,
+        keepalive_timeout=30,
+    )
+    remaining = iter(jobs)
+
+    async def work(session: aiohttp.ClientSession) -> None:
+        for scan, group_id, known in remaining:
+            roster: GroupRoster | None = None
+            error: Exception | None = None
+            try:
+                roster = await _fetch_group_roster(
+                    session,
+                    limiter,
+                    domain,
+                    scan.group_kind,
+                    group_id,
+                    attempts if known else 1,
+                    retry_delay_seconds,
                 )
-            return None
+            except Exception as exc:  # one page never aborts the scan
+                error = exc
+            scan.record(group_id, known, roster, error)
 
+    async with aiohttp.ClientSession(
+        cookies=cookies,
+        headers={**legacy.HEADERS, "Accept": "text/html", "Referer": domain},
+        timeout=aiohttp.ClientTimeout(total=timeout_seconds),
+        connector=connector,
+    ) as session:
+        await asyncio.gather(*(work(session) for _ in range(min(limiter.maximum, len(jobs)))))
+    return limiter.summary()
+
+
+def scan_group_rosters_concurrently(
+    domain: str,
+    cookies: dict[str, str],
+    known_ids_by_kind: dict[str, Iterable[int]],
+    *,
+    timeout_seconds: float,
+    attempts: int,
+    retry_delay_seconds: float,
+    discovery_window: int = 50,
+    concurrency: int = 8,
+    max_concurrency: int | None = None,
+) -> dict[str, list[GroupRoster]]:
+    """Scan clan and brotherhood rosters at once over one aiohttp session.
+
+    Each kind gets the ID plan described in ``scan_group_rosters``: known IDs
+    with their retries, then one probe per ID of the discovery window, and a
+    failed page never aborts the scan. The requests of both kinds share one
+    adaptive concurrency limit, which never grows above ``concurrency``
+    unless ``max_concurrency`` allows it.
+    """
+    for group_kind in known_ids_by_kind:
+        if group_kind not in {"clan", "brotherhood"}:
+            raise ValueError(f"Unsupported group kind: {group_kind}")
+
+    attempts = max(1, int(attempts))
+    retry_delay_seconds = max(0.0, float(retry_delay_seconds))
+    timeout_seconds = max(1.0, float(timeout_seconds))
+    discovery_window = max(0, int(discovery_window))
+    scans: list[_RosterScan] = []
+    for group_kind, group_ids in known_ids_by_kind.items():
+        known_ids = sorted({int(group_id) for group_id in group_ids if int(group_id) > 0})
+        discovery_start = (known_ids[-1] + 1) if known_ids else 1
+        scans.append(
+            _RosterScan(
+                group_kind=group_kind,
+                known_ids=known_ids,
+                discovery_ids=range(discovery_start, discovery_start + discovery_window),
+                rosters_by_id={},
+                failed_ids=[],
+            )
+        )
         if known_ids:
             LOG.info(
                 "%s roster scan: refreshing %s known IDs; range=%s..%s",
-                group_kind,
-                len(known_ids),
-                known_ids[0],
-                known_ids[-1],
+                group_kind, len(known_ids), known_ids[0], known_ids[-1],
             )
         else:
             LOG.warning(
-                "%s roster scan has no historical or endpoint IDs; "
-                "probing bootstrap range 1..%s once",
-                group_kind,
-                discovery_window,
+                "%s roster scan has no historical or endpoint IDs; probing bootstrap range 1..%s once",
+                group_kind, discovery_window,
             )
 
-        for index, group_id in enumerate(known_ids, 1):
-            try:
-                roster = fetch_one(group_id, attempts)
-            except Exception as exc:
-                failed_ids.append(group_id)
-                LOG.warning(
-                    "%s known roster id=%s could not be refreshed; skipping: %s",
-                    group_kind,
-                    group_id,
-                    exc,
-                )
-                continue
-            if roster is None:
-                LOG.info(
-                    "%s known roster id=%s no longer exists; skipping",
-                    group_kind,
-                    group_id,
-                )
-                continue
-            rosters_by_id[group_id] = roster
-            if index % 50 == 0:
-                LOG.info(
-                    "%s roster refresh progress: checked=%s/%s, valid=%s, members=%s, failed=%s",
-                    group_kind,
-                    index,
-                    len(known_ids),
-                    len(rosters_by_id),
-                    sum(len(item.members) for item in rosters_by_id.values()),
-                    len(failed_ids),
-                )
+    summary = asyncio.run(
+        _scan_group_rosters_async(
+            domain,
+            cookies,
+            scans,
+            timeout_seconds=timeout_seconds,
+            attempts=attempts,
+            retry_delay_seconds=retry_delay_seconds,
+            concurrency=max(1, int(concurrency)),
+            max_concurrency=max_concurrency,
+        )
+    )
 
-        discovery_start = (known_ids[-1] + 1) if known_ids else 1
-        discovery_end = discovery_start + discovery_window - 1
-        discovery_ids = range(discovery_start, discovery_end + 1) if discovery_window else ()
-        for index, group_id in enumerate(discovery_ids, 1):
-            try:
-                roster = fetch_one(group_id, 1)
-            except Exception as exc:
-                failed_ids.append(group_id)
-                LOG.warning(
-                    "%s roster discovery id=%s failed; skipping without aborting collection: %s",
-                    group_kind,
-                    group_id,
-                    exc,
-                )
-                continue
-            if roster is not None:
-                rosters_by_id[group_id] = roster
-                LOG.info(
-                    "%s roster scan discovered new valid id=%s (%s)",
-                    group_kind,
-                    group_id,
-                    roster.name,
-                )
-            if index % 50 == 0:
-                LOG.info(
-                    "%s roster discovery progress: checked=%s/%s, valid_total=%s, members=%s, failed=%s",
-                    group_kind,
-                    index,
-                    discovery_window,
-                    len(rosters_by_id),
-                    sum(len(item.members) for item in rosters_by_id.values()),
-                    len(failed_ids),
-                )
+    for scan in scans:
+        LOG.info(
+            "%s roster scan finished: known=%s, discovery=%s..%s, valid=%s, members=%s, failed=%s",
+            scan.group_kind,
+            len(scan.known_ids),
+            scan.discovery_ids.start,
+            scan.discovery_ids.stop - 1,
+            len(scan.rosters_by_id),
+            scan.members(),
+            len(scan.failed_ids),
+        )
+    LOG.info("Roster scan concurrency: %s", summary)
+    return {
+        scan.group_kind: [scan.rosters_by_id[key] for key in sorted(scan.rosters_by_id)]
+        for scan in scans
+    }
 
-    LOG.info(
-        "%s roster scan finished: known=%s, discovery=%s..%s, valid=%s, members=%s, failed=%s",
-        group_kind,
-        len(known_ids),
-        discovery_start,
-        discovery_end if discovery_window else discovery_start - 1,
-        len(rosters_by_id),
-        sum(len(item.members) for item in rosters_by_id.values()),
-        len(failed_ids),
-    )
-    return [rosters_by_id[key] for key in sorted(rosters_by_id)]
 
 def apply_group_rosters(
     heroes: dict[int, dict],
@@ -870,28 +1184,24 @@ def replace_groups_from_rosters(
         "brotherhood": [],
     }
     scan_errors: dict[str, str] = {}
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        futures = {
-            group_kind: executor.submit(
-                scan_group_rosters,
+    try:
+        rosters_by_kind.update(
+            scan_group_rosters_concurrently(
                 domain,
                 cookies,
-                group_kind,
-                known_group_ids=known_ids_by_kind[group_kind],
+                known_ids_by_kind,
+                concurrency=int(legacy.env_get("GROUP_SCAN_CONCURRENCY", "8")),
+                max_concurrency=int(legacy.env_get("GROUP_SCAN_MAX_CONCURRENCY", "0")) or None,
                 **scan_options,
             )
-            for group_kind in ("clan", "brotherhood")
-        }
-        for group_kind, future in futures.items():
-            try:
-                rosters_by_kind[group_kind] = future.result()
-            except Exception as exc:
-                scan_errors[group_kind] = str(exc)
-                LOG.exception(
-                    "%s roster scan failed completely; continuing without it: %s",
-                    group_kind,
-                    exc,
-                )
+        )
+    except Exception as exc:
+        for group_kind in ("clan", "brotherhood"):
+            scan_errors[group_kind] = str(exc)
+        LOG.exception(
+            "Roster scan failed completely; continuing without it: %s",
+            exc,
+        )
 
     scan_meta: dict[str, Any] = {}
     for group_kind in ("clan", "brotherhood"):
@@ -1040,38 +1350,88 @@ def _previous_lord_wins(db_path: Path) -> dict[int, int]:
         conn.close()
 
 
-def _fetch_one_lord_wins(
+async def _fetch_one_lord_wins(
+    session: aiohttp.ClientSession,
+    limiter: AdaptiveLimiter,
     pid: int,
     domain: str,
-    cookies: dict[str, str],
     retries: int,
-    timeout_seconds: float,
 ) -> tuple[int, int | None, str | None]:
     url = f"{domain}achievements?player={pid}"
     last_error = None
     for attempt in range(1, max(1, retries) + 1):
+        retry_after: float | None = None
         try:
-            response = requests.get(
-                url,
-                cookies=cookies,
-                headers=legacy.HEADERS,
-                timeout=max(5.0, timeout_seconds),
-                allow_redirects=True,
-            )
-            if response.status_code == 200:
-                value = parse_lord_wins_from_achievements(response.text)
+            async with limiter:
+                started = time.monotonic()
+                async with session.get(url, allow_redirects=True) as response:
+                    text = await response.text(errors="replace")
+                    status = int(response.status)
+                    if status == 429 or 500 <= status <= 599:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        limiter.on_throttle(retry_after)
+                    else:
+                        limiter.on_success(time.monotonic() - started)
+            if status == 200:
+                value = parse_lord_wins_from_achievements(text)
                 if value is not None:
                     return pid, value, None
                 last_error = "lord_wins_not_found"
             else:
-                last_error = f"http_{response.status_code}"
-        except requests.RequestException as exc:
+                last_error = f"http_{status}"
+        except asyncio.TimeoutError:
+            last_error = "TimeoutError"
+            limiter.on_throttle()
+        except aiohttp.ClientError as exc:
             last_error = type(exc).__name__
+            limiter.on_throttle()
         if attempt < max(1, retries):
-            time.sleep(min(5.0, 2 ** (attempt - 1)))
+            await asyncio.sleep(max(retry_after or 0.0, min(5.0, 2 ** (attempt - 1))))
     return pid, None, last_error
 
 
+async def _fetch_lord_wins(
+    pids: list[int],
+    *,
+    domain: str,
+    cookies: dict[str, str],
+    concurrency: int,
+    retries: int,
+    timeout_seconds: float,
+    on_result: Callable[[int, int | None, str | None], None],
+    max_concurrency: int | None = None,
+) -> dict[str, Any]:
+    """Fetch achievement pages with a worker pool under an adaptive limit.
+
+    All workers share one keep-alive connection pool; the returned summary
+    has the limiter state plus request and connection counts.
+    """
+    limiter = AdaptiveLimiter(concurrency, maximum=max(concurrency, min(max_concurrency or concurrency, 128)))
+    metrics = RequestMetrics()
+    timeout = aiohttp.ClientTimeout(total=max(5.0, timeout_seconds))
+    connector = aiohttp.TCPConnector(
+        limit=max(limiter.maximum + 10, 30),
+        limit_per_host=max(limiter.maximum, 20),
+        ttl_dns_cache=600,
+        keepalive_timeout=30,
+    )
+    remaining = iter(pids)
+
+    async def work(session: aiohttp.ClientSession) -> None:
+        for pid in remaining:
+            on_result(*await _fetch_one_lord_wins(session, limiter, pid, domain, retries))
+
+    async with aiohttp.ClientSession(
+        cookies=cookies,
+        headers=legacy.HEADERS,
+        timeout=timeout,
+        connector=connector,
+        trace_configs=[metrics.trace_config()],
+    ) as session:
+        await asyncio.gather(*(work(session) for _ in range(min(limiter.maximum, len(pids)))))
+    return {**limiter.summary(), **metrics.summary()}
+
+
 def enrich_profile_fallback_lord_wins(
     heroes: dict[int, dict],
     *,
@@ -1080,6 +1440,7 @@ def enrich_profile_fallback_lord_wins(
     cookies: dict[str, str],
     concurrency: int,
     retries: int,
+    max_concurrency: int | None = None,
 ) -> dict[str, Any]:
     """Fill lord wins for profile fallback from individual achievement pages."""
     missing = [
@@ -1099,38 +1460,49 @@ def enrich_profile_fallback_lord_wins(
     reused = 0
     errors: dict[str, int] = {}
     timeout_seconds = float(legacy.env_get("LORD_WINS_TIMEOUT_SECONDS", "30"))
-    worker_count = max(1, min(int(concurrency), 64))
-    with ThreadPoolExecutor(max_workers=worker_count) as pool:
-        futures = [
-            pool.submit(
-                _fetch_one_lord_wins,
-                pid,
-                domain,
-                cookies,
-                max(1, retries),
-                timeout_seconds,
+    completed = 0
+
+    def record(pid: int, value: int | None, error: str | None) -> None:
+        nonlocal completed, fetched, reused
+        completed += 1
+        if value is not None:
+            heroes[pid]["Побед над Владыкой"] = value
+            fetched += 1
+        elif pid in previous:
+            heroes[pid]["Побед над Владыкой"] = previous[pid]
+            reused += 1
+        else:
+            errors[error or "unknown"] = errors.get(error or "unknown", 0) + 1
+        if completed % 1000 == 0 or completed == len(missing):
+            LOG.info(
+                "Lord-wins fallback progress %s/%s: fetched=%s, previous=%s, missing=%s",
+                completed,
+                len(missing),
+                fetched,
+                reused,
+                completed - fetched - reused,
             )
-            for pid in missing
-        ]
-        for index, future in enumerate(futures, 1):
-            pid, value, error = future.result()
-            if value is not None:
-                heroes[pid]["Побед над Владыкой"] = value
-                fetched += 1
-            elif pid in previous:
-                heroes[pid]["Побед над Владыкой"] = previous[pid]
-                reused += 1
-            else:
-                errors[error or "unknown"] = errors.get(error or "unknown", 0) + 1
-            if index % 1000 == 0 or index == len(futures):
-                LOG.info(
-                    "Lord-wins fallback progress %s/%s: fetched=%s, previous=%s, missing=%s",
-                    index,
-                    len(futures),
-                    fetched,
-                    reused,
-                    index - fetched - reused,
-                )
+
+    concurrency_summary = asyncio.run(
+        _fetch_lord_wins(
+            missing,
+            domain=domain,
+            cookies=cookies,
+            concurrency=max(1, min(int(concurrency), 64)),
+            retries=max(1, retries),
+            timeout_seconds=timeout_seconds,
+            on_result=record,
+            max_concurrency=max_concurrency,
+        )
+    )
+    LOG.info(
+        "Lord-wins fallback fetched %s pages in %.1fs (%.1f req/s) over %s connections; limiter=%s",
+        concurrency_summary["requests"],
+        concurrency_summary["elapsed_seconds"],
+        concurrency_summary["requests_per_second"],
+        concurrency_summary["connections_opened"],
+        {key: concurrency_summary[key] for key in ("limit", "peak_limit", "throttles")},
+    )
 
     still_missing = sum(
         1 for hero in heroes.values()
@@ -1150,6 +1522,7 @@ def enrich_profile_fallback_lord_wins(
         "missing": still_missing,
         "coverage": coverage,
         "errors": errors,
+        "concurrency": concurrency_summary,
     }
 
 
@@ -1160,7 +1533,7 @@ def _save_legacy_fallback_snapshot(
     cookies: dict[str, str],
     domain: str,
     reason: str,
-) -> tuple[Path, Path]:
+) -> tuple[Path, Path | None]:
     """Run the profile collector while preserving the level-5+ dataset contract."""
     if not legacy.check_site_ready(
         domain,
@@ -1193,18 +1566,46 @@ def _save_legacy_fallback_snapshot(
         probe_end,
         len(ids),
     )
-    results, failures, achievement_failures = asyncio.run(
-        legacy.collect(
-            ids,
-            cookies,
-            domain,
-            args.concurrency,
-            args.retries,
-            known_names=known_names,
-            achievement_retries=args.achievement_retries,
-            systemic_failure_sample_size=args.systemic_failure_sample_size,
+    journal_path = Path(
+        legacy.env_get(
+            "FALLBACK_CHECKPOINT_PATH",
+            str(legacy.DATA_DIR / "profile_fallback.journal.ndjson"),
         )
     )
+    max_age_hours = float(legacy.env_get("FALLBACK_CHECKPOINT_MAX_AGE_HOURS", "6"))
+    resumed = legacy.CheckpointJournal.load(journal_path, max_age_hours * 3600, ids)
+    remaining = [pid for pid in ids if pid not in resumed.heroes]
+    if resumed.heroes:
+        LOG.warning(
+            "Resuming profile fallback from %s: reused=%s, remaining=%s",
+            journal_path,
+            len(resumed.heroes),
+            len(remaining),
+        )
+
+    sink = legacy.DictSink()
+    journal = legacy.CheckpointJournal(journal_path, sink, resumed)
+    try:
+        asyncio.run(
+            legacy.collect_into(
+                remaining,
+                journal,
+                cookies,
+                domain,
+                args.concurrency,
+                args.retries,
+                known_names=known_names,
+                achievement_retries=args.achievement_retries,
+                systemic_failure_sample_size=args.systemic_failure_sample_size,
+                max_concurrency=args.max_concurrency,
+                parse_workers=args.parse_workers if args.parse_workers >= 0 else None,
+            )
+        )
+    finally:
+        journal.close()
+    results = {**resumed.heroes, **sink.results}
+    failures = sink.failures
+    achievement_failures = [*resumed.achievement_failures, *sink.achievement_failures]
     filtered = {
         pid: hero
         for pid, hero in results.items()
@@ -1217,6 +1618,7 @@ def _save_legacy_fallback_snapshot(
         cookies=cookies,
         concurrency=args.concurrency,
         retries=max(args.retries, args.achievement_retries),
+        max_concurrency=args.max_concurrency,
     )
 
     retained_count, retained_ratio = _coverage_ratio(set(filtered), previous_ids)
@@ -1227,35 +1629,34 @@ def _save_legacy_fallback_snapshot(
             f"({retained_count}/{len(previous_ids)})"
         )
 
-    snapshot_path, metadata_path = legacy.save_snapshot(
-        filtered,
-        failures=failures,
-        achievement_failures=achievement_failures,
-        baseline_ids=previous_ids,
-        known_ids=sorted(set(known_ids).union(filtered)),
-        probe_start=probe_start,
-        probe_end=probe_end,
-    )
-    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
-    metadata.update(
-        {
-            "collection_source": "profile_fallback",
-            "scope_min_level": SCOPE_MIN_LEVEL,
-            "fallback_reason": reason,
-            "previous_snapshot": previous_snapshot,
-            "previous_level5_count": len(previous_ids),
-            "retained_previous_level5_count": retained_count,
-            "retained_previous_level5_ratio": retained_ratio,
-            "legacy_fallback_used": True,
-            "fallback_recheck_window": recheck_window,
-            "lord_wins_source": "achievement_pages",
-            "lord_wins_collection": lord_wins_meta,
-        }
-    )
-    metadata_path.write_text(
-        json.dumps(metadata, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    extra_metadata = {
+        "collection_source": "profile_fallback",
+        "scope_min_level": SCOPE_MIN_LEVEL,
+        "fallback_reason": reason,
+        "previous_snapshot": previous_snapshot,
+        "previous_level5_count": len(previous_ids),
+        "retained_previous_level5_count": retained_count,
+        "retained_previous_level5_ratio": retained_ratio,
+        "legacy_fallback_used": True,
+        "fallback_recheck_window": recheck_window,
+        "checkpoint_resumed_profiles": len(resumed.heroes),
+        "lord_wins_source": "achievement_pages",
+        "lord_wins_collection": lord_wins_meta,
+    }
+    scope = {
+        "failures": failures,
+        "achievement_failures": achievement_failures,
+        "baseline_ids": previous_ids,
+        "known_ids": sorted(set(known_ids).union(filtered)),
+        "probe_start": probe_start,
+        "probe_end": probe_end,
+        "extra_metadata": extra_metadata,
+    }
+    if args.output == "sqlite":
+        snapshot_path, metadata_path = legacy.stage_snapshot(db_path, filtered, **scope)
+    else:
+        snapshot_path, metadata_path = legacy.save_snapshot(filtered, **scope)
+    journal_path.unlink(missing_ok=True)
     LOG.info(
         "Profile fallback saved: players=%s, retained=%.2f%% (%s/%s), "
         "profile_failures=%s, achievement_warnings=%s",
@@ -1345,22 +1746,19 @@ def save_api_snapshot(
     previous_snapshot: str | None,
     retained_count: int,
     retained_ratio: float,
-) -> tuple[Path, Path]:
+    stage_db: Path | None = None,
+) -> tuple[Path, Path | None]:
+    """Write the JSON snapshot, or stage it in ``stage_db`` for promotion."""
     current_ids = set(collection.heroes)
     highest_id = max(current_ids, default=0)
-    snapshot_path, metadata_path = legacy.save_snapshot(
-        collection.heroes,
-        failures=[],
-        achievement_failures=[],
-        baseline_ids=previous_ids,
-        known_ids=sorted(current_ids),
-        probe_start=0,
-        probe_end=0,
-    )
-
-    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
-    metadata.update(
-        {
+    scope = {
+        "failures": [],
+        "achievement_failures": [],
+        "baseline_ids": previous_ids,
+        "known_ids": sorted(current_ids),
+        "probe_start": 0,
+        "probe_end": 0,
+        "extra_metadata": {
             "collection_source": "bulk_api",
             "scope_min_level": SCOPE_MIN_LEVEL,
             "api_endpoint": collection.endpoint,
@@ -1375,13 +1773,11 @@ def save_api_snapshot(
             "probe_end": None,
             "highest_probed_id": highest_id,
             "legacy_fallback_used": False,
-        }
-    )
-    metadata_path.write_text(
-        json.dumps(metadata, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
-    return snapshot_path, metadata_path
+        },
+    }
+    if stage_db is not None:
+        return legacy.stage_snapshot(stage_db, collection.heroes, **scope)
+    return legacy.save_snapshot(collection.heroes, **scope)
 
 
 def main() -> int:
@@ -1442,7 +1838,8 @@ def main() -> int:
                 reason=str(endpoint_error),
             )
             LOG.info("Saved profile fallback snapshot: %s", snapshot_path)
-            LOG.info("Saved profile fallback metadata: %s", metadata_path)
+            if metadata_path is not None:
+                LOG.info("Saved profile fallback metadata: %s", metadata_path)
             return 0
         except Exception as fallback_error:
             error = (
@@ -1477,6 +1874,7 @@ def main() -> int:
             previous_snapshot,
             retained_count,
             retained_ratio,
+            stage_db=db_path if args.output == "sqlite" else None,
         )
     except Exception as snapshot_error:
         error = f"Bulk endpoint succeeded, but snapshot saving failed: {snapshot_error}"
@@ -1492,7 +1890,8 @@ def main() -> int:
         return 2
 
     LOG.info("Saved level-5+ API snapshot: %s", snapshot_path)
-    LOG.info("Saved level-5+ API metadata: %s", metadata_path)
+    if metadata_path is not None:
+        LOG.info("Saved level-5+ API metadata: %s", metadata_path)
     LOG.info(
         "Collection complete from endpoint with best-effort warriors pages: players=%s, "
         "retained previous level-5+=%.2f%% (%s/%s), groups=%s",
@@ -0,0 +1,157 @@
+"""Adaptive (AIMD) concurrency limit for requests to the game server.
+
+The limit grows by one slot after a full window of healthy responses and is
+cut multiplicatively on throttling: HTTP 429, 5xx, timeouts and connection
+errors. A response is healthy while the smoothed latency stays within
+``latency_factor`` of the best latency seen so far, so a server that is
+slowing down stops the growth before it starts refusing requests.
+``Retry-After`` pauses every new request until the server's deadline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+MAX_RETRY_AFTER_SECONDS = 120.0
+
+
+def retry_after_seconds(value: str | None, *, now: float | None = None) -> float | None:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    text = value.strip()
+    try:
+        seconds = float(text)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        current = now if now is not None else time.time()
+        seconds = moment.timestamp() - current
+    if seconds != seconds:  # NaN
+        return None
+    return max(0.0, min(MAX_RETRY_AFTER_SECONDS, seconds))
+
+
+class AdaptiveLimiter:
+    """An ``asyncio.Semaphore`` replacement whose size follows server health.
+
+    Use ``async with limiter:`` around one request and report its outcome
+    with ``on_success`` or ``on_throttle``. Outcomes that say nothing about
+    load, such as 404, should be reported as successes.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        *,
+        minimum: int = 1,
+        maximum: int | None = None,
+        decrease: float = 0.5,
+        latency_factor: float = 2.0,
+        cooldown_seconds: float = 1.0,
+    ) -> None:
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum if maximum is not None else initial))
+        self.limit = float(max(self.minimum, min(self.maximum, int(initial))))
+        self.decrease = min(0.95, max(0.05, float(decrease)))
+        self.latency_factor = max(1.0, float(latency_factor))
+        self.cooldown_seconds = max(0.0, float(cooldown_seconds))
+        self.in_flight = 0
+        self.peak_limit = int(self.limit)
+        self.throttles = 0
+        self.paused_until = 0.0
+        self._last_cut = float("-inf")
+        self._healthy_streak = 0
+        self._latency: float | None = None
+        self._best_latency: float | None = None
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with_slot = waiter.done() and not waiter.cancelled()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                if with_slot:
+                    self._wake()
+                raise
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake()
+
+    async def __aenter__(self) -> AdaptiveLimiter:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *_exc: object) -> None:
+        self.release()
+
+    def _wake(self) -> None:
+        free = self.current_limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self, latency_seconds: float | None = None) -> None:
+        if latency_seconds is not None:
+            latency = max(0.0, float(latency_seconds))
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if self._best_latency is None or self._latency < self._best_latency:
+                self._best_latency = self._latency
+            if self._latency > self._best_latency * self.latency_factor:
+                self._healthy_streak = 0
+                return
+        self._healthy_streak += 1
+        # Additive increase: one slot per window of `limit` healthy responses.
+        if self._healthy_streak >= self.current_limit and self.limit < self.maximum:
+            self.limit = min(float(self.maximum), self.limit + 1)
+            self.peak_limit = max(self.peak_limit, self.current_limit)
+            self._healthy_streak = 0
+            self._wake()
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        now = time.monotonic()
+        self.throttles += 1
+        self._healthy_streak = 0
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + min(MAX_RETRY_AFTER_SECONDS, retry_after))
+        # One cut per cooldown: a burst of failures from the same overload
+        # should not collapse the limit to the minimum.
+        if now - self._last_cut >= self.cooldown_seconds:
+            self.limit = max(float(self.minimum), self.limit * self.decrease)
+            self._last_cut = now
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "limit": self.current_limit,
+            "peak_limit": self.peak_limit,
+            "throttles": self.throttles,
+            "latency_ms": round(self._latency * 1000, 1) if self._latency is not None else None,
+        }
@@ -0,0 +1,199 @@
+"""Array engine for the ``best_growth`` table.
+
+``tools.build_db.compute_best_growth`` keeps a player's best growth per
+parameter in a temp table and updates it with one large upsert per pair of
+adjacent snapshots. This engine loads every snapshot once into arrays
+aligned to the registry's pid order, takes the deltas of all parameters of
+a pair in one step and keeps the running best values, their snapshots and
+levels in arrays. The rows it writes, and the order it writes them in, are
+those of the SQL engine, so both produce the same database file.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # build_db keeps using the SQL engine
+    np = None
+
+from forglory.schema import PARAM_TO_COLUMN, STAT_COLUMNS
+
+# Values are read as float64 and are only exact below this; anything larger,
+# fractional or not a number is left to the SQL engine.
+_FLOAT_EXACT = 2.0**53
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _param_columns(params: Sequence[str]) -> list[str]:
+    columns: list[str] = []
+    for param in params:
+        column = PARAM_TO_COLUMN[param]
+        for name in (column,) if column else STAT_COLUMNS:
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+def _plain_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    # Rows go straight into np.array, which wants tuples rather than sqlite3.Row.
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """One snapshot's levels and parameter values, aligned to the registry pids."""
+
+    present: Any
+    level: Any
+    level_null: Any
+    values: Any
+    nulls: Any
+
+
+def _load_snapshot(
+    conn: sqlite3.Connection,
+    snapshot_id: int,
+    pids: Any,
+    params: Sequence[str],
+    columns: list[str],
+) -> _Snapshot | None:
+    """Read ``snapshot_id`` into arrays, or return None if a value is not a safe integer."""
+    rows = _plain_cursor(conn).execute(
+        f"SELECT pid,level,{','.join(columns)} FROM observations WHERE snapshot_id=?",
+        (int(snapshot_id),),
+    ).fetchall()
+    count = len(pids)
+    present = np.zeros(count, dtype=bool)
+    level = np.zeros(count, dtype=np.int64)
+    level_null = np.ones(count, dtype=bool)
+    values = np.zeros((len(params), count), dtype=np.int64)
+    nulls = np.ones((len(params), count), dtype=bool)
+    if not rows:
+        return _Snapshot(present, level, level_null, values, nulls)
+    try:
+        table = np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    table = table.reshape(len(rows), len(columns) + 2)
+    missing = np.isnan(table)
+    known = table[~missing]
+    if known.size and (np.abs(known).max() >= _FLOAT_EXACT or not np.array_equal(known, np.floor(known))):
+        return None
+
+    if count == 0:
+        return _Snapshot(present, level, level_null, values, nulls)
+    # Players the registry does not show yet never take part in a pair.
+    row_pids = table[:, 0].astype(np.int64)
+    positions = np.minimum(np.searchsorted(pids, row_pids), count - 1)
+    registered = pids[positions] == row_pids
+    positions = positions[registered]
+    table = table[registered]
+    missing = missing[registered]
+    present[positions] = True
+
+    ints = np.where(missing, 0, table).astype(np.int64)
+    level[positions] = ints[:, 1]
+    level_null[positions] = missing[:, 1]
+    index = {column: offset + 2 for offset, column in enumerate(columns)}
+    for row, param in enumerate(params):
+        column = PARAM_TO_COLUMN[param]
+        if column:
+            values[row, positions] = ints[:, index[column]]
+            nulls[row, positions] = missing[:, index[column]]
+        else:
+            # A sum of stats is NULL as soon as one stat is, as in SQL.
+            source = [index[name] for name in STAT_COLUMNS]
+            values[row, positions] = ints[:, source].sum(axis=1)
+            nulls[row, positions] = missing[:, source].any(axis=1)
+    return _Snapshot(present, level, level_null, values, nulls)
+
+
+def compute_best_growth_arrays(
+    conn: sqlite3.Connection,
+    best_for_snapshot_id: int,
+    snapshots: Sequence[tuple[int, int]],
+    params: Sequence[str],
+    max_gap_hours: float,
+) -> bool:
+    """Fill ``best_growth`` from ``snapshots`` (ordered by time); return False to defer to SQL.
+
+    Nothing is written when False is returned: NumPy is missing or a
+    snapshot holds values the SQL engine would not compute as exact integers.
+    The caller has already cleared ``best_growth``.
+    """
+    if np is None:
+        return False
+    registry = _plain_cursor(conn).execute(
+        """
+        SELECT pid,visible_from_snapshot_id FROM players
+        WHERE visible_from_snapshot_id IS NOT NULL
+        ORDER BY pid
+        """
+    ).fetchall()
+    pids = np.array([int(row[0]) for row in registry], dtype=np.int64)
+    visible_from = np.array([int(row[1]) for row in registry], dtype=np.int64)
+    columns = _param_columns(params)
+
+    shape = (len(params), len(pids))
+    best_diff = np.zeros(shape, dtype=np.int64)
+    best_has = np.zeros(shape, dtype=bool)
+    best_snapshot = np.zeros(shape, dtype=np.int64)
+    best_level = np.zeros(shape, dtype=np.int64)
+    best_level_null = np.ones(shape, dtype=bool)
+
+    previous_sid, previous_ts = snapshots[0]
+    previous: _Snapshot | None = None
+    for current_sid, current_ts in snapshots[1:]:
+        gap_hours = (int(current_ts) - int(previous_ts)) / 3600.0
+        if gap_hours <= max_gap_hours:
+            if previous is None:
+                previous = _load_snapshot(conn, previous_sid, pids, params, columns)
+            current = _load_snapshot(conn, current_sid, pids, params, columns)
+            if previous is None or current is None:
+                return False
+            eligible = previous.present & current.present & (int(current_sid) >= visible_from)
+            diff = current.values - previous.values
+            better = eligible & ~current.nulls & ~previous.nulls
+            better &= ~best_has | (diff > best_diff)
+            np.copyto(best_diff, diff, where=better)
+            best_has |= better
+            best_snapshot[better] = int(current_sid)
+            np.copyto(best_level, np.broadcast_to(current.level, shape), where=better)
+            np.copyto(best_level_null, np.broadcast_to(current.level_null, shape), where=better)
+            previous = current
+        else:
+            previous = None
+        previous_sid, previous_ts = current_sid, current_ts
+
+    for row, param in enumerate(params):
+        chosen = np.flatnonzero(best_has[row])
+        levels = [
+            None if null else level
+            for level, null in zip(best_level[row, chosen].tolist(), best_level_null[row, chosen].tolist())
+        ]
+        conn.executemany(
+            """
+            INSERT INTO best_growth(
+                best_for_snapshot_id,param,pid,level,diff,best_snapshot_id
+            )
+            VALUES (?,?,?,?,?,?)
+            """,
+            zip(
+                [int(best_for_snapshot_id)] * len(chosen),
+                [param] * len(chosen),
+                pids[chosen].tolist(),
+                levels,
+                best_diff[row, chosen].tolist(),
+                best_snapshot[row, chosen].tolist(),
+            ),
+        )
+    return True
@@ -0,0 +1,405 @@
+"""Columnar binary archive for collected hero snapshots.
+
+A ``heroes_*.fgcol`` file stores exactly the values ``build_db`` imports from a
+JSON snapshot, laid out column by column so that repeated values compress well
+and decoding skips JSON parsing entirely:
+
+    magic                 8 bytes, ``FGCOL\\x00\\x01\\n``
+    header length         u32, followed by a UTF-8 JSON header
+    payload               one zlib stream with the sections below
+
+Payload sections (little-endian, ``rows`` entries each):
+
+    pids                  int64, gaps between consecutive sorted ids
+    string table          u32 count, then u32 length + UTF-8 bytes per entry
+    text columns          int32 index into the string table, -1 when missing
+    integer columns       null bitmap (ceil(rows / 8) bytes) + int64 values
+
+When the header names a ``base`` archive, integer values are stored as the
+difference from the base value of the same player and column whenever both
+are present. Daily counters move little, so such deltas are mostly small and
+compress far better than absolute totals. The header also records the
+``base_sha256`` of the base file, and a delta is only decoded against a base
+with exactly that hash: a base rewritten after the delta was written would
+otherwise decode it into wrong values without any error.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+from forglory.schema import (
+    BROTHERHOOD_ID_KEYS,
+    BROTHERHOOD_KEYS,
+    CLAN_ID_KEYS,
+    CLAN_KEYS,
+    FIELD_BY_COLUMN,
+    NAME_KEYS,
+    NUMERIC_FIELDS,
+    parse_int,
+    pick_group_id,
+    pick_numeric,
+    pick_text,
+)
+
+MAGIC = b"FGCOL\x00\x01\n"
+FORMAT_VERSION = 1
+SUFFIX = ".fgcol"
+COMPRESS_LEVEL = 6
+
+TEXT_COLUMNS: tuple[str, ...] = ("name", "clan", "brotherhood")
+INT_COLUMNS: tuple[str, ...] = (
+    "clan_id",
+    "brotherhood_id",
+    *(item.column for item in NUMERIC_FIELDS),
+)
+TEXT_JSON_KEYS = {"name": "Имя", "clan": "Клан", "brotherhood": "Братство"}
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+class ColumnarFormatError(ValueError):
+    pass
+
+
+@dataclass
+class ColumnarSnapshot:
+    pids: list[int]
+    text: dict[str, list[str | None]]
+    ints: dict[str, list[int | None]]
+    header: dict[str, Any] = field(default_factory=dict)
+
+    def heroes(self) -> dict[str, dict[str, Any]]:
+        """Rebuild snapshot JSON rows that import to the same observations."""
+        heroes: dict[str, dict[str, Any]] = {}
+        for row, pid in enumerate(self.pids):
+            hero: dict[str, Any] = {"ID": pid}
+            for column, values in self.text.items():
+                value = values[row]
+                if value is not None:
+                    hero[TEXT_JSON_KEYS.get(column, column)] = value
+            for column, values in self.ints.items():
+                value = values[row]
+                if value is None:
+                    continue
+                numeric = FIELD_BY_COLUMN.get(column)
+                hero[numeric.json_key if numeric else column] = value
+            heroes[str(pid)] = hero
+        return heroes
+
+    def same_values(self, other: ColumnarSnapshot) -> bool:
+        return self.pids == other.pids and self.text == other.text and self.ints == other.ints
+
+
+def from_heroes(heroes: Mapping[Any, Mapping[str, Any]]) -> ColumnarSnapshot:
+    """Extract the importable columns from snapshot rows, sorted by player id."""
+    by_pid: dict[int, Mapping[str, Any]] = {}
+    for pid_raw, hero in heroes.items():
+        pid = parse_int(pid_raw)
+        if pid is None:
+            pid = parse_int(hero.get("ID"))
+        if pid is None:
+            continue
+        by_pid[pid] = hero
+
+    pids = sorted(by_pid)
+    text: dict[str, list[str | None]] = {column: [] for column in TEXT_COLUMNS}
+    ints: dict[str, list[int | None]] = {column: [] for column in INT_COLUMNS}
+    for pid in pids:
+        hero = dict(by_pid[pid])
+        text["name"].append(pick_text(hero, NAME_KEYS))
+        text["clan"].append(pick_text(hero, CLAN_KEYS))
+        text["brotherhood"].append(pick_text(hero, BROTHERHOOD_KEYS))
+        ints["clan_id"].append(pick_group_id(hero, CLAN_ID_KEYS))
+        ints["brotherhood_id"].append(pick_group_id(hero, BROTHERHOOD_ID_KEYS))
+        for numeric in NUMERIC_FIELDS:
+            ints[numeric.column].append(pick_numeric(hero, numeric))
+    return ColumnarSnapshot(pids, text, ints)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, payload: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _check_int64(column: str, value: int) -> int:
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        raise ColumnarFormatError(f"{column}={value} does not fit into int64")
+    return value
+
+
+def _base_lookup(
+    snapshot: ColumnarSnapshot,
+    base: ColumnarSnapshot | None,
+) -> list[int | None]:
+    if base is None:
+        return [None] * len(snapshot.pids)
+    base_rows = {pid: row for row, pid in enumerate(base.pids)}
+    return [base_rows.get(pid) for pid in snapshot.pids]
+
+
+def encode(
+    snapshot: ColumnarSnapshot,
+    *,
+    base: ColumnarSnapshot | None = None,
+    header: Mapping[str, Any] | None = None,
+) -> bytes:
+    rows = len(snapshot.pids)
+    base_rows = _base_lookup(snapshot, base)
+    sections: list[bytes] = []
+
+    gaps = array("q")
+    previous = 0
+    for pid in snapshot.pids:
+        gaps.append(_check_int64("pid", pid - previous))
+        previous = pid
+    sections.append(_little_endian(gaps))
+
+    strings: dict[str, int] = {}
+    indexes: dict[str, array] = {}
+    for column in TEXT_COLUMNS:
+        column_indexes = array("i")
+        for value in snapshot.text[column]:
+            if value is None:
+                column_indexes.append(-1)
+            else:
+                column_indexes.append(strings.setdefault(value, len(strings)))
+        indexes[column] = column_indexes
+    table = [struct.pack("<I", len(strings))]
+    for value in strings:
+        encoded = value.encode("utf-8")
+        table.append(struct.pack("<I", len(encoded)))
+        table.append(encoded)
+    sections.append(b"".join(table))
+    sections.extend(_little_endian(indexes[column]) for column in TEXT_COLUMNS)
+
+    for column in INT_COLUMNS:
+        values = snapshot.ints[column]
+        base_values = base.ints.get(column) if base is not None else None
+        nulls = bytearray((rows + 7) // 8)
+        encoded_values = array("q")
+        for row, value in enumerate(values):
+            if value is None:
+                nulls[row >> 3] |= 1 << (row & 7)
+                encoded_values.append(0)
+                continue
+            base_row = base_rows[row]
+            reference = None
+            if base_values is not None and base_row is not None:
+                reference = base_values[base_row]
+            if reference is not None:
+                value -= reference
+            encoded_values.append(_check_int64(column, value))
+        sections.append(bytes(nulls))
+        sections.append(_little_endian(encoded_values))
+
+    full_header = {
+        "format": FORMAT_VERSION,
+        "rows": rows,
+        "text_columns": list(TEXT_COLUMNS),
+        "int_columns": list(INT_COLUMNS),
+        "strings": len(strings),
+        "base": None,
+        "depth": 0,
+        **(header or {}),
+    }
+    header_bytes = json.dumps(
+        full_header, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    return b"".join(
+        (
+            MAGIC,
+            _HEADER_LENGTH.pack(len(header_bytes)),
+            header_bytes,
+            zlib.compress(b"".join(sections), COMPRESS_LEVEL),
+        )
+    )
+
+
+def _split(blob: bytes) -> tuple[dict[str, Any], bytes]:
+    if not blob.startswith(MAGIC):
+        raise ColumnarFormatError("not a columnar snapshot")
+    offset = len(MAGIC)
+    (header_length,) = _HEADER_LENGTH.unpack_from(blob, offset)
+    offset += _HEADER_LENGTH.size
+    try:
+        header = json.loads(blob[offset : offset + header_length].decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ColumnarFormatError(f"invalid header: {exc}") from exc
+    if header.get("format") != FORMAT_VERSION:
+        raise ColumnarFormatError(f"unsupported format {header.get('format')!r}")
+    return header, blob[offset + header_length :]
+
+
+def decode(blob: bytes, base: ColumnarSnapshot | None = None) -> ColumnarSnapshot:
+    header, compressed = _split(blob)
+    if header.get("base") and base is None:
+        raise ColumnarFormatError(f"delta snapshot needs base {header['base']}")
+    try:
+        payload = zlib.decompress(compressed)
+    except zlib.error as exc:
+        raise ColumnarFormatError(f"corrupt payload: {exc}") from exc
+
+    rows = int(header["rows"])
+    offset = 0
+
+    def take(size: int) -> bytes:
+        nonlocal offset
+        if offset + size > len(payload):
+            raise ColumnarFormatError("truncated payload")
+        chunk = payload[offset : offset + size]
+        offset += size
+        return chunk
+
+    pids: list[int] = []
+    previous = 0
+    for gap in _from_little_endian("q", take(rows * 8)):
+        previous += gap
+        pids.append(previous)
+
+    (string_count,) = struct.unpack("<I", take(4))
+    strings: list[str] = []
+    for _ in range(string_count):
+        (length,) = struct.unpack("<I", take(4))
+        strings.append(take(length).decode("utf-8"))
+
+    text: dict[str, list[str | None]] = {}
+    for column in header["text_columns"]:
+        text[column] = [
+            strings[index] if index >= 0 else None
+            for index in _from_little_endian("i", take(rows * 4))
+        ]
+
+    snapshot = ColumnarSnapshot(pids, text, {}, header)
+    base_rows = _base_lookup(snapshot, base)
+    null_size = (rows + 7) // 8
+    for column in header["int_columns"]:
+        nulls = take(null_size)
+        encoded_values = _from_little_endian("q", take(rows * 8))
+        base_values = base.ints.get(column) if base is not None else None
+        values: list[int | None] = []
+        for row, value in enumerate(encoded_values):
+            if nulls[row >> 3] & (1 << (row & 7)):
+                values.append(None)
+                continue
+            base_row = base_rows[row]
+            if base_values is not None and base_row is not None:
+                reference = base_values[base_row]
+                if reference is not None:
+                    value += reference
+            values.append(value)
+        snapshot.ints[column] = values
+    if offset != len(payload):
+        raise ColumnarFormatError("unexpected trailing payload")
+    return snapshot
+
+
+def read_header(path: Path) -> dict[str, Any]:
+    with path.open("rb") as handle:
+        prefix = handle.read(len(MAGIC) + _HEADER_LENGTH.size)
+        if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size or not prefix.startswith(MAGIC):
+            raise ColumnarFormatError(f"{path.name} is not a columnar snapshot")
+        (header_length,) = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+        header, _ = _split(prefix + handle.read(header_length))
+    return header
+
+
+def read_snapshot(
+    path: Path,
+    resolve_base: Callable[[str], Path] | None = None,
+    _cache: dict[str, tuple[ColumnarSnapshot, str]] | None = None,
+) -> ColumnarSnapshot:
+    """Decode an archive, following its delta chain through sibling files."""
+    return _read_with_digest(path, resolve_base, {} if _cache is None else _cache)[0]
+
+
+def _read_with_digest(
+    path: Path,
+    resolve_base: Callable[[str], Path] | None,
+    cache: dict[str, tuple[ColumnarSnapshot, str]],
+) -> tuple[ColumnarSnapshot, str]:
+    cached = cache.get(path.name)
+    if cached is not None:
+        return cached
+    blob = path.read_bytes()
+    header, _ = _split(blob)
+    base = None
+    if header.get("base"):
+        base_name = str(header["base"])
+        expected = header.get("base_sha256")
+        if not expected:
+            raise ColumnarFormatError(f"{path.name} does not record the hash of its base {base_name}")
+        base_path = resolve_base(base_name) if resolve_base else path.with_name(base_name)
+        base, base_digest = _read_with_digest(base_path, resolve_base, cache)
+        if base_digest != expected:
+            raise ColumnarFormatError(
+                f"{path.name} was written against another version of {base_name}"
+            )
+    snapshot = decode(blob, base)
+    cache[path.name] = (snapshot, hashlib.sha256(blob).hexdigest())
+    return cache[path.name]
+
+
+def load_heroes(path: Path) -> dict[str, dict[str, Any]]:
+    return read_snapshot(path).heroes()
+
+
+def archive_name(snapshot_name: str) -> str:
+    for suffix in (".json.gz", ".json"):
+        if snapshot_name.endswith(suffix):
+            return snapshot_name[: -len(suffix)] + SUFFIX
+    return snapshot_name + SUFFIX
+
+
+def write_snapshot(
+    path: Path,
+    snapshot: ColumnarSnapshot,
+    *,
+    base_path: Path | None = None,
+    source_name: str | None = None,
+    source_sha256: str | None = None,
+) -> Path:
+    """Write ``snapshot`` atomically, delta-encoded against ``base_path`` if given."""
+    header: dict[str, Any] = {"source_name": source_name, "source_sha256": source_sha256}
+    base = None
+    if base_path is not None:
+        base, base_digest = _read_with_digest(base_path, None, {})
+        header["base"] = base_path.name
+        header["base_sha256"] = base_digest
+        header["depth"] = int(base.header.get("depth") or 0) + 1
+    blob = encode(snapshot, base=base, header=header)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+def latest_archive(directory: Path, before_name: str | None = None) -> Path | None:
+    """Return the newest archive whose snapshot name sorts before ``before_name``."""
+    candidates = sorted(
+        path
+        for path in directory.glob(f"heroes_*{SUFFIX}")
+        if before_name is None or path.name < before_name
+    )
+    return candidates[-1] if candidates else None
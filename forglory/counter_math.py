@@ -2,7 +2,12 @@
 
 from __future__ import annotations
 
-from typing import SupportsInt
+from typing import Any, Mapping, Sequence, SupportsInt
+
+try:
+    import numpy as np
+except ImportError:  # the column helper falls back to the scalar function
+    np = None
 
 UINT32_MODULUS = 1 << 32
 INT32_MIN = -(1 << 31)
@@ -32,6 +37,9 @@ WRAP_COUNTER_COLUMNS: tuple[str, ...] = (
     "chat",
 )
 WRAP_COUNTER_COLUMN_SET = frozenset(WRAP_COUNTER_COLUMNS)
+# The NumPy paths work in int64; values this large take the scalar path.
+_ARRAY_LIMIT = 1 << 61
+_FLOAT_EXACT = float(1 << 53)
 
 
 def unwrap_cumulative_counter(
@@ -84,3 +92,131 @@ def sql_cumulative_delta32(
         f"WHEN {raw}<{INT32_MIN} THEN {raw}+{UINT32_MODULUS} "
         f"ELSE {raw} END"
     )
+
+
+def unwrap_counter_column(
+    pids: Sequence[SupportsInt],
+    values: Sequence[SupportsInt | None],
+    previous: Mapping[int, SupportsInt | None] | None = None,
+) -> list[int | None]:
+    """Apply :func:`unwrap_cumulative_counter` down a whole column.
+
+    Rows must be grouped by pid and ordered by time within each pid. Every
+    non-null value is unwrapped against the pid's last unwrapped value, or
+    ``previous[pid]`` for the pid's first value; nulls stay null and do not
+    reset the chain. Uses NumPy when it is installed and every value fits in
+    64 bits, and the scalar function otherwise; both give the same result.
+    """
+    if len(pids) != len(values):
+        raise ValueError("pids and values must have the same length")
+    if np is not None and len(values):
+        try:
+            return _unwrap_column_numpy(pids, values, previous or {})
+        except OverflowError:
+            pass
+    return _unwrap_column_python(pids, values, previous or {})
+
+
+def _unwrap_column_python(
+    pids: Sequence[SupportsInt],
+    values: Sequence[SupportsInt | None],
+    previous: Mapping[int, SupportsInt | None],
+) -> list[int | None]:
+    result: list[int | None] = []
+    current_pid: int | None = None
+    last: SupportsInt | None = None
+    for pid, value in zip(pids, values):
+        pid = int(pid)
+        if pid != current_pid:
+            current_pid = pid
+            last = previous.get(pid)
+        if value is None:
+            result.append(None)
+            continue
+        last = unwrap_cumulative_counter(value, last)
+        result.append(last)
+    return result
+
+
+def _as_int64(values: Sequence[SupportsInt | None]) -> tuple[Any, Any]:
+    """Values as an int64 array with nulls as 0, and the mask of non-null values."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        data = values.astype(np.int64)
+        present = np.ones(len(values), dtype=bool)
+    else:
+        # Converting through float64 runs in C and turns None into NaN. It is
+        # exact below 2**53; anything larger is converted one int at a time.
+        floats = np.array(values, dtype=np.float64)
+        present = ~np.isnan(floats)
+        data = np.where(present, floats, 0)
+        if len(data) and float(np.abs(data).max()) < _FLOAT_EXACT:
+            data = data.astype(np.int64)
+        else:
+            data = np.fromiter(
+                (0 if value is None else int(value) for value in values), dtype=np.int64, count=len(values)
+            )
+    if len(data) and int(np.abs(data).max()) >= _ARRAY_LIMIT:
+        raise OverflowError("value outside the int64 working range")
+    return data, present
+
+
+def _with_nulls(values: Any, present: Any) -> list[int | None]:
+    if present.all():
+        return values.tolist()
+    result = np.full(len(present), None, dtype=object)
+    result[present] = values
+    return result.tolist()
+
+
+def _wrap_steps(deficit: Any) -> Any:
+    """ceil(deficit / 2**32), element-wise."""
+    return -((-deficit) // UINT32_MODULUS)
+
+
+def _unwrap_column_numpy(
+    pids: Sequence[SupportsInt],
+    values: Sequence[SupportsInt | None],
+    previous: Mapping[int, SupportsInt | None],
+) -> list[int | None]:
+    data, present = _as_int64(values)
+    raw = data[present]
+    if not len(raw):
+        return [None] * len(data)
+    pid_array = np.asarray(pids, dtype=np.int64)[present]
+
+    starts = np.ones(len(raw), dtype=bool)
+    starts[1:] = pid_array[1:] != pid_array[:-1]
+    start_index = np.flatnonzero(starts)
+    seeds = [previous.get(int(pid)) for pid in pid_array[start_index].tolist()]
+    seeded = np.array([seed is not None for seed in seeds], dtype=bool)
+    seed_values, _ = _as_int64([0 if seed is None else seed for seed in seeds])
+
+    # The scalar rule adds the fewest k >= 0 steps of 2**32 that keep a value
+    # no more than 2**31 below the previous unwrapped one. In steps that is
+    # o[i] = max(0, o[i-1] + c[i]), where c[i] is what the raw difference
+    # alone needs. A pid's first value starts from o = 0 against its seed, or
+    # without one only lifts negative values.
+    needed = np.empty_like(raw)
+    needed[1:] = INT32_MIN - raw[1:] + raw[:-1]
+    needed[start_index] = np.where(
+        seeded, INT32_MIN - raw[start_index] + seed_values, -raw[start_index]
+    )
+    steps = _wrap_steps(needed)
+
+    # That recursion is the running sum of c minus its running minimum
+    # (floored at 0), restarted for every pid. Lowering each pid's sums below
+    # everything before it lets one minimum.accumulate restart per pid.
+    segment = np.cumsum(starts) - 1
+    totals = np.cumsum(steps)
+    local = totals - np.where(start_index > 0, totals[start_index - 1], 0)[segment]
+    spread = 2 * int(np.abs(local).max()) + 1
+    if spread * len(start_index) >= _ARRAY_LIMIT:
+        raise OverflowError("too many wraps for the int64 working range")
+    shift = segment * spread
+    floor = np.minimum(np.minimum.accumulate(local - shift) + shift, 0)
+    offsets = local - floor
+    if int(offsets.max()) >= 1 << 28:
+        raise OverflowError("too many wraps for the int64 working range")
+
+    return _with_nulls(raw + offsets * UINT32_MODULUS, present)
+
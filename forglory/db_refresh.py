@@ -0,0 +1,262 @@
+"""Refresh the web database in the background while the old one keeps serving.
+
+The fetch tool downloads or patches the release into ``<db>.next`` beside
+the live file, validates it with ``PRAGMA quick_check`` and its sha256, and
+leaves the live file alone. Group identifiers are repaired on the staged
+copy, and only then is it renamed over the live path. The rename is atomic:
+requests that already have the old file open keep reading it until they
+finish, and ``app.get_db`` opens the new file for every request after that.
+
+Every swap moves the hot file's ``schema_meta.hot_min_ts`` forward. The
+snapshots that leave the hot window are only in a newer cold archive, so the
+same loop fetches the cold file again whenever the hot one has snapshots
+before its window that the cold one does not have.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+LOCK_PATH = Path("/tmp/forglory-db-refresh.lock")
+HISTORY_LOCK_PATH = Path("/tmp/forglory-cold-db-refresh.lock")
+
+
+def staging_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + ".next")
+
+
+def release_state_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + ".release")
+
+
+def refresh_database(
+    root: Path,
+    script: Path,
+    db_path: Path,
+    *,
+    timeout: int,
+    lock_path: Path = LOCK_PATH,
+) -> bool:
+    """Swap in a newer release of ``db_path``; return True when the file changed.
+
+    Returns False without waiting when another process holds the refresh
+    lock; that process is doing the same work.
+    """
+    # Render runs on Linux; the import stays local so the package still
+    # imports on Windows.
+    import fcntl
+
+    from forglory import _repair_missing_group_ids
+
+    staged = staging_path(db_path)
+    state = release_state_path(db_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("w", encoding="utf-8") as lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        staged.unlink(missing_ok=True)
+        try:
+            subprocess.run(
+                [
+                    sys.executable,
+                    str(script),
+                    "--out",
+                    str(staged),
+                    "--base",
+                    str(db_path),
+                    "--release-state",
+                    str(state),
+                    "--attempts",
+                    "3",
+                    "--retry-delay",
+                    "5",
+                    "--patches",
+                ],
+                cwd=root,
+                check=True,
+                timeout=timeout,
+            )
+            if not staged.exists():
+                return False
+            _repair_missing_group_ids(staged)
+            sidecar = staged.with_name(staged.name + ".digest.json")
+            if sidecar.exists():
+                os.replace(sidecar, db_path.with_name(db_path.name + ".digest.json"))
+            os.replace(staged, db_path)
+        except BaseException:
+            # The remembered release no longer describes the live file.
+            state.unlink(missing_ok=True)
+            staged.unlink(missing_ok=True)
+            raise
+    return True
+
+
+def _file_signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def history_gap(db_path: Path, history_path: Path) -> int:
+    """Count snapshots before the hot window of ``db_path`` that ``history_path`` lacks.
+
+    A full database has no hot window and never needs the cold archive.
+    """
+    hot = sqlite3.connect(f"file:{db_path.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        try:
+            row = hot.execute("SELECT value FROM schema_meta WHERE key='hot_min_ts'").fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        if row is None:
+            return 0
+        hot_min_ts = int(row[0])
+        covered_until = None
+        if history_path.exists():
+            cold = sqlite3.connect(f"file:{history_path.resolve().as_posix()}?mode=ro", uri=True)
+            try:
+                covered_until = cold.execute("SELECT MAX(ts) FROM snapshots").fetchone()[0]
+            except sqlite3.OperationalError:
+                covered_until = None
+            finally:
+                cold.close()
+        return int(
+            hot.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE ts<? AND ts>?",
+                (hot_min_ts, -1 if covered_until is None else int(covered_until)),
+            ).fetchone()[0]
+        )
+    finally:
+        hot.close()
+
+
+def refresh_history_database(
+    root: Path,
+    script: Path,
+    db_path: Path,
+    history_path: Path,
+    asset: str,
+    *,
+    timeout: int,
+    lock_path: Path = HISTORY_LOCK_PATH,
+) -> bool:
+    """Fetch the cold archive when ``db_path`` has snapshots it lacks; return True when fetched.
+
+    The release is remembered beside the archive, so a release that has not
+    changed since the last fetch is not downloaded again even if the gap
+    remains.
+    """
+    import fcntl
+
+    from forglory import _repair_missing_group_ids
+
+    if history_path.exists() and not history_gap(db_path, history_path):
+        return False
+    state = release_state_path(history_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("w", encoding="utf-8") as lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        before = _file_signature(history_path)
+        try:
+            subprocess.run(
+                [
+                    sys.executable,
+                    str(script),
+                    "--out",
+                    str(history_path),
+                    "--asset",
+                    asset,
+                    "--release-state",
+                    str(state),
+                    "--attempts",
+                    "3",
+                    "--retry-delay",
+                    "5",
+                ],
+                cwd=root,
+                check=True,
+                timeout=timeout,
+            )
+            if not history_path.exists() or _file_signature(history_path) == before:
+                return False
+            _repair_missing_group_ids(history_path)
+        except BaseException:
+            state.unlink(missing_ok=True)
+            raise
+    return True
+
+
+def start_background_refresh(
+    root: Path,
+    script: Path,
+    db_path: Path,
+    *,
+    interval: float,
+    timeout: int,
+    initial_delay: float = 0.0,
+    history: tuple[Path, str] | None = None,
+) -> threading.Thread:
+    """Refresh ``db_path`` after ``initial_delay`` and then every ``interval`` seconds.
+
+    A non-positive ``interval`` refreshes once. ``history`` is the cold
+    archive's path and release asset; it is brought up to the hot window
+    right away and after every round.
+    """
+
+    def run_history() -> None:
+        if history is None:
+            return
+        history_path, asset = history
+        try:
+            if refresh_history_database(root, script, db_path, history_path, asset, timeout=timeout):
+                print(f"Database refresh: fetched a new cold history {history_path}.", flush=True)
+            missing = history_gap(db_path, history_path)
+            if missing:
+                print(
+                    f"Database refresh: cold history still lacks {missing} snapshots "
+                    "before the hot window; retrying next round.",
+                    flush=True,
+                )
+        except Exception as exc:  # the hot file keeps serving without history
+            print(f"Cold history refresh failed: {type(exc).__name__}: {exc}", flush=True)
+
+    def run() -> None:
+        run_history()
+        delay = initial_delay
+        while True:
+            if delay > 0:
+                time.sleep(delay)
+            started = time.monotonic()
+            try:
+                if refresh_database(root, script, db_path, timeout=timeout):
+                    print(
+                        f"Database refresh: swapped in a new {db_path} "
+                        f"after {time.monotonic() - started:.1f}s.",
+                        flush=True,
+                    )
+            except Exception as exc:  # keep the refresher alive for the next round
+                print(
+                    f"Database refresh failed; still serving the current file: {type(exc).__name__}: {exc}",
+                    flush=True,
+                )
+            run_history()
+            if interval <= 0:
+                return
+            delay = interval
+
+    thread = threading.Thread(target=run, name="forglory-db-refresh", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,56 @@
+"""Request and connection counters for aiohttp client sessions.
+
+``RequestMetrics.trace_config()`` plugs into ``aiohttp.ClientSession`` and
+counts requests, new connections (each one a TCP and, over HTTPS, a TLS
+handshake) and connections taken back from the keep-alive pool. A healthy
+pooled fetcher opens roughly as many connections as its concurrency limit,
+not one per request.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import aiohttp
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.request_errors = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.started = time.monotonic()
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(*_args: Any) -> None:
+            self.requests += 1
+
+        async def on_request_exception(*_args: Any) -> None:
+            self.request_errors += 1
+
+        async def on_connection_create_end(*_args: Any) -> None:
+            self.connections_opened += 1
+
+        async def on_connection_reuseconn(*_args: Any) -> None:
+            self.connections_reused += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def summary(self) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "requests": self.requests,
+            "request_errors": self.request_errors,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(self.requests / elapsed, 2),
+        }
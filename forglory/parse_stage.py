@@ -0,0 +1,79 @@
+"""Run CPU-bound HTML parsing off the asyncio event loop.
+
+Parsing a profile with BeautifulSoup takes long enough that doing it inside
+a coroutine stalls every socket the loop is serving. ``ParseStage`` ships the
+raw HTML to a process pool instead. A bounded number of jobs may be queued,
+so fetchers wait for a parser slot rather than piling HTML up in memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def default_parse_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def _timed(function: Callable[..., T], args: tuple) -> tuple[bool, Any, float]:
+    started = time.perf_counter()
+    try:
+        return True, function(*args), time.perf_counter() - started
+    except Exception as exc:  # re-raised in the event loop with the parse time kept
+        return False, exc, time.perf_counter() - started
+
+
+class ParseStage:
+    """Bounded process-pool stage; ``workers=0`` parses inline on the loop."""
+
+    def __init__(self, workers: int | None = None, *, queue_per_worker: int = 4) -> None:
+        self.workers = default_parse_workers() if workers is None else max(0, int(workers))
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._capacity = max(1, self.workers) * max(1, queue_per_worker)
+        self.jobs = 0
+        self.parse_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def __aenter__(self) -> ParseStage:
+        if self.workers:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self._capacity)
+        return self
+
+    async def __aexit__(self, *_exc: object) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """Parse in the pool; module-level ``function`` and picklable args only."""
+        if self._executor is None or self._slots is None:
+            ok, value, elapsed = _timed(function, args)
+        else:
+            waited = time.perf_counter()
+            async with self._slots:
+                self.wait_seconds += time.perf_counter() - waited
+                loop = asyncio.get_running_loop()
+                ok, value, elapsed = await loop.run_in_executor(
+                    self._executor, _timed, function, args
+                )
+        self.jobs += 1
+        self.parse_seconds += elapsed
+        if not ok:
+            raise value
+        return value
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "jobs": self.jobs,
+            "parse_seconds": round(self.parse_seconds, 3),
+            "parse_wait_seconds": round(self.wait_seconds, 3),
+        }
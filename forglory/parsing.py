@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import json
 import re
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Callable
 from urllib.parse import parse_qs, urlparse
 
-from bs4 import BeautifulSoup
-
 from .schema import parse_int
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 
 # Prefer selectors scoped to the actual profile. The generic selector is kept
 # only as a fallback for older page layouts.
@@ -130,8 +134,304 @@ def _find_profile_name(soup: BeautifulSoup, hero_id: int | None = None) -> str |
     return None
 
 
+CLAN_LINK = re.compile(r"/clan/info\?id=\d+")
+BROTHERHOOD_LINK = re.compile(r"/brotherhood/info\?id=\d+")
+
+# Reject an interstitial/confirmation page, but allow partial legacy
+# profiles. Some valid profiles can omit the level and core combat counters
+# while still containing clan or resource statistics.
+PROFILE_MARKER_KEYS = {
+    "Уровень", "Слава", "Побед", "Поражений",
+    "Побед над Драконом", "Побед над Змеем",
+    "Сила", "Защита", "Ловкость", "Мастерство", "Живучесть",
+    "Награбил (серебро)", "Потерял (серебро)",
+    "Награбил (кристаллы)", "Потерял (кристаллы)",
+    "Клан", "Братство",
+}
+
+# Link lookup for one stat row: returns (href, text) of the first <a> in the
+# row content whose href matches the pattern.
+LinkFinder = Callable[[re.Pattern[str]], "tuple[str, str] | None"]
+
+
+def _apply_stat_row(
+    data: dict[str, object],
+    content_text: str,
+    icon_src: str | None,
+    find_link: LinkFinder,
+) -> None:
+    """Add one stat row to ``data``; shared by the fast and BeautifulSoup parsers."""
+    for label, key, id_key, pattern in (
+        ("Клан:", "Клан", "clan_id", CLAN_LINK),
+        ("Братство:", "Братство", "brotherhood_id", BROTHERHOOD_LINK),
+    ):
+        if label not in content_text:
+            continue
+        link = find_link(pattern)
+        if link:
+            href, text = link
+            match = re.search(r"id=(\d+)", href)
+            data[key] = text
+            data[id_key] = int(match.group(1)) if match else 0
+        else:
+            data[key] = "не состоит"
+            data[id_key] = 0
+        return
+
+    if ":" not in content_text:
+        return
+    key, raw_value = map(str.strip, content_text.split(":", 1))
+
+    if key in ("Награбил", "Потерял") and icon_src:
+        if "silver" in icon_src:
+            key += " (серебро)"
+        elif "crystal" in icon_src:
+            key += " (кристаллы)"
+
+    numeric = parse_int(raw_value)
+    data[key] = numeric if numeric is not None else raw_value.strip()
+
+
+def _finish_hero(data: dict[str, object], name: str | None, fallback_name: str | None) -> dict:
+    if not name and fallback_name:
+        candidate = str(fallback_name).strip()
+        if candidate and normalize_profile_text(candidate) not in PROFILE_UI_LABELS:
+            name = candidate
+    if not name:
+        raise ValueError("profile_name_not_found")
+    data["Имя"] = name
+
+    # These fields are genuinely zero when the page omits them in the current game layout.
+    data.setdefault("Чат", 0)
+    return data
+
+
+# Elements html.parser-backed BeautifulSoup closes immediately.
+VOID_ELEMENTS = frozenset({
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+})
+
+
+class _Unsure(Exception):
+    """The page has markup the fast path does not model; use BeautifulSoup."""
+
+
+class _EventParser(HTMLParser):
+    """Stream HTMLParser events while tracking the open-element stack.
+
+    End tags close elements the way BeautifulSoup's html.parser builder does
+    (up to the most recent open element of that name, stray ones ignored), so
+    element depths match the tree BeautifulSoup would build. Text collectors
+    reproduce ``get_text(" ", strip=True)`` for the element they were opened
+    on. Anything that would make the two disagree raises ``_Unsure``.
+    """
+
+    def __init__(self) -> None:
+        # Same event stream as BeautifulSoup's builder, which also resolves
+        # character references itself.
+        super().__init__(convert_charrefs=False)
+        self.stack: list[str] = []
+        self._text: list[str] = []
+        self._collectors: list[tuple[int, list[str]]] = []
+
+    def collect(self, depth: int) -> list[str]:
+        strings: list[str] = []
+        self._collectors.append((depth, strings))
+        return strings
+
+    def _flush(self) -> None:
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text.clear()
+        if text:
+            for _depth, strings in self._collectors:
+                strings.append(text)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush()
+        attributes = {name: value or "" for name, value in attrs}
+        if tag in VOID_ELEMENTS:
+            self.on_void(tag, attributes)
+            return
+        if self._collectors and tag in ("script", "style", "template"):
+            # BeautifulSoup keeps these strings out of get_text().
+            raise _Unsure(tag)
+        self.stack.append(tag)
+        self.on_start(tag, attributes, len(self.stack))
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush()
+        if tag in VOID_ELEMENTS or tag not in self.stack:
+            return
+        index = len(self.stack) - 1 - self.stack[::-1].index(tag)
+        if len(self.stack) - index > 1 and self._collectors:
+            raise _Unsure(f"implicitly closed inside </{tag}>")
+        self._close_to(index)
+
+    def _close_to(self, index: int) -> None:
+        while len(self.stack) > index:
+            depth = len(self.stack)
+            self._collectors = [item for item in self._collectors if item[0] < depth]
+            self.on_end(depth)
+            self.stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        try:
+            code = int(name[1:], 16) if name[:1] in ("x", "X") else int(name)
+        except ValueError:
+            code = -1
+        # Control characters, cp1252 remapping and invalid code points are
+        # resolved differently by BeautifulSoup versions.
+        if code in (9, 10, 13) or 32 <= code < 127 or 160 <= code < 0xD800 or 0xE000 <= code <= 0x10FFFF:
+            self._text.append(chr(code))
+        elif self._collectors:
+            raise _Unsure(f"&#{name};")
+
+    def handle_entityref(self, name: str) -> None:
+        # HTML 4 names only; "lang"/"rang" changed code points in HTML5.
+        code = name2codepoint.get(name) if name not in ("lang", "rang") else None
+        if code is not None:
+            self._text.append(chr(code))
+        elif self._collectors:
+            raise _Unsure(f"&{name}")
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if self._collectors:
+            raise _Unsure("CDATA")
+
+    def run(self, html: str) -> None:
+        self.feed(html)
+        self.close()
+        self._flush()
+        self._close_to(0)
+
+    def on_start(self, tag: str, attrs: dict[str, str], depth: int) -> None:
+        pass
+
+    def on_void(self, tag: str, attrs: dict[str, str]) -> None:
+        pass
+
+    def on_end(self, depth: int) -> None:
+        pass
+
+
+class _ProfileEvents(_EventParser):
+    """Collect the name span and ``div#stats`` stat rows of the current layout."""
+
+    def __init__(self, hero_id: int) -> None:
+        super().__init__()
+        self.hero_id = str(hero_id)
+        self.names: list[list[str]] = []
+        self.blocks: list[list[dict]] = []
+        self._stats: list[int] = []
+        self._block: tuple[int, list[dict]] | None = None
+        self._span: dict | None = None
+
+    def on_start(self, tag: str, attrs: dict[str, str], depth: int) -> None:
+        if attrs.get("data-hero-name-id") == self.hero_id:
+            self.names.append(self.collect(depth))
+        if tag != "div" and tag != "span" and tag != "a":
+            return
+        classes = attrs.get("class", "").split()
+        if tag == "div" and attrs.get("id") == "stats":
+            self._stats.append(depth)
+        if self._stats and tag == "div" and "grid" in classes and "grid-cols-profileStat" in classes:
+            if self._block is not None:
+                raise _Unsure("nested stat block")
+            self._block = (depth, [])
+        elif self._block is not None:
+            if tag == "span" and depth == self._block[0] + 1:
+                self._span = {"depth": depth, "text": self.collect(depth), "icon": None, "links": []}
+                self._block[1].append(self._span)
+            elif tag == "a" and self._span is not None:
+                self._span["links"].append((attrs.get("href", ""), self.collect(depth)))
+
+    def on_void(self, tag: str, attrs: dict[str, str]) -> None:
+        if tag == "img" and self._span is not None and self._span["icon"] is None:
+            self._span["icon"] = attrs
+
+    def on_end(self, depth: int) -> None:
+        if self._span is not None and depth == self._span["depth"]:
+            self._span = None
+        if self._block is not None and depth == self._block[0]:
+            self.blocks.append(self._block[1])
+            self._block = None
+        if self._stats and depth == self._stats[-1]:
+            self._stats.pop()
+
+
+def _parse_hero_fast(html: str, hero_id: int) -> dict | None:
+    """Parse the current profile layout without building a tree.
+
+    Returns None whenever the result might differ from ``parse_hero_bs4``:
+    no ``data-hero-name-id`` name, no ``div#stats`` grid rows, rows without two
+    direct spans, or markup the event parser does not model.
+    """
+    events = _ProfileEvents(hero_id)
+    try:
+        events.run(html)
+    except _Unsure:
+        return None
+
+    name = None
+    for strings in events.names:
+        name = _clean_profile_name(" ".join(strings))
+        if name:
+            break
+    if not name or not events.blocks:
+        return None
+
+    data: dict[str, object] = {"ID": hero_id}
+    for spans in events.blocks:
+        if len(spans) < 2:
+            return None
+        icon, content = spans[0]["icon"], spans[1]
+
+        def find_link(pattern: re.Pattern[str], links: list = content["links"]) -> tuple[str, str] | None:
+            for href, strings in links:
+                if pattern.search(href):
+                    return href, " ".join(strings)
+            return None
+
+        _apply_stat_row(data, " ".join(content["text"]), icon.get("src") if icon else None, find_link)
+
+    if not any(key in data for key in PROFILE_MARKER_KEYS):
+        return None
+    return _finish_hero(data, name, None)
+
+
 def parse_hero(html: str, hero_id: int, fallback_name: str | None = None) -> dict:
-    """Parse one profile page. Missing optional blocks stay missing, not zeroed."""
+    """Parse one profile page. Missing optional blocks stay missing, not zeroed.
+
+    The current layout is read by a streaming fast path; any page it is not
+    sure about goes through the BeautifulSoup parser, which gives the same dict.
+    """
+    data = _parse_hero_fast(html, hero_id)
+    if data is not None:
+        return data
+    return parse_hero_bs4(html, hero_id, fallback_name)
+
+
+def parse_hero_bs4(html: str, hero_id: int, fallback_name: str | None = None) -> dict:
+    """Parse one profile page with BeautifulSoup, tolerating older layouts."""
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     name = _find_profile_name(soup, hero_id)
     data: dict[str, object] = {"ID": hero_id}
@@ -153,93 +453,93 @@ def parse_hero(html: str, hero_id: int, fallback_name: str | None = None) -> dic
         else:
             icon = block.find("img")
             content = block
-        content_text = content.get_text(" ", strip=True)
-
-        if "Клан:" in content_text:
-            link = content.find("a", href=re.compile(r"/clan/info\?id=\d+"))
-            if link:
-                match = re.search(r"id=(\d+)", link.get("href", ""))
-                data["Клан"] = link.get_text(" ", strip=True)
-                data["clan_id"] = int(match.group(1)) if match else 0
-            else:
-                data["Клан"] = "не состоит"
-                data["clan_id"] = 0
-            continue
 
-        if "Братство:" in content_text:
-            link = content.find("a", href=re.compile(r"/brotherhood/info\?id=\d+"))
-            if link:
-                match = re.search(r"id=(\d+)", link.get("href", ""))
-                data["Братство"] = link.get_text(" ", strip=True)
-                data["brotherhood_id"] = int(match.group(1)) if match else 0
-            else:
-                data["Братство"] = "не состоит"
-                data["brotherhood_id"] = 0
-            continue
+        def find_link(pattern: re.Pattern[str], content=content) -> tuple[str, str] | None:
+            link = content.find("a", href=pattern)
+            if not link:
+                return None
+            return str(link.get("href", "")), link.get_text(" ", strip=True)
 
-        if ":" not in content_text:
-            continue
-        key, raw_value = map(str.strip, content_text.split(":", 1))
-
-        if key in ("Награбил", "Потерял") and icon and icon.get("src"):
-            src = str(icon["src"])
-            if "silver" in src:
-                key += " (серебро)"
-            elif "crystal" in src:
-                key += " (кристаллы)"
-
-        numeric = parse_int(raw_value)
-        data[key] = numeric if numeric is not None else raw_value.strip()
-
-    # Reject an interstitial/confirmation page, but allow partial legacy
-    # profiles. Some valid profiles can omit the level and core combat counters
-    # while still containing clan or resource statistics.
-    profile_marker_keys = {
-        "Уровень", "Слава", "Побед", "Поражений",
-        "Побед над Драконом", "Побед над Змеем",
-        "Сила", "Защита", "Ловкость", "Мастерство", "Живучесть",
-        "Награбил (серебро)", "Потерял (серебро)",
-        "Награбил (кристаллы)", "Потерял (кристаллы)",
-        "Клан", "Братство",
-    }
-    if not stat_blocks or not any(key in data for key in profile_marker_keys):
+        icon_src = icon.get("src") if icon else None
+        _apply_stat_row(data, content.get_text(" ", strip=True), str(icon_src) if icon_src else None, find_link)
+
+    if not stat_blocks or not any(key in data for key in PROFILE_MARKER_KEYS):
         raise ValueError("profile_stats_not_found")
+    return _finish_hero(data, name, fallback_name)
+
+
+def _beast_kills(text: str, bold_texts: list[str]) -> int | None:
+    status_match = re.search(r"(\d[\d\s\xa0]*)\s+из\s+(\d[\d\s\xa0]*)", text)
+    level_match = re.search(r"(?:уровень|ур\.?|lvl)\s*[:№]?\s*(\d+)", text, re.IGNORECASE)
+    if not level_match:
+        bold_numbers = [parse_int(value) for value in bold_texts]
+        level = next((number for number in reversed(bold_numbers) if number is not None), None)
+    else:
+        level = int(level_match.group(1))
+    if not status_match or level is None:
+        return None
+    current = parse_int(status_match.group(1))
+    if current is None:
+        return None
+    return level * (4 * level - 2) // 2 + current
 
-    if not name and fallback_name:
-        candidate = str(fallback_name).strip()
-        if candidate and normalize_profile_text(candidate) not in PROFILE_UI_LABELS:
-            name = candidate
-    if not name:
-        raise ValueError("profile_name_not_found")
-    data["Имя"] = name
 
-    # These fields are genuinely zero when the page omits them in the current game layout.
-    data.setdefault("Чат", 0)
-    return data
+class _AchievementEvents(_EventParser):
+    """Collect the text, header and bold counters of each achievement card."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.cards: list[dict] = []
+        self._card: dict | None = None
+
+    def on_start(self, tag: str, attrs: dict[str, str], depth: int) -> None:
+        if tag != "div" and tag != "b":
+            return
+        classes = set(attrs.get("class", "").split())
+        if tag == "div" and {"flex", "flex-col", "p-2", "leading-5"} <= classes:
+            if self._card is not None:
+                raise _Unsure("nested achievement card")
+            self._card = {"depth": depth, "text": self.collect(depth), "name": None, "bold": []}
+        elif self._card is not None:
+            if tag == "div" and self._card["name"] is None and {"font-bold", "item-header", "pb-1"} <= classes:
+                self._card["name"] = self.collect(depth)
+            elif tag == "b" and "font-semibold" in classes:
+                self._card["bold"].append(self.collect(depth))
+
+    def on_end(self, depth: int) -> None:
+        if self._card is not None and depth == self._card["depth"]:
+            self.cards.append(self._card)
+            self._card = None
 
 
 def parse_kill_beasts(html: str, _hero_id: int | None = None) -> int | None:
     """Return the beast-kill counter or None when the achievement block is unavailable."""
+    events = _AchievementEvents()
+    try:
+        events.run(html)
+    except _Unsure:
+        return parse_kill_beasts_bs4(html, _hero_id)
+    for card in events.cards:
+        if card["name"] is None or " ".join(card["name"]) != "Повелитель Зверей":
+            continue
+        return _beast_kills(" ".join(card["text"]), [" ".join(strings) for strings in card["bold"]])
+    return None
+
+
+def parse_kill_beasts_bs4(html: str, _hero_id: int | None = None) -> int | None:
+    """BeautifulSoup version of ``parse_kill_beasts``."""
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html.parser")
     achievements = soup.select("div.flex.flex-col.p-2.leading-5")
     for achievement in achievements:
         name_tag = achievement.select_one("div.font-bold.item-header.pb-1")
         if not name_tag or name_tag.get_text(" ", strip=True) != "Повелитель Зверей":
             continue
-        text = achievement.get_text(" ", strip=True)
-        status_match = re.search(r"(\d[\d\s\xa0]*)\s+из\s+(\d[\d\s\xa0]*)", text)
-        level_match = re.search(r"(?:уровень|ур\.?|lvl)\s*[:№]?\s*(\d+)", text, re.IGNORECASE)
-        if not level_match:
-            bold_numbers = [parse_int(tag.get_text(" ", strip=True)) for tag in achievement.select("b.font-semibold")]
-            level = next((number for number in reversed(bold_numbers) if number is not None), None)
-        else:
-            level = int(level_match.group(1))
-        if not status_match or level is None:
-            return None
-        current = parse_int(status_match.group(1))
-        if current is None:
-            return None
-        return level * (4 * level - 2) // 2 + current
+        return _beast_kills(
+            achievement.get_text(" ", strip=True),
+            [tag.get_text(" ", strip=True) for tag in achievement.select("b.font-semibold")],
+        )
     return None
 
 
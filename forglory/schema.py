@@ -73,6 +73,12 @@ PARAM_TO_COLUMN: dict[str, str | None] = {
 
 BEST_PARAMS = tuple(PARAM_TO_COLUMN)
 
+NAME_KEYS = ("Имя", "имя", "name", "nick", "Ник")
+CLAN_KEYS = ("Клан", "clan")
+BROTHERHOOD_KEYS = ("Братство", "brotherhood")
+CLAN_ID_KEYS = ("clan_id", "Клан_id", "клан_id")
+BROTHERHOOD_ID_KEYS = ("brotherhood_id", "Братство_id", "братство_id")
+
 
 def parse_int(value: Any) -> int | None:
     """Convert game counters to int without turning missing values into zero."""
@@ -108,3 +114,13 @@ def pick_text(hero: dict[str, Any], keys: Iterable[str]) -> str | None:
         if text:
             return text
     return None
+
+
+def pick_group_id(hero: dict[str, Any], keys: Iterable[str]) -> int | None:
+    """Return the first non-empty group id; zero means "no group" like a missing id."""
+    value: Any = None
+    for key in keys:
+        value = hero.get(key)
+        if value:
+            break
+    return parse_int(value)
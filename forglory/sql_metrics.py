@@ -0,0 +1,292 @@
+"""Opt-in SQL and route timing for the web app.
+
+``SqlMetrics.wrap(conn)`` returns a connection proxy whose cursors time each
+statement from ``execute`` until its rows have been read, so the figure
+includes SQLite's stepping and not only the prepare. Statements are grouped
+by a literal-free fingerprint; routes by their URL rule. ``render()`` emits
+the aggregates in the Prometheus text format: totals, latency histograms and
+p50/p95/p99 over a window of recent samples. Statements slower than
+``slow_ms`` are logged together with their ``EXPLAIN QUERY PLAN``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable
+
+LOGGER = logging.getLogger("forglory.sql")
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+SAMPLE_WINDOW = 1024
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals replaced by ``?`` and whitespace collapsed."""
+    text = _STRING_RE.sub("?", str(sql))
+    text = _NUMBER_RE.sub("?", text)
+    text = " ".join(text.split())
+    return _LIST_RE.sub("(?,...)", text)
+
+
+def statement_id(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+
+class _Series:
+    __slots__ = ("count", "total", "buckets", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples: deque[float] = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _TimedCursor:
+    """Cursor proxy that reports once its result has been consumed."""
+
+    def __init__(self, cursor: Any, report: Callable[[float, int], None], elapsed: float) -> None:
+        self._cursor = cursor
+        self._report = report
+        self._elapsed = elapsed
+        self._rows = 0
+        self._open = True
+
+    def _finish(self) -> None:
+        if self._open:
+            self._open = False
+            self._report(self._elapsed, self._rows)
+
+    def _timed(self, function: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def fetchone(self) -> Any:
+        row = self._timed(self._cursor.fetchone)
+        self._rows += row is not None
+        self._finish()
+        return row
+
+    def fetchmany(self, *args: Any) -> list[Any]:
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self) -> _TimedCursor:
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            row = self._timed(next, self._cursor)
+        except StopIteration:
+            self._finish()
+            raise
+        self._rows += 1
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self) -> None:
+        self._finish()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    def __init__(self, conn: Any, metrics: SqlMetrics) -> None:
+        self._conn = conn
+        self._metrics = metrics
+
+    def execute(self, sql: str, parameters: Any = ()) -> _TimedCursor:
+        started = time.perf_counter()
+        cursor = self._conn.execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+
+        def report(seconds: float, rows: int) -> None:
+            self._metrics.record_statement(self._conn, sql, parameters, seconds, rows)
+
+        return _TimedCursor(cursor, report, elapsed)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class SqlMetrics:
+    """Thread-safe aggregates of statement, cache and route timings."""
+
+    def __init__(
+        self,
+        *,
+        slow_ms: float = 250.0,
+        explain: bool = True,
+    ) -> None:
+        self.slow_seconds = max(0.0, slow_ms) / 1000
+        self.explain = explain
+        self._request_log: ContextVar[list[dict[str, Any]] | None] = ContextVar("sql_request_log", default=None)
+        self.slow_queries: deque[dict[str, Any]] = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._statements: dict[str, _Series] = {}
+        self._statement_rows: dict[str, int] = {}
+        self._statement_sql: dict[str, str] = {}
+        self._routes: dict[str, _Series] = {}
+        self._route_sql: dict[str, _Series] = {}
+        self._route_statements: dict[str, int] = {}
+        self._cache: dict[tuple[str, str], int] = {}
+
+    def wrap(self, conn: Any) -> _TimedConnection:
+        return _TimedConnection(conn, self)
+
+    def record_statement(self, conn: Any, sql: str, parameters: Any, seconds: float, rows: int) -> None:
+        text = fingerprint(sql)
+        key = statement_id(text)
+        with self._lock:
+            self._statements.setdefault(key, _Series()).observe(seconds)
+            self._statement_rows[key] = self._statement_rows.get(key, 0) + rows
+            self._statement_sql.setdefault(key, text)
+        log = self._request_log.get()
+        if log is not None:
+            log.append({"statement": key, "rows": rows, "seconds": seconds})
+        if seconds >= self.slow_seconds:
+            self._log_slow(conn, sql, parameters, text, key, seconds, rows)
+
+    def record_cache(self, function: str, hit: bool) -> None:
+        result = "hit" if hit else "miss"
+        with self._lock:
+            self._cache[function, result] = self._cache.get((function, result), 0) + 1
+        log = self._request_log.get()
+        if log is not None:
+            log.append({"cache": function, "hit": hit})
+
+    def start_request(self) -> None:
+        """Collect the statements and cache lookups of the current request."""
+        self._request_log.set([])
+
+    def finish_request(self, route: str, seconds: float) -> dict[str, Any]:
+        """Fold the current request's log into the route aggregates and summarize it."""
+        log = self._request_log.get() or []
+        self._request_log.set(None)
+        statements = [entry for entry in log if "statement" in entry]
+        hits = sum(1 for entry in log if entry.get("hit") is True)
+        misses = sum(1 for entry in log if entry.get("hit") is False)
+        sql_seconds = sum(entry["seconds"] for entry in statements)
+        with self._lock:
+            self._routes.setdefault(route, _Series()).observe(seconds)
+            self._route_sql.setdefault(route, _Series()).observe(sql_seconds)
+            self._route_statements[route] = self._route_statements.get(route, 0) + len(statements)
+        return {
+            "statements": len(statements),
+            "rows": sum(entry["rows"] for entry in statements),
+            "sql_seconds": sql_seconds,
+            "cache_hits": hits,
+            "cache_misses": misses,
+        }
+
+    def _log_slow(
+        self, conn: Any, sql: str, parameters: Any, text: str, key: str, seconds: float, rows: int
+    ) -> None:
+        plan: list[str] = []
+        if self.explain:
+            try:
+                plan = [str(row[-1]) for row in conn.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+            except Exception as exc:  # the plan is diagnostic only
+                plan = [f"unavailable: {type(exc).__name__}: {exc}"]
+        entry = {"statement": key, "sql": text, "ms": round(seconds * 1000, 2), "rows": rows, "plan": plan}
+        self.slow_queries.append(entry)
+        LOGGER.warning(
+            "slow query %s: %.1f ms, %d rows: %s\n  plan: %s",
+            key, seconds * 1000, rows, text, "\n  plan: ".join(plan) or "-",
+        )
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything recorded so far."""
+        lines: list[str] = []
+        with self._lock:
+            _histogram(lines, "forglory_sql_statement_seconds", "Statement time including row fetches",
+                       "statement", self._statements)
+            _family(lines, "forglory_sql_statement_rows_total", "counter", "Rows returned per statement",
+                    (({"statement": key}, rows) for key, rows in sorted(self._statement_rows.items())))
+            _family(lines, "forglory_sql_statement_info", "gauge", "Fingerprint of each statement id",
+                    (({"statement": key, "sql": sql}, 1) for key, sql in sorted(self._statement_sql.items())))
+            _family(lines, "forglory_query_cache_total", "counter", "cached_query lookups by result",
+                    (({"function": function, "result": result}, count)
+                     for (function, result), count in sorted(self._cache.items())))
+            _histogram(lines, "forglory_request_seconds", "Request wall time per route", "route", self._routes)
+            _histogram(lines, "forglory_request_sql_seconds", "SQL time per request", "route", self._route_sql)
+            _family(lines, "forglory_request_sql_statements_total", "counter", "Statements run per route",
+                    (({"route": route}, count) for route, count in sorted(self._route_statements.items())))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _family(lines: list[str], name: str, kind: str, help_text: str, samples: Iterable[tuple[dict, Any]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+
+
+def _histogram(lines: list[str], name: str, help_text: str, label: str, series: dict[str, _Series]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, item in sorted(series.items()):
+        for bound, count in zip(BUCKETS, item.buckets):
+            lines.append(f"{name}_bucket{_labels({label: key, 'le': bound})} {count}")
+        lines.append(f"{name}_bucket{_labels({label: key, 'le': '+Inf'})} {item.count}")
+        lines.append(f"{name}_sum{_labels({label: key})} {_number(item.total)}")
+        lines.append(f"{name}_count{_labels({label: key})} {item.count}")
+    lines.append(f"# HELP {name}_quantile {help_text}, over the last {SAMPLE_WINDOW} samples")
+    lines.append(f"# TYPE {name}_quantile gauge")
+    for key, item in sorted(series.items()):
+        for q in QUANTILES:
+            lines.append(f"{name}_quantile{_labels({label: key, 'quantile': q})} {_number(item.quantile(q))}")
@@ -0,0 +1,280 @@
+"""Named query implementations used by the web app.
+
+``app.py`` looks its batched queries up in ``QUERIES`` by name and passes in
+the connection and the few helpers they need, so nothing is patched into
+the app at import time and no SQL is rewritten on ``execute``. A deployment
+or test can swap an implementation with ``QUERIES.register(name,
+replace=True)``.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Callable
+
+
+class QueryRegistry:
+    def __init__(self) -> None:
+        self._queries: dict[str, Callable[..., Any]] = {}
+
+    def register(self, name: str, *, replace: bool = False) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+            if name in self._queries and not replace:
+                raise ValueError(f"Query {name!r} is already registered")
+            self._queries[name] = function
+            return function
+
+        return decorator
+
+    def __getitem__(self, name: str) -> Callable[..., Any]:
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise KeyError(f"Unknown query {name!r}; registered: {', '.join(sorted(self._queries))}") from None
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._queries
+
+    def names(self) -> list[str]:
+        return sorted(self._queries)
+
+
+QUERIES = QueryRegistry()
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+BALANCE_STATS = ("strength", "defense", "dexterity", "mastery", "vitality")
+
+
+@QUERIES.register("level_balance_top10")
+def level_balance_top10(db: sqlite3.Connection, snapshot_id: int) -> list[sqlite3.Row]:
+    """Average of the ten strongest values of each stat on every level.
+
+    The Ritual of Balance caps every stat at 75% of this average, not of the
+    single strongest value.
+    """
+    ranks = ",".join(
+        f"ROW_NUMBER() OVER (PARTITION BY level ORDER BY {column} DESC, pid ASC) AS {column}_rank"
+        for column in BALANCE_STATS
+    )
+    averages = ",".join(
+        f"AVG(CASE WHEN {column}_rank <= 10 THEN {column} END) AS {column}" for column in BALANCE_STATS
+    )
+    return db.execute(
+        f"""
+        WITH ranked AS (
+            SELECT level,{','.join(BALANCE_STATS)},{ranks}
+            FROM observations
+            WHERE snapshot_id=? AND level IS NOT NULL
+        )
+        SELECT level,{averages}
+        FROM ranked
+        GROUP BY level
+        """,
+        (snapshot_id,),
+    ).fetchall()
+
+
+@QUERIES.register("personal_stats")
+def personal_stats(
+    db: sqlite3.Connection,
+    pid: int,
+    snap_from: str,
+    snap_to: str,
+    *,
+    snapshot_info: Callable[[str], tuple[int, int] | None],
+    params: list[str],
+    value_expr: Callable[[str, str], str],
+    row_value: Callable[[Any, str], int | None],
+) -> dict | None:
+    """A player's values, growth and ranks for every parameter in four reads.
+
+    Overall and growth ranks come from one window query each over all
+    parameters instead of two COUNT queries per parameter.
+    """
+    from_info = snapshot_info(snap_from)
+    to_info = snapshot_info(snap_to)
+    if not from_info or not to_info:
+        return None
+    from_sid, from_ts = from_info
+    to_sid, to_ts = to_info
+    if from_ts > to_ts:
+        from_sid, to_sid = to_sid, from_sid
+        snap_from, snap_to = snap_to, snap_from
+
+    observation_rows = db.execute(
+        """
+        SELECT o.*,n.value AS _player_name
+        FROM observations o
+        LEFT JOIN text_values n ON n.text_id=o.name_id
+        WHERE o.pid=? AND o.snapshot_id IN (?,?)
+        """,
+        (int(pid), int(from_sid), int(to_sid)),
+    ).fetchall()
+    observations = {int(row["snapshot_id"]): row for row in observation_rows}
+    start = observations.get(int(from_sid))
+    end = observations.get(int(to_sid))
+    if start is None or end is None:
+        return None
+
+    values_sql = ",".join(f"({_sql_literal(param)})" for param in params)
+    overall_value = "CASE pv.param " + " ".join(
+        f"WHEN {_sql_literal(param)} THEN {value_expr(param, 'o')}" for param in params
+    ) + " END"
+    growth_value = "CASE pv.param " + " ".join(
+        f"WHEN {_sql_literal(param)} THEN ({value_expr(param, 'c')}-{value_expr(param, 'p')})" for param in params
+    ) + " END"
+
+    overall_rows = db.execute(
+        f"""
+        WITH param_values(param) AS (VALUES {values_sql}),
+        values_by_param AS (
+            SELECT pv.param,o.pid,{overall_value} AS value
+            FROM observations o
+            CROSS JOIN param_values pv
+            WHERE o.snapshot_id=?
+        ),
+        ranked AS (
+            SELECT param,pid,
+                   ROW_NUMBER() OVER(PARTITION BY param ORDER BY value DESC,pid ASC) AS rank
+            FROM values_by_param
+            WHERE value IS NOT NULL
+        )
+        SELECT param,rank FROM ranked WHERE pid=?
+        """,
+        (int(to_sid), int(pid)),
+    ).fetchall()
+    overall_ranks = {str(row["param"]): int(row["rank"]) for row in overall_rows}
+
+    growth_rows = db.execute(
+        f"""
+        WITH param_values(param) AS (VALUES {values_sql}),
+        values_by_param AS (
+            SELECT pv.param,c.pid,{growth_value} AS value
+            FROM observations c
+            JOIN observations p ON p.snapshot_id=? AND p.pid=c.pid
+            CROSS JOIN param_values pv
+            WHERE c.snapshot_id=?
+        ),
+        ranked AS (
+            SELECT param,pid,
+                   ROW_NUMBER() OVER(PARTITION BY param ORDER BY value DESC,pid ASC) AS rank
+            FROM values_by_param
+            WHERE value IS NOT NULL
+        )
+        SELECT param,rank FROM ranked WHERE pid=?
+        """,
+        (int(from_sid), int(to_sid), int(pid)),
+    ).fetchall()
+    growth_ranks = {str(row["param"]): int(row["rank"]) for row in growth_rows}
+
+    best_rows = db.execute(
+        """
+        WITH latest AS (
+            SELECT snapshot_id FROM snapshots ORDER BY ts DESC LIMIT 1
+        ),
+        ranked AS (
+            SELECT bg.param,bg.pid,bg.diff,bg.best_snapshot_id,
+                   ROW_NUMBER() OVER(PARTITION BY bg.param ORDER BY bg.diff DESC,bg.pid ASC) AS rank
+            FROM best_growth bg
+            WHERE bg.best_for_snapshot_id=(SELECT snapshot_id FROM latest)
+        )
+        SELECT r.param,r.diff,s.filename AS best_snapshot,r.rank AS best_rank
+        FROM ranked r
+        JOIN snapshots s ON s.snapshot_id=r.best_snapshot_id
+        WHERE r.pid=?
+        """,
+        (int(pid),),
+    ).fetchall()
+    best_by_param = {str(row["param"]): dict(row) for row in best_rows}
+
+    rows_out = []
+    for param in params:
+        start_value = row_value(start, param)
+        end_value = row_value(end, param)
+        delta = end_value - start_value if start_value is not None and end_value is not None else None
+        best = best_by_param.get(param)
+        rows_out.append(
+            {
+                "param": param,
+                "start": start_value,
+                "end": end_value,
+                "delta": delta,
+                "growth_rank": growth_ranks.get(param) if delta is not None else None,
+                "overall_rank": overall_ranks.get(param) if end_value is not None else None,
+                "best_diff": int(best["diff"]) if best else None,
+                "best_snapshot": best["best_snapshot"] if best else None,
+                "best_rank": int(best["best_rank"]) if best else None,
+            }
+        )
+
+    return {
+        "pid": int(pid),
+        "name": end["_player_name"] or str(pid),
+        "level": int(end["level"]) if end["level"] is not None else None,
+        "file1": snap_from,
+        "file2": snap_to,
+        "rows": rows_out,
+    }
+
+
+@QUERIES.register("player_suggestions")
+def player_suggestions(
+    db: sqlite3.Connection,
+    query_text: str,
+    *,
+    snapshot_id: int | None = None,
+    level: int | None = None,
+    limit: int = 5,
+) -> list[dict]:
+    """Players whose name contains ``query_text``, highest level first.
+
+    Each name appears once. Without ``snapshot_id`` the latest snapshot is
+    searched.
+    """
+    if snapshot_id is None:
+        latest_sql = "latest AS (SELECT snapshot_id FROM snapshots ORDER BY ts DESC LIMIT 1),"
+        join_sql = "JOIN latest l ON l.snapshot_id=o.snapshot_id"
+        snapshot_sql = ""
+        args: list[Any] = []
+    else:
+        latest_sql = join_sql = ""
+        snapshot_sql = "o.snapshot_id=? AND "
+        args = [int(snapshot_id)]
+    args.append(f"%{query_text}%")
+    level_sql = ""
+    if level is not None:
+        level_sql = " AND o.level=?"
+        args.append(int(level))
+    args += [query_text, int(limit)]
+    rows = db.execute(
+        f"""
+        WITH {latest_sql}
+        matches AS (
+            SELECT n.value AS name,n.norm AS name_norm,o.level,o.pid,
+                   ROW_NUMBER() OVER(
+                       PARTITION BY n.norm
+                       ORDER BY COALESCE(o.level,-1) DESC,o.pid ASC
+                   ) AS same_name_rank
+            FROM observations o
+            {join_sql}
+            JOIN text_values n ON n.text_id=o.name_id
+            WHERE {snapshot_sql}n.norm LIKE ?{level_sql}
+        )
+        SELECT name,name_norm,level,pid
+        FROM matches
+        WHERE same_name_rank=1
+        ORDER BY COALESCE(level,-1) DESC,
+                 CASE WHEN name_norm=? THEN 0 ELSE 1 END,
+                 name COLLATE NOCASE,pid
+        LIMIT ?
+        """,
+        args,
+    ).fetchall()
+    return [
+        {"name": str(row["name"]), "level": int(row["level"]) if row["level"] is not None else None}
+        for row in rows
+    ]
@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 import gzip
+import hashlib
 import json
 import logging
 import os
@@ -12,15 +13,18 @@ import sqlite3
 import sys
 import time
 from collections import Counter
-from contextlib import suppress
-from dataclasses import asdict, dataclass
+from contextlib import nullcontext, suppress
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Collection, Iterable, Protocol, TypeVar
 
 import aiohttp
 import requests
 
+from forglory import columnar
+from forglory.adaptive_limit import AdaptiveLimiter, retry_after_seconds
+from forglory.parse_stage import ParseStage
 from forglory.parsing import parse_hero, parse_kill_beasts, profile_url_matches
 
 
@@ -30,6 +34,7 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 LOG = logging.getLogger("forglory.collector")
+T = TypeVar("T")
 
 ROOT = Path(__file__).resolve().parent
 DATA_DIR = ROOT / "data"
@@ -54,6 +59,7 @@ class FetchResult:
     achievement_failure: FetchFailure | None = None
     diagnostic_html: str | None = None
     diagnostic_url: str | None = None
+    fetch_seconds: float = 0.0
 
 
 def load_env_file(path: Path) -> dict[str, str]:
@@ -214,11 +220,11 @@ def load_known_names_from_db(db_path: Path) -> dict[int, str]:
         conn.close()
 
 
-def failure_summary(failures: list[FetchFailure], limit: int = 5) -> list[dict[str, object]]:
-    counts = Counter(
-        (item.stage, item.error_type, item.http_status, item.message or "")
-        for item in failures
-    )
+def _failure_key(item: FetchFailure) -> tuple:
+    return item.stage, item.error_type, item.http_status, item.message or ""
+
+
+def _summarize_failure_counts(counts: Counter, limit: int) -> list[dict[str, object]]:
     return [
         {
             "stage": stage,
@@ -231,8 +237,8 @@ def failure_summary(failures: list[FetchFailure], limit: int = 5) -> list[dict[s
     ]
 
 
-def format_failure_summary(failures: list[FetchFailure], limit: int = 3) -> str:
-    items = failure_summary(failures, limit)
+def _format_failure_counts(counts: Counter, limit: int = 3) -> str:
+    items = _summarize_failure_counts(counts, limit)
     if not items:
         return "none"
     return "; ".join(
@@ -241,6 +247,14 @@ def format_failure_summary(failures: list[FetchFailure], limit: int = 3) -> str:
     )
 
 
+def failure_summary(failures: list[FetchFailure], limit: int = 5) -> list[dict[str, object]]:
+    return _summarize_failure_counts(Counter(_failure_key(item) for item in failures), limit)
+
+
+def format_failure_summary(failures: list[FetchFailure], limit: int = 3) -> str:
+    return _format_failure_counts(Counter(_failure_key(item) for item in failures), limit)
+
+
 def load_collection_scope(db_path: Path) -> tuple[list[int], set[int], int]:
     known, baseline, highest = load_ids_from_db(db_path)
     if not known:
@@ -300,30 +314,44 @@ async def _request_text(
     pid: int,
     stage: str,
     retries: int,
+    limiter: AdaptiveLimiter | None = None,
 ) -> tuple[str | None, str | None, FetchFailure | None]:
     error: FetchFailure | None = None
     for attempt in range(1, retries + 1):
+        retry_after: float | None = None
         try:
-            async with session.get(url, allow_redirects=True) as response:
-                text = await response.text(errors="replace")
-                status = int(response.status)
-                final_url = str(response.url)
-                if status == 200:
-                    return text, final_url, None
-                if status in {404, 410}:
-                    return None, final_url, _failure(pid, stage, "not_found", attempt, status)
-                if status in {401, 403}:
-                    return None, final_url, _failure(pid, stage, "auth_error", attempt, status)
-                if status == 429 or 500 <= status <= 599:
-                    if attempt < retries:
-                        await asyncio.sleep((2 ** (attempt - 1)) + random.random())
-                        continue
-                    return None, final_url, _failure(pid, stage, "temporary_http", attempt, status)
-                return None, final_url, _failure(pid, stage, "http_error", attempt, status)
+            async with limiter or nullcontext():
+                started = time.monotonic()
+                async with session.get(url, allow_redirects=True) as response:
+                    text = await response.text(errors="replace")
+                    status = int(response.status)
+                    final_url = str(response.url)
+                    if status == 429 or 500 <= status <= 599:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        if limiter:
+                            limiter.on_throttle(retry_after)
+                    elif limiter:
+                        limiter.on_success(time.monotonic() - started)
+            if status == 200:
+                return text, final_url, None
+            if status in {404, 410}:
+                return None, final_url, _failure(pid, stage, "not_found", attempt, status)
+            if status in {401, 403}:
+                return None, final_url, _failure(pid, stage, "auth_error", attempt, status)
+            if status == 429 or 500 <= status <= 599:
+                if attempt < retries:
+                    await asyncio.sleep(max(retry_after or 0.0, (2 ** (attempt - 1)) + random.random()))
+                    continue
+                return None, final_url, _failure(pid, stage, "temporary_http", attempt, status)
+            return None, final_url, _failure(pid, stage, "http_error", attempt, status)
         except asyncio.TimeoutError:
             error = _failure(pid, stage, "timeout", attempt)
+            if limiter:
+                limiter.on_throttle()
         except aiohttp.ClientError as exc:
             error = _failure(pid, stage, "network_error", attempt, message=str(exc))
+            if limiter:
+                limiter.on_throttle()
         except Exception as exc:
             error = _failure(pid, stage, "unexpected_error", attempt, message=repr(exc))
         if attempt < retries:
@@ -332,37 +360,44 @@ async def _request_text(
 
 
 async def _limited_request(
-    semaphore: asyncio.Semaphore,
+    limiter: AdaptiveLimiter,
     session: aiohttp.ClientSession,
     url: str,
     pid: int,
     stage: str,
     retries: int,
 ) -> tuple[str | None, str | None, FetchFailure | None]:
-    async with semaphore:
-        return await _request_text(session, url, pid, stage, retries)
+    return await _request_text(session, url, pid, stage, retries, limiter)
+
+
+async def _parse(parser: ParseStage | None, function: Callable[..., T], *args: object) -> T:
+    if parser is None:
+        return function(*args)
+    return await parser.run(function, *args)
 
 
 async def fetch_hero(
     session: aiohttp.ClientSession,
     hero_id: int,
-    semaphore: asyncio.Semaphore,
+    limiter: AdaptiveLimiter,
     domain: str,
     retries: int,
     fallback_name: str | None = None,
     achievement_retries: int = 1,
+    parser: ParseStage | None = None,
 ) -> FetchResult:
     profile_url = f"{domain}hero/detail?player={hero_id}"
+    started = time.perf_counter()
     achievement_url = f"{domain}achievements?player={hero_id}"
 
     profile_task = asyncio.create_task(
         _limited_request(
-            semaphore, session, profile_url, hero_id, "profile", retries
+            limiter, session, profile_url, hero_id, "profile", retries
         )
     )
     achievement_task = asyncio.create_task(
         _limited_request(
-            semaphore,
+            limiter,
             session,
             achievement_url,
             hero_id,
@@ -372,6 +407,7 @@ async def fetch_hero(
     )
 
     profile_text, final_url, failure = await profile_task
+    fetch_seconds = time.perf_counter() - started
     if failure:
         achievement_task.cancel()
         with suppress(asyncio.CancelledError):
@@ -406,11 +442,7 @@ async def fetch_hero(
             diagnostic_url=final_url,
         )
     try:
-        hero_data = parse_hero(
-            profile_text,
-            hero_id,
-            fallback_name=fallback_name,
-        )
+        hero_data = await _parse(parser, parse_hero, profile_text, hero_id, fallback_name)
     except Exception as exc:
         achievement_task.cancel()
         with suppress(asyncio.CancelledError):
@@ -429,12 +461,14 @@ async def fetch_hero(
             diagnostic_url=final_url,
         )
 
+    waited = time.perf_counter()
     achievement_text, _achievement_final_url, achievement_failure = (
         await achievement_task
     )
+    fetch_seconds += time.perf_counter() - waited
     if achievement_text:
         try:
-            kills = parse_kill_beasts(achievement_text, hero_id)
+            kills = await _parse(parser, parse_kill_beasts, achievement_text, hero_id)
             if kills is not None:
                 hero_data["Убито зверей"] = kills
             else:
@@ -450,11 +484,170 @@ async def fetch_hero(
         hero_id,
         hero_data,
         achievement_failure=achievement_failure,
+        fetch_seconds=fetch_seconds,
     )
 
 
-async def collect(
+class ResultSink(Protocol):
+    """Receives collector output as each player completes."""
+
+    def add_hero(self, pid: int, data: dict) -> None: ...
+
+    def add_failure(self, failure: FetchFailure) -> None: ...
+
+    def add_achievement_failure(self, failure: FetchFailure) -> None: ...
+
+
+class DictSink:
+    """Keep every result in memory, as ``collect`` has always returned them.
+
+    The JSON snapshot is one object sorted by player id and the columnar
+    archive is encoded from the same rows, so both are written from the
+    finished dict; ``--output sqlite`` streams through ``StagingSink``.
+    """
+
+    def __init__(self) -> None:
+        self.results: dict[int, dict] = {}
+        self.failures: list[FetchFailure] = []
+        self.achievement_failures: list[FetchFailure] = []
+
+    def add_hero(self, pid: int, data: dict) -> None:
+        self.results[pid] = data
+
+    def add_failure(self, failure: FetchFailure) -> None:
+        self.failures.append(failure)
+
+    def add_achievement_failure(self, failure: FetchFailure) -> None:
+        self.achievement_failures.append(failure)
+
+
+class StagingSink:
+    """Stage every hero in the ratings database as soon as it completes.
+
+    Only the collected player ids and the failures stay in memory; the rows
+    wait in the staging tables for ``finish_staged_snapshot``.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        from tools.db_staging import StagingWriter
+
+        self.writer = StagingWriter(db_path)
+        self.pids: set[int] = set()
+        self.failures: list[FetchFailure] = []
+        self.achievement_failures: list[FetchFailure] = []
+
+    def add_hero(self, pid: int, data: dict) -> None:
+        self.writer.add(pid, data)
+        self.pids.add(pid)
+
+    def add_failure(self, failure: FetchFailure) -> None:
+        self.failures.append(failure)
+
+    def add_achievement_failure(self, failure: FetchFailure) -> None:
+        self.achievement_failures.append(failure)
+
+
+@dataclass
+class JournalState:
+    heroes: dict[int, dict]
+    fetched_at: dict[int, float]
+    achievement_failures: list[FetchFailure]
+
+
+class CheckpointJournal:
+    """Append-only NDJSON journal of a profile collection.
+
+    Every hero and failure is written and flushed as it completes, then
+    forwarded to ``sink``. After a crash or runner timeout, ``load`` returns
+    the heroes fetched recently enough to reuse, so a restarted collection
+    only requests the rest.
+    """
+
+    def __init__(self, path: Path, sink: ResultSink, state: JournalState | None = None) -> None:
+        self.path = path
+        self.sink = sink
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        # Rewrite the carried-over records so stale and partial lines are dropped.
+        with temp_path.open("w", encoding="utf-8") as handle:
+            if state is not None:
+                for pid, data in state.heroes.items():
+                    handle.write(self._line("hero", pid=pid, at=state.fetched_at[pid], data=data))
+                for item in state.achievement_failures:
+                    handle.write(self._line("achievement_failure", at=state.fetched_at[item.pid], **asdict(item)))
+        os.replace(temp_path, path)
+        self._handle = path.open("a", encoding="utf-8")
+
+    @staticmethod
+    def _line(kind: str, **fields: object) -> str:
+        return json.dumps({"kind": kind, **fields}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _write(self, kind: str, **fields: object) -> None:
+        self._handle.write(self._line(kind, at=time.time(), **fields))
+        self._handle.flush()
+
+    def add_hero(self, pid: int, data: dict) -> None:
+        self._write("hero", pid=pid, data=data)
+        self.sink.add_hero(pid, data)
+
+    def add_failure(self, failure: FetchFailure) -> None:
+        self._write("failure", **asdict(failure))
+        self.sink.add_failure(failure)
+
+    def add_achievement_failure(self, failure: FetchFailure) -> None:
+        self._write("achievement_failure", **asdict(failure))
+        self.sink.add_achievement_failure(failure)
+
+    def close(self) -> None:
+        self._handle.close()
+
+    @staticmethod
+    def load(path: Path, max_age_seconds: float, ids: Iterable[int] | None = None) -> JournalState:
+        """Return heroes fetched within ``max_age_seconds``; failures are retried."""
+        state = JournalState({}, {}, [])
+        if max_age_seconds <= 0 or not path.exists():
+            return state
+        wanted = set(ids) if ids is not None else None
+        oldest = time.time() - max_age_seconds
+        achievement_failures: dict[int, FetchFailure] = {}
+        with path.open("r", encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    kind = record.pop("kind")
+                    fetched_at = float(record.pop("at"))
+                    pid = int(record["pid"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # A crash can leave the last line half-written.
+                if fetched_at < oldest or (wanted is not None and pid not in wanted):
+                    continue
+                if kind == "hero" and isinstance(record.get("data"), dict):
+                    state.heroes[pid] = record["data"]
+                    state.fetched_at[pid] = fetched_at
+                elif kind == "achievement_failure":
+                    achievement_failures[pid] = FetchFailure(**record)
+        state.achievement_failures = [
+            item for pid, item in achievement_failures.items() if pid in state.heroes
+        ]
+        return state
+
+
+@dataclass
+class CollectionStats:
+    requested: int = 0
+    completed: int = 0
+    profiles: int = 0
+    failures: int = 0
+    achievement_failures: int = 0
+    aborted: bool = False
+    limiter: dict = field(default_factory=dict)
+    fetch_seconds: float = 0.0
+    parse: dict = field(default_factory=dict)
+
+
+async def collect_into(
     ids: Iterable[int],
+    sink: ResultSink,
     cookies: dict[str, str],
     domain: str,
     concurrency: int,
@@ -462,17 +655,32 @@ async def collect(
     known_names: dict[int, str] | None = None,
     achievement_retries: int = 1,
     systemic_failure_sample_size: int = 200,
-) -> tuple[dict[int, dict], list[FetchFailure], list[FetchFailure]]:
+    max_concurrency: int | None = None,
+    parse_workers: int | None = None,
+) -> CollectionStats:
+    """Fetch ``ids`` with a fixed pool of workers and stream results to ``sink``.
+
+    Workers pull pids from a bounded queue, so only ``max_concurrency``
+    players are in flight however long the id list is. Requests start at
+    ``concurrency`` and the adaptive limiter moves between 1 and
+    ``max_concurrency`` as the server allows; without it the limit only
+    backs off from ``concurrency`` and recovers to it. HTML is parsed in a
+    process pool of ``parse_workers`` (0 parses inline on the event loop).
+    """
     ids = list(dict.fromkeys(ids))
     known_names = known_names or {}
-    results: dict[int, dict] = {}
-    failures: list[FetchFailure] = []
-    achievement_failures: list[FetchFailure] = []
-    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = AdaptiveLimiter(
+        max(1, concurrency),
+        maximum=max(concurrency, max_concurrency or concurrency),
+    )
+    workers_count = limiter.maximum
+    stats = CollectionStats(requested=len(ids))
+    failure_counts: Counter[tuple] = Counter()
+    queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=workers_count * 2)
     timeout = aiohttp.ClientTimeout(total=30, connect=8, sock_read=18)
     connector = aiohttp.TCPConnector(
-        limit=max(concurrency + 10, 30),
-        limit_per_host=max(concurrency, 20),
+        limit=max(limiter.maximum + 10, 30),
+        limit_per_host=max(limiter.maximum, 20),
         ttl_dns_cache=600,
         keepalive_timeout=30,
     )
@@ -482,108 +690,167 @@ async def collect(
         old_file.unlink(missing_ok=True)
     diagnostic_count = 0
 
-    async with aiohttp.ClientSession(
+    def record(item: FetchResult) -> None:
+        nonlocal diagnostic_count
+        stats.completed += 1
+        stats.fetch_seconds += item.fetch_seconds
+        if item.data is not None:
+            stats.profiles += 1
+            sink.add_hero(item.pid, item.data)
+        elif item.failure:
+            stats.failures += 1
+            failure_counts[_failure_key(item.failure)] += 1
+            sink.add_failure(item.failure)
+            if item.diagnostic_html and diagnostic_count < 5:
+                diagnostic_count += 1
+                diagnostic_path = diagnostics_dir / (
+                    f"{diagnostic_count:02d}_pid_{item.pid}_"
+                    f"{item.failure.error_type}.html"
+                )
+                diagnostic_path.write_text(
+                    item.diagnostic_html, encoding="utf-8", errors="replace"
+                )
+        if item.achievement_failure:
+            stats.achievement_failures += 1
+            sink.add_achievement_failure(item.achievement_failure)
+
+        if stats.completed % 1000 == 0 or stats.completed == stats.requested:
+            LOG.info(
+                "Progress %s/%s: profiles=%s, failed=%s, "
+                "achievement warnings=%s, concurrency=%s; reasons=%s",
+                stats.completed,
+                stats.requested,
+                stats.profiles,
+                stats.failures,
+                stats.achievement_failures,
+                limiter.current_limit,
+                _format_failure_counts(failure_counts),
+            )
+
+        if (
+            systemic_failure_sample_size > 0
+            and stats.completed >= systemic_failure_sample_size
+            and not stats.profiles
+            and not stats.aborted
+        ):
+            LOG.error(
+                "Systemic collection failure after %s responses; "
+                "aborting remaining requests. Reasons: %s",
+                stats.completed,
+                _format_failure_counts(failure_counts, 5),
+            )
+            stats.aborted = True
+            current = asyncio.current_task()
+            for task in tasks:
+                if task is not current and not task.done():
+                    task.cancel()
+
+    async def produce() -> None:
+        for pid in ids:
+            await queue.put(pid)
+        for _ in range(workers_count):
+            await queue.put(None)
+
+    async def work(session: aiohttp.ClientSession) -> None:
+        while not stats.aborted:
+            pid = await queue.get()
+            if pid is None:
+                return
+            item = await fetch_hero(
+                session,
+                pid,
+                limiter,
+                domain,
+                retries,
+                fallback_name=known_names.get(pid),
+                achievement_retries=achievement_retries,
+                parser=parser,
+            )
+            record(item)
+
+    tasks: list[asyncio.Task] = []
+    async with ParseStage(parse_workers) as parser, aiohttp.ClientSession(
         cookies=cookies,
         headers=HEADERS,
         timeout=timeout,
         connector=connector,
     ) as session:
-        tasks = [
-            asyncio.create_task(
-                fetch_hero(
-                    session,
-                    pid,
-                    semaphore,
-                    domain,
-                    retries,
-                    fallback_name=known_names.get(pid),
-                    achievement_retries=achievement_retries,
-                )
-            )
-            for pid in ids
-        ]
-        completed = 0
-        aborted = False
-        for future in asyncio.as_completed(tasks):
-            item = await future
-            completed += 1
-            if item.data is not None:
-                results[item.pid] = item.data
-            elif item.failure:
-                failures.append(item.failure)
-                if item.diagnostic_html and diagnostic_count < 5:
-                    diagnostic_count += 1
-                    diagnostic_path = diagnostics_dir / (
-                        f"{diagnostic_count:02d}_pid_{item.pid}_"
-                        f"{item.failure.error_type}.html"
-                    )
-                    diagnostic_path.write_text(
-                        item.diagnostic_html, encoding="utf-8", errors="replace"
-                    )
-            if item.achievement_failure:
-                achievement_failures.append(item.achievement_failure)
-
-            if completed % 1000 == 0 or completed == len(tasks):
-                LOG.info(
-                    "Progress %s/%s: profiles=%s, failed=%s, "
-                    "achievement warnings=%s; reasons=%s",
-                    completed,
-                    len(tasks),
-                    len(results),
-                    len(failures),
-                    len(achievement_failures),
-                    format_failure_summary(failures),
-                )
+        tasks.append(asyncio.create_task(produce()))
+        tasks.extend(
+            asyncio.create_task(work(session)) for _ in range(min(workers_count, len(ids)))
+        )
+        try:
+            done, _pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
 
-            if (
-                systemic_failure_sample_size > 0
-                and completed >= systemic_failure_sample_size
-                and not results
-            ):
-                LOG.error(
-                    "Systemic collection failure after %s responses; "
-                    "aborting remaining requests. Reasons: %s",
-                    completed,
-                    format_failure_summary(failures, 5),
-                )
-                aborted = True
-                for task in tasks:
-                    if not task.done():
-                        task.cancel()
-                break
+    stats.limiter = limiter.summary()
+    stats.parse = parser.summary()
+    LOG.info("Adaptive concurrency: %s", stats.limiter)
+    LOG.info(
+        "Stage time: fetch=%.1fs across requests, parse=%.1fs in %s workers "
+        "(%s jobs, %.1fs waiting for a parser slot)",
+        stats.fetch_seconds,
+        stats.parse["parse_seconds"],
+        stats.parse["workers"] or "inline",
+        stats.parse["jobs"],
+        stats.parse["parse_wait_seconds"],
+    )
+    return stats
 
-        if aborted:
-            await asyncio.gather(*tasks, return_exceptions=True)
 
-    return results, failures, achievement_failures
+async def collect(
+    ids: Iterable[int],
+    cookies: dict[str, str],
+    domain: str,
+    concurrency: int,
+    retries: int,
+    known_names: dict[int, str] | None = None,
+    achievement_retries: int = 1,
+    systemic_failure_sample_size: int = 200,
+    max_concurrency: int | None = None,
+    parse_workers: int | None = None,
+) -> tuple[dict[int, dict], list[FetchFailure], list[FetchFailure]]:
+    sink = DictSink()
+    await collect_into(
+        ids,
+        sink,
+        cookies,
+        domain,
+        concurrency,
+        retries,
+        known_names=known_names,
+        achievement_retries=achievement_retries,
+        systemic_failure_sample_size=systemic_failure_sample_size,
+        max_concurrency=max_concurrency,
+        parse_workers=parse_workers,
+    )
+    return sink.results, sink.failures, sink.achievement_failures
 
 
-def save_snapshot(
-    results: dict[int, dict],
+def snapshot_metadata(
+    snapshot_name: str,
+    captured: datetime,
+    results: Collection[int],
     failures: list[FetchFailure],
     achievement_failures: list[FetchFailure],
     baseline_ids: set[int],
     known_ids: list[int],
     probe_start: int,
     probe_end: int,
-) -> tuple[Path, Path]:
-    captured = datetime.now(timezone.utc) + timedelta(hours=3)
-    timestamp = captured.strftime("%Y-%m-%d_%H-%M-%S")
-    snapshot_path = DATA_DIR / f"heroes_{timestamp}.json.gz"
-    metadata_path = DATA_DIR / f"heroes_{timestamp}.meta.json"
-
-    sorted_data = {str(pid): results[pid] for pid in sorted(results)}
-    with gzip.open(snapshot_path, "wt", encoding="utf-8", compresslevel=6) as handle:
-        json.dump(sorted_data, handle, ensure_ascii=False, separators=(",", ":"))
-
-    baseline_success = len(baseline_ids.intersection(results))
-    metadata = {
+) -> dict[str, Any]:
+    return {
         "schema": 1,
-        "snapshot": snapshot_path.name,
+        "snapshot": snapshot_name,
         "captured_at": captured.isoformat(),
         "known_ids_count": len(known_ids),
         "baseline_ids_count": len(baseline_ids),
-        "baseline_success_count": baseline_success,
+        "baseline_success_count": len(baseline_ids.intersection(results)),
         "successful_profiles": len(results),
         "probe_start": probe_start,
         "probe_end": probe_end,
@@ -591,16 +858,155 @@ def save_snapshot(
         "failures": [asdict(item) for item in failures],
         "achievement_failures": [asdict(item) for item in achievement_failures],
     }
+
+
+def snapshot_timestamp() -> tuple[datetime, str]:
+    captured = datetime.now(timezone.utc) + timedelta(hours=3)
+    return captured, captured.strftime("%Y-%m-%d_%H-%M-%S")
+
+
+def save_snapshot(
+    results: dict[int, dict],
+    failures: list[FetchFailure],
+    achievement_failures: list[FetchFailure],
+    baseline_ids: set[int],
+    known_ids: list[int],
+    probe_start: int,
+    probe_end: int,
+    extra_metadata: dict[str, Any] | None = None,
+) -> tuple[Path, Path]:
+    captured, timestamp = snapshot_timestamp()
+    snapshot_path = DATA_DIR / f"heroes_{timestamp}.json.gz"
+    metadata_path = DATA_DIR / f"heroes_{timestamp}.meta.json"
+
+    sorted_data = {str(pid): results[pid] for pid in sorted(results)}
+    with gzip.open(snapshot_path, "wt", encoding="utf-8", compresslevel=6) as handle:
+        json.dump(sorted_data, handle, ensure_ascii=False, separators=(",", ":"))
+
+    metadata = snapshot_metadata(
+        snapshot_path.name, captured, results, failures, achievement_failures,
+        baseline_ids, known_ids, probe_start, probe_end,
+    )
+    archive_path = save_columnar_snapshot(snapshot_path, results)
+    if archive_path is not None:
+        metadata["columnar_snapshot"] = archive_path.name
+    metadata.update(extra_metadata or {})
     metadata_path.write_text(
         json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8"
     )
     return snapshot_path, metadata_path
 
 
+def stage_snapshot(
+    db_path: Path,
+    results: dict[int, dict],
+    failures: list[FetchFailure],
+    achievement_failures: list[FetchFailure],
+    baseline_ids: set[int],
+    known_ids: list[int],
+    probe_start: int,
+    probe_end: int,
+    extra_metadata: dict[str, Any] | None = None,
+) -> tuple[Path, Path | None]:
+    """Stage the snapshot in the ratings database instead of writing JSON.
+
+    Nothing is published until ``tools/db_staging.py promote`` validates it;
+    the returned name is the snapshot's filename inside the database. The
+    metadata is staged next to the rows, so there is no metadata file and the
+    second value is None.
+    """
+    sink = StagingSink(db_path)
+    try:
+        for pid in sorted(results):
+            sink.add_hero(pid, results[pid])
+        return finish_staged_snapshot(
+            sink, failures, achievement_failures, baseline_ids, known_ids,
+            probe_start, probe_end, extra_metadata,
+        )
+    except Exception:
+        sink.writer.discard()
+        raise
+    finally:
+        sink.writer.close()
+
+
+def finish_staged_snapshot(
+    sink: StagingSink,
+    failures: list[FetchFailure],
+    achievement_failures: list[FetchFailure],
+    baseline_ids: set[int],
+    known_ids: list[int],
+    probe_start: int,
+    probe_end: int,
+    extra_metadata: dict[str, Any] | None = None,
+) -> tuple[Path, Path | None]:
+    """Name the rows already staged through ``sink`` and record their metadata."""
+    captured, timestamp = snapshot_timestamp()
+    snapshot_name = f"heroes_{timestamp}.json.gz"
+    metadata = snapshot_metadata(
+        snapshot_name, captured, sink.pids, failures, achievement_failures,
+        baseline_ids, known_ids, probe_start, probe_end,
+    )
+    metadata.update(extra_metadata or {})
+    count = sink.writer.finish(snapshot_name, metadata)
+    LOG.info("Staged %s players as %s in %s", count, snapshot_name, sink.writer.db_path)
+    return Path(snapshot_name), None
+
+
+def save_columnar_snapshot(snapshot_path: Path, results: dict[int, dict]) -> Path | None:
+    """Write the columnar archive next to a JSON snapshot, as a delta when possible.
+
+    The archive is a compact secondary copy: failing to write it never fails
+    the collection, because the JSON snapshot remains the source of truth.
+    It is opt-in with ``SNAPSHOT_COLUMNAR=1``: the workflows do not keep
+    ``data/`` between runs, so without a persisted previous archive there is
+    no delta base, and ``build_db`` reads the JSON whenever both exist.
+    """
+    if env_get("SNAPSHOT_COLUMNAR", "0").strip().lower() not in {"1", "true", "yes", "on"}:
+        return None
+    max_depth = int(env_get("SNAPSHOT_COLUMNAR_MAX_DEPTH", "6"))
+    archive_path = snapshot_path.with_name(columnar.archive_name(snapshot_path.name))
+    try:
+        base_path = columnar.latest_archive(snapshot_path.parent, before_name=archive_path.name)
+        if base_path is not None and int(columnar.read_header(base_path).get("depth") or 0) >= max_depth:
+            base_path = None
+        digest = hashlib.sha256(snapshot_path.read_bytes()).hexdigest()
+        columnar.write_snapshot(
+            archive_path,
+            columnar.from_heroes(results),
+            base_path=base_path,
+            source_name=snapshot_path.name,
+            source_sha256=digest,
+        )
+    except (OSError, ValueError) as exc:
+        LOG.warning("Columnar snapshot was not written: %s", exc)
+        archive_path.unlink(missing_ok=True)
+        return None
+    LOG.info(
+        "Columnar snapshot %s: %s bytes (base=%s)",
+        archive_path.name,
+        archive_path.stat().st_size,
+        base_path.name if base_path else None,
+    )
+    return archive_path
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Collect all known and newly probed players")
     parser.add_argument("--db-path", default=env_get("DB_PATH", "data/db/ratings.sqlite"))
     parser.add_argument("--concurrency", type=int, default=int(env_get("COLLECT_CONCURRENCY", "40")))
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(env_get("COLLECT_MAX_CONCURRENCY", "0")) or None,
+        help="Upper bound for adaptive concurrency; defaults to --concurrency, so the limit only grows when set",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=int(env_get("PARSE_WORKERS", "-1")),
+        help="HTML parser processes; 0 parses inline, negative uses every CPU",
+    )
     parser.add_argument("--retries", type=int, default=int(env_get("COLLECT_RETRIES", "2")))
     parser.add_argument(
         "--achievement-retries",
@@ -618,6 +1024,12 @@ def parse_args() -> argparse.Namespace:
         type=float,
         default=float(env_get("MIN_BASELINE_SUCCESS_RATIO", "0.995")),
     )
+    parser.add_argument(
+        "--output",
+        choices=("json", "sqlite"),
+        default=env_get("COLLECT_OUTPUT", "json"),
+        help="json writes data/heroes_*.json.gz; sqlite stages rows in --db-path for promotion",
+    )
     return parser.parse_args()
 
 
@@ -649,18 +1061,30 @@ def main() -> int:
         args.concurrency,
     )
 
-    results, failures, achievement_failures = asyncio.run(
-        collect(
-            ids,
-            cookies,
-            domain,
-            args.concurrency,
-            args.retries,
-            known_names=known_names,
-            achievement_retries=args.achievement_retries,
-            systemic_failure_sample_size=args.systemic_failure_sample_size,
+    options = {
+        "known_names": known_names,
+        "achievement_retries": args.achievement_retries,
+        "systemic_failure_sample_size": args.systemic_failure_sample_size,
+        "max_concurrency": args.max_concurrency,
+        "parse_workers": args.parse_workers if args.parse_workers >= 0 else None,
+    }
+    staging: StagingSink | None = None
+    results: Collection[int]
+    if args.output == "sqlite":
+        # Rows go straight to the staging tables; only ids stay in memory.
+        staging = StagingSink(db_path)
+        try:
+            asyncio.run(collect_into(ids, staging, cookies, domain, args.concurrency, args.retries, **options))
+        except BaseException:
+            staging.writer.discard()
+            staging.writer.close()
+            raise
+        results = staging.pids
+        failures, achievement_failures = staging.failures, staging.achievement_failures
+    else:
+        results, failures, achievement_failures = asyncio.run(
+            collect(ids, cookies, domain, args.concurrency, args.retries, **options)
         )
-    )
 
     baseline_success = len(baseline_ids.intersection(results))
     ratio = baseline_success / len(baseline_ids) if baseline_ids else 1.0
@@ -672,6 +1096,9 @@ def main() -> int:
             baseline_success,
             len(baseline_ids),
         )
+        if staging is not None:
+            staging.writer.discard()
+            staging.writer.close()
         failure_report = DATA_DIR / "last_failed_collection.json"
         failure_report.write_text(
             json.dumps(
@@ -690,17 +1117,16 @@ def main() -> int:
         )
         return 2
 
-    snapshot, metadata = save_snapshot(
-        results,
-        failures,
-        achievement_failures,
-        baseline_ids,
-        known_ids,
-        probe_start,
-        probe_end,
-    )
-    LOG.info("Saved snapshot: %s", snapshot)
-    LOG.info("Saved metadata: %s", metadata)
+    scope = (failures, achievement_failures, baseline_ids, known_ids, probe_start, probe_end)
+    if staging is not None:
+        try:
+            finish_staged_snapshot(staging, *scope)
+        finally:
+            staging.writer.close()
+    else:
+        snapshot, metadata = save_snapshot(results, *scope)
+        LOG.info("Saved snapshot: %s", snapshot)
+        LOG.info("Saved metadata: %s", metadata)
     LOG.info(
         "Collection complete: %s profiles, %s profile failures, %s achievement warnings",
         len(results),
@@ -0,0 +1,9 @@
+"""Gunicorn settings, read from the working directory on start."""
+
+
+def post_worker_init(worker):
+    """Warm each worker's query cache once it has loaded the app."""
+    import app
+
+    if app.WARMUP_ENABLED:
+        app.start_warmup_watcher()
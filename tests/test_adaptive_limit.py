@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+
+from forglory.adaptive_limit import AdaptiveLimiter, retry_after_seconds
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    def test_healthy_windows_grow_and_throttling_cuts_once_per_cooldown(self) -> None:
+        limiter = AdaptiveLimiter(4, maximum=6, cooldown_seconds=60)
+        for _ in range(4):
+            limiter.on_success(0.1)
+        self.assertEqual(limiter.current_limit, 5)
+        for _ in range(5):
+            limiter.on_success(0.1)
+        for _ in range(20):
+            limiter.on_success(0.1)
+        self.assertEqual(limiter.current_limit, 6)
+
+        limiter.on_throttle()
+        limiter.on_throttle()
+        self.assertEqual(limiter.current_limit, 3)
+        self.assertEqual(limiter.summary()["throttles"], 2)
+        self.assertEqual(limiter.summary()["peak_limit"], 6)
+
+    def test_slow_responses_stop_growth(self) -> None:
+        limiter = AdaptiveLimiter(2, maximum=10)
+        limiter.on_success(0.1)
+        for _ in range(30):
+            limiter.on_success(2.0)
+        self.assertEqual(limiter.current_limit, 2)
+
+    def test_in_flight_never_exceeds_limit_and_retry_after_pauses(self) -> None:
+        limiter = AdaptiveLimiter(3, maximum=3)
+        peak = 0
+
+        async def request() -> None:
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.001)
+
+        async def scenario() -> float:
+            await asyncio.gather(*(request() for _ in range(30)))
+            limiter.on_throttle(0.05)
+            started = time.monotonic()
+            await request()
+            return time.monotonic() - started
+
+        waited = asyncio.run(scenario())
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(limiter.current_limit, 1)
+        self.assertGreaterEqual(waited, 0.04)
+
+    def test_retry_after_accepts_seconds_and_http_dates(self) -> None:
+        self.assertEqual(retry_after_seconds("7"), 7.0)
+        self.assertEqual(retry_after_seconds("100000"), 120.0)
+        self.assertIsNone(retry_after_seconds("soon"))
+        now = 1_700_000_000.0
+        self.assertEqual(
+            retry_after_seconds("Tue, 14 Nov 2023 22:13:50 GMT", now=now),
+            30.0,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
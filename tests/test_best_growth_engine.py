@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from forglory import best_growth
+from tools.build_db import compute_best_growth
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+
+
+def rebuild(source: Path, target: Path, engine: str) -> tuple[str, list[tuple]]:
+    shutil.copyfile(source, target)
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        latest = conn.execute("SELECT snapshot_id FROM snapshots ORDER BY ts DESC LIMIT 1").fetchone()[0]
+        conn.execute("BEGIN")
+        compute_best_growth(conn, int(latest), engine=engine)
+        conn.execute("COMMIT")
+        rows = conn.execute("SELECT * FROM best_growth ORDER BY param,pid").fetchall()
+    finally:
+        conn.close()
+    return hashlib.sha256(target.read_bytes()).hexdigest(), rows
+
+
+@unittest.skipUnless(best_growth.available(), "NumPy is not installed")
+class BestGrowthEngineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "source.sqlite"
+        generate_database(self.source, SyntheticDbConfig(players=400, snapshots=9, seed=5))
+        with sqlite3.connect(self.source) as conn:
+            snapshot_ids = [row[0] for row in conn.execute("SELECT snapshot_id FROM snapshots ORDER BY ts")]
+            # Missing values, missing levels and a missing stat in the stat sum.
+            conn.execute("UPDATE observations SET glory=NULL WHERE pid%7=0 AND snapshot_id%2=0")
+            conn.execute("UPDATE observations SET level=NULL WHERE pid%11=0")
+            conn.execute("UPDATE observations SET strength=NULL WHERE pid%13=0 AND snapshot_id=?", (snapshot_ids[3],))
+            # Equal growth in every pair: the earliest pair must win the tie.
+            conn.execute("UPDATE observations SET wins=snapshot_id*10 WHERE pid%5=0")
+            # Shrinking values give negative best growth.
+            conn.execute("UPDATE observations SET losses=1000-snapshot_id WHERE pid%3=0")
+            # A gap longer than max_gap_hours splits the window into two runs.
+            for sid in reversed(snapshot_ids[5:]):
+                conn.execute("UPDATE snapshots SET ts=ts+30*3600 WHERE snapshot_id=?", (sid,))
+            conn.execute(
+                "UPDATE players SET visible_from_snapshot_id=? WHERE pid%17=0", (snapshot_ids[6],)
+            )
+
+    def assert_engines_agree(self) -> list[tuple]:
+        sql_digest, sql_rows = rebuild(self.source, self.root / "sql.sqlite", "sql")
+        array_digest, array_rows = rebuild(self.source, self.root / "array.sqlite", "array")
+        self.assertTrue(sql_rows)
+        self.assertEqual(array_rows, sql_rows)
+        self.assertEqual(array_digest, sql_digest)
+        return sql_rows
+
+    def test_array_engine_writes_the_same_file_as_sql(self) -> None:
+        rows = self.assert_engines_agree()
+        params = {row[1] for row in rows}
+        self.assertIn("Сумма статов", params)
+        self.assertTrue(any(row[3] is None for row in rows))
+        self.assertTrue(any(row[4] < 0 for row in rows))
+
+    def test_values_the_arrays_cannot_carry_fall_back_to_sql(self) -> None:
+        with sqlite3.connect(self.source) as conn:
+            conn.execute("UPDATE observations SET glory=glory+0.5 WHERE pid=(SELECT MIN(pid) FROM observations)")
+        conn = sqlite3.connect(self.source)
+        self.addCleanup(conn.close)
+        snapshots = conn.execute("SELECT snapshot_id,ts FROM snapshots ORDER BY ts").fetchall()
+        conn.execute("DELETE FROM best_growth")
+        self.assertFalse(
+            best_growth.compute_best_growth_arrays(conn, snapshots[-1][0], snapshots, ("Слава",), 26.0)
+        )
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM best_growth").fetchone()[0], 0)
+        conn.rollback()
+        self.assert_engines_agree()
+
+    def test_array_engine_requires_numpy(self) -> None:
+        conn = sqlite3.connect(self.source)
+        self.addCleanup(conn.close)
+        with mock.patch.object(best_growth, "np", None):
+            with self.assertRaises(RuntimeError):
+                compute_best_growth(conn, 1, engine="array")
+        with self.assertRaises(ValueError):
+            compute_best_growth(conn, 1, engine="pandas")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.blockzip import BlockZipError, compress_file, extract_file, read_index, verify_file
+
+
+class BlockZipTests(unittest.TestCase):
+    def test_blocks_are_deterministic_and_readable_by_plain_gzip(self) -> None:
+        payload = b"".join(f"row {index:06d}\n".encode() for index in range(50_000))
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "ratings.sqlite"
+            source.write_bytes(payload)
+            serial, parallel = root / "serial.gz", root / "parallel.gz"
+
+            self.assertEqual(compress_file(source, serial, block_size=64 * 1024, threads=1), 9)
+            compress_file(source, parallel, block_size=64 * 1024, threads=4)
+
+            self.assertEqual(serial.read_bytes(), parallel.read_bytes())
+            self.assertEqual(gzip.decompress(parallel.read_bytes()), payload)
+            self.assertEqual(sum(block.raw_size for block in read_index(parallel)), len(payload))
+            self.assertEqual(verify_file(parallel, threads=4), len(payload))
+
+            target = root / "restored.sqlite"
+            self.assertEqual(extract_file(parallel, target, threads=4), len(payload))
+            self.assertEqual(target.read_bytes(), payload)
+
+    def test_plain_gzip_falls_back_and_corruption_is_detected(self) -> None:
+        payload = b"ForGlory" * 40_000
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            plain = root / "plain.gz"
+            plain.write_bytes(gzip.compress(payload, mtime=0))
+            target = root / "plain.sqlite"
+            self.assertEqual(extract_file(plain, target), len(payload))
+            self.assertEqual(target.read_bytes(), payload)
+            with self.assertRaises(BlockZipError):
+                read_index(plain)
+
+            source = root / "source.sqlite"
+            source.write_bytes(payload)
+            blocked = root / "blocked.gz"
+            compress_file(source, blocked, block_size=100_000, threads=2)
+            data = bytearray(blocked.read_bytes())
+            last = read_index(blocked)[-1]
+            data[last.offset + last.size - 5] ^= 0xFF
+            blocked.write_bytes(bytes(data))
+            with self.assertRaises(BlockZipError):
+                verify_file(blocked, threads=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import unittest
+
+from collect_api_first import ApiCollectionError, parse_api_payload, parse_api_stream
+
+
+def row(pid: int, clan_id: int = 0) -> dict:
+    data = {
+        "id": pid, "nickname": f"Игрок {pid}", "level": 10, "glory": 1_000 + pid,
+        "wins": 10, "losses": 2, "dragon_wins": 3, "serpent_wins": 4,
+        "strength": 5, "defense": 6, "agility": 7, "mastery": 8, "vitality": 9,
+        "silver_looted": 11, "silver_lost": 12, "crystals_looted": 13, "crystals_lost": 14,
+        "beasts_killed": 15, "achievements": {"lord_wins": pid * 3},
+    }
+    if clan_id:
+        data.update({"clan_id": clan_id, "clan_name": f"Клан {clan_id}"})
+    return data
+
+
+def chunks(payload: dict, size: int) -> list[bytes]:
+    body = json.dumps(payload, ensure_ascii=False, indent=1).encode("utf-8")
+    return [body[index:index + size] for index in range(0, len(body), size)]
+
+
+class BulkApiStreamTests(unittest.TestCase):
+    def test_stream_matches_whole_payload_parse_for_any_chunking(self) -> None:
+        payload = {
+            "success": True,
+            "data": [row(pid, clan_id=pid % 3) for pid in range(1, 30)],
+            "meta": {"min_level": 5, "count": 29, "generated_at": 1767225600},
+        }
+        expected = parse_api_payload(payload, 10)
+        # Tiny chunks split keys, numbers and multi-byte Cyrillic characters.
+        for size in (1, 7, 64, 1 << 20):
+            with self.subTest(size=size):
+                self.assertEqual(parse_api_stream(chunks(payload, size), 10), expected)
+
+    def test_meta_may_come_before_or_after_rows(self) -> None:
+        payload = {"meta": {"count": 2}, "data": [row(1), row(2, 4)], "success": True}
+        heroes, meta = parse_api_stream(chunks(payload, 5), 1)
+        self.assertEqual(sorted(heroes), [1, 2])
+        self.assertEqual(meta["count"], 2)
+        self.assertEqual(meta["forglory_group_coverage"]["clan_members"], 1)
+
+    def test_invalid_streams_are_rejected(self) -> None:
+        cases = {
+            "success": {"success": False, "data": [row(1)]},
+            "duplicate": {"success": True, "data": [row(1), row(1)]},
+            "count": {"success": True, "data": [row(1)], "meta": {"count": 2}},
+            "minimum": {"success": True, "data": [row(1)]},
+        }
+        for name, payload in cases.items():
+            with self.subTest(name=name), self.assertRaises(ApiCollectionError):
+                parse_api_stream(chunks(payload, 9), 1 if name != "minimum" else 5)
+        for body in (b'{"success": true, "data": [', b"[]", b'{"success": true} {}'):
+            with self.subTest(body=body), self.assertRaises(ApiCollectionError):
+                parse_api_stream([body], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -25,6 +25,7 @@ class CollectionSourceRoutingTests(unittest.TestCase):
             retries=2,
             achievement_retries=1,
             systemic_failure_sample_size=200,
+            output="json",
         )
 
     def _collection(self) -> ApiCollection:
@@ -135,10 +136,11 @@ class CollectionSourceRoutingTests(unittest.TestCase):
         clan = GroupRoster(6, "Roster clan", frozenset({10}))
         brotherhood = GroupRoster(100, "Roster brotherhood", frozenset({10}))
 
-        def scan(_domain, _cookies, kind, **_kwargs):
-            return [clan] if kind == "clan" else [brotherhood]
+        def scan(_domain, _cookies, known_ids_by_kind, **_kwargs):
+            self.assertEqual(set(known_ids_by_kind), {"clan", "brotherhood"})
+            return {"clan": [clan], "brotherhood": [brotherhood]}
 
-        with patch("collect_api_first.scan_group_rosters", side_effect=scan):
+        with patch("collect_api_first.scan_group_rosters_concurrently", side_effect=scan):
             replace_groups_from_rosters(
                 collection,
                 "https://playwekings.mobi/",
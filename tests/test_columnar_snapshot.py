@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from forglory import columnar
+from tools.convert_snapshots_columnar import convert_archive
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def hero(pid: int, name: str, glory: int, wins: int, clan: str | None = None) -> dict:
+    data = {
+        "ID": pid,
+        "Имя": name,
+        "Уровень": 5,
+        "Слава": glory,
+        "Побед": wins,
+        "Поражений": "1 204",
+        "Сила": 10,
+        "Защита": 11,
+        "Ловкость": 12,
+        "Мастерство": 13,
+        "Живучесть": 14,
+        "Чат": 0,
+    }
+    if clan:
+        data.update({"Клан": clan, "clan_id": 7, "Братство": "Орден", "brotherhood_id": 0})
+    return data
+
+
+def write_snapshot(folder: Path, filename: str, data: dict[str, dict]) -> None:
+    with gzip.open(folder / filename, "wt", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False)
+
+
+def observation_rows(db: Path) -> list[tuple]:
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(
+            """
+            SELECT snapshot_id,pid,name,level,glory,wins,losses,chat,clan,clan_id,
+                   brotherhood,brotherhood_id,visible
+            FROM heroes
+            ORDER BY snapshot_id,pid
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def source_hashes(db: Path) -> list[tuple]:
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute("SELECT filename,source_sha256 FROM snapshots ORDER BY ts").fetchall()
+    finally:
+        conn.close()
+
+
+def build(source: Path, db: Path) -> None:
+    subprocess.run(
+        [
+            sys.executable, str(ROOT / "tools" / "build_db.py"),
+            "--data-dir", str(source), "--db-path", str(db), "--rebuild",
+        ],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+class ColumnarSnapshotTests(unittest.TestCase):
+    def test_delta_archive_round_trips_through_its_base(self) -> None:
+        first = {"3": hero(3, "Гамма", 100, 2**32 + 5, "Клан"), "1": hero(1, "Альфа", 50, 7)}
+        second = {
+            "1": hero(1, "Альфа", 60, 9),
+            "4": hero(4, "Новый", 1, 0),
+            "3": {**hero(3, "Гамма", 90, 2**32 + 8, "Клан"), "Побед над Владыкой": None},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            base = columnar.write_snapshot(
+                folder / "heroes_2026-01-01_20-00-00.fgcol", columnar.from_heroes(first)
+            )
+            delta = columnar.write_snapshot(
+                folder / "heroes_2026-01-02_20-00-00.fgcol",
+                columnar.from_heroes(second),
+                base_path=base,
+            )
+
+            header = columnar.read_header(delta)
+            decoded = columnar.read_snapshot(delta)
+            base_sha256 = hashlib.sha256(base.read_bytes()).hexdigest()
+
+        self.assertEqual(header["base"], base.name)
+        self.assertEqual(header["base_sha256"], base_sha256)
+        self.assertEqual(header["depth"], 1)
+        self.assertTrue(decoded.same_values(columnar.from_heroes(second)))
+        self.assertEqual(decoded.pids, [1, 3, 4])
+        self.assertEqual(decoded.ints["wins"], [9, 2**32 + 8, 0])
+        self.assertEqual(decoded.ints["losses"], [1204, 1204, 1204])
+        self.assertEqual(decoded.ints["brotherhood_id"], [None, None, None])
+        self.assertEqual(decoded.text["clan"], [None, "Клан", None])
+
+    def test_build_db_imports_converted_archive_like_json(self) -> None:
+        snapshots = {
+            "heroes_2026-01-01_20-00-00.json.gz": {"1": hero(1, "База", 10, 1, "Клан")},
+            "heroes_2026-01-02_20-00-00.json.gz": {
+                "1": hero(1, "База", 20, 3, "Клан"),
+                "2": hero(2, "Новый", 5, 0),
+            },
+            "heroes_2026-01-03_20-00-00.json.gz": {
+                "1": hero(1, "База", 30, 4),
+                "2": hero(2, "Новый", 8, 1),
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "data"
+            source.mkdir()
+            for filename, data in snapshots.items():
+                write_snapshot(source, filename, data)
+            json_db = root / "json.sqlite"
+            build(source, json_db)
+
+            stats = convert_archive(source, max_depth=1, remove_json=True)
+            self.assertEqual(stats["converted"], 3)
+            self.assertEqual(stats["removed_json"], 3)
+            self.assertEqual(sorted(path.suffix for path in source.iterdir()), [".fgcol"] * 3)
+            depths = [
+                columnar.read_header(path)["depth"] for path in sorted(source.glob("*.fgcol"))
+            ]
+            self.assertEqual(depths, [0, 1, 0])
+
+            columnar_db = root / "columnar.sqlite"
+            build(source, columnar_db)
+
+            self.assertEqual(observation_rows(columnar_db), observation_rows(json_db))
+            self.assertEqual(source_hashes(columnar_db), source_hashes(json_db))
+
+    def test_delta_refuses_a_rewritten_base(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            base = columnar.write_snapshot(
+                folder / "heroes_2026-01-01_20-00-00.fgcol", columnar.from_heroes({"1": hero(1, "А", 10, 1)})
+            )
+            delta = columnar.write_snapshot(
+                folder / "heroes_2026-01-02_20-00-00.fgcol",
+                columnar.from_heroes({"1": hero(1, "А", 20, 3)}),
+                base_path=base,
+            )
+            columnar.write_snapshot(base, columnar.from_heroes({"1": hero(1, "А", 15, 2)}))
+
+            with self.assertRaisesRegex(columnar.ColumnarFormatError, "another version"):
+                columnar.read_snapshot(delta)
+
+    def test_rewriting_a_base_reencodes_its_dependents(self) -> None:
+        names = [f"heroes_2026-01-0{day}_20-00-00.json.gz" for day in (1, 2, 3)]
+        snapshots = [{"1": hero(1, "База", 10 * day, day), "2": hero(2, "Второй", day, 0)} for day in (1, 2, 3)]
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp)
+            for filename, data in zip(names, snapshots):
+                write_snapshot(source, filename, data)
+            convert_archive(source, remove_json=True)
+            archives = sorted(source.glob("*.fgcol"))
+            sources = [columnar.read_header(path)["source_sha256"] for path in archives]
+
+            # Snapshot 1 comes back with different JSON; 2 and 3 only exist as deltas.
+            changed = {"1": hero(1, "База", 7, 1)}
+            write_snapshot(source, names[0], changed)
+            with mock.patch("builtins.print"):
+                stats = convert_archive(source)
+
+            self.assertEqual(stats["converted"], 3)
+            for path, data in zip(archives[1:], snapshots[1:]):
+                self.assertTrue(columnar.read_snapshot(path).same_values(columnar.from_heroes(data)))
+            self.assertEqual([columnar.read_header(path)["source_sha256"] for path in archives[1:]], sources[1:])
+            self.assertTrue(columnar.read_snapshot(archives[0]).same_values(columnar.from_heroes(changed)))
+            with mock.patch("builtins.print"):
+                self.assertEqual(convert_archive(source)["skipped"], 3)
+
+    def test_collection_writes_archives_only_when_enabled(self) -> None:
+        import get_data
+
+        results = {1: hero(1, "База", 10, 1, "Клан")}
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            snapshot = folder / "heroes_2026-01-01_20-00-00.json.gz"
+            write_snapshot(folder, snapshot.name, {"1": results[1]})
+            with mock.patch.object(get_data, "_ENV", {}), mock.patch.dict("os.environ", clear=False) as env:
+                env.pop("SNAPSHOT_COLUMNAR", None)
+                self.assertIsNone(get_data.save_columnar_snapshot(snapshot, results))
+                self.assertEqual(list(folder.glob("*.fgcol")), [])
+
+                env["SNAPSHOT_COLUMNAR"] = "1"
+                archive = get_data.save_columnar_snapshot(snapshot, results)
+            self.assertIsNotNone(archive)
+            self.assertTrue(columnar.read_snapshot(archive).same_values(columnar.from_heroes(results)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import random
 import sqlite3
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
+from forglory import counter_math
 from forglory.counter_math import (
+    UINT32_MODULUS,
     cumulative_delta32,
     sql_cumulative_delta32,
+    unwrap_counter_column,
     unwrap_cumulative_counter,
 )
-from tools.normalize_counter_wraps import normalize_counter_history
+from tools.normalize_counter_wraps import load_watermark, normalize_counter_history, pid_batches
 from tools.rebuild_best_growth_safe import rebuild_best_growth
 
 
@@ -62,6 +67,95 @@ class CounterMathTests(unittest.TestCase):
         )
 
 
+# Values around the points where the scalar rules change behaviour.
+EDGE_VALUES = (
+    0, 1, -1, 2**31 - 1, 2**31, -(2**31), -(2**31) - 1,
+    UINT32_MODULUS - 1, UINT32_MODULUS, UINT32_MODULUS + 1, 3 * UINT32_MODULUS + 7,
+)
+
+
+def random_counter(rng: random.Random) -> int | None:
+    choice = rng.random()
+    if choice < 0.15:
+        return None
+    if choice < 0.35:
+        return rng.choice(EDGE_VALUES) + rng.randint(-2, 2)
+    if choice < 0.5:
+        return rng.randint(-(2**31), 2**31)
+    if choice < 0.55:
+        return rng.randint(-(2**36), 2**36)
+    return rng.randint(0, 6 * UINT32_MODULUS)
+
+
+def scalar_unwrap(pids: list[int], values: list[int | None], previous: dict[int, int | None]) -> list[int | None]:
+    result: list[int | None] = []
+    last: dict[int, int | None] = {}
+    for pid, value in zip(pids, values):
+        if value is None:
+            result.append(None)
+            continue
+        last[pid] = unwrap_cumulative_counter(value, last.get(pid, previous.get(pid)))
+        result.append(last[pid])
+    return result
+
+
+class CounterColumnTests(unittest.TestCase):
+    """The column helper must agree with the scalar function on every input."""
+
+    def backends(self):
+        yield "python", mock.patch.object(counter_math, "np", None)
+        if counter_math.np is not None:
+            yield "numpy", mock.patch.object(counter_math, "np", counter_math.np)
+
+    def test_unwrap_column_matches_scalar_unwrap(self) -> None:
+        rng = random.Random(20260719)
+        cases = []
+        for _ in range(400):
+            size = rng.randint(0, 40)
+            pids = sorted(rng.randint(1, 6) for _ in range(size))
+            values = [random_counter(rng) for _ in range(size)]
+            previous = {pid: random_counter(rng) for pid in range(1, 7) if rng.random() < 0.5}
+            cases.append((pids, values, previous))
+        # Long descending runs need several wraps in a row.
+        cases.append(([7] * 6, [UINT32_MODULUS - 1, 5, 3, 2, 1, 0], {}))
+        cases.append(([7] * 3, [-5, -(2**31) - 10, 10], {7: 4 * UINT32_MODULUS}))
+        # Beyond float64 precision and beyond the int64 working range.
+        cases.append(([8, 8, 9, 9], [2**55 + 1, 2**55 + 3, 2**62, 2**62 + 1], {}))
+        for name, backend in self.backends():
+            with backend, self.subTest(backend=name):
+                for pids, values, previous in cases:
+                    self.assertEqual(
+                        unwrap_counter_column(pids, values, previous),
+                        scalar_unwrap(pids, values, previous),
+                        msg=f"pids={pids} values={values} previous={previous}",
+                    )
+
+    def test_column_returns_python_ints(self) -> None:
+        result = unwrap_counter_column([1, 1, 2], [UINT32_MODULUS - 1, 3, None])
+        self.assertEqual(result, [UINT32_MODULUS - 1, UINT32_MODULUS + 3, None])
+        self.assertIs(type(result[1]), int)
+        with self.assertRaises(ValueError):
+            unwrap_counter_column([1], [])
+
+    def test_pid_batches_never_split_a_player(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            rows = [(snapshot, pid) for pid in range(1, 8) for snapshot in range(pid)]
+            cursor = conn.execute(
+                "SELECT column1,column2 FROM (VALUES " + ",".join("(?,?)" for _ in rows) + ") ORDER BY column2",
+                [value for row in rows for value in row],
+            )
+            batches = list(pid_batches(cursor, size=4))
+        finally:
+            conn.close()
+        self.assertEqual(sum(len(batch) for batch in batches), len(rows))
+        seen: set[int] = set()
+        for batch in batches:
+            pids = {row[1] for row in batch}
+            self.assertFalse(pids & seen)
+            seen |= pids
+
+
 class CounterHistoryNormalizationTests(unittest.TestCase):
     def test_history_repair_makes_all_plain_rating_differences_correct(self) -> None:
         conn = sqlite3.connect(":memory:")
@@ -135,6 +229,64 @@ class CounterHistoryNormalizationTests(unittest.TestCase):
         self.assertEqual(long_delta, 205_165_396)
 
 
+    def test_incremental_run_continues_from_the_watermark(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE snapshots(
+                    snapshot_id INTEGER PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    ts INTEGER NOT NULL
+                );
+                CREATE TABLE scan_state(
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE observations(
+                    snapshot_id INTEGER NOT NULL,
+                    pid INTEGER NOT NULL,
+                    wins INTEGER,
+                    rob_silver INTEGER,
+                    PRIMARY KEY(snapshot_id,pid)
+                );
+                """
+            )
+            conn.executemany(
+                "INSERT INTO snapshots(snapshot_id,filename,ts) VALUES(?,?,?)",
+                ((1, "first", 1_000_000), (2, "second", 1_086_400)),
+            )
+            conn.executemany(
+                "INSERT INTO observations(snapshot_id,pid,wins,rob_silver) VALUES(?,?,?,?)",
+                ((1, 7, 5, 4_103_436_672), (2, 7, 6, 0), (1, 8, 1, 10)),
+            )
+            self.assertEqual(normalize_counter_history(conn), {"rob_silver": 1})
+            self.assertEqual(load_watermark(conn), 1_086_400)
+
+            # Already-normalized rows are not revisited by the incremental pass.
+            conn.execute("UPDATE observations SET rob_silver=-1 WHERE snapshot_id=1 AND pid=8")
+            conn.execute("INSERT INTO snapshots VALUES(3,'third',1172800)")
+            conn.executemany(
+                "INSERT INTO observations(snapshot_id,pid,wins,rob_silver) VALUES(?,?,?,?)",
+                ((3, 7, 7, 13_634_772), (3, 8, None, 20)),
+            )
+            changes = normalize_counter_history(conn, incremental=True)
+            values = conn.execute(
+                "SELECT snapshot_id,pid,wins,rob_silver FROM observations ORDER BY snapshot_id,pid"
+            ).fetchall()
+            self.assertEqual(changes, {"rob_silver": 1})
+            self.assertEqual(values[-2:], [(3, 7, 7, 4_308_602_068), (3, 8, None, 20)])
+            self.assertEqual(values[1], (1, 8, 1, -1))
+
+            # A removed snapshot whose id was reused invalidates the watermark.
+            conn.execute("DELETE FROM observations WHERE snapshot_id=3")
+            conn.execute("DELETE FROM snapshots WHERE snapshot_id=3")
+            conn.execute("INSERT INTO snapshots VALUES(3,'replacement',1180000)")
+            self.assertIsNone(load_watermark(conn))
+        finally:
+            conn.close()
+
+
 class BestGrowthRebuildTests(unittest.TestCase):
     def test_rebuild_removes_false_four_billion_growth(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
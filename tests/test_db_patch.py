@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import gzip
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from forglory import _repair_missing_group_ids
+from tools import db_patch
+from tools.db_patch import (
+    PatchError,
+    apply_patch,
+    cached_content_digest,
+    cached_content_parts,
+    content_digest,
+    content_parts,
+    create_patch,
+    manifest_name,
+    patch_asset_name,
+    patch_chain,
+    patch_prefix,
+    update_manifest,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+SNAPSHOTS = (
+    "heroes_2026-01-01_20-00-00.json.gz",
+    "heroes_2026-01-02_20-00-00.json.gz",
+    "heroes_2026-01-03_20-00-00.json.gz",
+)
+
+
+def hero(pid: int, glory: int, name: str | None = None) -> dict:
+    return {
+        "ID": pid, "Имя": name or f"Игрок {pid}", "Уровень": 1, "Слава": glory, "Побед": glory,
+        "Поражений": 0, "Сила": 1, "Защита": 1, "Ловкость": 1, "Мастерство": 1, "Живучесть": 1,
+    }
+
+
+def build(source: Path, db: Path) -> None:
+    subprocess.run(
+        [sys.executable, str(ROOT / "tools" / "build_db.py"), "--data-dir", str(source),
+         "--db-path", str(db)],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+class DbPatchTests(unittest.TestCase):
+    def test_patch_turns_published_database_into_the_next_one(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "data"
+            source.mkdir()
+            db = root / "ratings.sqlite"
+            for index, filename in enumerate(SNAPSHOTS[:2]):
+                data = {str(pid): hero(pid, pid * 10 + index) for pid in (1, 2, 3)}
+                with gzip.open(source / filename, "wt", encoding="utf-8") as handle:
+                    json.dump(data, handle, ensure_ascii=False)
+            build(source, db)
+            base = root / "base.sqlite"
+            shutil.copyfile(db, base)
+
+            data = {str(pid): hero(pid, pid * 10 + 5) for pid in (1, 3, 4)}
+            data["3"]["Имя"] = "Переименован"
+            with gzip.open(source / SNAPSHOTS[2], "wt", encoding="utf-8") as handle:
+                json.dump(data, handle, ensure_ascii=False)
+            build(source, db)
+
+            patch = root / "patch.sqlite.gz"
+            details = create_patch(base, db, patch)
+            self.assertEqual(details["latest_snapshot"], SNAPSHOTS[2])
+            self.assertEqual(details["snapshots_upserts"], 1)
+            self.assertGreater(details["observations_upserts"], 0)
+            self.assertLess(patch.stat().st_size, db.stat().st_size)
+
+            client = root / "client.sqlite"
+            shutil.copyfile(base, client)
+            self.assertEqual(cached_content_digest(client), content_digest(base))
+            expected = content_digest(db)
+            with mock.patch.object(db_patch, "content_parts", wraps=content_parts) as hashed:
+                self.assertEqual(apply_patch(client, patch), expected)
+            # Only the new snapshot's observations are hashed again, not the whole table.
+            touched = [call.args[1] for call in hashed.call_args_list]
+            self.assertEqual(len(touched), 1)
+            self.assertEqual(len(touched[0]["observations"]), 1)
+            self.assertEqual(
+                cached_content_parts(client),
+                {name: value for name, value in content_parts(db).items() if value is not None},
+            )
+
+            with self.assertRaises(PatchError):
+                apply_patch(client, patch)
+
+    def test_render_group_repair_keeps_the_database_on_the_patch_chain(self) -> None:
+        def snapshot(filename: str, glory: int) -> None:
+            data = {str(pid): {**hero(pid, pid * 10 + glory), "Клан": "Без номера"} for pid in (1, 2)}
+            with gzip.open(source / filename, "wt", encoding="utf-8") as handle:
+                json.dump(data, handle, ensure_ascii=False)
+
+        def publish() -> None:
+            build(source, db)
+            subprocess.run(
+                [sys.executable, str(ROOT / "tools" / "repair_group_ids.py"), "--db", str(db)],
+                cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "data"
+            source.mkdir()
+            db = root / "ratings.sqlite"
+            snapshot(SNAPSHOTS[0], 0)
+            build(source, db)
+            # The clan has a name but no game ID, so the repair changes rows.
+            self.assertGreater(_repair_missing_group_ids(db)[0], 0)
+            base = root / "base.sqlite"
+            shutil.copyfile(db, base)
+
+            # Render downloads the release and repairs it.
+            client = root / "client.sqlite"
+            shutil.copyfile(base, client)
+            self.assertEqual(_repair_missing_group_ids(client), (0, 0))
+
+            snapshot(SNAPSHOTS[1], 5)
+            publish()
+            patch = root / "ratings-patch.sqlite.gz"
+            details = create_patch(base, db, patch)
+            manifest = update_manifest(None, {"asset": patch.name, **details})
+
+            chain = patch_chain(manifest, content_digest(client))
+            self.assertEqual([entry["asset"] for entry in chain or []], [patch.name])
+            apply_patch(client, patch)
+            self.assertEqual(_repair_missing_group_ids(client), (0, 0))
+            self.assertEqual(patch_chain(manifest, content_digest(client)), [])
+
+    def test_manifest_chain_links_only_consecutive_patches(self) -> None:
+        first = {"asset": "a", "base_digest": "d0", "result_digest": "d1"}
+        second = {"asset": "b", "base_digest": "d1", "result_digest": "d2"}
+        manifest = update_manifest(update_manifest(None, first), second)
+
+        self.assertEqual(manifest["latest_digest"], "d2")
+        self.assertEqual(patch_chain(manifest, "d0"), [first, second])
+        self.assertEqual(patch_chain(manifest, "d1"), [second])
+        self.assertEqual(patch_chain(manifest, "d2"), [])
+        self.assertIsNone(patch_chain(manifest, "unknown"))
+
+        restarted = update_manifest(manifest, {"asset": "c", "base_digest": "x", "result_digest": "d3"})
+        self.assertEqual([entry["asset"] for entry in restarted["patches"]], ["c"])
+        self.assertEqual(len(update_manifest(manifest, {**second, "base_digest": "d2"}, keep=2)["patches"]), 2)
+
+    def test_hot_database_has_its_own_patch_names(self) -> None:
+        self.assertEqual(manifest_name(patch_prefix("ratings.sqlite.gz")), "ratings.patches.json")
+        self.assertEqual(manifest_name(patch_prefix("ratings-hot.sqlite.gz")), "ratings-hot.patches.json")
+        self.assertEqual(
+            patch_asset_name(SNAPSHOTS[0], "ratings-hot"), "ratings-hot-patch-heroes_2026-01-01_20-00-00.sqlite.gz"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import app as app_module
+from forglory.db_refresh import (
+    history_gap,
+    refresh_database,
+    refresh_history_database,
+    release_state_path,
+    staging_path,
+)
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+
+FAKE_FETCH = """
+import shutil, sys
+from pathlib import Path
+args = sys.argv[1:]
+out = Path(args[args.index("--out") + 1])
+state = Path(args[args.index("--release-state") + 1])
+source = Path(sys.argv[0]).with_name("release.sqlite")
+if source.exists():
+    shutil.copyfile(source, out)
+    state.write_text("new", encoding="utf-8")
+if Path(sys.argv[0]).with_name("fail").exists():
+    raise SystemExit(1)
+"""
+
+
+def snapshot_count(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return int(conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0])
+    finally:
+        conn.close()
+
+
+class DatabaseHotSwapTests(unittest.TestCase):
+    def test_new_requests_read_the_new_file_while_open_ones_drain(self) -> None:
+        old_path = app_module.DB_PATH
+        with tempfile.TemporaryDirectory() as tmp:
+            live = Path(tmp) / "ratings.sqlite"
+            staged = Path(tmp) / "ratings.sqlite.next"
+            generate_database(live, SyntheticDbConfig(players=40, snapshots=2, seed=1))
+            generate_database(staged, SyntheticDbConfig(players=40, snapshots=3, seed=1))
+            app_module.DB_PATH = str(live)
+            app_module._QUERY_CACHE.clear()
+            try:
+                with app_module.app.app_context():
+                    self.assertEqual(len(app_module.list_snapshot_ids()), 2)
+                    old_signature = app_module.g.db_signature
+                    os.replace(staged, live)
+
+                    with self.assertLogs(app_module.app.logger, "INFO") as logs:
+                        with app_module.app.app_context():
+                            self.assertEqual(len(app_module.list_snapshot_ids()), 3)
+                    self.assertIn("was replaced", logs.output[0])
+                    self.assertFalse(
+                        [key for key in app_module._QUERY_CACHE if key[1] == old_signature]
+                    )
+
+                    # The request that started on the old file finishes on it
+                    # and does not put its results back into the cache.
+                    self.assertEqual(len(app_module.list_snapshot_ids()), 2)
+                    self.assertFalse(
+                        [key for key in app_module._QUERY_CACHE if key[1] == old_signature]
+                    )
+                    self.assertEqual(app_module._DB_CONNECTIONS[old_signature], 1)
+                self.assertNotIn(old_signature, app_module._DB_CONNECTIONS)
+
+                response = app_module.app.test_client().get("/")
+                self.assertEqual(response.status_code, 200)
+            finally:
+                app_module.DB_PATH = old_path
+                app_module._QUERY_CACHE.clear()
+
+
+@unittest.skipUnless(importlib.util.find_spec("fcntl"), "the refresher locks with fcntl")
+class BackgroundRefreshTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.script = self.root / "fetch.py"
+        self.script.write_text(FAKE_FETCH, encoding="utf-8")
+        self.live = self.root / "ratings.sqlite"
+        generate_database(self.live, SyntheticDbConfig(players=30, snapshots=2, seed=3))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def refresh(self) -> bool:
+        return refresh_database(self.root, self.script, self.live, timeout=60, lock_path=self.root / "refresh.lock")
+
+    def test_unchanged_release_leaves_the_live_file_alone(self) -> None:
+        inode = self.live.stat().st_ino
+        self.assertFalse(self.refresh())
+        self.assertEqual(self.live.stat().st_ino, inode)
+
+    def test_new_release_is_staged_beside_the_live_file_and_renamed_over_it(self) -> None:
+        generate_database(self.root / "release.sqlite", SyntheticDbConfig(players=30, snapshots=3, seed=3))
+        with open(self.live, "rb") as reader:
+            self.assertTrue(self.refresh())
+            self.assertEqual(reader.read(16), b"SQLite format 3\x00")
+        self.assertEqual(snapshot_count(self.live), 3)
+        self.assertFalse(staging_path(self.live).exists())
+        self.assertEqual(release_state_path(self.live).read_text(encoding="utf-8"), "new")
+
+    def test_failed_fetch_keeps_serving_and_forgets_the_release(self) -> None:
+        generate_database(self.root / "release.sqlite", SyntheticDbConfig(players=30, snapshots=3, seed=3))
+        (self.root / "fail").touch()
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.refresh()
+        self.assertEqual(snapshot_count(self.live), 2)
+        self.assertFalse(staging_path(self.live).exists())
+        self.assertFalse(release_state_path(self.live).exists())
+
+    def test_refresh_skips_while_another_process_holds_the_lock(self) -> None:
+        import fcntl
+
+        generate_database(self.root / "release.sqlite", SyntheticDbConfig(players=30, snapshots=3, seed=3))
+        with (self.root / "refresh.lock").open("w") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            self.assertFalse(self.refresh())
+        self.assertEqual(snapshot_count(self.live), 2)
+
+
+def make_split(source: Path, hot: Path, cold: Path, hot_snapshots: int) -> None:
+    """Copy ``source`` into a hot file whose window holds the last ``hot_snapshots`` and a cold file with the rest."""
+    shutil.copyfile(source, hot)
+    shutil.copyfile(source, cold)
+    with sqlite3.connect(source) as conn:
+        times = [row[0] for row in conn.execute("SELECT ts FROM snapshots ORDER BY ts")]
+    hot_min_ts = times[-hot_snapshots]
+    with sqlite3.connect(hot) as conn:
+        conn.execute("INSERT OR REPLACE INTO schema_meta(key,value) VALUES ('hot_min_ts',?)", (str(hot_min_ts),))
+    with sqlite3.connect(cold) as conn:
+        conn.execute("DELETE FROM snapshots WHERE ts>=?", (hot_min_ts,))
+
+
+@unittest.skipUnless(importlib.util.find_spec("fcntl"), "the refresher locks with fcntl")
+class HistoryRefreshTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.script = self.root / "fetch.py"
+        self.script.write_text(FAKE_FETCH, encoding="utf-8")
+        self.full = self.root / "full.sqlite"
+        generate_database(self.full, SyntheticDbConfig(players=30, snapshots=6, seed=3))
+        self.hot = self.root / "ratings.sqlite"
+        self.cold = self.root / "ratings-cold.sqlite"
+
+    def refresh(self) -> bool:
+        return refresh_history_database(
+            self.root,
+            self.script,
+            self.hot,
+            self.cold,
+            "ratings-cold.sqlite.gz",
+            timeout=60,
+            lock_path=self.root / "cold.lock",
+        )
+
+    def test_a_moved_hot_window_fetches_the_newer_cold_archive(self) -> None:
+        make_split(self.full, self.hot, self.cold, hot_snapshots=4)
+        self.assertEqual(history_gap(self.hot, self.cold), 0)
+        self.assertFalse(self.refresh())
+
+        # The next hot release starts two snapshots later.
+        make_split(self.full, self.hot, self.root / "release.sqlite", hot_snapshots=2)
+        self.assertEqual(history_gap(self.hot, self.cold), 2)
+        self.assertTrue(self.refresh())
+        self.assertEqual(history_gap(self.hot, self.cold), 0)
+        self.assertEqual(snapshot_count(self.cold), 4)
+
+    def test_missing_archive_is_fetched_and_full_databases_need_none(self) -> None:
+        self.assertEqual(history_gap(self.full, self.cold), 0)
+        make_split(self.full, self.hot, self.root / "release.sqlite", hot_snapshots=3)
+        self.assertEqual(history_gap(self.hot, self.cold), 3)
+        self.assertTrue(self.refresh())
+        self.assertEqual(history_gap(self.hot, self.cold), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.db_staging import StagingError, discard_snapshot, promote_snapshot, stage_snapshot
+
+ROOT = Path(__file__).resolve().parents[1]
+NAMES = ("heroes_2026-01-01_20-00-00.json.gz", "heroes_2026-01-02_20-00-00.json.gz")
+
+
+def hero(pid: int, name: str, glory: int, clan: str | None = None) -> dict:
+    data = {
+        "ID": pid, "Имя": name, "Уровень": 7, "Слава": glory, "Побед": pid, "Поражений": 1,
+        "Сила": 1, "Защита": 2, "Ловкость": 3, "Мастерство": 4, "Живучесть": 5,
+    }
+    if clan:
+        data.update({"Клан": f" {clan} ", "clan_id": 40 + pid})
+    return data
+
+
+SNAPSHOTS = (
+    {str(pid): hero(pid, f"Игрок {pid}", 100 * pid, "Волки" if pid % 2 else None) for pid in range(1, 6)},
+    {str(pid): hero(pid, f"Игрок {pid}", 150 * pid, "Вороны" if pid % 3 else None) for pid in range(2, 8)},
+)
+METADATA = {
+    "highest_probed_id": 7,
+    "failures": [{"pid": 9, "stage": "profile", "error_type": "timeout", "attempts": 3}],
+}
+
+
+def build(data_dir: Path, db: Path) -> None:
+    subprocess.run(
+        [sys.executable, str(ROOT / "tools" / "build_db.py"), "--data-dir", str(data_dir), "--db-path", str(db)],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def staging_tables(db: Path) -> list[str]:
+    conn = sqlite3.connect(db)
+    try:
+        return [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'staged_%' ORDER BY name"
+        )]
+    finally:
+        conn.close()
+
+
+def published(db: Path) -> dict[str, list[tuple]]:
+    conn = sqlite3.connect(db)
+    try:
+        return {
+            "heroes": conn.execute("SELECT * FROM heroes ORDER BY snapshot_num,pid").fetchall(),
+            "players": conn.execute("SELECT * FROM players ORDER BY pid").fetchall(),
+            "failures": conn.execute("SELECT * FROM collection_failures").fetchall(),
+            "scan_state": conn.execute("SELECT * FROM scan_state").fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+class DbStagingTests(unittest.TestCase):
+    def test_promoted_snapshot_matches_json_import(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            json_dir, first_dir = root / "json", root / "first"
+            json_dir.mkdir()
+            first_dir.mkdir()
+            for folder, snapshots in ((json_dir, SNAPSHOTS), (first_dir, SNAPSHOTS[:1])):
+                for name, data in zip(NAMES, snapshots):
+                    with gzip.open(folder / name, "wt", encoding="utf-8") as handle:
+                        json.dump(data, handle, ensure_ascii=False)
+            (json_dir / NAMES[1].replace(".json.gz", ".meta.json")).write_text(
+                json.dumps(METADATA), encoding="utf-8"
+            )
+            build(json_dir, root / "json.sqlite")
+            build(first_dir, root / "staged.sqlite")
+
+            self.assertEqual(stage_snapshot(root / "staged.sqlite", NAMES[1], SNAPSHOTS[1], METADATA), 6)
+            result = promote_snapshot(root / "staged.sqlite")
+
+            self.assertEqual(result["snapshot"], NAMES[1])
+            self.assertEqual(published(root / "staged.sqlite"), published(root / "json.sqlite"))
+            self.assertEqual(staging_tables(root / "staged.sqlite"), [])
+
+    def test_rejected_snapshot_leaves_published_tables_untouched(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "ratings.sqlite"
+            stage_snapshot(db, NAMES[0], SNAPSHOTS[0])
+            promote_snapshot(db)
+            before = published(db)
+
+            labels = {str(pid): hero(pid, "Подтверждение", pid) for pid in range(10, 20)}
+            stage_snapshot(db, NAMES[1], labels)
+            with self.assertRaisesRegex(RuntimeError, "interface label"):
+                promote_snapshot(db, NAMES[1])
+            with self.assertRaises(StagingError):
+                promote_snapshot(db, NAMES[0])
+
+            self.assertEqual(published(db), before)
+            self.assertEqual(staging_tables(db), ["staged_observations", "staged_snapshots"])
+
+    def test_staging_tables_are_dropped_once_nothing_is_staged(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "ratings.sqlite"
+            stage_snapshot(db, NAMES[0], SNAPSHOTS[0])
+            stage_snapshot(db, NAMES[1], SNAPSHOTS[1])
+            promote_snapshot(db, NAMES[0])
+            self.assertEqual(staging_tables(db), ["staged_observations", "staged_snapshots"])
+
+            self.assertEqual(discard_snapshot(db, NAMES[1]), 6)
+            self.assertEqual(staging_tables(db), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import get_data
+from collect_api_first import fetch_from_bulk_api, scan_group_rosters_concurrently
+from tools.fake_game_server import FakeGameConfig, FakeGameServer
+
+
+class FakeGameServerTests(unittest.TestCase):
+    def test_collectors_read_the_synthetic_players(self) -> None:
+        config = FakeGameConfig(players=40, clan_size=6, brotherhood_size=15, redirect_rate=0.3)
+
+        async def scenario() -> tuple:
+            async with FakeGameServer(config) as server:
+                with tempfile.TemporaryDirectory() as tmp, patch.object(get_data, "DATA_DIR", Path(tmp)):
+                    profiles = await get_data.collect(range(1, 43), {}, server.url, 4, 2, parse_workers=0)
+                # Coverage comes from the streaming pass, not a second walk over the heroes.
+                with patch("collect_api_first._group_coverage", side_effect=AssertionError("second pass")):
+                    bulk = await asyncio.to_thread(
+                        fetch_from_bulk_api, server.url, {},
+                        attempts=1, retry_delay_seconds=0, timeout_seconds=10, min_player_count=1,
+                    )
+                rosters = await asyncio.to_thread(
+                    scan_group_rosters_concurrently, server.url, {},
+                    {kind: server.game.group_ids(kind) for kind in ("clan", "brotherhood")},
+                    timeout_seconds=10, attempts=1, retry_delay_seconds=0, discovery_window=2,
+                )
+                return server.game, profiles, bulk, rosters, server.game.stats()
+
+        game, (results, failures, achievement_failures), bulk, rosters, stats = asyncio.run(scenario())
+
+        self.assertEqual(sorted(results), list(range(1, 41)))
+        self.assertEqual([(item.pid, item.error_type) for item in failures], [(41, "not_found"), (42, "not_found")])
+        self.assertEqual(achievement_failures, [])
+        for pid, player in game.players.items():
+            with self.subTest(pid=pid):
+                hero = results[pid]
+                self.assertEqual(
+                    (hero["Имя"], hero["Слава"], hero["clan_id"], hero["brotherhood_id"], hero["Убито зверей"]),
+                    (player.name, player.glory, player.clan_id, player.brotherhood_id, player.beasts_killed),
+                )
+                if player.level >= 5:
+                    self.assertEqual(bulk.heroes[pid]["Слава"], player.glory)
+                    self.assertEqual(bulk.heroes[pid]["Побед над Владыкой"], player.lord_wins)
+        self.assertEqual(
+            {roster.group_id: roster.members for roster in rosters["clan"]},
+            {group_id: frozenset(members) for group_id, members in game.rosters["clan"].items()},
+        )
+        self.assertGreater(stats["routes"]["/hero/detail"]["statuses"]["302"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
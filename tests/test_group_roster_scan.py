@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import sqlite3
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import patch
+from typing import Any, Callable
 
-import requests
+from aiohttp import web
 
 from collect_api_first import (
     GroupRoster,
@@ -14,9 +15,50 @@ from collect_api_first import (
     load_known_group_ids,
     parse_group_roster_html,
     scan_group_rosters,
+    scan_group_rosters_concurrently,
 )
 
 
+MISSING = "<html><body>Что-то пошло не так.</body></html>"
+
+
+def scan_against_server(
+    page: Callable[[str, int], tuple[int, str]],
+    scan: Callable[[str], Any],
+) -> tuple[Any, list[tuple[str, int]], int]:
+    """Run ``scan`` against a local roster server; return its result, the calls and peak concurrency."""
+    calls: list[tuple[str, int]] = []
+    in_flight = {"now": 0, "peak": 0}
+
+    async def warriors(request: web.Request) -> web.Response:
+        kind = request.match_info["kind"]
+        group_id = int(request.query["id"])
+        calls.append((kind, group_id))
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            in_flight["now"] -= 1
+        status, text = page(kind, group_id)
+        return web.Response(status=status, text=text, content_type="text/html")
+
+    async def scenario() -> Any:
+        app = web.Application()
+        app.router.add_get("/{kind}/warriors", warriors)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            return await asyncio.to_thread(scan, f"http://127.0.0.1:{port}/")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario()), calls, in_flight["peak"]
+
+
 class GroupRosterScanTests(unittest.TestCase):
     def test_clan_roster_page(self) -> None:
         html = """
@@ -108,41 +150,11 @@ class GroupRosterScanTests(unittest.TestCase):
             6: '<p class="group-header">Воины клана Шестой</p><a href="/hero/detail?player=52">A</a>',
             8: '<p class="group-header">Воины клана Восьмой</p><a href="/hero/detail?player=74">B</a>',
         }
-        missing = "<html><body>Что-то пошло не так.</body></html>"
-
-        class Response:
-            def __init__(self, text: str, url: str, status_code: int = 200) -> None:
-                self.text = text
-                self.url = url
-                self.status_code = status_code
-
-            def raise_for_status(self) -> None:
-                if self.status_code >= 400:
-                    raise requests.HTTPError(f"HTTP {self.status_code}")
-
-        class Session:
-            def __init__(self) -> None:
-                self.calls: list[str] = []
-
-            def __enter__(self):
-                self.headers = {}
-                self.cookies = {}
-                return self
-
-            def __exit__(self, *_args):
-                return False
-
-            def get(self, url: str, **_kwargs):
-                self.calls.append(url)
-                group_id = int(url.rsplit("=", 1)[1])
-                return Response(pages.get(group_id, missing), url)
-
-        session = Session()
-        with patch("collect_api_first.requests.Session", return_value=session), patch(
-            "collect_api_first.time.sleep", return_value=None
-        ):
-            rosters = scan_group_rosters(
-                "https://playwekings.mobi/",
+
+        rosters, calls, peak = scan_against_server(
+            lambda kind, group_id: (200, pages.get(group_id, MISSING)),
+            lambda url: scan_group_rosters(
+                url,
                 {},
                 "clan",
                 timeout_seconds=1,
@@ -150,52 +162,30 @@ class GroupRosterScanTests(unittest.TestCase):
                 retry_delay_seconds=0,
                 known_group_ids=[6],
                 discovery_window=4,
-            )
+            ),
+        )
 
         self.assertEqual(
             [(item.group_id, item.name) for item in rosters],
             [(6, "Шестой"), (8, "Восьмой")],
         )
-        self.assertFalse(any(url.endswith("id=1") for url in session.calls))
-        self.assertTrue(any(url.endswith("id=10") for url in session.calls))
-        self.assertFalse(any(url.endswith("id=11") for url in session.calls))
+        self.assertNotIn(("clan", 1), calls)
+        self.assertIn(("clan", 10), calls)
+        self.assertNotIn(("clan", 11), calls)
+        self.assertEqual(peak, 1)
 
     def test_http_500_for_one_known_id_does_not_abort_scan(self) -> None:
         valid = '<p class="group-header">Воины клана Шестой</p><a href="/hero/detail?player=52">A</a>'
-        missing = "<html><body>Что-то пошло не так.</body></html>"
-
-        class Response:
-            def __init__(self, text: str, url: str, status_code: int = 200) -> None:
-                self.text = text
-                self.url = url
-                self.status_code = status_code
-
-            def raise_for_status(self) -> None:
-                if self.status_code >= 400:
-                    raise requests.HTTPError(f"HTTP {self.status_code}")
-
-        class Session:
-            def __enter__(self):
-                self.headers = {}
-                self.cookies = {}
-                return self
-
-            def __exit__(self, *_args):
-                return False
-
-            def get(self, url: str, **_kwargs):
-                group_id = int(url.rsplit("=", 1)[1])
-                if group_id == 7:
-                    return Response("server error", url, 500)
-                if group_id == 6:
-                    return Response(valid, url)
-                return Response(missing, url)
-
-        with patch("collect_api_first.requests.Session", return_value=Session()), patch(
-            "collect_api_first.time.sleep", return_value=None
-        ):
-            rosters = scan_group_rosters(
-                "https://playwekings.mobi/",
+
+        def page(kind: str, group_id: int) -> tuple[int, str]:
+            if group_id == 7:
+                return 500, "server error"
+            return 200, valid if group_id == 6 else MISSING
+
+        rosters, calls, _peak = scan_against_server(
+            page,
+            lambda url: scan_group_rosters(
+                url,
                 {},
                 "clan",
                 timeout_seconds=1,
@@ -203,44 +193,17 @@ class GroupRosterScanTests(unittest.TestCase):
                 retry_delay_seconds=0,
                 known_group_ids=[6, 7],
                 discovery_window=3,
-            )
+            ),
+        )
 
         self.assertEqual([(item.group_id, item.name) for item in rosters], [(6, "Шестой")])
+        self.assertEqual(calls.count(("clan", 7)), 3)
 
     def test_discovery_stops_at_max_known_plus_fifty(self) -> None:
-        missing = "<html><body>Что-то пошло не так.</body></html>"
-
-        class Response:
-            def __init__(self, url: str) -> None:
-                self.text = missing
-                self.url = url
-                self.status_code = 200
-
-            def raise_for_status(self) -> None:
-                return None
-
-        class Session:
-            def __init__(self) -> None:
-                self.calls: list[str] = []
-
-            def __enter__(self):
-                self.headers = {}
-                self.cookies = {}
-                return self
-
-            def __exit__(self, *_args):
-                return False
-
-            def get(self, url: str, **_kwargs):
-                self.calls.append(url)
-                return Response(url)
-
-        session = Session()
-        with patch("collect_api_first.requests.Session", return_value=session), patch(
-            "collect_api_first.time.sleep", return_value=None
-        ):
-            scan_group_rosters(
-                "https://playwekings.mobi/",
+        _rosters, calls, _peak = scan_against_server(
+            lambda kind, group_id: (200, MISSING),
+            lambda url: scan_group_rosters(
+                url,
                 {},
                 "brotherhood",
                 timeout_seconds=1,
@@ -248,9 +211,10 @@ class GroupRosterScanTests(unittest.TestCase):
                 retry_delay_seconds=0,
                 known_group_ids=[100, 400],
                 discovery_window=50,
-            )
+            ),
+        )
 
-        requested = {int(url.rsplit("=", 1)[1]) for url in session.calls}
+        requested = {group_id for _kind, group_id in calls}
         self.assertIn(100, requested)
         self.assertIn(400, requested)
         self.assertIn(401, requested)
@@ -258,6 +222,49 @@ class GroupRosterScanTests(unittest.TestCase):
         self.assertNotIn(1, requested)
         self.assertNotIn(451, requested)
 
+    def test_concurrent_scan_covers_both_kinds_with_the_same_plan(self) -> None:
+        pages = {
+            ("clan", 6): '<p class="group-header">Воины клана Шестой</p><a href="/hero/detail?player=52">A</a>',
+            ("clan", 8): '<p class="group-header">Воины клана Восьмой</p><a href="/hero/detail?player=74">B</a>',
+            ("brotherhood", 100): '<p class="group-header">Воины братства Сотое</p><a href="/hero/detail?player=1">C</a>',
+            ("brotherhood", 102): '<p class="group-header">Воины братства Новое</p>',
+        }
+
+        def page(kind: str, group_id: int) -> tuple[int, str]:
+            if kind == "clan" and group_id == 7:
+                return 500, "server error"
+            return 200, pages.get((kind, group_id), MISSING)
+
+        rosters, calls, peak = scan_against_server(
+            page,
+            lambda url: scan_group_rosters_concurrently(
+                url,
+                {},
+                {"clan": [6, 7], "brotherhood": [100]},
+                timeout_seconds=5,
+                attempts=3,
+                retry_delay_seconds=0,
+                discovery_window=3,
+                concurrency=4,
+            ),
+        )
+
+        self.assertEqual(
+            [(item.group_id, item.name) for item in rosters["clan"]],
+            [(6, "Шестой"), (8, "Восьмой")],
+        )
+        self.assertEqual(
+            [(item.group_id, item.name, item.members) for item in rosters["brotherhood"]],
+            [(100, "Сотое", frozenset({1})), (102, "Новое", frozenset())],
+        )
+        # Known IDs keep their retries; discovery IDs are probed once.
+        self.assertEqual(calls.count(("clan", 7)), 3)
+        self.assertEqual(calls.count(("clan", 9)), 1)
+        self.assertEqual(calls.count(("brotherhood", 103)), 1)
+        self.assertNotIn(("clan", 11), calls)
+        self.assertNotIn(("brotherhood", 104), calls)
+        self.assertGreater(peak, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.parse import urlencode
+
+from tools.split_hot_cold import split_database
+
+ROOT = Path(__file__).resolve().parents[1]
+SNAPSHOTS = (
+    "heroes_2026-01-01_20-00-00.json.gz",
+    "heroes_2026-01-20_20-00-00.json.gz",
+    "heroes_2026-02-01_20-00-00.json.gz",
+    "heroes_2026-02-02_20-00-00.json.gz",
+)
+
+
+def hero(pid: int, glory: int) -> dict:
+    return {
+        "ID": pid, "Имя": f"Игрок {pid}", "Уровень": 1, "Слава": glory, "Побед": glory,
+        "Поражений": 0, "Сила": 1, "Защита": 1, "Ловкость": 1, "Мастерство": 1, "Живучесть": 1,
+    }
+
+
+class HotColdSplitTests(unittest.TestCase):
+    def build(self, root: Path) -> Path:
+        source = root / "data"
+        source.mkdir()
+        for index, filename in enumerate(SNAPSHOTS):
+            data = {str(pid): hero(pid, pid * 10 + index) for pid in (1, 2, 3)}
+            with gzip.open(source / filename, "wt", encoding="utf-8") as handle:
+                json.dump(data, handle, ensure_ascii=False)
+        db = root / "ratings.sqlite"
+        subprocess.run(
+            [sys.executable, str(ROOT / "tools" / "build_db.py"), "--data-dir", str(source),
+             "--db-path", str(db), "--rebuild", "--best-window-days", "5"],
+            cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+        )
+        return db
+
+    def test_split_keeps_catalog_hot_and_moves_old_observations_cold(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            db = self.build(root)
+            hot, cold = root / "hot.sqlite", root / "cold.sqlite"
+            stats = split_database(db, hot, cold, hot_days=5)
+
+            self.assertEqual(stats["snapshots"], 4)
+            self.assertEqual(stats["cold_snapshots"], 2)
+            self.assertEqual(stats["hot_observations"], 6)
+            self.assertEqual(stats["cold_observations"], 6)
+            conn = sqlite3.connect(hot)
+            try:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM players").fetchone()[0], 3)
+                self.assertGreater(conn.execute("SELECT COUNT(*) FROM best_growth").fetchone()[0], 0)
+                self.assertEqual(
+                    conn.execute("SELECT value FROM schema_meta WHERE key='db_role'").fetchone()[0],
+                    "hot",
+                )
+            finally:
+                conn.close()
+
+            import app as app_module
+
+            old_paths = app_module.DB_PATH, app_module.COLD_DB_PATH
+            app_module.DB_PATH, app_module.COLD_DB_PATH = str(hot), str(cold)
+            try:
+                client = app_module.app.test_client()
+                with app_module.app.test_request_context():
+                    self.assertFalse(app_module.use_history_for(SNAPSHOTS[3]))
+                    self.assertTrue(app_module.use_history_for(SNAPSHOTS[2]))
+
+                old_page = client.get(
+                    "/?" + urlencode({"mode": "Общий", "param": "Слава", "file": SNAPSHOTS[0]})
+                )
+                self.assertEqual(old_page.status_code, 200)
+                self.assertEqual(old_page.data.count(b"data-nickname="), 3)
+
+                growth = client.get(
+                    "/?" + urlencode({
+                        "mode": "Прирост", "param": "Слава", "file1": SNAPSHOTS[0], "file2": SNAPSHOTS[3],
+                    })
+                )
+                self.assertEqual(growth.status_code, 200)
+                self.assertEqual(growth.data.count(b"data-nickname="), 3)
+
+                profile = client.get("/profile?" + urlencode({"nickname": "Игрок 2"}))
+                self.assertEqual(profile.status_code, 200)
+                with app_module.app.test_request_context():
+                    self.assertEqual(len(app_module.player_snapshot_options(2)), 2)
+                    app_module.attach_history_db()
+                    self.assertEqual(len(app_module.player_snapshot_options(2)), 4)
+            finally:
+                app_module.DB_PATH, app_module.COLD_DB_PATH = old_paths
+
+
+if __name__ == "__main__":
+    unittest.main()
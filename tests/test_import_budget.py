@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import unittest
+
+from tools.import_profile import (
+    WEB_FORBIDDEN,
+    check_budget,
+    parse_importtime,
+    profile_import,
+    total_us,
+)
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |       _bs4_helper
+import time:      1200 |       1500 |     bs4
+import time:       500 |       2000 |   forglory.parsing
+import time:      4000 |       6000 | app
+"""
+
+
+class ImportBudgetTests(unittest.TestCase):
+    def test_parse_importtime_reports_where_a_module_came_from(self) -> None:
+        records = parse_importtime(SAMPLE)
+        self.assertEqual([record.name for record in records], ["_bs4_helper", "bs4", "forglory.parsing", "app"])
+        self.assertEqual(total_us(records), 6000)
+        problems = check_budget(records, budget_ms=5, own_budget_ms=100)
+        self.assertIn("bs4 is imported on the app path: bs4 <- forglory.parsing <- app", problems)
+        self.assertIn("import app took 6.0 ms; budget 5 ms", problems)
+
+    def test_web_import_stays_within_budget(self) -> None:
+        records = profile_import("app")
+        self.assertTrue(records, "python -X importtime printed nothing")
+        self.assertEqual(check_budget(records), [])
+        loaded = {record.name for record in records}
+        self.assertIn("flask", loaded)
+        self.assertFalse(loaded & set(WEB_FORBIDDEN))
+
+
+if __name__ == "__main__":
+    unittest.main()
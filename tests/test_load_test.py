@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+from tools.load_test import DEFAULT_MIX, UrlMix, parse_mix, run_load_test
+
+
+class LoadTestTests(unittest.TestCase):
+    def test_mix_parsing(self) -> None:
+        self.assertEqual(parse_mix("index=3, profile=0,suggest=1"), {"index": 3, "profile": 0, "suggest": 1})
+        with self.assertRaises(ValueError):
+            parse_mix("index=1,unknown=2")
+        with self.assertRaises(ValueError):
+            parse_mix("index=0")
+
+    def test_gunicorn_serves_the_whole_mix(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "load.sqlite"
+            generate_database(db, SyntheticDbConfig(players=200, snapshots=3))
+            kinds = {UrlMix(db, DEFAULT_MIX, seed).draw()[0] for seed in range(40)}
+            self.assertEqual(kinds, set(DEFAULT_MIX))
+
+            result = run_load_test(db, mix=DEFAULT_MIX, concurrency=2, duration=1.0, workers=1, threads=2)
+
+        self.assertGreater(result["requests"], 0)
+        self.assertEqual(set(result["statuses"]), {"200"})
+        self.assertEqual(sum(kind["requests"] for kind in result["by_kind"].values()), result["requests"])
+        self.assertIsNotNone(result["cache_hit_rate"])
+        self.assertEqual(len(result["workers"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
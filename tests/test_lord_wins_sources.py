@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import tempfile
 import unittest
+from pathlib import Path
+
+from aiohttp import web
 
 from collect_api_first import (
     ApiCollectionError,
+    enrich_profile_fallback_lord_wins,
     normalise_api_hero,
     parse_lord_wins_from_achievements,
 )
@@ -53,6 +59,46 @@ class LordWinsSourceTests(unittest.TestCase):
         )
         self.assertEqual(parse_lord_wins_from_achievements(html), 140)
 
+    def test_fallback_fetcher_reuses_pooled_connections(self) -> None:
+        async def achievements(request: web.Request) -> web.Response:
+            pid = int(request.query["player"])
+            await asyncio.sleep(0.005)
+            return web.Response(text=f'<script>window.hero={{"lord_wins":{pid * 2}}};</script>')
+
+        heroes = {pid: {"ID": pid} for pid in range(1, 41)}
+
+        async def scenario() -> dict:
+            app = web.Application()
+            app.router.add_get("/achievements", achievements)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            try:
+                with tempfile.TemporaryDirectory() as tmp:
+                    return await asyncio.to_thread(
+                        enrich_profile_fallback_lord_wins,
+                        heroes,
+                        db_path=Path(tmp) / "missing.sqlite",
+                        domain=f"http://127.0.0.1:{port}/",
+                        cookies={},
+                        concurrency=4,
+                        retries=2,
+                    )
+            finally:
+                await runner.cleanup()
+
+        summary = asyncio.run(scenario())
+
+        self.assertEqual(summary["fetched"], 40)
+        self.assertEqual(heroes[7]["Побед над Владыкой"], 14)
+        metrics = summary["concurrency"]
+        self.assertEqual(metrics["requests"], 40)
+        self.assertLessEqual(metrics["connections_opened"], 8)
+        self.assertGreater(metrics["connections_reused"], 0)
+        self.assertGreater(metrics["requests_per_second"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
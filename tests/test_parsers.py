@@ -3,7 +3,14 @@ from __future__ import annotations
 import unittest
 from pathlib import Path
 
-from forglory.parsing import parse_hero, parse_kill_beasts, profile_url_matches
+from forglory.parsing import (
+    _parse_hero_fast,
+    parse_hero,
+    parse_hero_bs4,
+    parse_kill_beasts,
+    parse_kill_beasts_bs4,
+    profile_url_matches,
+)
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
@@ -127,6 +134,46 @@ class ParserTests(unittest.TestCase):
         # level * (4*level - 2) / 2 + current = 4*14/2 + 3 = 31
         self.assertEqual(parse_kill_beasts(self.fixture("achievements_valid.html"), 103), 31)
 
+    def test_current_layout_fixture_takes_fast_path(self) -> None:
+        html = self.fixture("profile_current_layout.html")
+        hero = _parse_hero_fast(html, 104)
+        self.assertIsNotNone(hero)
+        self.assertEqual(hero["Имя"], "Текущий Игрок")
+        self.assertEqual(hero["Слава"], 1204377)
+        self.assertEqual(hero["Награбил (серебро)"], 8450120)
+        self.assertEqual(hero["Потерял (кристаллы)"], 917)
+        self.assertEqual((hero["Клан"], hero["clan_id"]), ("Стражи & Ко", 412))
+        self.assertEqual((hero["Братство"], hero["brotherhood_id"]), ("Северный Ветер", 38))
+        self.assertEqual(hero["Чат"], 4512)
+
+    def test_fast_path_matches_beautifulsoup(self) -> None:
+        pages = [
+            (self.fixture("profile_current_layout.html"), 104),
+            (self.fixture("profile_without_groups.html"), 101),
+            (self.fixture("profile_without_brotherhood.html"), 102),
+            (self.fixture("profile_changed_wrapper.html"), 103),
+            # Markup the fast path does not model must fall back, not diverge.
+            ('<span data-hero-name-id="5">Ник</span><div id="stats">'
+             '<div class="grid grid-cols-profileStat"><span>Уровень: 3</div></div>', 5),
+            ('<span data-hero-name-id="5">Ник</span><div id="stats">'
+             '<div class="grid grid-cols-profileStat"><span></span><span>Слава: <i>4</span></i></div></div>', 5),
+            ('<span data-hero-name-id="5">A&ampB</span><div id="stats">'
+             '<div class="grid grid-cols-profileStat"><span></span><span>Слава: 4</span></div></div>', 5),
+        ]
+        for html, hero_id in pages:
+            with self.subTest(hero_id=hero_id, html=html[:60]):
+                expected = parse_hero_bs4(html, hero_id)
+                fast = _parse_hero_fast(html, hero_id)
+                if fast is not None:
+                    self.assertEqual(list(fast.items()), list(expected.items()))
+                self.assertEqual(list(parse_hero(html, hero_id).items()), list(expected.items()))
+
+    def test_achievement_fast_path_matches_beautifulsoup(self) -> None:
+        for name in ("achievements_valid.html", "achievements_broken.html", "profile_current_layout.html"):
+            with self.subTest(name=name):
+                html = self.fixture(name)
+                self.assertEqual(parse_kill_beasts(html), parse_kill_beasts_bs4(html))
+
     def test_redirect_validation(self) -> None:
         self.assertTrue(profile_url_matches("https://playwekings.mobi/hero/detail?player=17", 17))
         self.assertFalse(profile_url_matches("https://playwekings.mobi/hero/profile", 17))
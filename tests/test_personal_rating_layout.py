@@ -1,64 +1,50 @@
 from __future__ import annotations
 
 import sqlite3
+import sys
 import unittest
 from pathlib import Path
 
-import forglory
+from forglory.web_queries import QUERIES
 
 
 ROOT = Path(__file__).resolve().parents[1]
 
 
 class PersonalRatingLayoutTests(unittest.TestCase):
-    def test_personal_stats_adds_rank_in_best_growth_rating_fallback(self) -> None:
+    def test_registry_rejects_accidental_overrides(self) -> None:
+        self.assertIn("personal_stats", QUERIES)
+        with self.assertRaises(ValueError):
+            QUERIES.register("personal_stats")(lambda *args, **kwargs: None)
+        with self.assertRaisesRegex(KeyError, "player_suggestions"):
+            QUERIES["missing"]
+
+    def test_balance_cap_uses_top10_average_without_patching_sqlite(self) -> None:
+        import app  # noqa: F401  (importing the app used to install the patch)
+        import forglory
+
+        self.assertIn("level_balance_top10", QUERIES)
+        self.assertFalse(hasattr(sqlite3.connect, "__wrapped__"))
+        self.assertFalse(hasattr(forglory, "_install_app_parameter_patch"))
+        self.assertFalse(
+            any(hasattr(finder, "_forglory_app_parameter_finder") for finder in sys.meta_path)
+        )
         conn = sqlite3.connect(":memory:")
         conn.row_factory = sqlite3.Row
         try:
-            conn.executescript(
-                """
-                CREATE TABLE snapshots(
-                    snapshot_id INTEGER PRIMARY KEY,
-                    ts INTEGER NOT NULL
-                );
-                CREATE TABLE best_growth(
-                    best_for_snapshot_id INTEGER NOT NULL,
-                    param TEXT NOT NULL,
-                    pid INTEGER NOT NULL,
-                    diff INTEGER NOT NULL
-                );
-                INSERT INTO snapshots VALUES(10,1000);
-                INSERT INTO best_growth VALUES(10,'Слава',2,20);
-                INSERT INTO best_growth VALUES(10,'Слава',7,20);
-                INSERT INTO best_growth VALUES(10,'Слава',9,15);
-                INSERT INTO best_growth VALUES(10,'Побед',7,4);
-                INSERT INTO best_growth VALUES(10,'Побед',3,5);
-                """
+            conn.execute(
+                "CREATE TABLE observations(snapshot_id,pid,level,strength,defense,dexterity,mastery,vitality)"
             )
-
-            def original_query(pid: int, _snap_from: str, _snap_to: str):
-                return {
-                    "pid": pid,
-                    "rows": [
-                        {"param": "Слава", "best_diff": 20},
-                        {"param": "Побед", "best_diff": 4},
-                        {"param": "Поражений", "best_diff": None},
-                    ],
-                }
-
-            namespace = {
-                "query_personal_stats": original_query,
-                "get_db": lambda: conn,
-            }
-            self.assertTrue(forglory._patch_personal_stats_query(namespace))
-
-            result = namespace["query_personal_stats"](7, "from", "to")
-            ranks = {row["param"]: row["best_rank"] for row in result["rows"]}
-            self.assertEqual(ranks["Слава"], 2)
-            self.assertEqual(ranks["Побед"], 2)
-            self.assertIsNone(ranks["Поражений"])
+            conn.executemany(
+                "INSERT INTO observations VALUES(1,?,5,?,?,1,1,1)",
+                [(pid, pid * 10, 100 if pid == 1 else 1) for pid in range(1, 13)],
+            )
+            (row,) = QUERIES["level_balance_top10"](conn, 1)
         finally:
             conn.close()
+        self.assertEqual(row["level"], 5)
+        self.assertEqual(row["strength"], sum(range(30, 130, 10)) / 10)
+        self.assertEqual(row["defense"], (100 + 9) / 10)
 
     def test_personal_stats_uses_batched_queries(self) -> None:
         conn = sqlite3.connect(":memory:")
@@ -146,30 +132,21 @@ class PersonalRatingLayoutTests(unittest.TestCase):
                 column = {"Слава": "glory", "Побед": "wins"}[param]
                 return f"{alias}.{column}"
 
-            def original_query(*_args, **_kwargs):
-                raise AssertionError("The original N+1 query must not be called")
-
-            namespace = {
-                "query_personal_stats": original_query,
-                "get_db": lambda: conn,
-                "snapshot_info": snapshot_info,
-                "_row_value": row_value,
-                "_player_value_expr": player_value_expr,
-                "PERSONAL_PARAMS": ["Слава", "Побед", "Сумма статов"],
-                "cached_query": lambda function: function,
-            }
-            self.assertTrue(forglory._patch_personal_stats_query(namespace))
-
             statements: list[str] = []
             conn.set_trace_callback(
                 lambda sql: statements.append(sql)
                 if sql.lstrip().upper().startswith(("SELECT", "WITH"))
                 else None
             )
-            result = namespace["query_personal_stats"](
+            result = QUERIES["personal_stats"](
+                conn,
                 1,
                 "heroes_2026-08-01_20-00-00.json.gz",
                 "heroes_2026-08-02_20-00-00.json.gz",
+                snapshot_info=snapshot_info,
+                params=["Слава", "Побед", "Сумма статов"],
+                value_expr=player_value_expr,
+                row_value=row_value,
             )
             conn.set_trace_callback(None)
 
@@ -223,33 +200,8 @@ class PersonalRatingLayoutTests(unittest.TestCase):
                 """
             )
 
-            class FakeApp:
-                def __init__(self):
-                    self.view_functions = {
-                        "api_player_suggest_all": lambda: ["legacy-all"],
-                        "api_player_suggest": lambda: ["legacy-snapshot"],
-                    }
-
-            class FakeRequest:
-                def __init__(self):
-                    self.args = {"q": "player"}
-
-            flask_app = FakeApp()
-            fake_request = FakeRequest()
-            namespace = {
-                "app": flask_app,
-                "api_player_suggest_all": flask_app.view_functions["api_player_suggest_all"],
-                "api_player_suggest": flask_app.view_functions["api_player_suggest"],
-                "get_db": lambda: conn,
-                "normalize_name": lambda value: " ".join(value.casefold().split()),
-                "snapshot_num": lambda filename: 2 if filename == "latest" else None,
-                "_db_available": lambda: True,
-                "request": fake_request,
-                "jsonify": lambda payload: payload,
-            }
-            self.assertTrue(forglory._patch_player_suggestion_route(namespace))
-
-            all_payload = flask_app.view_functions["api_player_suggest_all"]()
+            suggestions = QUERIES["player_suggestions"]
+            all_payload = suggestions(conn, "player")
             self.assertEqual(len(all_payload), 5)
             self.assertEqual(
                 [item["level"] for item in all_payload],
@@ -257,20 +209,10 @@ class PersonalRatingLayoutTests(unittest.TestCase):
             )
             self.assertEqual(all_payload[0]["name"], "Player Beta")
 
-            fake_request.args = {
-                "q": "player",
-                "snapshot": "latest",
-                "level": "Все",
-            }
-            snapshot_payload = flask_app.view_functions["api_player_suggest"]()
+            snapshot_payload = suggestions(conn, "player", snapshot_id=2)
             self.assertEqual(snapshot_payload, all_payload)
 
-            fake_request.args = {
-                "q": "player",
-                "snapshot": "latest",
-                "level": "12",
-            }
-            filtered_payload = flask_app.view_functions["api_player_suggest"]()
+            filtered_payload = suggestions(conn, "player", snapshot_id=2, level=12)
             self.assertEqual(
                 filtered_payload,
                 [{"name": "Player Epsilon", "level": 12}],
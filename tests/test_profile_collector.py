@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import get_data
+from forglory.parse_stage import ParseStage
+from forglory.parsing import parse_hero
+from get_data import CheckpointJournal, DictSink, FetchResult, StagingSink, collect, collect_into
+
+
+class ProfileCollectorTests(unittest.TestCase):
+    def test_worker_pool_bounds_in_flight_players_and_streams_results(self) -> None:
+        in_flight = 0
+        peak = 0
+
+        async def fake_fetch_hero(session, pid, semaphore, domain, retries, **kwargs) -> FetchResult:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            if pid % 10 == 0:
+                return FetchResult(pid, None, get_data._failure(pid, "profile", "not_found", 1, 404))
+            return FetchResult(pid, {"ID": pid, "Имя": kwargs.get("fallback_name") or str(pid)})
+
+        streamed: list[int] = []
+
+        class RecordingSink(DictSink):
+            def add_hero(self, pid: int, data: dict) -> None:
+                streamed.append(pid)
+                super().add_hero(pid, data)
+
+        sink = RecordingSink()
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            get_data, "DATA_DIR", Path(tmp)
+        ), patch.object(get_data, "fetch_hero", fake_fetch_hero):
+            stats = asyncio.run(
+                collect_into(
+                    [*range(1, 501), 5, 6], sink, {}, "https://example.test/", 4, 1,
+                    known_names={3: "Третий"}, max_concurrency=7,
+                )
+            )
+
+        self.assertLessEqual(peak, 7)
+        self.assertEqual((stats.requested, stats.completed, stats.profiles, stats.failures), (500, 500, 450, 50))
+        self.assertFalse(stats.aborted)
+        self.assertEqual(len(streamed), 450)
+        self.assertEqual(sink.results[3]["Имя"], "Третий")
+        self.assertEqual(len(sink.failures), 50)
+
+    def test_staging_sink_writes_rows_while_collecting(self) -> None:
+        def hero(pid: int) -> dict:
+            return {"ID": pid, "Имя": f"Игрок {pid}", "Уровень": 6, "Слава": pid * 3}
+
+        async def fake_fetch_hero(session, pid, semaphore, domain, retries, **kwargs) -> FetchResult:
+            await asyncio.sleep(0)
+            return FetchResult(pid, hero(pid))
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            get_data, "DATA_DIR", Path(tmp)
+        ), patch.object(get_data, "fetch_hero", fake_fetch_hero):
+            streamed, stored = Path(tmp) / "streamed.sqlite", Path(tmp) / "stored.sqlite"
+            sink = StagingSink(streamed)
+            sink.writer.batch_size = 50
+            asyncio.run(collect_into(range(1, 121), sink, {}, "https://example.test/", 4, 1))
+            with sqlite3.connect(streamed) as conn:
+                written = conn.execute("SELECT COUNT(*) FROM staged_observations").fetchone()[0]
+            name, metadata_path = get_data.finish_staged_snapshot(sink, [], [], {1, 2, 500}, [1, 2], 3, 120)
+            sink.writer.close()
+            get_data.stage_snapshot(stored, {pid: hero(pid) for pid in range(1, 121)}, [], [], set(), [], 3, 120)
+
+            def staged(db: Path) -> list[tuple]:
+                with sqlite3.connect(db) as conn:
+                    return conn.execute("SELECT * FROM staged_observations ORDER BY pid").fetchall()
+
+            with sqlite3.connect(streamed) as conn:
+                metadata = json.loads(conn.execute("SELECT metadata FROM staged_snapshots").fetchone()[0])
+            streamed_rows, stored_rows = staged(streamed), staged(stored)
+
+        # Full batches reach the database before the collection finishes.
+        self.assertEqual(written, 100)
+        self.assertIsNone(metadata_path)
+        self.assertEqual((metadata["successful_profiles"], metadata["baseline_success_count"]), (120, 2))
+        self.assertEqual(len(streamed_rows), 120)
+        self.assertEqual({row[0] for row in streamed_rows}, {name.name})
+        self.assertEqual([row[1:] for row in streamed_rows], [row[1:] for row in stored_rows])
+
+    def test_limit_never_grows_above_concurrency_unless_allowed(self) -> None:
+        in_flight = 0
+        peak = 0
+
+        async def slow_fetch_hero(session, pid, semaphore, domain, retries, **kwargs) -> FetchResult:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return FetchResult(pid, {"ID": pid, "Имя": str(pid)})
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            get_data, "DATA_DIR", Path(tmp)
+        ), patch.object(get_data, "fetch_hero", slow_fetch_hero):
+            stats = asyncio.run(collect_into(range(1, 301), DictSink(), {}, "https://example.test/", 4, 1))
+
+        self.assertLessEqual(peak, 4)
+        self.assertLessEqual(stats.limiter["peak_limit"], 4)
+
+    def test_systemic_failure_aborts_and_keeps_diagnostics(self) -> None:
+        calls = 0
+
+        async def failing_fetch_hero(session, pid, semaphore, domain, retries, **kwargs) -> FetchResult:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return FetchResult(
+                pid,
+                None,
+                get_data._failure(pid, "profile", "auth_error", 1, 403),
+                diagnostic_html="<html>login</html>",
+            )
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            get_data, "DATA_DIR", Path(tmp)
+        ), patch.object(get_data, "fetch_hero", failing_fetch_hero):
+            results, failures, achievement_failures = asyncio.run(
+                collect(range(1, 5001), {}, "https://example.test/", 4, 1, systemic_failure_sample_size=20)
+            )
+            diagnostics = sorted(path.name for path in (Path(tmp) / "failed_html").glob("*.html"))
+
+        self.assertEqual(results, {})
+        self.assertGreaterEqual(len(failures), 20)
+        self.assertLess(calls, 40)
+        self.assertEqual(achievement_failures, [])
+        self.assertEqual(len(diagnostics), 5)
+        self.assertTrue(diagnostics[0].endswith("_auth_error.html"))
+
+    def test_checkpoint_journal_resumes_only_fresh_heroes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "journal.ndjson"
+            sink = DictSink()
+            journal = CheckpointJournal(path, sink)
+            journal.add_hero(1, {"ID": 1})
+            journal.add_hero(2, {"ID": 2})
+            journal.add_achievement_failure(get_data._failure(2, "achievements", "timeout", 1))
+            journal.add_failure(get_data._failure(3, "profile", "timeout", 2))
+            journal.add_hero(9, {"ID": 9})
+            journal.close()
+            with path.open("a", encoding="utf-8") as handle:
+                stale = {"kind": "hero", "at": time.time() - 7200, "pid": 4, "data": {"ID": 4}}
+                handle.write(json.dumps(stale) + "\n")
+                handle.write('{"kind":"hero","at":')
+
+            state = CheckpointJournal.load(path, 3600, ids=[1, 2, 3, 4])
+            self.assertEqual(sorted(sink.results), [1, 2, 9])
+            self.assertEqual(sorted(state.heroes), [1, 2])
+            self.assertEqual([item.pid for item in state.achievement_failures], [2])
+            self.assertEqual(CheckpointJournal.load(path, 0).heroes, {})
+
+            resumed = CheckpointJournal(path, DictSink(), state)
+            resumed.add_hero(3, {"ID": 3})
+            resumed.close()
+            self.assertEqual(sorted(CheckpointJournal.load(path, 3600).heroes), [1, 2, 3])
+            self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 4)
+
+    def test_parse_stage_matches_inline_parsing_and_reraises_errors(self) -> None:
+        html = (Path(__file__).parent / "fixtures" / "profile_without_brotherhood.html").read_text(
+            encoding="utf-8"
+        )
+
+        async def scenario(workers: int) -> tuple[list[dict], dict]:
+            async with ParseStage(workers, queue_per_worker=1) as stage:
+                heroes = await asyncio.gather(*(stage.run(parse_hero, html, 102) for _ in range(6)))
+                with self.assertRaises(ValueError):
+                    await stage.run(parse_hero, "<html></html>", 1)
+            return heroes, stage.summary()
+
+        pooled, summary = asyncio.run(scenario(2))
+        inline, inline_summary = asyncio.run(scenario(0))
+        self.assertEqual(pooled, [parse_hero(html, 102)] * 6)
+        self.assertEqual(pooled, inline)
+        self.assertEqual((summary["workers"], summary["jobs"]), (2, 7))
+        self.assertEqual((inline_summary["workers"], inline_summary["jobs"]), (0, 7))
+        self.assertGreater(summary["parse_seconds"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
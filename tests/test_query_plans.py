@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.generate_ratings_db import generate_database
+from tools.query_plans import PLAN_DB_CONFIG, check_plans, collect_statements, load_baseline
+
+
+class QueryPlanTests(unittest.TestCase):
+    def test_app_statements_keep_their_accepted_plans(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "plans.sqlite"
+            generate_database(db, PLAN_DB_CONFIG)
+            statements = collect_statements(db)
+            baseline = load_baseline()
+
+            current, failures = check_plans(db, statements, baseline)
+            self.assertEqual(failures, [], "\n\n" + "\n\n".join(failures) + "\n\nRun tools/query_plans.py --update "
+                             "if the new plans are intended.")
+            self.assertGreater(len(current), 100)
+
+            conn = sqlite3.connect(db)
+            conn.execute("DROP INDEX idx_best_growth_lookup")
+            conn.commit()
+            conn.close()
+            _current, failures = check_plans(db, statements, baseline)
+        self.assertTrue(failures)
+        self.assertIn("-SEARCH bg USING INDEX idx_best_growth_lookup", failures[0])
+        self.assertIn("+USE TEMP B-TREE FOR ORDER BY", failures[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
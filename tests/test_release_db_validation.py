@@ -3,9 +3,11 @@ from __future__ import annotations
 import hashlib
 import importlib.util
 import sqlite3
+import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 
 SCRIPT = Path(__file__).resolve().parents[1] / "tools" / "fetch_db_from_release.py"
@@ -75,6 +77,26 @@ class ReleaseDatabaseValidationTests(unittest.TestCase):
             second_hash = MODULE.file_sha256(first)
             self.assertNotEqual(first_hash, second_hash)
 
+    def test_unchanged_release_state_skips_the_download(self) -> None:
+        release = {"assets": [{"name": "ratings.sqlite.gz", "size": 10, "updated_at": "2026-07-26T02:20:00Z"}]}
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            base = self.make_db(root, ["heroes_2026-07-26_02-14-44.json.gz"])
+            state = root / "ratings.sqlite.release"
+            state.write_text(MODULE.release_fingerprint(release), encoding="utf-8")
+            out = root / "ratings.sqlite.next"
+            argv = ["fetch", "--out", str(out), "--base", str(base), "--release-state", str(state), "--patches"]
+            with (
+                mock.patch.object(sys, "argv", argv),
+                mock.patch.object(MODULE, "fetch_release", return_value=release),
+                mock.patch.object(MODULE, "download_asset", side_effect=AssertionError("downloaded")),
+            ):
+                self.assertEqual(MODULE.main(), 0)
+            self.assertFalse(out.exists())
+
+            release["assets"][0]["updated_at"] = "2026-07-27T02:20:00Z"
+            self.assertNotEqual(MODULE.release_fingerprint(release), state.read_text(encoding="utf-8"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.parse import urlencode
+
+from forglory.sql_metrics import SqlMetrics, fingerprint
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+
+
+class SqlMetricsTests(unittest.TestCase):
+    def test_fingerprint_drops_literals(self) -> None:
+        self.assertEqual(
+            fingerprint("SELECT *  FROM t\n WHERE a='x''y' AND b=-12 AND c IN (?, ?, ?) AND d=1.5"),
+            "SELECT * FROM t WHERE a=? AND b=? AND c IN (?,...) AND d=?",
+        )
+        self.assertEqual(fingerprint("SELECT col2 FROM t2"), "SELECT col2 FROM t2")
+
+    def test_routes_statements_and_slow_plans_are_exposed(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "ratings.sqlite"
+            generate_database(db, SyntheticDbConfig(players=150, snapshots=3))
+
+            import app as app_module
+            old = app_module.DB_PATH, app_module.SQL_METRICS
+            app_module.DB_PATH = str(db)
+            app_module.SQL_METRICS = metrics = SqlMetrics(slow_ms=0)
+            app_module._QUERY_CACHE.clear()
+            try:
+                client = app_module.app.test_client()
+                self.assertEqual(client.get("/metrics").data.count(b"forglory_request_seconds_count"), 0)
+                url = "/?" + urlencode({"mode": "Общий", "param": "Слава", "level": "Все"})
+                with self.assertLogs("forglory.sql", "WARNING") as logs:
+                    first = client.get(url)
+                second = client.get(url)
+                exposition = client.get("/metrics")
+            finally:
+                app_module.DB_PATH, app_module.SQL_METRICS = old
+                app_module._QUERY_CACHE.clear()
+
+        self.assertEqual(first.status_code, 200)
+        self.assertRegex(first.headers["Server-Timing"], r'^sql;dur=[\d.]+;desc="[1-9]\d* statements, [1-9]\d* rows, cache \d+/\d+"$')
+        self.assertRegex(second.headers["Server-Timing"], r'desc="0 statements, 0 rows, cache (\d+)/\1"')
+        self.assertTrue(any("SEARCH" in line or "SCAN" in line for line in logs.output))
+        self.assertTrue(all(entry["plan"] for entry in metrics.slow_queries))
+
+        self.assertEqual(exposition.status_code, 200)
+        self.assertTrue(exposition.content_type.startswith("text/plain; version=0.0.4"))
+        text = exposition.get_data(as_text=True)
+        self.assertIn('forglory_request_seconds_count{route="/"} 2', text)
+        self.assertIn('forglory_query_cache_total{function="query_rating_overall",result="hit"} 1', text)
+        self.assertIn('forglory_query_cache_total{function="query_rating_overall",result="miss"} 1', text)
+        self.assertIn('forglory_sql_statement_seconds_bucket{statement="', text)
+        self.assertIn('forglory_request_sql_seconds_quantile{route="/",quantile="0.99"}', text)
+        self.assertRegex(text, r'forglory_sql_statement_info\{statement="\w+",sql="SELECT filename FROM snapshots ORDER BY ts DESC"\} 1')
+
+    def test_metrics_endpoint_is_off_by_default(self) -> None:
+        import app as app_module
+
+        if app_module.SQL_METRICS is None:
+            self.assertEqual(app_module.app.test_client().get("/metrics").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
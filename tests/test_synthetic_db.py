@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.benchmark_queries import benchmark
+from tools.build_db import validate_database
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+
+
+class SyntheticDatabaseTests(unittest.TestCase):
+    def test_generated_database_is_valid_and_benchmarkable(self) -> None:
+        config = SyntheticDbConfig(players=200, snapshots=4, rename_rate=0.2, late_join_ratio=0.2)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "synthetic.sqlite"
+            counts = generate_database(db, config)
+            self.assertEqual(counts["snapshots"], 4)
+            self.assertEqual(counts["players"], 200)
+            self.assertLess(counts["observations"], 800)
+
+            conn = sqlite3.connect(db)
+            try:
+                validate_database(conn)
+                renamed = conn.execute(
+                    "SELECT COUNT(*) FROM (SELECT pid FROM heroes GROUP BY pid HAVING COUNT(DISTINCT name) > 1)"
+                ).fetchone()[0]
+                best_rows = conn.execute("SELECT COUNT(*) FROM best30").fetchone()[0]
+                latest_count = conn.execute("SELECT player_count FROM snapshots ORDER BY ts DESC").fetchone()[0]
+            finally:
+                conn.close()
+            self.assertGreater(renamed, 0)
+            self.assertGreater(best_rows, 0)
+            self.assertEqual(generate_database(db, config), counts)
+
+            results = benchmark(db, pages=[1, 2], params=["Слава"], repeat=1)
+        self.assertGreater(len(results), 20)
+        for row in results:
+            with self.subTest(query=row["query"], args=row["args"]):
+                self.assertGreaterEqual(row["uncached_ms"], 0)
+                self.assertGreaterEqual(row["cached_ms"], 0)
+        rating = [row for row in results if row["query"] == "query_rating_overall" and row["args"]["level"] is None]
+        self.assertEqual([row["rows"] for row in rating], [100, latest_count - 100])
+
+
+if __name__ == "__main__":
+    unittest.main()
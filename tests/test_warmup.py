@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+import app as app_module
+from forglory.sql_metrics import SqlMetrics
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database
+
+
+class WarmUpTests(unittest.TestCase):
+    def test_warm_up_serves_the_hottest_pages_from_the_cache(self) -> None:
+        old = app_module.DB_PATH, app_module.SQL_METRICS
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "ratings.sqlite"
+            generate_database(db, SyntheticDbConfig(players=60, snapshots=3, seed=5))
+            app_module.DB_PATH = str(db)
+            app_module._QUERY_CACHE.clear()
+            try:
+                with self.assertLogs(app_module.app.logger, "INFO") as logs:
+                    result = app_module.warm_up()
+                self.assertEqual(result["pages"], len(app_module.warmup_urls()))
+                self.assertGreater(result["indexes"], 0)
+                self.assertRegex(logs.output[-1], r"Warm-up of .*ratings\.sqlite: \d+ pages and \d+ indexes in ")
+
+                app_module.SQL_METRICS = SqlMetrics(slow_ms=10_000, explain=False)
+                client = app_module.app.test_client()
+                for query in (
+                    {"mode": "Общий", "param": "Слава"},
+                    {"mode": "Общий", "param": "Кланы по славе"},
+                    {"mode": "Общий", "param": "По уровню"},
+                    {"mode": "Прирост", "param": "Сумма статов"},
+                    {"mode": "Лучшие (приросты)", "param": "Побед"},
+                ):
+                    with self.subTest(**query):
+                        response = client.get("/", query_string=query)
+                        self.assertEqual(response.status_code, 200)
+                        hits, lookups = re.search(
+                            r"cache (\d+)/(\d+)", response.headers["Server-Timing"]
+                        ).groups()
+                        self.assertEqual(hits, lookups)
+            finally:
+                app_module.DB_PATH, app_module.SQL_METRICS = old
+                app_module._QUERY_CACHE.clear()
+
+    def test_warm_up_without_a_database_does_nothing(self) -> None:
+        old = app_module.DB_PATH
+        app_module.DB_PATH = "/nonexistent/ratings.sqlite"
+        try:
+            with self.assertLogs(app_module.app.logger, "INFO"):
+                result = app_module.warm_up()
+        finally:
+            app_module.DB_PATH = old
+        self.assertEqual((result["pages"], result["indexes"]), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
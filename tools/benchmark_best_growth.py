@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Time the SQL and the NumPy engines of ``compute_best_growth``.
+
+Each engine runs on its own copy of the database, ``--repeat`` times from a
+fresh copy, and the fastest run is reported. The check fails unless both
+engines leave byte-identical database files behind.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory import best_growth  # noqa: E402
+from tools.build_db import BEST_GROWTH_ENGINES, compute_best_growth  # noqa: E402
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database  # noqa: E402
+
+
+def run_engine(source: Path, target: Path, engine: str, *, max_gap_hours: float) -> tuple[float, str]:
+    """Rebuild best_growth on a copy of ``source``; return seconds and the file's sha256."""
+    shutil.copyfile(source, target)
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        latest = conn.execute("SELECT snapshot_id FROM snapshots ORDER BY ts DESC LIMIT 1").fetchone()
+        if not latest:
+            raise RuntimeError(f"{source} has no snapshots")
+        started = time.perf_counter()
+        conn.execute("BEGIN")
+        compute_best_growth(conn, int(latest[0]), max_gap_hours=max_gap_hours, engine=engine)
+        conn.execute("COMMIT")
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    return elapsed, hashlib.sha256(target.read_bytes()).hexdigest()
+
+
+def benchmark(source: Path, work_dir: Path, *, repeat: int, max_gap_hours: float) -> dict[str, tuple[float, str]]:
+    results = {}
+    for engine in BEST_GROWTH_ENGINES:
+        runs = [
+            run_engine(source, work_dir / f"{engine}.sqlite", engine, max_gap_hours=max_gap_hours)
+            for _ in range(repeat)
+        ]
+        results[engine] = (min(seconds for seconds, _digest in runs), runs[-1][1])
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the best_growth engines")
+    parser.add_argument("--db", help="Database to benchmark on (default: a generated one)")
+    parser.add_argument("--players", type=int, default=SyntheticDbConfig.players)
+    parser.add_argument("--snapshots", type=int, default=31)
+    parser.add_argument("--seed", type=int, default=SyntheticDbConfig.seed)
+    parser.add_argument("--max-gap-hours", type=float, default=26.0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the fastest is reported")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not best_growth.available():
+        print("ERROR: the array engine needs NumPy", file=sys.stderr)
+        return 2
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        if args.db:
+            source = Path(args.db)
+            if not source.exists():
+                print(f"ERROR: database not found: {source}", file=sys.stderr)
+                return 2
+        else:
+            source = work_dir / "synthetic.sqlite"
+            generate_database(
+                source, SyntheticDbConfig(players=args.players, snapshots=args.snapshots, seed=args.seed)
+            )
+        with sqlite3.connect(source) as conn:
+            observations = conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        results = benchmark(source, work_dir, repeat=max(1, args.repeat), max_gap_hours=args.max_gap_hours)
+
+    print(f"{'engine':<8} {'seconds':>8}  sha256")
+    for engine, (seconds, digest) in results.items():
+        print(f"{engine:<8} {seconds:>8.2f}  {digest[:16]}")
+    if len({digest for _seconds, digest in results.values()}) != 1:
+        print("ERROR: the engines left different database files", file=sys.stderr)
+        return 1
+    speedup = results["sql"][0] / results["array"][0]
+    print(f"OK: identical files from {observations} observations; array engine {speedup:.2f}x the SQL engine")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Benchmark the collectors against the local fake game server.
+
+Each collector runs in a fresh process so its peak RSS is its own, against
+``tools/fake_game_server.py`` running in this process. The report has the
+wall time, items per second (profiles, endpoint rows, roster members or
+achievement pages), the server-observed p50/p99 latency per route and the
+HTTP status mix, so runs with different fault settings can be compared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.fake_game_server import FakeGame, FakeGameConfig, serve_in_thread  # noqa: E402
+
+COLLECTORS = ("profiles", "bulk", "rosters", "rosters_concurrent", "lord_wins")
+
+
+def peak_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run_collector(name: str, url: str, config: FakeGameConfig, options: dict[str, Any]) -> int:
+    """Run one collector against ``url`` and return the number of items it produced."""
+    concurrency = int(options["concurrency"])
+    retries = int(options["retries"])
+    with tempfile.TemporaryDirectory() as tmp:
+        if name == "profiles":
+            import get_data
+
+            get_data.DATA_DIR = Path(tmp)  # keep failed_html diagnostics out of data/
+            # The --output sqlite path: rows are staged as they arrive.
+            sink = get_data.StagingSink(Path(tmp) / "staged.sqlite")
+            try:
+                asyncio.run(
+                    get_data.collect_into(
+                        range(1, config.players + 1),
+                        sink,
+                        {},
+                        url,
+                        concurrency,
+                        retries,
+                        achievement_retries=retries,
+                        parse_workers=int(options["parse_workers"]),
+                    )
+                )
+            finally:
+                sink.writer.close()
+            return len(sink.pids)
+
+        import collect_api_first
+
+        if name == "bulk":
+            collection = collect_api_first.fetch_from_bulk_api(
+                url, {}, attempts=retries, retry_delay_seconds=0, timeout_seconds=120, min_player_count=1
+            )
+            return len(collection.heroes)
+
+        game = FakeGame(config)
+        known = {kind: game.group_ids(kind) for kind in ("clan", "brotherhood")}
+        scan = {"timeout_seconds": 30, "attempts": retries, "retry_delay_seconds": 0, "discovery_window": 5}
+        if name == "rosters":
+            rosters = {
+                kind: collect_api_first.scan_group_rosters(url, {}, kind, known_group_ids=ids, **scan)
+                for kind, ids in known.items()
+            }
+        elif name == "rosters_concurrent":
+            rosters = collect_api_first.scan_group_rosters_concurrently(
+                url, {}, known, concurrency=concurrency, **scan
+            )
+        elif name == "lord_wins":
+            os.environ["LORD_WINS_MIN_COVERAGE"] = "0"
+            summary = collect_api_first.enrich_profile_fallback_lord_wins(
+                {pid: {"ID": pid} for pid in range(1, config.players + 1)},
+                db_path=Path(tmp) / "missing.sqlite",
+                domain=url,
+                cookies={},
+                concurrency=concurrency,
+                retries=retries,
+            )
+            return int(summary["fetched"])
+        else:
+            raise ValueError(f"Unknown collector: {name}")
+        return sum(len(roster.members) for group in rosters.values() for roster in group)
+
+
+def _child(name: str, url: str, config: FakeGameConfig, options: dict[str, Any], pipe: Any) -> None:
+    try:
+        started = time.perf_counter()
+        items = run_collector(name, url, config, options)
+        pipe.send({"items": items, "seconds": time.perf_counter() - started, "peak_rss_kb": peak_rss_kb()})
+    except BaseException as exc:  # reported back instead of dying silently in the child
+        pipe.send({"error": f"{type(exc).__name__}: {exc}"})
+    finally:
+        pipe.close()
+
+
+def benchmark(config: FakeGameConfig, collectors: list[str], options: dict[str, Any]) -> list[dict[str, Any]]:
+    context = multiprocessing.get_context("spawn")
+    rows: list[dict[str, Any]] = []
+    with serve_in_thread(config) as server:
+        for name in collectors:
+            server.game.reset_stats()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_child, args=(name, server.url, config, options, sender))
+            process.start()
+            sender.close()
+            result = receiver.recv()
+            process.join()
+            stats = server.game.stats()
+            if "error" in result:
+                rows.append({"collector": name, "error": result["error"], **stats})
+                continue
+            seconds = max(result["seconds"], 1e-9)
+            rows.append({
+                "collector": name,
+                "items": result["items"],
+                "seconds": round(seconds, 3),
+                "items_per_second": round(result["items"] / seconds, 1),
+                "peak_rss_mb": round(result["peak_rss_kb"] / 1024, 1) if result["peak_rss_kb"] else None,
+                **stats,
+            })
+    return rows
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the collectors against a local fake game server")
+    parser.add_argument("--collectors", default=",".join(COLLECTORS), help="Comma-separated subset")
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--clan-size", type=int, default=25)
+    parser.add_argument("--brotherhood-size", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0, help="Start a 429 burst every N requests")
+    parser.add_argument("--throttle-burst", type=int, default=0, help="Length of each 429 burst")
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    parser.add_argument("--redirect-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    collectors = [name.strip() for name in args.collectors.split(",") if name.strip()]
+    unknown = sorted(set(collectors) - set(COLLECTORS))
+    if unknown:
+        print(f"ERROR: unknown collectors: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    config = FakeGameConfig(
+        players=args.players,
+        seed=args.seed,
+        clan_size=args.clan_size,
+        brotherhood_size=args.brotherhood_size,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_every=args.throttle_every,
+        throttle_burst=args.throttle_burst,
+        retry_after=args.retry_after,
+        redirect_rate=args.redirect_rate,
+    )
+    options = {
+        "concurrency": args.concurrency,
+        "retries": args.retries,
+        "parse_workers": args.parse_workers,
+    }
+    rows = benchmark(config, collectors, options)
+    if args.json:
+        print(json.dumps({"config": asdict(config), "options": options, "results": rows}, indent=2))
+        return 0 if not any("error" in row for row in rows) else 1
+
+    print(f"{'collector':<20} {'items':>7} {'seconds':>8} {'items/s':>9} {'rss MB':>7} {'requests':>9}  route p50/p99 ms")
+    failed = 0
+    for row in rows:
+        routes = "; ".join(
+            f"{route} {stats['p50_ms']}/{stats['p99_ms']}" for route, stats in row["routes"].items()
+        )
+        if "error" in row:
+            failed += 1
+            print(f"{row['collector']:<20} ERROR {row['error']}")
+            continue
+        print(
+            f"{row['collector']:<20} {row['items']:>7} {row['seconds']:>8} {row['items_per_second']:>9} "
+            f"{row['peak_rss_mb'] or '-':>7} {row['requests']:>9}  {routes}"
+        )
+    if failed:
+        return 1
+    print(f"OK: {len(rows)} collectors benchmarked against {config.players} synthetic players")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
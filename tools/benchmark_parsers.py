@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Time the streaming profile parser against the BeautifulSoup parser.
+
+Runs both over the HTML fixtures used by tests/test_parsers.py, checks they
+return the same result and prints per-fixture timings. Profiles the fast path
+declines are reported as "fallback"; ``parse_hero`` pays for both passes there.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory.parsing import (  # noqa: E402
+    _parse_hero_fast,
+    parse_hero,
+    parse_hero_bs4,
+    parse_kill_beasts,
+    parse_kill_beasts_bs4,
+)
+
+FIXTURES = ROOT / "tests" / "fixtures"
+
+
+def best_of(function: Callable[[], Any], iterations: int, repeat: int) -> float:
+    """Best mean seconds per call over ``repeat`` runs of ``iterations`` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best
+
+
+def hero_id_for(html: str) -> int:
+    match = re.search(r'data-hero-name-id="(\d+)"', html)
+    return int(match.group(1)) if match else 1
+
+
+def benchmark(fixtures: Path, iterations: int, repeat: int) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    for path in sorted(fixtures.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        if path.name.startswith("profile_"):
+            hero_id = hero_id_for(html)
+            expected = parse_hero_bs4(html, hero_id)
+            if parse_hero(html, hero_id) != expected:
+                raise SystemExit(f"ERROR: parse_hero disagrees with BeautifulSoup on {path.name}")
+            path_taken = "fast" if _parse_hero_fast(html, hero_id) is not None else "fallback"
+            fast = lambda: parse_hero(html, hero_id)  # noqa: E731
+            soup = lambda: parse_hero_bs4(html, hero_id)  # noqa: E731
+        else:
+            if parse_kill_beasts(html) != parse_kill_beasts_bs4(html):
+                raise SystemExit(f"ERROR: parse_kill_beasts disagrees with BeautifulSoup on {path.name}")
+            path_taken = "fast"
+            fast = lambda: parse_kill_beasts(html)  # noqa: E731
+            soup = lambda: parse_kill_beasts_bs4(html)  # noqa: E731
+        fast_seconds = best_of(fast, iterations, repeat)
+        soup_seconds = best_of(soup, iterations, repeat)
+        rows.append({
+            "fixture": path.name,
+            "bytes": len(html.encode("utf-8")),
+            "path": path_taken,
+            "fast_us": round(fast_seconds * 1e6, 1),
+            "bs4_us": round(soup_seconds * 1e6, 1),
+            "speedup": round(soup_seconds / fast_seconds, 2) if fast_seconds else None,
+        })
+    return rows
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the profile parsers over the test fixtures")
+    parser.add_argument("--fixtures", default=str(FIXTURES))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rows = benchmark(Path(args.fixtures), max(1, args.iterations), max(1, args.repeat))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    print(f"{'fixture':<36} {'bytes':>7} {'path':>9} {'fast µs':>9} {'bs4 µs':>9} {'speedup':>8}")
+    for row in rows:
+        print(
+            f"{row['fixture']:<36} {row['bytes']:>7} {row['path']:>9} "
+            f"{row['fast_us']:>9} {row['bs4_us']:>9} {row['speedup']:>7}x"
+        )
+    print(f"OK: {len(rows)} fixtures, fast path and BeautifulSoup agree")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
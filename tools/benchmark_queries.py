@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Time the web app's query functions against a ratings database.
+
+Every ``@cached_query`` function in ``app.py`` and the three search
+endpoints are run once with an empty query cache (uncached) and again with
+the cache warm (cached), at each requested page depth. Point ``--db`` at a
+real database, or pass ``--generate`` to build one with
+``tools/generate_ratings_db.py`` first. ``--json`` output is stable and
+sorted, and ``--compare`` prints the change against an earlier JSON run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database  # noqa: E402
+
+DEFAULT_PARAMS = ("Слава", "Сумма статов", "Награбил (серебро)")
+
+
+def _size(result: Any) -> int | None:
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, list) or (isinstance(result, dict) and all(isinstance(key, int) for key in result)):
+        return len(result)
+    return None if result is None else 1
+
+
+def _time(function: Callable[[], Any], repeat: int, clear: Callable[[], None] | None) -> tuple[float, Any]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if clear is not None:
+            clear()
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def query_fixtures(db_path: Path) -> dict[str, Any]:
+    """Snapshots, a mid-ranked player and a name fragment to query with."""
+    conn = sqlite3.connect(f"file:{db_path.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        snapshots = [str(row[0]) for row in conn.execute("SELECT filename FROM snapshots ORDER BY ts DESC")]
+        latest = snapshots[0]
+        sid, count = conn.execute(
+            "SELECT snapshot_id,player_count FROM snapshots WHERE filename=?", (latest,)
+        ).fetchone()
+        row = conn.execute(
+            """
+            SELECT o.pid,n.value FROM observations o
+            JOIN text_values n ON n.text_id=o.name_id
+            WHERE o.snapshot_id=? ORDER BY o.glory DESC LIMIT 1 OFFSET ?
+            """,
+            (sid, int(count) // 2),
+        ).fetchone()
+        common_level = conn.execute(
+            "SELECT level FROM heroes WHERE snapshot_id=? GROUP BY level ORDER BY COUNT(*) DESC LIMIT 1",
+            (latest,),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "latest": latest,
+        "previous": snapshots[1] if len(snapshots) > 1 else None,
+        "oldest": snapshots[-1],
+        "pid": int(row[0]),
+        "name": str(row[1]),
+        "fragment": str(row[1]).split()[0][:4],
+        "level": int(common_level),
+    }
+
+
+def benchmark(
+    db_path: Path,
+    *,
+    pages: list[int],
+    params: list[str],
+    repeat: int,
+) -> list[dict[str, Any]]:
+    import app as web
+
+    old_path = web.DB_PATH
+    fixture = query_fixtures(db_path)
+    latest, previous, oldest = fixture["latest"], fixture["previous"], fixture["oldest"]
+    size = web.PAGE_SIZE
+    cases: list[tuple[str, dict[str, Any], Callable[[], Any]]] = []
+
+    def case(name: str, args: dict[str, Any], function: Callable[[], Any]) -> None:
+        cases.append((name, args, function))
+
+    for param in params:
+        for page in pages:
+            offset = (page - 1) * size
+            for level in (None, fixture["level"]):
+                case(
+                    "query_rating_overall",
+                    {"param": param, "level": level, "page": page},
+                    lambda p=param, lv=level, o=offset: web.query_rating_overall(latest, previous, p, lv, size, o),
+                )
+            case(
+                "query_growth_between",
+                {"param": param, "span": "previous", "page": page},
+                lambda p=param, o=offset: web.query_growth_between(previous or latest, latest, p, None, size, o),
+            )
+            case(
+                "query_growth_between",
+                {"param": param, "span": "oldest", "page": page},
+                lambda p=param, o=offset: web.query_growth_between(oldest, latest, p, None, size, o),
+            )
+            case(
+                "query_best_growth",
+                {"param": param, "page": page},
+                lambda p=param, o=offset: web.query_best_growth(p, None, size, o),
+            )
+        for kind in ("Клан", "Братство"):
+            case(
+                "query_group_overall",
+                {"kind": kind, "param": param},
+                lambda k=kind, p=param: web.query_group_overall(latest, previous, k, p, None),
+            )
+        case(
+            "_search_ranked_overall",
+            {"param": param},
+            lambda p=param: web._search_ranked_overall(latest, previous, p, None, fixture["fragment"]),
+        )
+        case(
+            "_search_ranked_growth",
+            {"param": param},
+            lambda p=param: web._search_ranked_growth(oldest, latest, p, None, fixture["fragment"]),
+        )
+        case(
+            "_search_ranked_best",
+            {"param": param},
+            lambda p=param: web._search_ranked_best(p, None, fixture["fragment"]),
+        )
+    for page in pages:
+        case(
+            "query_level_players",
+            {"page": page},
+            lambda o=(page - 1) * size: web.query_level_players(latest, fixture["level"], size, o),
+        )
+    case("list_snapshot_ids", {}, web.list_snapshot_ids)
+    case("all_levels_for_snapshot", {}, lambda: web.all_levels_for_snapshot(latest))
+    case("query_level_summaries", {}, lambda: web.query_level_summaries(latest, previous))
+    case("query_level_balance", {}, lambda: web.query_level_balance(latest))
+    case("query_personal_stats", {"span": "oldest"}, lambda: web.query_personal_stats(fixture["pid"], oldest, latest))
+    case("player_snapshot_options", {}, lambda: web.player_snapshot_options(fixture["pid"]))
+    case("find_player", {"by": "name"}, lambda: web.find_player(fixture["name"]))
+    case("find_player", {"by": "pid"}, lambda: web.find_player(str(fixture["pid"])))
+
+    web.DB_PATH = str(db_path)
+    client = web.app.test_client()
+    for endpoint, query in (
+        ("/api/player_suggest", {"snapshot": latest, "q": fixture["fragment"]}),
+        ("/api/player_suggest_all", {"q": fixture["fragment"]}),
+        ("/api/player_search", {"file": latest, "param": "Слава", "q": fixture["fragment"]}),
+    ):
+        def request(path: str = endpoint, args: dict[str, str] = query) -> Any:
+            response = client.get(path, query_string=args)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned HTTP {response.status_code}")
+            return response.get_json()
+
+        case(endpoint, {}, request)
+
+    results = []
+    try:
+        with web.app.app_context():
+            for name, args, function in cases:
+                uncached, result = _time(function, repeat, web._QUERY_CACHE.clear)
+                cached, _ = _time(function, repeat, None)
+                if isinstance(result, dict) and "results" in result:
+                    result = result["results"]
+                results.append({
+                    "query": name,
+                    "args": args,
+                    "rows": _size(result),
+                    "uncached_ms": round(uncached * 1000, 3),
+                    "cached_ms": round(cached * 1000, 3),
+                })
+    finally:
+        web.DB_PATH = old_path
+        web._QUERY_CACHE.clear()
+    return results
+
+
+def case_key(row: dict[str, Any]) -> str:
+    return row["query"] + json.dumps(row["args"], ensure_ascii=False, sort_keys=True)
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path) -> list[str]:
+    baseline = {case_key(row): row for row in json.loads(baseline_path.read_text(encoding="utf-8"))["results"]}
+    lines = []
+    for row in current:
+        before = baseline.get(case_key(row))
+        if before is None or not before["uncached_ms"]:
+            continue
+        ratio = row["uncached_ms"] / before["uncached_ms"]
+        lines.append(f"{ratio:>6.2f}x  {before['uncached_ms']:>9} -> {row['uncached_ms']:>9} ms  {case_key(row)}")
+    return lines
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the web query functions")
+    parser.add_argument("--db", default="data/db/ratings.sqlite")
+    parser.add_argument("--generate", action="store_true", help="Benchmark a freshly generated synthetic DB")
+    parser.add_argument("--players", type=int, default=SyntheticDbConfig.players)
+    parser.add_argument("--snapshots", type=int, default=SyntheticDbConfig.snapshots)
+    parser.add_argument("--seed", type=int, default=SyntheticDbConfig.seed)
+    parser.add_argument("--pages", default="1,10,50", help="Comma-separated page numbers")
+    parser.add_argument("--params", default=",".join(DEFAULT_PARAMS), help="Comma-separated rating parameters")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--compare", help="Earlier --json output to compare uncached times with")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    pages = sorted({max(1, int(page)) for page in args.pages.split(",") if page.strip()})
+    params = [param.strip() for param in args.params.split(",") if param.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db)
+        database: dict[str, Any] = {"path": str(db_path)}
+        if args.generate:
+            db_path = Path(tmp) / "synthetic.sqlite"
+            config = SyntheticDbConfig(players=args.players, snapshots=args.snapshots, seed=args.seed)
+            database = {"generated": {"players": config.players, "snapshots": config.snapshots, "seed": config.seed}}
+            generate_database(db_path, config)
+        if not db_path.exists():
+            print(f"ERROR: database not found: {db_path}", file=sys.stderr)
+            return 2
+        results = benchmark(db_path, pages=pages, params=params, repeat=max(1, args.repeat))
+
+    report = {"database": database, "sqlite": sqlite3.sqlite_version, "repeat": args.repeat, "results": results}
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True))
+    else:
+        print(f"{'uncached ms':>12} {'cached ms':>10} {'rows':>6}  query")
+        for row in results:
+            print(f"{row['uncached_ms']:>12} {row['cached_ms']:>10} {str(row['rows']):>6}  {case_key(row)}")
+        print(f"OK: {len(results)} query cases")
+    if args.compare:
+        for line in compare(results, Path(args.compare)):
+            print(line, file=sys.stderr if args.json else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
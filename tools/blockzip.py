@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Block-parallel gzip for database release artifacts.
+
+The file is an ordinary multi-member gzip stream, so ``gzip -d`` and
+``gzip.open`` still read it. Every member holds one fixed-size block of the
+input and carries an ``FG`` extra subfield with the member's compressed length
+and raw length. Walking those headers gives the block index without inflating
+anything, which lets a thread pool compress, verify and extract blocks
+independently; zlib releases the GIL while it works.
+
+Members are written with ``mtime=0`` and a fixed block size, so the same input,
+level and block size always produce the same bytes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import shutil
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, TypeVar
+
+BLOCK_SIZE = 4 * 1024 * 1024
+SUBFIELD_ID = b"FG"
+# ID1 ID2 CM FLG(FEXTRA) MTIME=0 XFL=0 OS=unknown XLEN, then SI1 SI2 LEN.
+_HEADER = struct.Struct("<BBBBIBBH2sH")
+_FIELDS = struct.Struct("<II")
+_TRAILER = struct.Struct("<II")
+HEADER_SIZE = _HEADER.size + _FIELDS.size
+
+T = TypeVar("T")
+
+
+class BlockZipError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Block:
+    offset: int
+    size: int
+    raw_size: int
+
+
+def default_threads() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    compressor = zlib.compressobj(max(1, min(9, level)), zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    size = HEADER_SIZE + len(body) + _TRAILER.size
+    header = _HEADER.pack(
+        0x1F, 0x8B, 8, 0x04, 0, 0, 255, 4 + _FIELDS.size, SUBFIELD_ID, _FIELDS.size
+    )
+    return (
+        header
+        + _FIELDS.pack(size, len(data))
+        + body
+        + _TRAILER.pack(zlib.crc32(data) & 0xFFFFFFFF, len(data) & 0xFFFFFFFF)
+    )
+
+
+def decompress_block(member: bytes, block: Block | None = None) -> bytes:
+    """Inflate one member and check its CRC and length."""
+    if len(member) < HEADER_SIZE + _TRAILER.size:
+        raise BlockZipError("Truncated block")
+    data = zlib.decompress(member[HEADER_SIZE:-_TRAILER.size], -zlib.MAX_WBITS)
+    crc, size = _TRAILER.unpack(member[-_TRAILER.size:])
+    if crc != zlib.crc32(data) & 0xFFFFFFFF or size != len(data) & 0xFFFFFFFF:
+        where = f" at offset {block.offset}" if block else ""
+        raise BlockZipError(f"Block{where} failed its CRC check")
+    if block is not None and len(data) != block.raw_size:
+        raise BlockZipError(f"Block at offset {block.offset} has the wrong length")
+    return data
+
+
+def _ordered(
+    items: Iterator[T],
+    work: Callable[[T], bytes],
+    threads: int,
+) -> Iterator[bytes]:
+    """Map ``work`` over ``items`` in a thread pool, yielding in input order.
+
+    Only ``2 * threads`` items are in flight, so memory stays bounded by the
+    block size rather than the file size.
+    """
+    if threads <= 1:
+        for item in items:
+            yield work(item)
+        return
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending: deque[Future[bytes]] = deque()
+        for item in items:
+            pending.append(pool.submit(work, item))
+            if len(pending) >= threads * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _read_blocks(source: BinaryIO, block_size: int) -> Iterator[bytes]:
+    while True:
+        data = source.read(block_size)
+        if not data:
+            return
+        yield data
+
+
+def compress_file(
+    source: Path,
+    target: Path,
+    *,
+    level: int = 6,
+    block_size: int = BLOCK_SIZE,
+    threads: int | None = None,
+) -> int:
+    """Compress ``source`` into ``target`` and return the number of blocks."""
+    if block_size <= 0:
+        raise ValueError("block_size must be positive")
+    blocks = 0
+    with source.open("rb") as reader, target.open("wb") as writer:
+        members = _ordered(
+            _read_blocks(reader, block_size),
+            lambda data: compress_block(data, level),
+            threads or default_threads(),
+        )
+        for member in members:
+            writer.write(member)
+            blocks += 1
+        if blocks == 0:
+            writer.write(compress_block(b"", level))
+            blocks = 1
+    return blocks
+
+
+def read_index(path: Path) -> list[Block]:
+    """Walk member headers; raise BlockZipError if the file is not block-compressed."""
+    blocks: list[Block] = []
+    total = path.stat().st_size
+    with path.open("rb") as handle:
+        offset = 0
+        while offset < total:
+            handle.seek(offset)
+            raw = handle.read(HEADER_SIZE)
+            if len(raw) < HEADER_SIZE:
+                raise BlockZipError(f"Truncated block header at offset {offset}")
+            id1, id2, method, flags, _mtime, _xfl, _os, xlen, subfield, sublen = _HEADER.unpack(
+                raw[:_HEADER.size]
+            )
+            if (
+                (id1, id2, method, flags) != (0x1F, 0x8B, 8, 0x04)
+                or xlen != 4 + _FIELDS.size
+                or subfield != SUBFIELD_ID
+                or sublen != _FIELDS.size
+            ):
+                raise BlockZipError(f"{path.name} is not block-compressed at offset {offset}")
+            size, raw_size = _FIELDS.unpack(raw[_HEADER.size:])
+            if size < HEADER_SIZE + _TRAILER.size or offset + size > total:
+                raise BlockZipError(f"Block at offset {offset} runs past the end of {path.name}")
+            blocks.append(Block(offset, size, raw_size))
+            offset += size
+    if not blocks:
+        raise BlockZipError(f"{path.name} is empty")
+    return blocks
+
+
+def is_block_file(path: Path) -> bool:
+    try:
+        read_index(path)
+    except (OSError, BlockZipError):
+        return False
+    return True
+
+
+def _members(path: Path, blocks: list[Block]) -> Iterator[tuple[Block, bytes]]:
+    with path.open("rb") as handle:
+        for block in blocks:
+            handle.seek(block.offset)
+            yield block, handle.read(block.size)
+
+
+def _inflate(path: Path, threads: int | None) -> Iterator[bytes]:
+    blocks = read_index(path)
+    yield from _ordered(
+        _members(path, blocks),
+        lambda item: decompress_block(item[1], item[0]),
+        threads or default_threads(),
+    )
+
+
+def verify_file(path: Path, *, threads: int | None = None) -> int:
+    """Inflate every block in parallel and return the total raw size."""
+    return sum(len(data) for data in _inflate(path, threads))
+
+
+def extract_file(source: Path, target: Path, *, threads: int | None = None) -> int:
+    """Decompress ``source`` into ``target``; plain gzip files stream single-threaded."""
+    written = 0
+    with target.open("wb") as writer:
+        if is_block_file(source):
+            for data in _inflate(source, threads):
+                writer.write(data)
+                written += len(data)
+        else:
+            with gzip.open(source, "rb") as reader:
+                shutil.copyfileobj(reader, writer, length=1024 * 1024)
+            written = writer.tell()
+    return written
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Block-parallel gzip compression")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compress = commands.add_parser("compress")
+    compress.add_argument("source")
+    compress.add_argument("target")
+    compress.add_argument("--level", type=int, default=6)
+    compress.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    compress.add_argument("--threads", type=int, default=default_threads())
+    extract = commands.add_parser("extract")
+    extract.add_argument("source")
+    extract.add_argument("target")
+    extract.add_argument("--threads", type=int, default=default_threads())
+    verify = commands.add_parser("verify")
+    verify.add_argument("source")
+    verify.add_argument("--threads", type=int, default=default_threads())
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "compress":
+        blocks = compress_file(
+            Path(args.source),
+            Path(args.target),
+            level=args.level,
+            block_size=args.block_size,
+            threads=args.threads,
+        )
+        print(f"OK: {args.source} -> {args.target} ({blocks} blocks)")
+    elif args.command == "extract":
+        size = extract_file(Path(args.source), Path(args.target), threads=args.threads)
+        print(f"OK: {args.source} -> {args.target} ({size} bytes)")
+    else:
+        size = verify_file(Path(args.source), threads=args.threads)
+        print(f"OK: {args.source} verified ({size} raw bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
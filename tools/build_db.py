@@ -18,18 +18,28 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from forglory import best_growth, columnar  # noqa: E402
 from forglory.schema import (  # noqa: E402
     BEST_PARAMS,
+    BROTHERHOOD_ID_KEYS,
+    BROTHERHOOD_KEYS,
+    CLAN_ID_KEYS,
+    CLAN_KEYS,
+    NAME_KEYS,
     NUMERIC_FIELDS,
     PARAM_TO_COLUMN,
     STAT_COLUMNS,
     parse_int,
+    pick_group_id,
     pick_numeric,
     pick_text,
 )
 
 SCHEMA_VERSION = 3
-DT_RE = re.compile(r"heroes_(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})\.(?:json|json\.gz)$")
+# Both engines fill best_growth with the same rows in the same order; see
+# forglory/best_growth.py and tools/benchmark_best_growth.py.
+BEST_GROWTH_ENGINES = ("sql", "array")
+DT_RE = re.compile(r"heroes_(\d{4}-\d{2}-\d{2})_(\d{2}-\d{2}-\d{2})\.(?:json|json\.gz|fgcol)$")
 
 
 def parse_dt_from_name(name: str) -> datetime | None:
@@ -47,20 +57,38 @@ def parse_dt_from_name(name: str) -> datetime | None:
 
 
 def list_snapshot_files(data_dir: Path) -> list[tuple[Path, int]]:
+    """Pick one file per snapshot: gzip JSON, plain JSON, then the columnar archive."""
     best_by_base: dict[str, Path] = {}
-    for path in [*data_dir.glob("heroes_*.json"), *data_dir.glob("heroes_*.json.gz")]:
+    for path in [
+        *data_dir.glob("heroes_*.json"),
+        *data_dir.glob("heroes_*.json.gz"),
+        *data_dir.glob(f"heroes_*{columnar.SUFFIX}"),
+    ]:
         dt = parse_dt_from_name(path.name)
         if not dt:
             continue
-        base = path.name[:-3] if path.name.endswith(".gz") else path.name
+        if path.name.endswith(columnar.SUFFIX):
+            base = path.name[: -len(columnar.SUFFIX)] + ".json"
+        else:
+            base = path.name[:-3] if path.name.endswith(".gz") else path.name
         previous = best_by_base.get(base)
-        if previous is None or (path.name.endswith(".gz") and not previous.name.endswith(".gz")):
+        if previous is None or _snapshot_file_rank(path) < _snapshot_file_rank(previous):
             best_by_base[base] = path
     items = [(path, int(parse_dt_from_name(path.name).timestamp())) for path in best_by_base.values()]
     return sorted(items, key=lambda item: item[1])
 
 
+def _snapshot_file_rank(path: Path) -> int:
+    if path.name.endswith(".json.gz"):
+        return 0
+    if path.name.endswith(".json"):
+        return 1
+    return 2
+
+
 def load_snapshot(path: Path) -> dict[str, dict[str, Any]]:
+    if path.name.endswith(columnar.SUFFIX):
+        return columnar.load_heroes(path)
     opener = gzip.open if path.suffix == ".gz" else open
     with opener(path, "rt", encoding="utf-8") as handle:
         return json.load(handle)
@@ -74,6 +102,19 @@ def file_sha256(path: Path) -> str:
     return digest.hexdigest()
 
 
+def snapshot_identity(path: Path) -> tuple[str, str]:
+    """Return the snapshot filename and source hash recorded in the database.
+
+    Columnar archives converted from JSON keep the original name and hash, so
+    switching an archive over to them does not re-import any snapshot.
+    """
+    if path.name.endswith(columnar.SUFFIX):
+        header = columnar.read_header(path)
+        name = header.get("source_name") or path.name[: -len(columnar.SUFFIX)] + ".json.gz"
+        return str(name), str(header.get("source_sha256") or file_sha256(path))
+    return path.name, file_sha256(path)
+
+
 def normalize_text(value: str) -> str:
     return " ".join(value.casefold().split())
 
@@ -316,6 +357,8 @@ def metadata_for_snapshot(path: Path) -> dict[str, Any] | None:
         meta_name = base[:-8] + ".meta.json"
     elif base.endswith(".json"):
         meta_name = base[:-5] + ".meta.json"
+    elif base.endswith(columnar.SUFFIX):
+        meta_name = base[: -len(columnar.SUFFIX)] + ".meta.json"
     else:
         return None
     meta_path = path.with_name(meta_name)
@@ -370,19 +413,10 @@ def import_snapshot_dict(
     rows: list[tuple[Any, ...]] = []
     pids: list[int] = []
     for pid_raw, hero in data.items():
-        pid = parse_int(pid_raw)
-        if pid is None:
-            pid = parse_int(hero.get("ID"))
-        if pid is None:
+        observation = observation_values(pid_raw, hero)
+        if observation is None:
             continue
-        name = pick_text(hero, ("Имя", "имя", "name", "nick", "Ник"))
-        clan = pick_text(hero, ("Клан", "clan"))
-        brotherhood = pick_text(hero, ("Братство", "brotherhood"))
-        clan_game_id = parse_int(hero.get("clan_id") or hero.get("Клан_id") or hero.get("клан_id"))
-        brotherhood_game_id = parse_int(
-            hero.get("brotherhood_id") or hero.get("Братство_id") or hero.get("братство_id")
-        )
-        numeric = [pick_numeric(hero, field) for field in NUMERIC_FIELDS]
+        pid, name, clan, clan_game_id, brotherhood, brotherhood_game_id, *numeric = observation
         rows.append(
             (
                 snapshot_id,
@@ -402,6 +436,35 @@ def import_snapshot_dict(
     if rows:
         conn.executemany(sql, rows)
 
+    record_snapshot_metadata(conn, snapshot_id, metadata)
+    return snapshot_id, pids
+
+
+def observation_values(pid_raw: Any, hero: dict[str, Any]) -> tuple[Any, ...] | None:
+    """Normalize one snapshot hero to (pid, name, clan, clan_game_id,
+    brotherhood, brotherhood_game_id, *numeric) or None without a player ID."""
+    pid = parse_int(pid_raw)
+    if pid is None:
+        pid = parse_int(hero.get("ID"))
+    if pid is None:
+        return None
+    return (
+        pid,
+        pick_text(hero, NAME_KEYS),
+        pick_text(hero, CLAN_KEYS),
+        pick_group_id(hero, CLAN_ID_KEYS),
+        pick_text(hero, BROTHERHOOD_KEYS),
+        pick_group_id(hero, BROTHERHOOD_ID_KEYS),
+        *(pick_numeric(hero, field) for field in NUMERIC_FIELDS),
+    )
+
+
+def record_snapshot_metadata(
+    conn: sqlite3.Connection,
+    snapshot_id: int,
+    metadata: dict[str, Any] | None,
+) -> None:
+    """Store the collection failures and probe watermark of a snapshot."""
     if metadata:
         failure_rows = []
         for group in (metadata.get("failures", []), metadata.get("achievement_failures", [])):
@@ -429,7 +492,6 @@ def import_snapshot_dict(
                 "ON CONFLICT(key) DO UPDATE SET value=MAX(value,excluded.value)",
                 (highest,),
             )
-    return snapshot_id, pids
 
 
 def update_registry_incremental(
@@ -516,7 +578,12 @@ def compute_best_growth(
     best_for_snapshot_id: int,
     window_days: int = 30,
     max_gap_hours: float = 26.0,
+    engine: str = "sql",
 ) -> None:
+    if engine not in BEST_GROWTH_ENGINES:
+        raise ValueError(f"Unknown best-growth engine {engine!r}; expected one of {', '.join(BEST_GROWTH_ENGINES)}")
+    if engine == "array" and not best_growth.available():
+        raise RuntimeError("The array best-growth engine needs NumPy")
     latest = conn.execute(
         "SELECT ts FROM snapshots WHERE snapshot_id=?", (best_for_snapshot_id,)
     ).fetchone()
@@ -531,6 +598,12 @@ def compute_best_growth(
     conn.execute("DELETE FROM best_growth")
     if len(snapshots) < 2:
         return
+    # The array engine declines snapshots holding values it cannot carry
+    # exactly; the SQL upsert below handles those.
+    if engine == "array" and best_growth.compute_best_growth_arrays(
+        conn, best_for_snapshot_id, [(int(sid), int(ts)) for sid, ts in snapshots], BEST_PARAMS, max_gap_hours
+    ):
+        return
 
     dynamic_columns = []
     for index, _param in enumerate(BEST_PARAMS):
@@ -689,6 +762,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--db-path", default="data/db/ratings.sqlite")
     parser.add_argument("--best-window-days", type=int, default=30)
     parser.add_argument("--max-gap-hours", type=float, default=26.0)
+    parser.add_argument(
+        "--best-growth-engine",
+        choices=BEST_GROWTH_ENGINES,
+        default="sql",
+        help="Compute best_growth with the SQL upsert or with NumPy arrays (same result)",
+    )
     parser.add_argument("--replace", action="store_true", help="Replace snapshots whose files changed")
     parser.add_argument("--rebuild", action="store_true", help="Delete and rebuild the database")
     parser.add_argument("--vacuum", action="store_true")
@@ -720,10 +799,10 @@ def main() -> int:
         out_of_order = False
 
         for path, ts in files:
+            filename, digest = snapshot_identity(path)
             current = conn.execute(
-                "SELECT source_sha256 FROM snapshots WHERE filename=?", (path.name,)
+                "SELECT source_sha256 FROM snapshots WHERE filename=?", (filename,)
             ).fetchone()
-            digest = file_sha256(path)
             if current and not args.replace and current[0] == digest:
                 skipped += 1
                 continue
@@ -735,7 +814,7 @@ def main() -> int:
             try:
                 sid, pids = import_snapshot_dict(
                     conn,
-                    path.name,
+                    filename,
                     ts,
                     data,
                     digest,
@@ -754,7 +833,7 @@ def main() -> int:
             except Exception:
                 conn.execute("ROLLBACK")
                 raise
-            imported.append(path.name)
+            imported.append(filename)
             print(f"Imported {path.name}: {len(data)} players")
             del data
 
@@ -773,6 +852,7 @@ def main() -> int:
                 int(latest[0]),
                 window_days=args.best_window_days,
                 max_gap_hours=args.max_gap_hours,
+                engine=args.best_growth_engine,
             )
             conn.execute("COMMIT")
 
@@ -2,18 +2,30 @@
 from __future__ import annotations
 
 import argparse
-import gzip
 import os
-import shutil
 import sqlite3
+import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.blockzip import BLOCK_SIZE, compress_file, default_threads, verify_file  # noqa: E402
+
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Validate and deterministically gzip a SQLite database")
     parser.add_argument("--db", default="data/db/ratings.sqlite")
     parser.add_argument("--out", default="data/db/ratings.sqlite.gz")
     parser.add_argument("--level", type=int, default=6)
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=BLOCK_SIZE,
+        help="Raw bytes per gzip member; keep it fixed so release hashes stay reproducible",
+    )
+    parser.add_argument("--threads", type=int, default=default_threads())
     args = parser.parse_args()
 
     db_path = Path(args.db)
@@ -31,17 +43,21 @@ def main() -> int:
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
     temp_path = out_path.with_suffix(out_path.suffix + ".tmp")
-    with db_path.open("rb") as source, temp_path.open("wb") as raw_target:
-        with gzip.GzipFile(
-            filename=db_path.name,
-            mode="wb",
-            fileobj=raw_target,
-            compresslevel=max(1, min(9, args.level)),
-            mtime=0,
-        ) as target:
-            shutil.copyfileobj(source, target, length=1024 * 1024)
+    blocks = compress_file(
+        db_path,
+        temp_path,
+        level=args.level,
+        block_size=args.block_size,
+        threads=args.threads,
+    )
+    raw_size = verify_file(temp_path, threads=args.threads)
+    if raw_size != db_path.stat().st_size:
+        temp_path.unlink(missing_ok=True)
+        raise SystemExit(
+            f"Compressed database verification failed: {raw_size} != {db_path.stat().st_size} bytes"
+        )
     os.replace(temp_path, out_path)
-    print(f"OK: {db_path} -> {out_path} ({out_path.stat().st_size} bytes)")
+    print(f"OK: {db_path} -> {out_path} ({out_path.stat().st_size} bytes, {blocks} blocks)")
     return 0
 
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory import columnar  # noqa: E402
+from tools.build_db import file_sha256, list_snapshot_files, load_snapshot  # noqa: E402
+
+
+def json_snapshots(data_dir: Path) -> list[Path]:
+    return [
+        path
+        for path, _ts in list_snapshot_files(data_dir)
+        if not path.name.endswith(columnar.SUFFIX)
+    ]
+
+
+def _dependents(data_dir: Path) -> dict[str, list[Path]]:
+    """Map each archive name to the archives delta-encoded directly against it."""
+    dependents: dict[str, list[Path]] = {}
+    for path in sorted(data_dir.glob(f"heroes_*{columnar.SUFFIX}")):
+        try:
+            base = columnar.read_header(path).get("base")
+        except (OSError, ValueError):
+            continue
+        if base:
+            dependents.setdefault(str(base), []).append(path)
+    return dependents
+
+
+def _decode_orphaned_dependents(
+    archive_path: Path,
+    dependents: dict[str, list[Path]],
+    pending: dict[str, columnar.ColumnarSnapshot],
+) -> None:
+    """Decode the archives without JSON that depend on ``archive_path``.
+
+    They have to be read while the chain they were written against still
+    exists; once ``archive_path`` is rewritten they can only be re-encoded
+    from these values.
+    """
+    cache: dict = {}
+    queue = list(dependents.get(archive_path.name, ()))
+    while queue:
+        path = queue.pop(0)
+        queue.extend(dependents.get(path.name, ()))
+        if path.name in pending:
+            continue
+        has_json = any(
+            path.with_name(path.name[: -len(columnar.SUFFIX)] + suffix).exists()
+            for suffix in (".json.gz", ".json")
+        )
+        if not has_json:
+            pending[path.name] = columnar.read_snapshot(path, _cache=cache)
+
+
+def convert_archive(
+    data_dir: Path,
+    *,
+    max_depth: int = 6,
+    force: bool = False,
+    remove_json: bool = False,
+) -> dict[str, int]:
+    """Convert every JSON snapshot into a verified columnar archive.
+
+    Archives are delta-encoded against the previous snapshot; a full keyframe
+    is written whenever the delta chain would exceed ``max_depth``. An archive
+    is only current while its source hash matches and its base still has the
+    hash it was encoded against, so rewriting an archive re-encodes every
+    archive built on it, including those whose JSON is already removed.
+    """
+    stats = {"converted": 0, "skipped": 0, "removed_json": 0, "json_bytes": 0, "columnar_bytes": 0}
+    dependents = _dependents(data_dir)
+    pending: dict[str, columnar.ColumnarSnapshot] = {}
+    digests: dict[str, str] = {}
+    previous_archive: Path | None = None
+    for path, _ts in list_snapshot_files(data_dir):
+        from_json = not path.name.endswith(columnar.SUFFIX)
+        archive_path = path.with_name(columnar.archive_name(path.name)) if from_json else path
+        digest = file_sha256(path) if from_json else None
+        header: dict = {}
+        if archive_path.exists():
+            try:
+                header = columnar.read_header(archive_path)
+            except (OSError, ValueError):
+                header = {}
+        base = header.get("base")
+        base_current = not base or (
+            header.get("base_sha256") is not None
+            and header.get("base_sha256") == digests.get(str(base))
+        )
+        if header and base_current and not force and (not from_json or header.get("source_sha256") == digest):
+            stats["skipped"] += 1
+            stats["json_bytes"] += path.stat().st_size if from_json else 0
+            stats["columnar_bytes"] += archive_path.stat().st_size
+            digests[archive_path.name] = file_sha256(archive_path)
+            previous_archive = archive_path
+            continue
+
+        if from_json:
+            expected = columnar.from_heroes(load_snapshot(path))
+            source_name = path.name
+        else:
+            expected = pending.pop(archive_path.name, None)
+            if expected is None:
+                expected = columnar.read_snapshot(archive_path)
+            source_name = header.get("source_name")
+            digest = header.get("source_sha256")
+        if archive_path.exists():
+            _decode_orphaned_dependents(archive_path, dependents, pending)
+
+        base_path = previous_archive
+        if base_path is not None and int(columnar.read_header(base_path).get("depth") or 0) >= max_depth:
+            base_path = None
+        columnar.write_snapshot(
+            archive_path,
+            expected,
+            base_path=base_path,
+            source_name=source_name,
+            source_sha256=digest,
+        )
+        if not columnar.read_snapshot(archive_path).same_values(expected):
+            if from_json:
+                archive_path.unlink(missing_ok=True)
+            raise RuntimeError(f"Columnar round trip mismatch for {path.name}")
+
+        stats["converted"] += 1
+        stats["json_bytes"] += path.stat().st_size if from_json else 0
+        stats["columnar_bytes"] += archive_path.stat().st_size
+        digests[archive_path.name] = file_sha256(archive_path)
+        if from_json:
+            message = (
+                f"Converted {path.name} -> {archive_path.name}: "
+                f"{path.stat().st_size} -> {archive_path.stat().st_size} bytes"
+            )
+        else:
+            message = f"Re-encoded {archive_path.name} against its rewritten base"
+        print(message + (f" (delta from {base_path.name})" if base_path else ""))
+        previous_archive = archive_path
+
+    if remove_json:
+        for path in json_snapshots(data_dir):
+            archive_path = path.with_name(columnar.archive_name(path.name))
+            if archive_path.exists() and columnar.read_header(archive_path).get("source_sha256") == file_sha256(path):
+                path.unlink()
+                stats["removed_json"] += 1
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Convert heroes_*.json(.gz) snapshots into columnar .fgcol archives"
+    )
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=6,
+        help="Longest delta chain before a full keyframe archive is written",
+    )
+    parser.add_argument("--force", action="store_true", help="Rewrite archives that are already current")
+    parser.add_argument(
+        "--remove-json",
+        action="store_true",
+        help="Delete JSON snapshots once a verified archive with the same source hash exists",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    stats = convert_archive(
+        Path(args.data_dir),
+        max_depth=max(0, args.max_depth),
+        force=args.force,
+        remove_json=args.remove_json,
+    )
+    print(
+        "OK: converted={converted}, skipped={skipped}, removed_json={removed_json}, "
+        "json_bytes={json_bytes}, columnar_bytes={columnar_bytes}".format(**stats)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Per-snapshot delta patches between two published ratings databases.
+
+A patch is a gzip-compressed SQLite file. For every replicated table it holds
+``upsert_<table>`` with rows that are new or changed in the target database and
+``delete_<table>`` with primary keys that disappeared. ``patch_meta`` records
+the content digests of the base and the result, so a client only applies a
+patch to the exact database it was cut from and can prove the outcome.
+
+Digests cover table contents, not file bytes: two databases with the same rows
+share a digest even when SQLite laid out their pages differently. The digest
+is built from one hash per table, and one per snapshot for ``observations``.
+A client keeps those part hashes next to its database, so verifying a patch
+only rehashes the parts the patch touched instead of the whole database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+PATCH_FORMAT = 1
+MANIFEST_NAME = "ratings.patches.json"  # of the full database; see manifest_name()
+DEFAULT_CHAIN_LENGTH = 14
+
+# Parents come before children; deletes run in reverse order.
+PATCH_TABLES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("schema_meta", ("key",)),
+    ("snapshots", ("snapshot_id",)),
+    ("text_values", ("text_id",)),
+    ("players", ("pid",)),
+    ("scan_state", ("key",)),
+    ("collection_failures", ("snapshot_id", "pid", "stage", "error_type")),
+    ("observations", ("snapshot_id", "pid")),
+    ("best_growth", ("best_for_snapshot_id", "param", "pid")),
+)
+# Tables hashed in one part per value of this column rather than as a whole.
+PARTITION_COLUMNS = {"observations": "snapshot_id"}
+
+
+class PatchError(RuntimeError):
+    pass
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _connect_ro(path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{path.resolve().as_posix()}?mode=ro", uri=True)
+
+
+def table_columns(conn: sqlite3.Connection, table: str, schema: str = "main") -> list[str]:
+    return sorted(str(row[1]) for row in conn.execute(f"PRAGMA {schema}.table_info({table})"))
+
+
+def _hash_rows(rows: Any) -> str | None:
+    digest = hashlib.sha256()
+    empty = True
+    for row in rows:
+        digest.update(json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        digest.update(b"\n")
+        empty = False
+    return None if empty else digest.hexdigest()
+
+
+def _table_parts(
+    conn: sqlite3.Connection,
+    table: str,
+    keys: tuple[str, ...],
+    partitions: list[Any] | None = None,
+) -> dict[str, str | None]:
+    """Hash ``table``; None marks a part that no longer has rows."""
+    columns = table_columns(conn, table)
+    parts: dict[str, str | None] = {
+        table: hashlib.sha256(json.dumps([table, columns]).encode("utf-8")).hexdigest()
+    }
+    if not columns:
+        return parts
+    select = f"SELECT {','.join(columns)} FROM {table}"
+    order = f"ORDER BY {','.join(keys)}"
+    column = PARTITION_COLUMNS.get(table)
+    if column is None:
+        parts[f"{table}/rows"] = _hash_rows(conn.execute(f"{select} {order}"))
+        return parts
+    if partitions is None:
+        partitions = [value for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM {table}")]
+    for value in partitions:
+        parts[f"{table}/{value}"] = _hash_rows(conn.execute(f"{select} WHERE {column}=? {order}", (value,)))
+    return parts
+
+
+def content_parts(path: Path, touched: dict[str, list[Any] | None] | None = None) -> dict[str, str | None]:
+    """Hash the replicated tables of ``path``, or only the ``touched`` parts.
+
+    ``touched`` maps a table to the partition values to rehash, or to None
+    for the whole table.
+    """
+    conn = _connect_ro(path)
+    try:
+        parts: dict[str, str | None] = {}
+        for table, keys in PATCH_TABLES:
+            if touched is None:
+                parts.update(_table_parts(conn, table, keys))
+            elif table in touched:
+                parts.update(_table_parts(conn, table, keys, touched[table]))
+        return parts
+    finally:
+        conn.close()
+
+
+def combine_parts(parts: dict[str, str | None]) -> str:
+    listed = sorted((name, value) for name, value in parts.items() if value is not None)
+    return hashlib.sha256(json.dumps(listed, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def content_digest(path: Path) -> str:
+    """Hash every replicated table in primary-key order with sorted column names."""
+    return combine_parts(content_parts(path))
+
+
+def digest_sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".digest.json")
+
+
+def cached_content_parts(path: Path) -> dict[str, str]:
+    """Return the part hashes, reusing a sidecar while the file bytes are unchanged."""
+    file_digest = file_sha256(path)
+    try:
+        cached = json.loads(digest_sidecar(path).read_text(encoding="utf-8"))
+        parts = cached.get("parts")
+        if cached.get("sha256") == file_digest and isinstance(parts, dict) and parts:
+            return {str(name): str(value) for name, value in parts.items()}
+    except (OSError, json.JSONDecodeError):
+        pass
+    parts = {name: value for name, value in content_parts(path).items() if value is not None}
+    remember_content_parts(path, parts, file_digest)
+    return parts
+
+
+def cached_content_digest(path: Path) -> str:
+    return combine_parts(cached_content_parts(path))
+
+
+def remember_content_parts(path: Path, parts: dict[str, str], file_digest: str | None = None) -> None:
+    payload = {
+        "sha256": file_digest or file_sha256(path),
+        "content_digest": combine_parts(parts),
+        "parts": parts,
+    }
+    try:
+        digest_sidecar(path).write_text(json.dumps(payload), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def _quoted(columns: list[str] | tuple[str, ...]) -> str:
+    return ",".join(columns)
+
+
+def create_patch(base_path: Path, target_path: Path, out_path: Path) -> dict[str, Any]:
+    """Write a patch that turns ``base_path`` into ``target_path``."""
+    base_digest = content_digest(base_path)
+    result_digest = content_digest(target_path)
+    work_path = out_path.with_name(out_path.name + ".sqlite.tmp")
+    work_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(f"file:{work_path.resolve().as_posix()}", uri=True)
+    stats: dict[str, int] = {}
+    try:
+        conn.execute("ATTACH DATABASE ? AS base", (f"file:{base_path.resolve().as_posix()}?mode=ro",))
+        conn.execute("ATTACH DATABASE ? AS target", (f"file:{target_path.resolve().as_posix()}?mode=ro",))
+        conn.execute("BEGIN")
+        conn.execute("CREATE TABLE patch_meta(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for table, keys in PATCH_TABLES:
+            columns = table_columns(conn, table, "target")
+            if columns != table_columns(conn, table, "base"):
+                raise PatchError(f"{table} columns changed; publish a full database instead")
+            column_list = _quoted(columns)
+            key_list = _quoted(keys)
+            conn.execute(f"CREATE TABLE upsert_{table}({column_list})")
+            conn.execute(f"CREATE TABLE delete_{table}({key_list})")
+            upserts = conn.execute(
+                f"""
+                INSERT INTO upsert_{table}({column_list})
+                SELECT {column_list} FROM target.{table}
+                EXCEPT
+                SELECT {column_list} FROM base.{table}
+                """
+            ).rowcount
+            deletes = conn.execute(
+                f"""
+                INSERT INTO delete_{table}({key_list})
+                SELECT {key_list} FROM base.{table}
+                EXCEPT
+                SELECT {key_list} FROM target.{table}
+                """
+            ).rowcount
+            stats[f"{table}_upserts"] = max(0, upserts)
+            stats[f"{table}_deletes"] = max(0, deletes)
+        latest = conn.execute(
+            "SELECT filename FROM target.snapshots ORDER BY ts DESC LIMIT 1"
+        ).fetchone()
+        meta = {
+            "format": str(PATCH_FORMAT),
+            "base_digest": base_digest,
+            "result_digest": result_digest,
+            "latest_snapshot": str(latest[0]) if latest else "",
+        }
+        conn.executemany("INSERT INTO patch_meta(key,value) VALUES(?,?)", meta.items())
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE base")
+        conn.execute("DETACH DATABASE target")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    temp_path = out_path.with_name(out_path.name + ".tmp")
+    with work_path.open("rb") as source, temp_path.open("wb") as raw_target:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw_target, compresslevel=9, mtime=0) as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+    work_path.unlink(missing_ok=True)
+    os.replace(temp_path, out_path)
+    return {**meta, **stats, "size": out_path.stat().st_size, "sha256": file_sha256(out_path)}
+
+
+def read_patch_meta(patch_db: Path) -> dict[str, str]:
+    conn = _connect_ro(patch_db)
+    try:
+        return {str(key): str(value) for key, value in conn.execute("SELECT key,value FROM patch_meta")}
+    finally:
+        conn.close()
+
+
+def _apply_unpacked(db_path: Path, patch_db: Path) -> dict[str, list[Any] | None]:
+    conn = sqlite3.connect(f"file:{db_path.resolve().as_posix()}", uri=True)
+    try:
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("ATTACH DATABASE ? AS patch", (f"file:{patch_db.resolve().as_posix()}?mode=ro",))
+        touched = _touched_parts(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        for table, keys in reversed(PATCH_TABLES):
+            key_list = _quoted(keys)
+            conn.execute(
+                f"DELETE FROM main.{table} WHERE ({key_list}) IN "
+                f"(SELECT {key_list} FROM patch.delete_{table})"
+            )
+        for table, _keys in PATCH_TABLES:
+            columns = table_columns(conn, f"upsert_{table}", "patch")
+            if not columns:
+                continue
+            column_list = _quoted(columns)
+            conn.execute(
+                f"INSERT OR REPLACE INTO main.{table}({column_list}) "
+                f"SELECT {column_list} FROM patch.upsert_{table}"
+            )
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE patch")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return touched
+
+
+def _touched_parts(conn: sqlite3.Connection) -> dict[str, list[Any] | None]:
+    """The parts a patch changes: partition values, or None for a whole table."""
+    touched: dict[str, list[Any] | None] = {}
+    for table, _keys in PATCH_TABLES:
+        column = PARTITION_COLUMNS.get(table)
+        if column is not None:
+            values = [value for (value,) in conn.execute(
+                f"SELECT {column} FROM patch.upsert_{table} UNION SELECT {column} FROM patch.delete_{table}"
+            )]
+            if values:
+                touched[table] = values
+        elif conn.execute(
+            f"SELECT 1 FROM patch.upsert_{table} UNION ALL SELECT 1 FROM patch.delete_{table} LIMIT 1"
+        ).fetchone():
+            touched[table] = None
+    return touched
+
+
+def apply_patch(db_path: Path, patch_path: Path) -> str:
+    """Apply one gzip patch in place and return the verified result digest.
+
+    The base is identified by the part hashes remembered next to
+    ``db_path``, so after the first patch only the touched parts are hashed.
+    """
+    unpacked = db_path.with_name(db_path.name + ".patch.sqlite")
+    try:
+        with gzip.open(patch_path, "rb") as source, unpacked.open("wb") as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        meta = read_patch_meta(unpacked)
+        if meta.get("format") != str(PATCH_FORMAT):
+            raise PatchError(f"Unsupported patch format {meta.get('format')!r}")
+        parts = cached_content_parts(db_path)
+        base = combine_parts(parts)
+        if base != meta.get("base_digest"):
+            raise PatchError(
+                f"{patch_path.name} expects base {meta.get('base_digest')}, local database is {base}"
+            )
+        touched = _apply_unpacked(db_path, unpacked)
+    finally:
+        unpacked.unlink(missing_ok=True)
+    for name, value in content_parts(db_path, touched).items():
+        if value is None:
+            parts.pop(name, None)
+        else:
+            parts[name] = value
+    result = combine_parts(parts)
+    if result != meta.get("result_digest"):
+        digest_sidecar(db_path).unlink(missing_ok=True)
+        raise PatchError(
+            f"{patch_path.name} produced {result}, expected {meta.get('result_digest')}"
+        )
+    remember_content_parts(db_path, parts)
+    return result
+
+
+def patch_chain(manifest: dict[str, Any], local_digest: str) -> list[dict[str, Any]] | None:
+    """Return the patches leading from ``local_digest`` to the newest result, or None."""
+    patches = list(manifest.get("patches") or [])
+    if manifest.get("latest_digest") == local_digest:
+        return []
+    for index, entry in enumerate(patches):
+        if entry.get("base_digest") == local_digest:
+            chain = patches[index:]
+            for previous, current in zip(chain, chain[1:]):
+                if previous.get("result_digest") != current.get("base_digest"):
+                    return None
+            if chain[-1].get("result_digest") != manifest.get("latest_digest"):
+                return None
+            return chain
+    return None
+
+
+def update_manifest(
+    previous: dict[str, Any] | None,
+    entry: dict[str, Any],
+    keep: int = DEFAULT_CHAIN_LENGTH,
+) -> dict[str, Any]:
+    patches = list((previous or {}).get("patches") or [])
+    if patches and patches[-1].get("result_digest") != entry["base_digest"]:
+        # The previous chain does not end at this patch's base; start over.
+        patches = []
+    patches.append(entry)
+    return {
+        "format": PATCH_FORMAT,
+        "latest_digest": entry["result_digest"],
+        "latest_snapshot": entry.get("latest_snapshot"),
+        "patches": patches[-max(1, keep):],
+    }
+
+
+def patch_prefix(asset: str) -> str:
+    """``ratings-hot.sqlite.gz`` -> ``ratings-hot``; an asset's patches and manifest share it."""
+    return asset.split(".", 1)[0] or "ratings"
+
+
+def manifest_name(prefix: str = "ratings") -> str:
+    return f"{prefix}.patches.json"
+
+
+def patch_asset_name(latest_snapshot: str, prefix: str = "ratings") -> str:
+    stem = latest_snapshot.split(".", 1)[0] or "snapshot"
+    return f"{prefix}-patch-{stem}.sqlite.gz"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Create or apply ratings database patches")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Diff two databases into a patch and update the manifest")
+    create.add_argument("--base", required=True, help="The previously published database")
+    create.add_argument("--db", default="data/db/ratings.sqlite")
+    create.add_argument("--out-dir", default="data/db/patches")
+    create.add_argument("--previous-manifest", help="Manifest downloaded from the current release")
+    create.add_argument("--keep", type=int, default=DEFAULT_CHAIN_LENGTH)
+    create.add_argument(
+        "--prefix",
+        default="ratings",
+        help="Name shared by the database asset, its patches and manifest, e.g. ratings-hot",
+    )
+
+    apply = commands.add_parser("apply", help="Apply one patch file to a database in place")
+    apply.add_argument("--db", default="data/db/ratings.sqlite")
+    apply.add_argument("--patch", required=True)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "apply":
+        digest = apply_patch(Path(args.db), Path(args.patch))
+        print(f"OK: {args.db} patched; content_digest={digest}")
+        return 0
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / manifest_name(args.prefix)
+    previous = None
+    if args.previous_manifest and Path(args.previous_manifest).exists():
+        try:
+            previous = json.loads(Path(args.previous_manifest).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            previous = None
+
+    db_path = Path(args.db)
+    base = Path(args.base)
+    probe = _connect_ro(db_path)
+    try:
+        latest = probe.execute("SELECT filename FROM snapshots ORDER BY ts DESC LIMIT 1").fetchone()
+    finally:
+        probe.close()
+    latest_snapshot = str(latest[0]) if latest else ""
+    asset = patch_asset_name(latest_snapshot, args.prefix)
+    try:
+        if not base.exists():
+            raise PatchError(f"No base database at {base}")
+        details = create_patch(base, db_path, out_dir / asset)
+    except (PatchError, OSError, sqlite3.Error) as exc:
+        # A stale manifest would tell clients that the old database is
+        # current, so publish an empty chain that forces a full download.
+        (out_dir / asset).unlink(missing_ok=True)
+        manifest = {
+            "format": PATCH_FORMAT,
+            "latest_digest": content_digest(db_path),
+            "latest_snapshot": latest_snapshot,
+            "patches": [],
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        print(f"OK: no patch for {latest_snapshot} ({exc}); manifest reset")
+        return 0
+
+    entry = {
+        "asset": asset,
+        "latest_snapshot": details["latest_snapshot"],
+        "base_digest": details["base_digest"],
+        "result_digest": details["result_digest"],
+        "size": details["size"],
+        "sha256": details["sha256"],
+    }
+    manifest = update_manifest(previous, entry, args.keep)
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(
+        f"OK: {asset} ({details['size']} bytes); observations_upserts="
+        f"{details['observations_upserts']}, best_growth_upserts={details['best_growth_upserts']}, "
+        f"players_upserts={details['players_upserts']}, chain={len(manifest['patches'])}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
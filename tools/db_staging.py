@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""Stage a collected snapshot in the ratings database and promote it atomically.
+
+Direct-to-SQLite collection (``--output sqlite``) writes normalized
+observations to ``staged_observations`` instead of a heroes_*.json.gz file.
+``promote`` runs the snapshot name checks of ``profile_name_guard.py`` on the
+staged rows and then moves them into ``snapshots``/``observations`` in one
+transaction, so a rejected or interrupted collection never reaches the
+published tables. ``tools/export_snapshot_from_db.py`` writes the JSON archive
+when one is wanted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory.schema import NUMERIC_FIELDS  # noqa: E402
+from tools.build_db import (  # noqa: E402
+    init_db,
+    normalize_text,
+    observation_values,
+    parse_dt_from_name,
+    rebuild_player_registry,
+    record_snapshot_metadata,
+    update_registry_incremental,
+)
+from tools.profile_name_guard import check_name_distribution, normalize_name  # noqa: E402
+
+TEXT_COLUMNS = ("name", "clan", "brotherhood")
+STAGED_COLUMNS = (
+    "pid", "name", "clan", "clan_game_id", "brotherhood", "brotherhood_game_id",
+    *(field.column for field in NUMERIC_FIELDS),
+)
+
+
+class StagingError(RuntimeError):
+    pass
+
+
+def init_staging(conn: sqlite3.Connection) -> None:
+    init_db(conn)
+    numeric_columns = ",\n".join(f"{field.column} INTEGER" for field in NUMERIC_FIELDS)
+    conn.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS staged_snapshots(
+            filename TEXT PRIMARY KEY,
+            ts INTEGER NOT NULL,
+            player_count INTEGER NOT NULL,
+            metadata TEXT NOT NULL,
+            staged_at INTEGER NOT NULL DEFAULT (unixepoch())
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS staged_observations(
+            filename TEXT NOT NULL,
+            pid INTEGER NOT NULL,
+            name TEXT,
+            clan TEXT,
+            clan_game_id INTEGER,
+            brotherhood TEXT,
+            brotherhood_game_id INTEGER,
+            {numeric_columns},
+            PRIMARY KEY(filename, pid)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def _drop_empty_staging(conn: sqlite3.Connection) -> None:
+    # The staging tables only exist while a snapshot waits for promotion, so
+    # they never ship inside a published database.
+    if conn.execute("SELECT 1 FROM staged_snapshots LIMIT 1").fetchone() is None:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS staged_observations")
+            conn.execute("DROP TABLE IF EXISTS staged_snapshots")
+
+
+def _clean_text(value: str | None) -> str | None:
+    # Same trimming as build_db.text_id, so promotion interns identical values.
+    if not value:
+        return None
+    return value.strip() or None
+
+
+PENDING_PREFIX = "pending:"
+
+
+class StagingWriter:
+    """Stage one snapshot's rows as they arrive instead of from a finished dict.
+
+    Rows are written under a provisional name in batches, so a collection
+    never holds its heroes in memory. ``finish`` gives them the snapshot's
+    filename and records its metadata; ``discard`` drops them. Rows left
+    behind by a crashed collection are removed by the next writer.
+    """
+
+    def __init__(self, db_path: Path, batch_size: int = 2000) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.pending = f"{PENDING_PREFIX}{os.getpid()}"
+        self.count = 0
+        self._rows: list[tuple[Any, ...]] = []
+        self._conn = sqlite3.connect(db_path)
+        placeholders = ",".join("?" for _ in STAGED_COLUMNS)
+        self._sql = (
+            f"INSERT OR REPLACE INTO staged_observations(filename,{','.join(STAGED_COLUMNS)}) "
+            f"VALUES(?,{placeholders})"
+        )
+        try:
+            init_staging(self._conn)
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM staged_observations WHERE filename LIKE ?", (PENDING_PREFIX + "%",)
+                )
+        except Exception:
+            self._conn.close()
+            raise
+
+    def add(self, pid_raw: Any, hero: dict[str, Any]) -> bool:
+        values = observation_values(pid_raw, hero)
+        if values is None:
+            return False
+        pid, name, clan, clan_game_id, brotherhood, brotherhood_game_id, *numeric = values
+        self._rows.append((
+            self.pending, pid, _clean_text(name), _clean_text(clan), clan_game_id,
+            _clean_text(brotherhood), brotherhood_game_id, *numeric,
+        ))
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+        return True
+
+    def _flush(self) -> None:
+        if self._rows:
+            with self._conn:
+                self._conn.executemany(self._sql, self._rows)
+            self._rows.clear()
+
+    def finish(self, filename: str, metadata: dict[str, Any] | None = None) -> int:
+        """Publish the rows to the staging tables as ``filename``; return the row count."""
+        dt = parse_dt_from_name(filename)
+        if dt is None:
+            raise StagingError(f"Snapshot name has no timestamp: {filename}")
+        self._flush()
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM staged_observations WHERE filename=?", (filename,))
+            count = conn.execute(
+                "UPDATE staged_observations SET filename=? WHERE filename=?", (filename, self.pending)
+            ).rowcount
+            conn.execute(
+                "INSERT OR REPLACE INTO staged_snapshots(filename,ts,player_count,metadata) VALUES(?,?,?,?)",
+                (filename, int(dt.timestamp()), count, json.dumps(metadata or {}, ensure_ascii=False)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return int(count)
+
+    def discard(self) -> None:
+        self._rows.clear()
+        with self._conn:
+            self._conn.execute("DELETE FROM staged_observations WHERE filename=?", (self.pending,))
+        _drop_empty_staging(self._conn)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def stage_snapshot(
+    db_path: Path,
+    filename: str,
+    heroes: dict[Any, dict[str, Any]],
+    metadata: dict[str, Any] | None = None,
+) -> int:
+    """Write one collected snapshot to the staging tables; return the row count."""
+    if parse_dt_from_name(filename) is None:
+        raise StagingError(f"Snapshot name has no timestamp: {filename}")
+    writer = StagingWriter(db_path)
+    try:
+        for pid_raw, hero in heroes.items():
+            writer.add(pid_raw, hero)
+        return writer.finish(filename, metadata)
+    except Exception:
+        writer.discard()
+        raise
+    finally:
+        writer.close()
+
+
+def staged_snapshot_names(conn: sqlite3.Connection) -> list[str]:
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='staged_snapshots'").fetchone():
+        return []
+    return [str(row[0]) for row in conn.execute("SELECT filename FROM staged_snapshots ORDER BY ts")]
+
+
+def validate_staged(conn: sqlite3.Connection, filename: str) -> str:
+    """Apply the snapshot name checks of ``profile_name_guard`` to staged rows."""
+    names: Counter = Counter()
+    total = 0
+    for name, count in conn.execute(
+        "SELECT name,COUNT(*) FROM staged_observations WHERE filename=? GROUP BY name",
+        (filename,),
+    ):
+        names[normalize_name(name)] += int(count)
+        total += int(count)
+    return check_name_distribution(names, total)
+
+
+def _intern_texts(conn: sqlite3.Connection, filename: str) -> None:
+    for column in TEXT_COLUMNS:
+        missing = conn.execute(
+            f"""
+            SELECT DISTINCT s.{column} FROM staged_observations s
+            WHERE s.filename=? AND s.{column} IS NOT NULL
+              AND NOT EXISTS(SELECT 1 FROM text_values t WHERE t.value=s.{column})
+            """,
+            (filename,),
+        ).fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO text_values(value,norm) VALUES(?,?)",
+            ((value, normalize_text(value)) for (value,) in missing),
+        )
+
+
+def promote_snapshot(db_path: Path, filename: str | None = None) -> dict[str, Any]:
+    """Validate the staged snapshot and publish it in a single transaction."""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_staging(conn)
+        staged = staged_snapshot_names(conn)
+        if filename is None:
+            if len(staged) != 1:
+                raise StagingError(f"Expected exactly one staged snapshot, found {len(staged)}")
+            filename = staged[0]
+        row = conn.execute(
+            "SELECT ts,metadata FROM staged_snapshots WHERE filename=?", (filename,)
+        ).fetchone()
+        if row is None:
+            raise StagingError(f"Snapshot is not staged: {filename}")
+        ts, metadata = int(row[0]), json.loads(row[1])
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM snapshots WHERE filename=?", (filename,)).fetchone():
+                raise StagingError(f"Snapshot is already published: {filename}")
+            validation = validate_staged(conn, filename)
+            previous_count, previous_max_ts = conn.execute(
+                "SELECT COUNT(*),MAX(ts) FROM snapshots"
+            ).fetchone()
+            player_count = int(conn.execute(
+                "SELECT COUNT(*) FROM staged_observations WHERE filename=?", (filename,)
+            ).fetchone()[0])
+
+            _intern_texts(conn, filename)
+            snapshot_id = int(conn.execute(
+                "INSERT INTO snapshots(filename,ts,player_count,source_sha256) VALUES(?,?,?,NULL)",
+                (filename, ts, player_count),
+            ).lastrowid)
+            numeric = ",".join(field.column for field in NUMERIC_FIELDS)
+            numeric_select = ",".join(f"s.{field.column}" for field in NUMERIC_FIELDS)
+            conn.execute(
+                f"""
+                INSERT INTO observations(
+                    snapshot_id,pid,name_id,clan_name_id,clan_game_id,
+                    brotherhood_name_id,brotherhood_game_id,{numeric}
+                )
+                SELECT ?,s.pid,n.text_id,c.text_id,s.clan_game_id,b.text_id,s.brotherhood_game_id,
+                       {numeric_select}
+                FROM staged_observations s
+                LEFT JOIN text_values n ON n.value=s.name
+                LEFT JOIN text_values c ON c.value=s.clan
+                LEFT JOIN text_values b ON b.value=s.brotherhood
+                WHERE s.filename=?
+                """,
+                (snapshot_id, filename),
+            )
+            record_snapshot_metadata(conn, snapshot_id, metadata)
+            if previous_max_ts is not None and ts <= int(previous_max_ts):
+                rebuild_player_registry(conn)
+            else:
+                pids = [int(pid) for (pid,) in conn.execute(
+                    "SELECT pid FROM staged_observations WHERE filename=?", (filename,)
+                )]
+                update_registry_incremental(
+                    conn, snapshot_id, pids, baseline_snapshot=int(previous_count) == 0
+                )
+            conn.execute("DELETE FROM staged_observations WHERE filename=?", (filename,))
+            conn.execute("DELETE FROM staged_snapshots WHERE filename=?", (filename,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _drop_empty_staging(conn)
+        return {
+            "snapshot": filename,
+            "snapshot_id": snapshot_id,
+            "players": player_count,
+            "validation": validation,
+            "metadata": metadata,
+        }
+    finally:
+        conn.close()
+
+
+def discard_snapshot(db_path: Path, filename: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        init_staging(conn)
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM staged_observations WHERE filename=?", (filename,)
+            ).rowcount
+            conn.execute("DELETE FROM staged_snapshots WHERE filename=?", (filename,))
+        _drop_empty_staging(conn)
+        return int(removed)
+    finally:
+        conn.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Promote or discard snapshots staged in SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    promote = commands.add_parser("promote")
+    promote.add_argument("--db", default="data/db/ratings.sqlite")
+    promote.add_argument("--snapshot", help="Staged snapshot filename; defaults to the only one")
+    promote.add_argument("--github-output", help="Append snapshot=<filename> to this file")
+    promote.add_argument("--metadata-out", help="Write the collection metadata of the snapshot here")
+    discard = commands.add_parser("discard")
+    discard.add_argument("--db", default="data/db/ratings.sqlite")
+    discard.add_argument("--snapshot", required=True)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        if args.command == "discard":
+            removed = discard_snapshot(Path(args.db), args.snapshot)
+            print(f"OK: discarded {args.snapshot} ({removed} staged rows)")
+            return 0
+        result = promote_snapshot(Path(args.db), args.snapshot)
+    except (StagingError, RuntimeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    if args.metadata_out:
+        metadata_path = Path(args.metadata_out)
+        metadata_path.parent.mkdir(parents=True, exist_ok=True)
+        metadata_path.write_text(
+            json.dumps(result["metadata"], ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    if args.github_output:
+        with open(args.github_output, "a", encoding="utf-8") as output:
+            output.write(f"snapshot={result['snapshot']}\n")
+    print(result["validation"])
+    print(f"OK: promoted {result['snapshot']} ({result['players']} players)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
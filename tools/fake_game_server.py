@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""Local stand-in for the game site, for collector tests and benchmarks.
+
+Serves the pages the collectors read: ``/hero/detail``, ``/achievements``,
+the bulk ``/heroes/for-glory`` endpoint and ``/clan|brotherhood/warriors``,
+all rendered for deterministic synthetic players. Latency, 5xx errors,
+bursts of 429 responses and redirects are injected by one middleware, so a
+benchmark measures the collector under the same conditions every run.
+
+Run it standalone with ``python tools/fake_game_server.py --port 8080`` and
+point a collector at ``http://127.0.0.1:8080/``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from aiohttp import web
+
+GAME_ERROR_PAGE = "<html><title>Викинги</title><body>Что-то пошло не так.</body></html>"
+GROUP_TITLES = {"clan": ("Клан", "Воины клана"), "brotherhood": ("Братство", "Воины братства")}
+BULK_CHUNK_ROWS = 500
+BULK_MIN_LEVEL = 5  # the endpoint only lists level-5+ players
+
+
+@dataclass(frozen=True)
+class FakeGameConfig:
+    players: int = 1000
+    seed: int = 1
+    clan_size: int = 25
+    brotherhood_size: int = 60
+    grouped_ratio: float = 0.7
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_every: int = 0
+    throttle_burst: int = 0
+    retry_after: float = 0.0
+    redirect_rate: float = 0.0
+
+
+@dataclass(frozen=True)
+class FakePlayer:
+    pid: int
+    name: str
+    level: int
+    glory: int
+    wins: int
+    losses: int
+    dragon_wins: int
+    serpent_wins: int
+    strength: int
+    defense: int
+    agility: int
+    mastery: int
+    vitality: int
+    silver_looted: int
+    silver_lost: int
+    crystals_looted: int
+    crystals_lost: int
+    beast_level: int
+    beast_progress: int
+    lord_wins: int
+    clan_id: int
+    brotherhood_id: int
+
+    @property
+    def beasts_killed(self) -> int:
+        # Same formula as forglory.parsing._beast_kills.
+        return self.beast_level * (4 * self.beast_level - 2) // 2 + self.beast_progress
+
+
+def group_name(group_kind: str, group_id: int) -> str:
+    return f"{GROUP_TITLES[group_kind][0]} {group_id}"
+
+
+def synthetic_player(config: FakeGameConfig, pid: int) -> FakePlayer:
+    rng = random.Random(config.seed * 1_000_003 + pid)
+    level = min(80, max(1, int(rng.expovariate(1 / 18)) + 1))
+    wins = rng.randint(0, level * 900)
+    grouped = rng.random() < config.grouped_ratio
+    return FakePlayer(
+        pid=pid,
+        name=f"Игрок {pid}",
+        level=level,
+        glory=wins * rng.randint(5, 30),
+        wins=wins,
+        losses=rng.randint(0, wins // 3 + 10),
+        dragon_wins=rng.randint(0, level * 8),
+        serpent_wins=rng.randint(0, level * 6),
+        strength=rng.randint(level, level * 250),
+        defense=rng.randint(level, level * 250),
+        agility=rng.randint(level, level * 250),
+        mastery=rng.randint(level, level * 250),
+        vitality=rng.randint(level, level * 250),
+        silver_looted=rng.randint(0, level * 200_000),
+        silver_lost=rng.randint(0, level * 50_000),
+        crystals_looted=rng.randint(0, level * 80),
+        crystals_lost=rng.randint(0, level * 20),
+        beast_level=rng.randint(1, 12),
+        beast_progress=rng.randint(0, 9),
+        lord_wins=rng.randint(0, level * 40),
+        clan_id=1 + (pid - 1) // config.clan_size if grouped and config.clan_size else 0,
+        brotherhood_id=(
+            1 + (pid - 1) // config.brotherhood_size if grouped and config.brotherhood_size else 0
+        ),
+    )
+
+
+def _number(value: int) -> str:
+    return f"{value:,}".replace(",", " ")
+
+
+def _stat(image: str, text: str) -> str:
+    return (
+        f'<div class="grid grid-cols-profileStat"><span><img src="/img/{image}.png" alt=""></span>'
+        f"<span>{text}</span></div>"
+    )
+
+
+def render_profile(player: FakePlayer) -> str:
+    groups = []
+    for kind, group_id in (("clan", player.clan_id), ("brotherhood", player.brotherhood_id)):
+        label = GROUP_TITLES[kind][0]
+        if group_id:
+            link = f'<a href="/{kind}/info?id={group_id}">{group_name(kind, group_id)}</a>'
+            groups.append(_stat(kind, f"{label}: {link}"))
+        else:
+            groups.append(_stat(kind, f"{label}: не состоит"))
+    stats = [
+        _stat("level", f"Уровень: {player.level}"),
+        _stat("glory", f"Слава: {_number(player.glory)}"),
+        _stat("win", f"Побед: {_number(player.wins)}"),
+        _stat("lose", f"Поражений: {_number(player.losses)}"),
+        _stat("dragon", f"Побед над Драконом: {_number(player.dragon_wins)}"),
+        _stat("snake", f"Побед над Змеем: {_number(player.serpent_wins)}"),
+        _stat("str", f"Сила: {_number(player.strength)}"),
+        _stat("def", f"Защита: {_number(player.defense)}"),
+        _stat("agi", f"Ловкость: {_number(player.agility)}"),
+        _stat("skill", f"Мастерство: {_number(player.mastery)}"),
+        _stat("vit", f"Живучесть: {_number(player.vitality)}"),
+        _stat("silver", f"Награбил: {_number(player.silver_looted)}"),
+        _stat("silver", f"Потерял: {_number(player.silver_lost)}"),
+        _stat("crystal", f"Награбил: {_number(player.crystals_looted)}"),
+        _stat("crystal", f"Потерял: {_number(player.crystals_lost)}"),
+        *groups,
+    ]
+    return (
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>Детали</title></head>'
+        '<body><header><a href="/hero/profile">Профиль</a></header><main>'
+        f'<div class="flex flex-col items-center"><span class="text-xl font-bold" '
+        f'data-hero-name-id="{player.pid}">{player.name}</span></div>'
+        f'<div id="stats" class="flex flex-col gap-1">{"".join(stats)}</div>'
+        '<div id="confirm-modal" class="hidden"><p class="text-center text-xl">Подтверждение</p></div>'
+        "</main></body></html>"
+    )
+
+
+def render_achievements(player: FakePlayer) -> str:
+    return (
+        f'<html><head><script>window.hero={{"id":{player.pid},"lord_wins":{player.lord_wins}}};'
+        "</script></head><body>"
+        '<div class="flex flex-col p-2 leading-5">'
+        '<div class="font-bold item-header pb-1">Повелитель Зверей</div>'
+        f'<span><b class="font-semibold">{player.beast_progress} из 10</b></span>'
+        f'<span>Уровень: <b class="font-semibold">{player.beast_level}</b></span>'
+        "</div></body></html>"
+    )
+
+
+def render_roster(group_kind: str, group_id: int, members: list[int]) -> str:
+    links = "".join(
+        f'<a class="hero-link" href="/hero/detail?player={pid}">Игрок {pid}</a>' for pid in members
+    )
+    return (
+        f'<html><body><main><p class="group-header">{GROUP_TITLES[group_kind][1]} '
+        f"{group_name(group_kind, group_id)}</p>{links}</main></body></html>"
+    )
+
+
+def api_row(player: FakePlayer) -> dict[str, Any]:
+    row: dict[str, Any] = {
+        "id": player.pid,
+        "nickname": player.name,
+        "level": player.level,
+        "glory": player.glory,
+        "wins": player.wins,
+        "losses": player.losses,
+        "dragon_wins": player.dragon_wins,
+        "serpent_wins": player.serpent_wins,
+        "strength": player.strength,
+        "defense": player.defense,
+        "agility": player.agility,
+        "mastery": player.mastery,
+        "vitality": player.vitality,
+        "silver_looted": player.silver_looted,
+        "silver_lost": player.silver_lost,
+        "crystals_looted": player.crystals_looted,
+        "crystals_lost": player.crystals_lost,
+        "beasts_killed": player.beasts_killed,
+        "achievements": {"lord_wins": player.lord_wins},
+    }
+    for kind, group_id in (("clan", player.clan_id), ("brotherhood", player.brotherhood_id)):
+        if group_id:
+            row[f"{kind}_id"] = group_id
+            row[f"{kind}_name"] = group_name(kind, group_id)
+    return row
+
+
+class FakeGame:
+    """Synthetic players plus per-route request statistics."""
+
+    def __init__(self, config: FakeGameConfig) -> None:
+        self.config = config
+        self.players = {pid: synthetic_player(config, pid) for pid in range(1, config.players + 1)}
+        self.rosters: dict[str, dict[int, list[int]]] = {"clan": {}, "brotherhood": {}}
+        for player in self.players.values():
+            if player.clan_id:
+                self.rosters["clan"].setdefault(player.clan_id, []).append(player.pid)
+            if player.brotherhood_id:
+                self.rosters["brotherhood"].setdefault(player.brotherhood_id, []).append(player.pid)
+        self._faults = random.Random(config.seed)
+        self._throttled_left = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.requests = 0
+        self.statuses: Counter[tuple[str, int]] = Counter()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+
+    def group_ids(self, group_kind: str) -> list[int]:
+        return sorted(self.rosters[group_kind])
+
+    def stats(self) -> dict[str, Any]:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+                "statuses": {
+                    str(status): count
+                    for (name, status), count in sorted(self.statuses.items())
+                    if name == route
+                },
+            }
+        return {"requests": self.requests, "routes": routes}
+
+    def _player(self, request: web.Request) -> FakePlayer | None:
+        try:
+            return self.players.get(int(request.query.get("player", "")))
+        except ValueError:
+            return None
+
+    @web.middleware
+    async def _faults_middleware(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        started = time.perf_counter()
+        route = request.path
+        self.requests += 1
+        config = self.config
+        rng = self._faults
+        delay = config.latency_ms + (rng.uniform(-1, 1) * config.jitter_ms if config.jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.throttle_every and self.requests % config.throttle_every == 0:
+            self._throttled_left = config.throttle_burst
+        response: web.StreamResponse
+        if route == "/":
+            response = await handler(request)
+        elif self._throttled_left > 0:
+            self._throttled_left -= 1
+            response = web.Response(
+                status=429, text="Too Many Requests", headers={"Retry-After": f"{config.retry_after:g}"}
+            )
+        elif config.error_rate and rng.random() < config.error_rate:
+            response = web.Response(status=503, text="Service Unavailable")
+        elif config.redirect_rate and "hop" not in request.query and rng.random() < config.redirect_rate:
+            response = web.Response(
+                status=302, headers={"Location": str(request.rel_url.update_query(hop="1"))}
+            )
+        else:
+            response = await handler(request)
+        self.statuses[(route, response.status)] += 1
+        self.latencies[route].append(time.perf_counter() - started)
+        return response
+
+    async def _home(self, _request: web.Request) -> web.Response:
+        return web.Response(
+            text='<html><body><a href="/hero/detail?player=1">hero/detail</a></body></html>',
+            content_type="text/html",
+        )
+
+    async def _profile(self, request: web.Request) -> web.Response:
+        player = self._player(request)
+        html = render_profile(player) if player else GAME_ERROR_PAGE
+        return web.Response(text=html, content_type="text/html")
+
+    async def _achievements(self, request: web.Request) -> web.Response:
+        player = self._player(request)
+        html = render_achievements(player) if player else GAME_ERROR_PAGE
+        return web.Response(text=html, content_type="text/html")
+
+    async def _roster(self, request: web.Request) -> web.Response:
+        group_kind = request.match_info["kind"]
+        try:
+            group_id = int(request.query.get("id", ""))
+        except ValueError:
+            group_id = 0
+        members = self.rosters[group_kind].get(group_id)
+        html = render_roster(group_kind, group_id, members) if members else GAME_ERROR_PAGE
+        return web.Response(text=html, content_type="text/html")
+
+    async def _bulk(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/json; charset=utf-8"})
+        await response.prepare(request)
+        await response.write(b'{"success":true,"data":[')
+        players = [player for player in self.players.values() if player.level >= BULK_MIN_LEVEL]
+        for start in range(0, len(players), BULK_CHUNK_ROWS):
+            rows = ",".join(
+                json.dumps(api_row(player), ensure_ascii=False, separators=(",", ":"))
+                for player in players[start:start + BULK_CHUNK_ROWS]
+            )
+            await response.write(("," if start else "").encode() + rows.encode("utf-8"))
+        meta = {"count": len(players), "min_level": BULK_MIN_LEVEL, "generated_at": int(time.time())}
+        await response.write(f'],"meta":{json.dumps(meta)}}}'.encode())
+        await response.write_eof()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._faults_middleware])
+        app.router.add_get("/", self._home)
+        app.router.add_get("/hero/detail", self._profile)
+        app.router.add_get("/achievements", self._achievements)
+        app.router.add_get("/heroes/for-glory", self._bulk)
+        app.router.add_get("/{kind:clan|brotherhood}/warriors", self._roster)
+        return app
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class FakeGameServer:
+    """``async with FakeGameServer(config) as server`` serves on ``server.url``."""
+
+    def __init__(self, config: FakeGameConfig, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.game = FakeGame(config)
+        self.host = host
+        self.port = port
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+
+    async def __aenter__(self) -> FakeGameServer:
+        self._runner = web.AppRunner(self.game.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.url = f"http://{self.host}:{self._runner.addresses[0][1]}/"
+        return self
+
+    async def __aexit__(self, *_exc: object) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+@contextmanager
+def serve_in_thread(config: FakeGameConfig) -> Iterator[FakeGameServer]:
+    """Run the server on its own event loop for synchronous callers."""
+    loop = asyncio.new_event_loop()
+    server = FakeGameServer(config)
+    stopped = asyncio.Event()
+    ready = threading.Event()
+
+    async def serve() -> None:
+        async with server:
+            ready.set()
+            await stopped.wait()
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True)
+    thread.start()
+    ready.wait()
+    try:
+        yield server
+    finally:
+        loop.call_soon_threadsafe(stopped.set)
+        thread.join()
+        loop.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve synthetic game pages for the collectors")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--throttle-burst", type=int, default=0)
+    parser.add_argument("--redirect-rate", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    config = FakeGameConfig(
+        players=args.players,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_every=args.throttle_every,
+        throttle_burst=args.throttle_burst,
+        redirect_rate=args.redirect_rate,
+    )
+
+    async def serve() -> None:
+        async with FakeGameServer(config, port=args.port) as server:
+            print(f"OK: serving {args.players} synthetic players on {server.url}", flush=True)
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import argparse
-import gzip
 import hashlib
 import json
 import os
@@ -14,6 +13,23 @@ import urllib.error
 import urllib.request
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Deliberately not importing the forglory package: on Render it runs this
+# script while holding the startup refresh lock.
+from tools.blockzip import extract_file  # noqa: E402
+from tools.db_patch import (  # noqa: E402
+    PatchError,
+    apply_patch,
+    cached_content_digest,
+    digest_sidecar,
+    manifest_name,
+    patch_chain,
+    patch_prefix,
+)
+
 
 def request(
     url: str,
@@ -91,6 +107,16 @@ def fetch_release(repo: str, tag: str, token: str) -> dict:
         return json.load(response)
 
 
+def release_fingerprint(release: dict) -> str:
+    """Identify a release by the name, size and upload time of its assets."""
+    assets = sorted(
+        (str(asset.get("name")), int(asset.get("size") or 0), str(asset.get("updated_at") or ""))
+        for asset in release.get("assets", [])
+        if asset.get("name")
+    )
+    return json.dumps(assets, separators=(",", ":"))
+
+
 def choose_asset(release: dict, preferred: list[str]) -> tuple[str, dict] | None:
     assets = {
         asset.get("name"): asset
@@ -127,6 +153,64 @@ def download_asset(asset: dict, token: str, target: Path) -> None:
             shutil.copyfileobj(response, output, length=1024 * 1024)
 
 
+def apply_release_patches(
+    release: dict,
+    token: str,
+    out_path: Path,
+    work_path: Path,
+    manifest_name: str,
+) -> tuple[str, str] | None:
+    """Patch a copy of the cached database up to the release.
+
+    Returns ("current", digest) when the cached database already matches the
+    release, ("patched", digest) when ``work_path`` holds the verified result,
+    and None when the caller has to fall back to the full download.
+    """
+    selected = choose_asset(release, [manifest_name])
+    if selected is None:
+        print(f"Release has no {manifest_name}; downloading the full database.")
+        return None
+    manifest_path = out_path.with_name(out_path.name + ".manifest.json")
+    patch_path = out_path.with_name(out_path.name + ".patch.gz")
+    try:
+        download_asset(selected[1], token, manifest_path)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        local_digest = cached_content_digest(out_path)
+        chain = patch_chain(manifest, local_digest)
+        if chain is None:
+            print("Cached database is not on the published patch chain; downloading the full database.")
+            return None
+        if not chain:
+            print(f"Cached database already matches the release ({local_digest}).")
+            return "current", local_digest
+
+        # The sidecar of part hashes describes the copy as well, so only the
+        # parts each patch touches are hashed again.
+        shutil.copyfile(out_path, work_path)
+        if digest_sidecar(out_path).exists():
+            shutil.copyfile(digest_sidecar(out_path), digest_sidecar(work_path))
+        digest = local_digest
+        for entry in chain:
+            asset = choose_asset(release, [str(entry.get("asset"))])
+            if asset is None:
+                raise PatchError(f"Patch asset {entry.get('asset')} is missing from the release")
+            print(f"Applying {entry['asset']} ({entry.get('size')} bytes)")
+            download_asset(asset[1], token, patch_path)
+            if file_sha256(patch_path) != entry.get("sha256"):
+                raise PatchError(f"Patch asset {entry['asset']} does not match its manifest hash")
+            digest = apply_patch(work_path, patch_path)
+        print(f"Applied {len(chain)} patch(es); content_digest={digest}")
+        return "patched", digest
+    except (PatchError, OSError, ValueError, sqlite3.Error, urllib.error.URLError) as exc:
+        print(f"Patch update failed, downloading the full database instead: {exc}", file=sys.stderr)
+        work_path.unlink(missing_ok=True)
+        digest_sidecar(work_path).unlink(missing_ok=True)
+        return None
+    finally:
+        manifest_path.unlink(missing_ok=True)
+        patch_path.unlink(missing_ok=True)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Download and validate the latest SQLite release asset"
@@ -150,9 +234,28 @@ def main() -> int:
     parser.add_argument("--minimum-snapshot-count", type=int)
     parser.add_argument("--attempts", type=int, default=1)
     parser.add_argument("--retry-delay", type=float, default=10.0)
+    parser.add_argument(
+        "--patches",
+        action="store_true",
+        help="Update an existing --out database from published delta patches when possible",
+    )
+    parser.add_argument(
+        "--base",
+        help="Existing database to patch from; --out is only written when the release differs from it",
+    )
+    parser.add_argument(
+        "--release-state",
+        help="File remembering the release last saved; an unchanged release is not downloaded again",
+    )
+    parser.add_argument(
+        "--patch-manifest",
+        default=os.environ.get("DB_PATCH_MANIFEST"),
+        help="Patch manifest asset (default: the one published for --asset)",
+    )
     args = parser.parse_args()
 
     token = os.environ.get("GITHUB_TOKEN", "")
+    patch_manifest = args.patch_manifest or manifest_name(patch_prefix(args.asset))
     preferred = [args.asset]
     if args.asset.endswith(".gz"):
         preferred.append(args.asset[:-3])
@@ -161,13 +264,15 @@ def main() -> int:
 
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    base_path = Path(args.base) if args.base else out_path
+    state_path = Path(args.release_state) if args.release_state else None
     temp_download = out_path.with_suffix(out_path.suffix + ".download")
     temp_db = out_path.with_suffix(out_path.suffix + ".tmp")
 
     last_error: Exception | None = None
     attempts = max(1, args.attempts)
     for attempt in range(1, attempts + 1):
-        for path in (temp_download, temp_db):
+        for path in (temp_download, temp_db, digest_sidecar(temp_db)):
             path.unlink(missing_ok=True)
         try:
             try:
@@ -178,35 +283,58 @@ def main() -> int:
                     return 0
                 raise
 
-            selected = choose_asset(release, preferred)
-            if selected is None:
-                if args.optional:
-                    print(
-                        f"No supported DB asset found in release {args.tag}; "
-                        "continuing without it."
-                    )
-                    return 0
-                raise RuntimeError(
-                    f"No supported DB asset found. Tried: {', '.join(preferred)}"
+            fingerprint = release_fingerprint(release)
+            if (
+                state_path is not None
+                and base_path.exists()
+                and state_path.exists()
+                and state_path.read_text(encoding="utf-8") == fingerprint
+            ):
+                print(f"Release {args.tag} is unchanged since {base_path} was saved.")
+                return 0
+
+            patched = None
+            # Patched files match the release by content, not by bytes.
+            if args.patches and base_path.exists() and not args.expect_sha256:
+                patched = apply_release_patches(
+                    release, token, base_path, temp_db, patch_manifest
                 )
+            if patched and patched[0] == "current" and base_path != out_path:
+                print(f"{base_path} already matches release {args.tag}; nothing to save.")
+                if state_path is not None:
+                    state_path.write_text(fingerprint, encoding="utf-8")
+                return 0
+            candidate = out_path if patched and patched[0] == "current" else temp_db
 
-            asset_name, asset = selected
-            print(
-                f"Downloading {asset_name} from GitHub Release {args.tag}; "
-                f"asset_id={asset.get('id')}, updated_at={asset.get('updated_at')}, "
-                f"attempt={attempt}/{attempts}"
-            )
-            download_asset(asset, token, temp_download)
+            if patched is None:
+                selected = choose_asset(release, preferred)
+                if selected is None:
+                    if args.optional:
+                        print(
+                            f"No supported DB asset found in release {args.tag}; "
+                            "continuing without it."
+                        )
+                        return 0
+                    raise RuntimeError(
+                        f"No supported DB asset found. Tried: {', '.join(preferred)}"
+                    )
+
+                asset_name, asset = selected
+                print(
+                    f"Downloading {asset_name} from GitHub Release {args.tag}; "
+                    f"asset_id={asset.get('id')}, updated_at={asset.get('updated_at')}, "
+                    f"attempt={attempt}/{attempts}"
+                )
+                download_asset(asset, token, temp_download)
 
-            if asset_name.endswith(".gz"):
-                with gzip.open(temp_download, "rb") as source, temp_db.open("wb") as target:
-                    shutil.copyfileobj(source, target, length=1024 * 1024)
-            else:
-                os.replace(temp_download, temp_db)
-            temp_download.unlink(missing_ok=True)
+                if asset_name.endswith(".gz"):
+                    extract_file(temp_download, temp_db)
+                else:
+                    os.replace(temp_download, temp_db)
+                temp_download.unlink(missing_ok=True)
 
             latest_snapshot, snapshot_count, database_sha256 = validate(
-                temp_db, args.require_schema_version
+                candidate, args.require_schema_version
             )
             if (
                 args.expect_latest_snapshot
@@ -235,7 +363,12 @@ def main() -> int:
                     f"sha256={database_sha256}, expected={args.expect_sha256}"
                 )
 
-            os.replace(temp_db, out_path)
+            if candidate != out_path:
+                os.replace(temp_db, out_path)
+                if patched is not None and digest_sidecar(temp_db).exists():
+                    os.replace(digest_sidecar(temp_db), digest_sidecar(out_path))
+            if state_path is not None:
+                state_path.write_text(fingerprint, encoding="utf-8")
             print(
                 f"Saved database to {out_path} ({out_path.stat().st_size} bytes); "
                 f"latest_snapshot={latest_snapshot or 'unknown'}, "
@@ -248,7 +381,7 @@ def main() -> int:
             if attempt < attempts:
                 time.sleep(max(0.0, args.retry_delay))
 
-    for path in (temp_download, temp_db):
+    for path in (temp_download, temp_db, digest_sidecar(temp_db)):
         path.unlink(missing_ok=True)
     if last_error is not None:
         raise last_error
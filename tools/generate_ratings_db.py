@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Generate a synthetic ratings.sqlite with the production schema.
+
+The schema comes from ``build_db.init_db`` and the player registry and
+best-growth table from the same functions the import uses, so the web
+queries see a realistic database of any size. Players, snapshots, the level
+distribution, clan and brotherhood sizes, late joiners and rename rates are
+configurable; the same seed always produces the same database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory.schema import NUMERIC_FIELDS  # noqa: E402
+from tools.build_db import (  # noqa: E402
+    compute_best_growth,
+    init_db,
+    normalize_text,
+    recreate_views,
+    update_registry_incremental,
+    validate_database,
+)
+
+SYLLABLES = (
+    "бьорн", "раг", "нар", "ульф", "сиг", "хильд", "тор", "вал", "кир", "ард",
+    "сван", "гер", "один", "локи", "фрей", "эйр", "ска", "мир", "дан", "свет",
+    "ing", "vald", "dark", "wolf", "storm", "ice", "fen", "rok", "sky", "bjor",
+    "axe", "rune", "hel", "gar", "mund", "thor", "sven", "ulf", "rik", "ald",
+)
+GROWN_COLUMNS = (
+    "glory", "wins", "losses", "dragon_wins", "snake_wins", "lord_wins", "beasts_killed",
+    "strength", "defense", "dexterity", "mastery", "vitality",
+    "rob_silver", "lost_silver", "rob_crystals", "lost_crystals", "chat",
+)
+STAT_GROWTH = {"strength", "defense", "dexterity", "mastery", "vitality"}
+
+
+@dataclass(frozen=True)
+class SyntheticDbConfig:
+    players: int = 20_000
+    snapshots: int = 14
+    interval_hours: float = 24.0
+    start: str = "2026-01-01_20-00-00"
+    seed: int = 1
+    level_mean: float = 18.0
+    max_level: int = 80
+    clan_size: int = 25
+    brotherhood_size: int = 60
+    grouped_ratio: float = 0.7
+    late_join_ratio: float = 0.1
+    rename_rate: float = 0.002
+    group_change_rate: float = 0.01
+
+
+def _nickname(rng: random.Random) -> str:
+    name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    if rng.random() < 0.3:
+        name = f"{name} {rng.randint(1, 99)}"
+    return name.capitalize() if rng.random() < 0.7 else name.upper()
+
+
+def _group_id(rng: random.Random, config: SyntheticDbConfig, size: int) -> int:
+    if not size or rng.random() >= config.grouped_ratio:
+        return 0
+    return rng.randint(1, max(1, config.players // size))
+
+
+class _Player:
+    __slots__ = ("pid", "first", "name", "level", "clan", "brotherhood", "values")
+
+    def __init__(self, pid: int, rng: random.Random, config: SyntheticDbConfig) -> None:
+        self.pid = pid
+        late = config.snapshots > 1 and rng.random() < config.late_join_ratio
+        self.first = rng.randint(1, config.snapshots - 1) if late else 0
+        self.name = _nickname(rng)
+        self.level = min(config.max_level, max(1, int(rng.expovariate(1 / config.level_mean)) + 1))
+        self.clan = _group_id(rng, config, config.clan_size)
+        self.brotherhood = _group_id(rng, config, config.brotherhood_size)
+        scale = self.level * self.level
+        self.values = {column: rng.randint(0, scale * 40) for column in GROWN_COLUMNS}
+        for column in STAT_GROWTH:
+            self.values[column] = rng.randint(self.level, self.level * 250)
+
+    def advance(self, rng: random.Random, config: SyntheticDbConfig) -> None:
+        if rng.random() < 0.03 and self.level < config.max_level:
+            self.level += 1
+        activity = rng.random()
+        if activity < 0.25:
+            return  # idle since the previous snapshot
+        battles = int(activity * self.level * 12)
+        values = self.values
+        wins = rng.randint(0, battles)
+        values["wins"] += wins
+        values["losses"] += battles - wins
+        values["glory"] += wins * rng.randint(5, 30)
+        for column in GROWN_COLUMNS:
+            if column in STAT_GROWTH:
+                values[column] += rng.randint(0, self.level * 3)
+            elif column not in {"wins", "losses", "glory"}:
+                values[column] += rng.randint(0, battles)
+        if rng.random() < config.rename_rate:
+            self.name = _nickname(rng)
+        if rng.random() < config.group_change_rate:
+            self.clan = _group_id(rng, config, config.clan_size)
+        if rng.random() < config.group_change_rate:
+            self.brotherhood = _group_id(rng, config, config.brotherhood_size)
+
+
+def generate_database(path: Path, config: SyntheticDbConfig) -> dict[str, int]:
+    """Write the synthetic database to ``path``, replacing any existing file."""
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(config.seed)
+    players = [_Player(pid, rng, config) for pid in range(1, config.players + 1)]
+    start = datetime.strptime(config.start, "%Y-%m-%d_%H-%M-%S").replace(tzinfo=timezone.utc)
+    columns = [field.column for field in NUMERIC_FIELDS]
+    insert_sql = (
+        "INSERT INTO observations(snapshot_id,pid,name_id,clan_name_id,clan_game_id,"
+        f"brotherhood_name_id,brotherhood_game_id,{','.join(columns)}) "
+        f"VALUES({','.join('?' for _ in range(7 + len(columns)))})"
+    )
+    text_ids: dict[str, int] = {}
+
+    conn = sqlite3.connect(path)
+    try:
+        init_db(conn)
+
+        def text_id(value: str | None) -> int | None:
+            if not value:
+                return None
+            cached = text_ids.get(value)
+            if cached is None:
+                cached = int(conn.execute(
+                    "INSERT INTO text_values(value,norm) VALUES(?,?)", (value, normalize_text(value))
+                ).lastrowid)
+                text_ids[value] = cached
+            return cached
+
+        latest_sid = 0
+        for index in range(config.snapshots):
+            moment = start + timedelta(hours=config.interval_hours * index)
+            filename = f"heroes_{moment.strftime('%Y-%m-%d_%H-%M-%S')}.json.gz"
+            conn.execute("BEGIN")
+            present = [player for player in players if player.first <= index]
+            latest_sid = int(conn.execute(
+                "INSERT INTO snapshots(filename,ts,player_count,source_sha256) VALUES(?,?,?,NULL)",
+                (filename, int(moment.timestamp()), len(present)),
+            ).lastrowid)
+            rows = []
+            for player in present:
+                if index:
+                    player.advance(rng, config)
+                values = player.values
+                rows.append((
+                    latest_sid,
+                    player.pid,
+                    text_id(player.name),
+                    text_id(f"Клан {player.clan}" if player.clan else None),
+                    player.clan,
+                    text_id(f"Братство {player.brotherhood}" if player.brotherhood else None),
+                    player.brotherhood,
+                    *(player.level if column == "level" else values.get(column) for column in columns),
+                ))
+            conn.executemany(insert_sql, rows)
+            update_registry_incremental(
+                conn, latest_sid, [player.pid for player in present], baseline_snapshot=index == 0
+            )
+            conn.execute("COMMIT")
+
+        conn.execute("BEGIN")
+        compute_best_growth(conn, latest_sid)
+        conn.execute("COMMIT")
+        recreate_views(conn)
+        conn.execute("ANALYZE")
+        validate_database(conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return {
+            "snapshots": int(conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]),
+            "observations": int(conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]),
+            "players": int(conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]),
+            "text_values": len(text_ids),
+        }
+    finally:
+        conn.close()
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = SyntheticDbConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic ratings database")
+    parser.add_argument("--out", default="data/db/synthetic.sqlite")
+    parser.add_argument("--players", type=int, default=defaults.players)
+    parser.add_argument("--snapshots", type=int, default=defaults.snapshots)
+    parser.add_argument("--interval-hours", type=float, default=defaults.interval_hours)
+    parser.add_argument("--start", default=defaults.start, help="First snapshot time, YYYY-MM-DD_HH-MM-SS")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--level-mean", type=float, default=defaults.level_mean)
+    parser.add_argument("--max-level", type=int, default=defaults.max_level)
+    parser.add_argument("--clan-size", type=int, default=defaults.clan_size)
+    parser.add_argument("--brotherhood-size", type=int, default=defaults.brotherhood_size)
+    parser.add_argument("--grouped-ratio", type=float, default=defaults.grouped_ratio)
+    parser.add_argument("--late-join-ratio", type=float, default=defaults.late_join_ratio)
+    parser.add_argument("--rename-rate", type=float, default=defaults.rename_rate)
+    parser.add_argument("--group-change-rate", type=float, default=defaults.group_change_rate)
+    return parser.parse_args()
+
+
+def config_from_args(args: argparse.Namespace) -> SyntheticDbConfig:
+    return SyntheticDbConfig(
+        players=args.players,
+        snapshots=max(1, args.snapshots),
+        interval_hours=args.interval_hours,
+        start=args.start,
+        seed=args.seed,
+        level_mean=args.level_mean,
+        max_level=args.max_level,
+        clan_size=args.clan_size,
+        brotherhood_size=args.brotherhood_size,
+        grouped_ratio=args.grouped_ratio,
+        late_join_ratio=args.late_join_ratio,
+        rename_rate=args.rename_rate,
+        group_change_rate=args.group_change_rate,
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    counts = generate_database(Path(args.out), config_from_args(args))
+    print(
+        f"OK: {args.out}; snapshots={counts['snapshots']}, observations={counts['observations']}, "
+        f"players={counts['players']}, names={counts['text_values']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
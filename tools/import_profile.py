@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Profile what importing the web entry point costs.
+
+``python -X importtime -c "import app"`` runs in a fresh interpreter a few
+times and the fastest run is kept, since the first one may still be
+writing bytecode. The report lists the slowest imports by cumulative time.
+The check fails when any collector-only module is on the web import path,
+when importing ``app`` takes longer than ``--budget-ms`` in total, or when
+the project's own modules take longer than ``--own-budget-ms``. Render cold
+starts pay this cost before the first request is answered.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+WEB_MODULE = "app"
+WEB_IMPORT_BUDGET_MS = 450.0
+OWN_IMPORT_BUDGET_MS = 80.0
+FIRST_PARTY = ("app", "forglory", "tools")
+# Only the collectors parse HTML or talk HTTP, only the offline tools do array
+# math, and only the Render database refresh runs subprocesses and takes file
+# locks.
+WEB_FORBIDDEN = (
+    "bs4",
+    "aiohttp",
+    "requests",
+    "numpy",
+    "forglory.parsing",
+    "forglory.http_metrics",
+    "forglory.adaptive_limit",
+    "forglory.parse_stage",
+    "forglory.db_refresh",
+    "subprocess",
+    "fcntl",
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def top_level(self) -> str:
+        return self.name.split(".")[0]
+
+
+def parse_importtime(text: str) -> list[ImportRecord]:
+    records = []
+    for line in text.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def profile_import(module: str = WEB_MODULE, *, runs: int = 3) -> list[ImportRecord]:
+    """Import records of the fastest of ``runs`` fresh imports of ``module``."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in {"RENDER", "RENDER_SERVICE_ID", "SQL_METRICS"}
+    }
+    best: list[ImportRecord] | None = None
+    for _ in range(max(1, runs)):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        records = parse_importtime(result.stderr)
+        if best is None or total_us(records, module) < total_us(best, module):
+            best = records
+    return best or []
+
+
+def total_us(records: list[ImportRecord], module: str = WEB_MODULE) -> int:
+    return next((record.cumulative_us for record in records if record.name == module), 0)
+
+
+def own_us(records: list[ImportRecord]) -> int:
+    return sum(record.self_us for record in records if record.top_level in FIRST_PARTY)
+
+
+def check_budget(
+    records: list[ImportRecord],
+    *,
+    module: str = WEB_MODULE,
+    budget_ms: float = WEB_IMPORT_BUDGET_MS,
+    own_budget_ms: float = OWN_IMPORT_BUDGET_MS,
+    forbidden: tuple[str, ...] = WEB_FORBIDDEN,
+) -> list[str]:
+    problems = []
+    loaded = {record.name for record in records}
+    for name in forbidden:
+        if name in loaded:
+            chain = _import_chain(records, name)
+            problems.append(f"{name} is imported on the {module} path: {' <- '.join(chain)}")
+    total = total_us(records, module) / 1000
+    if total > budget_ms:
+        problems.append(f"import {module} took {total:.1f} ms; budget {budget_ms:.0f} ms")
+    own = own_us(records) / 1000
+    if own > own_budget_ms:
+        problems.append(f"project modules took {own:.1f} ms; budget {own_budget_ms:.0f} ms")
+    return problems
+
+
+def _import_chain(records: list[ImportRecord], name: str) -> list[str]:
+    """``name`` and the modules whose import pulled it in, innermost first.
+
+    importtime prints a module after everything it imported, one level
+    shallower, so the importer is the next shallower record below it.
+    """
+    index = next(position for position, record in enumerate(records) if record.name == name)
+    chain = [name]
+    depth = records[index].depth
+    for record in records[index + 1:]:
+        if record.depth < depth:
+            chain.append(record.name)
+            depth = record.depth
+    return chain
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Profile and budget the web entry point's imports")
+    parser.add_argument("--module", default=WEB_MODULE)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh imports to run; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, default=WEB_IMPORT_BUDGET_MS)
+    parser.add_argument("--own-budget-ms", type=float, default=OWN_IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=20, help="Slowest imports to list")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    records = profile_import(args.module, runs=args.runs)
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for record in sorted(records, key=lambda item: item.cumulative_us, reverse=True)[: args.top]:
+        print(f"{record.cumulative_us / 1000:>14.1f} {record.self_us / 1000:>8.1f}  {record.name}")
+    problems = check_budget(
+        records, module=args.module, budget_ms=args.budget_ms, own_budget_ms=args.own_budget_ms
+    )
+    for problem in problems:
+        print(f"ERROR: {problem}", file=sys.stderr)
+    if problems:
+        return 1
+    print(
+        f"OK: import {args.module} took {total_us(records, args.module) / 1000:.1f} ms, "
+        f"{own_us(records) / 1000:.1f} ms in project modules, {len(records)} modules"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Load-test the web app under gunicorn with a weighted mix of real URLs.
+
+A synthetic database is generated (or ``--db`` is used), the app is started
+with gunicorn on a free local port and SQL metrics enabled, and a pool of
+aiohttp clients replays index pages in every mode, parameter and page depth,
+profiles, suggestions, searches and level lists for ``--duration`` seconds.
+The report has requests per second, latency percentiles overall and per
+kind, the status mix, the ``cached_query`` hit rate taken from the
+Server-Timing headers, and the RSS of each gunicorn worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import aiohttp  # noqa: E402
+
+from tools.benchmark_queries import query_fixtures  # noqa: E402
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database  # noqa: E402
+
+DEFAULT_MIX = {"index": 50, "profile": 12, "suggest": 15, "search": 13, "level_players": 10}
+INDEX_MODES = ("Общий", "Прирост", "Лучшие (приросты)")
+INDEX_PARAMS = (
+    "Слава", "Побед", "Сумма статов", "Награбил (серебро)", "Сила", "Убито зверей",
+    "По уровню", "Кланы по славе", "Братства по статам",
+)
+GROUP_PARAMS = {"По уровню", "Кланы по славе", "Братства по статам"}
+SERVER_TIMING_RE = re.compile(r'desc="(\d+) statements, (\d+) rows, cache (\d+)/(\d+)"')
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown request kind: {name}")
+        mix[name] = int(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The request mix needs at least one positive weight")
+    return mix
+
+
+class UrlMix:
+    """Draws URLs in the configured proportions from what the database contains."""
+
+    def __init__(self, db_path: Path, mix: dict[str, int], seed: int = 1) -> None:
+        self.fixture = query_fixtures(db_path)
+        conn = sqlite3.connect(f"file:{db_path.resolve().as_posix()}?mode=ro", uri=True)
+        try:
+            self.snapshots = [str(row[0]) for row in conn.execute("SELECT filename FROM snapshots ORDER BY ts DESC")]
+            self.names = [str(row[0]) for row in conn.execute(
+                "SELECT name FROM heroes WHERE snapshot_id=? ORDER BY pid LIMIT 500", (self.fixture["latest"],)
+            )]
+            self.levels = [int(row[0]) for row in conn.execute(
+                "SELECT level FROM heroes WHERE snapshot_id=? GROUP BY level HAVING COUNT(*) >= 10",
+                (self.fixture["latest"],),
+            )]
+        finally:
+            conn.close()
+        self.rng = random.Random(seed)
+        self.kinds = [kind for kind, weight in mix.items() if weight > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+
+    def _fragment(self) -> str:
+        name = self.rng.choice(self.names)
+        start = self.rng.randrange(max(1, len(name) - 3))
+        return name[start:start + 3]
+
+    def draw(self) -> tuple[str, str]:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        rng = self.rng
+        latest = self.snapshots[0]
+        if kind == "index":
+            mode = rng.choice(INDEX_MODES)
+            param = rng.choice([param for param in INDEX_PARAMS if mode == "Общий" or param not in GROUP_PARAMS])
+            query: dict[str, Any] = {
+                "mode": mode,
+                "param": param,
+                "level": "Все" if rng.random() < 0.7 else rng.choice(self.levels),
+                "page": 1 + min(int(rng.expovariate(0.5)), 30),
+                "file": rng.choice(self.snapshots[:3]),
+            }
+            if mode == "Прирост":
+                query.update(file1=rng.choice(self.snapshots[1:] or self.snapshots), file2=latest)
+            return kind, "/?" + urlencode(query)
+        if kind == "profile":
+            return kind, "/profile?" + urlencode({"nickname": rng.choice(self.names)})
+        if kind == "suggest":
+            if rng.random() < 0.5:
+                return kind, "/api/player_suggest_all?" + urlencode({"q": self._fragment()})
+            return kind, "/api/player_suggest?" + urlencode({"snapshot": latest, "q": self._fragment()})
+        if kind == "search":
+            return kind, "/api/player_search?" + urlencode(
+                {"mode": "Общий", "param": rng.choice(INDEX_PARAMS[:6]), "q": self._fragment(), "file": latest}
+            )
+        return kind, "/api/level_players?" + urlencode(
+            {"snapshot_id": latest, "level": rng.choice(self.levels), "page": 1 + int(rng.expovariate(1.0))}
+        )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def worker_pids(master_pid: int) -> list[int]:
+    """Children of the gunicorn master, read from /proc (Linux only)."""
+    pids = []
+    for entry in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = entry.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry.parent.name))
+    return sorted(pids)
+
+
+def rss_mb(pid: int) -> float | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+
+def _latency(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": _percentile(ordered, 0.5),
+        "p90_ms": _percentile(ordered, 0.9),
+        "p99_ms": _percentile(ordered, 0.99),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+async def replay(base_url: str, urls: UrlMix, *, concurrency: int, duration: float, timeout: float) -> dict[str, Any]:
+    samples: dict[str, list[float]] = {kind: [] for kind in urls.kinds}
+    statuses: dict[str, int] = {}
+    totals = {"statements": 0, "rows": 0, "cache_hits": 0, "cache_lookups": 0, "bytes": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        while time.perf_counter() < deadline:
+            kind, path = urls.draw()
+            started = time.perf_counter()
+            try:
+                async with session.get(base_url + path, allow_redirects=False) as response:
+                    body = await response.read()
+                    status = str(response.status)
+                    timing = SERVER_TIMING_RE.search(response.headers.get("Server-Timing", ""))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                status, body, timing = type(exc).__name__, b"", None
+            samples[kind].append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            totals["bytes"] += len(body)
+            if timing:
+                totals["statements"] += int(timing.group(1))
+                totals["rows"] += int(timing.group(2))
+                totals["cache_hits"] += int(timing.group(3))
+                totals["cache_lookups"] += int(timing.group(4))
+
+    started = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    every = [sample for values in samples.values() for sample in values]
+    lookups = totals.pop("cache_lookups")
+    return {
+        "requests": len(every),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(every) / max(elapsed, 1e-9), 1),
+        "latency": _latency(every),
+        "by_kind": {kind: {"requests": len(values), **_latency(values)} for kind, values in sorted(samples.items())},
+        "statuses": dict(sorted(statuses.items())),
+        "cache_hit_rate": round(totals["cache_hits"] / lookups, 3) if lookups else None,
+        **totals,
+    }
+
+
+def start_gunicorn(db_path: Path, *, workers: int, threads: int, port: int) -> subprocess.Popen:
+    # The background warm-up would compete with the replayed traffic.
+    env = dict(os.environ, DB_PATH=str(db_path), SQL_METRICS="1", SQL_SLOW_MS="1000000", WARMUP="0")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "app:app",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def _wait_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+            try:
+                async with session.get(base_url + "/robots.txt") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("gunicorn did not start in time")
+
+
+def run_load_test(
+    db_path: Path,
+    *,
+    mix: dict[str, int],
+    concurrency: int = 16,
+    duration: float = 20.0,
+    workers: int = 2,
+    threads: int = 4,
+    seed: int = 1,
+    timeout: float = 30.0,
+) -> dict[str, Any]:
+    urls = UrlMix(db_path, mix, seed)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_gunicorn(db_path, workers=workers, threads=threads, port=port)
+    try:
+        asyncio.run(_wait_ready(base_url, process, timeout))
+        pids = worker_pids(process.pid)
+        rss_before = {str(pid): rss_mb(pid) for pid in pids}
+        result = asyncio.run(replay(base_url, urls, concurrency=concurrency, duration=duration, timeout=timeout))
+        result["workers"] = [
+            {"pid": pid, "rss_mb_start": rss_before.get(str(pid)), "rss_mb_end": rss_mb(pid)}
+            for pid in worker_pids(process.pid)
+        ]
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    result["config"] = {
+        "concurrency": concurrency, "duration": duration, "workers": workers, "threads": threads, "mix": mix,
+    }
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the web app under gunicorn")
+    parser.add_argument("--db", help="Existing database (default: generate a synthetic one)")
+    parser.add_argument("--players", type=int, default=SyntheticDbConfig.players)
+    parser.add_argument("--snapshots", type=int, default=SyntheticDbConfig.snapshots)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic to replay")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument(
+        "--mix", default=",".join(f"{kind}={weight}" for kind, weight in DEFAULT_MIX.items()),
+        help="Comma-separated kind=weight pairs",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db) if args.db else Path(tmp) / "load.sqlite"
+        if not args.db:
+            generate_database(db_path, SyntheticDbConfig(players=args.players, snapshots=args.snapshots, seed=args.seed))
+        result = run_load_test(
+            db_path,
+            mix=mix,
+            concurrency=max(1, args.concurrency),
+            duration=args.duration,
+            workers=max(1, args.workers),
+            threads=max(1, args.threads),
+            seed=args.seed,
+        )
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        latency = result["latency"]
+        print(
+            f"{result['requests']} requests in {result['seconds']} s: {result['requests_per_second']} req/s, "
+            f"p50 {latency['p50_ms']} ms, p90 {latency['p90_ms']} ms, p99 {latency['p99_ms']} ms, "
+            f"max {latency['max_ms']} ms"
+        )
+        print(f"{'kind':<14} {'requests':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        for kind, stats in result["by_kind"].items():
+            print(f"{kind:<14} {stats['requests']:>8} {stats['p50_ms']:>8} {stats['p90_ms']:>8} {stats['p99_ms']:>8}")
+        print(f"statuses: {result['statuses']}; cache hit rate: {result['cache_hit_rate']}")
+        for worker in result["workers"]:
+            print(f"worker {worker['pid']}: RSS {worker['rss_mb_start']} -> {worker['rss_mb_end']} MB")
+    failed = sum(count for status, count in result["statuses"].items() if status != "200")
+    if failed:
+        print(f"ERROR: {failed} requests did not return HTTP 200", file=sys.stderr)
+        return 1
+    print(f"OK: {result['requests']} requests replayed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -15,20 +15,22 @@ if str(ROOT) not in sys.path:
 
 from forglory.counter_math import (  # noqa: E402
     WRAP_COUNTER_COLUMN_SET,
-    unwrap_cumulative_counter,
+    unwrap_counter_column,
 )
 from forglory.schema import NUMERIC_FIELDS  # noqa: E402
 
 
+WATERMARK_ID_KEY = "counter_wraps_snapshot_id"
+WATERMARK_TS_KEY = "counter_wraps_snapshot_ts"
+WATERMARK_COUNT_KEY = "counter_wraps_snapshot_count"
+BATCH_ROWS = 200_000
+
+
 def table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
     return {str(row[1]) for row in conn.execute(f"PRAGMA table_info({table})")}
 
 
-def normalize_counter_history(
-    conn: sqlite3.Connection,
-    *,
-    dry_run: bool = False,
-) -> dict[str, int]:
+def counter_columns(conn: sqlite3.Connection) -> list[str]:
     observation_columns = table_columns(conn, "observations")
     columns = [
         field.column
@@ -38,49 +40,248 @@ def normalize_counter_history(
     ]
     if not columns:
         raise RuntimeError("No numeric observation columns were found")
+    return columns
 
-    select_columns = ",".join(f"o.{column}" for column in columns)
-    cursor = conn.execute(
+
+def has_scan_state(conn: sqlite3.Connection) -> bool:
+    return bool(table_columns(conn, "scan_state"))
+
+
+def load_watermark(conn: sqlite3.Connection) -> int | None:
+    """Return the ts up to which history is normalized, or None if unknown.
+
+    The snapshot id alone is not enough: removing the latest snapshot frees
+    its id for the next import, and an older snapshot imported late would sit
+    below the watermark. The stored ts and snapshot count catch both cases.
+    """
+    if not has_scan_state(conn):
+        return None
+    stored = {
+        str(key): int(value)
+        for key, value in conn.execute(
+            "SELECT key,value FROM scan_state WHERE key IN (?,?,?)",
+            (WATERMARK_ID_KEY, WATERMARK_TS_KEY, WATERMARK_COUNT_KEY),
+        )
+    }
+    if len(stored) != 3:
+        return None
+    row = conn.execute(
+        "SELECT ts FROM snapshots WHERE snapshot_id=?", (stored[WATERMARK_ID_KEY],)
+    ).fetchone()
+    if row is None or int(row[0]) != stored[WATERMARK_TS_KEY]:
+        return None
+    count = conn.execute(
+        "SELECT COUNT(*) FROM snapshots WHERE ts<=?", (stored[WATERMARK_TS_KEY],)
+    ).fetchone()[0]
+    if int(count) != stored[WATERMARK_COUNT_KEY]:
+        return None
+    return stored[WATERMARK_TS_KEY]
+
+
+def store_watermark(conn: sqlite3.Connection) -> None:
+    if not has_scan_state(conn):
+        return
+    row = conn.execute(
+        "SELECT snapshot_id,ts FROM snapshots ORDER BY ts DESC,snapshot_id DESC LIMIT 1"
+    ).fetchone()
+    if row is None:
+        return
+    count = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO scan_state(key,value) VALUES(?,?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (
+            (WATERMARK_ID_KEY, int(row[0])),
+            (WATERMARK_TS_KEY, int(row[1])),
+            (WATERMARK_COUNT_KEY, int(count)),
+        ),
+    )
+
+
+def previous_values(
+    conn: sqlite3.Connection,
+    columns: list[str],
+    pids: set[int],
+    through_ts: int,
+) -> dict[int, dict[str, int | None]]:
+    """Find each player's latest non-null value per column at or before ``through_ts``.
+
+    Snapshots are walked newest first and a player leaves the search once
+    every column has a value, so a daily run usually reads one snapshot.
+    """
+    previous = {pid: {column: None for column in columns} for pid in pids}
+    missing = {pid: set(columns) for pid in pids}
+    conn.execute("DROP TABLE IF EXISTS temp.counter_pending")
+    conn.execute("CREATE TEMP TABLE counter_pending(pid INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT INTO temp.counter_pending(pid) VALUES(?)", ((pid,) for pid in pids))
+    snapshot_ids = [
+        int(row[0])
+        for row in conn.execute(
+            "SELECT snapshot_id FROM snapshots WHERE ts<=? ORDER BY ts DESC,snapshot_id DESC",
+            (through_ts,),
+        )
+    ]
+    select_columns = ",".join(columns)
+    try:
+        for snapshot_id in snapshot_ids:
+            if not missing:
+                break
+            resolved: list[tuple[int]] = []
+            for row in conn.execute(
+                f"""
+                SELECT pid,{select_columns} FROM observations
+                WHERE snapshot_id=? AND pid IN (SELECT pid FROM temp.counter_pending)
+                """,
+                (snapshot_id,),
+            ):
+                pid = int(row[0])
+                wanted = missing[pid]
+                for index, column in enumerate(columns, start=1):
+                    if column in wanted and row[index] is not None:
+                        previous[pid][column] = int(row[index])
+                        wanted.discard(column)
+                if not wanted:
+                    del missing[pid]
+                    resolved.append((pid,))
+            conn.executemany("DELETE FROM temp.counter_pending WHERE pid=?", resolved)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.counter_pending")
+    return previous
+
+
+def pid_batches(cursor: sqlite3.Cursor, size: int = BATCH_ROWS):
+    """Yield lists of about ``size`` rows ordered by pid, never splitting a pid."""
+    pending: list[tuple] = []
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            if pending:
+                yield pending
+            return
+        rows = pending + rows
+        last_pid = rows[-1][1]
+        split = len(rows)
+        while split and rows[split - 1][1] == last_pid:
+            split -= 1
+        pending = rows[split:]
+        if split:
+            yield rows[:split]
+
+
+def apply_updates(
+    conn: sqlite3.Connection,
+    columns: list[str],
+    updates: dict[tuple[int, int], dict[str, int]],
+) -> None:
+    """Write all changed cells with one UPDATE ... FROM over a temp table."""
+    if not updates:
+        return
+    column_list = ",".join(columns)
+    conn.execute("DROP TABLE IF EXISTS temp.counter_updates")
+    conn.execute(
         f"""
-        SELECT o.snapshot_id,o.pid,{select_columns}
-        FROM observations o
-        JOIN snapshots s ON s.snapshot_id=o.snapshot_id
-        ORDER BY o.pid,s.ts,o.snapshot_id
+        CREATE TEMP TABLE counter_updates(
+            snapshot_id INTEGER NOT NULL,
+            pid INTEGER NOT NULL,
+            {column_list},
+            PRIMARY KEY(snapshot_id,pid)
+        ) WITHOUT ROWID
         """
     )
+    try:
+        placeholders = ",".join("?" for _ in range(len(columns) + 2))
+        conn.executemany(
+            f"INSERT INTO temp.counter_updates(snapshot_id,pid,{column_list}) VALUES({placeholders})",
+            (
+                (snapshot_id, pid, *(cells.get(column) for column in columns))
+                for (snapshot_id, pid), cells in updates.items()
+            ),
+        )
+        assignments = ",".join(f"{column}=COALESCE(u.{column},observations.{column})" for column in columns)
+        conn.execute(
+            f"""
+            UPDATE observations SET {assignments}
+            FROM temp.counter_updates u
+            WHERE observations.snapshot_id=u.snapshot_id AND observations.pid=u.pid
+            """
+        )
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.counter_updates")
 
-    previous_by_column: dict[str, int | None] = {column: None for column in columns}
-    updates: dict[str, list[tuple[int, int, int]]] = defaultdict(list)
-    current_pid: int | None = None
 
-    for row in cursor:
-        snapshot_id = int(row[0])
-        pid = int(row[1])
-        if pid != current_pid:
-            current_pid = pid
-            previous_by_column = {column: None for column in columns}
+def normalize_counter_history(
+    conn: sqlite3.Connection,
+    *,
+    dry_run: bool = False,
+    incremental: bool = False,
+) -> dict[str, int]:
+    """Unwrap counters across history and return changed cells per column.
 
-        for index, column in enumerate(columns, start=2):
-            raw = row[index]
-            if raw is None:
-                continue
-            raw_value = int(raw)
-            normalized = unwrap_cumulative_counter(
-                raw_value, previous_by_column[column]
+    With ``incremental`` only snapshots newer than the stored watermark are
+    read, each player's counters continuing from their last normalized value.
+    Without a valid watermark the whole history is normalized.
+    """
+    columns = counter_columns(conn)
+    watermark = load_watermark(conn) if incremental else None
+    select_columns = ",".join(f"o.{column}" for column in columns)
+    if watermark is None:
+        previous: dict[int, dict[str, int | None]] = {}
+        cursor = conn.execute(
+            f"""
+            SELECT o.snapshot_id,o.pid,{select_columns}
+            FROM observations o
+            JOIN snapshots s ON s.snapshot_id=o.snapshot_id
+            ORDER BY o.pid,s.ts,o.snapshot_id
+            """
+        )
+    else:
+        pids = {
+            int(row[0])
+            for row in conn.execute(
+                """
+                SELECT DISTINCT o.pid FROM observations o
+                JOIN snapshots s ON s.snapshot_id=o.snapshot_id
+                WHERE s.ts>?
+                """,
+                (watermark,),
             )
-            previous_by_column[column] = normalized
-            if normalized != raw_value:
-                updates[column].append((normalized, snapshot_id, pid))
+        }
+        previous = previous_values(conn, columns, pids, watermark)
+        cursor = conn.execute(
+            f"""
+            SELECT o.snapshot_id,o.pid,{select_columns}
+            FROM observations o
+            JOIN snapshots s ON s.snapshot_id=o.snapshot_id
+            WHERE s.ts>?
+            ORDER BY o.pid,s.ts,o.snapshot_id
+            """,
+            (watermark,),
+        )
+
+    updates: dict[tuple[int, int], dict[str, int]] = {}
+    changes: dict[str, int] = defaultdict(int)
+    previous_by_column = {
+        column: {pid: values[column] for pid, values in previous.items()}
+        for column in columns
+    }
+
+    # Whole columns are unwrapped at once; a pid never spans two batches, so
+    # its chain only continues from the values before the watermark.
+    for rows in pid_batches(cursor):
+        pids = [row[1] for row in rows]
+        for index, column in enumerate(columns, start=2):
+            raw_values = [row[index] for row in rows]
+            normalized = unwrap_counter_column(pids, raw_values, previous_by_column[column])
+            for row, raw, value in zip(rows, raw_values, normalized):
+                if value != raw:
+                    updates.setdefault((int(row[0]), int(row[1])), {})[column] = value
+                    changes[column] += 1
 
     if not dry_run:
-        for column, rows in updates.items():
-            conn.executemany(
-                f"UPDATE observations SET {column}=? "
-                "WHERE snapshot_id=? AND pid=?",
-                rows,
-            )
+        apply_updates(conn, columns, updates)
+        store_watermark(conn)
 
-    return {column: len(rows) for column, rows in updates.items()}
+    return dict(changes)
 
 
 def main() -> int:
@@ -91,6 +292,11 @@ def main() -> int:
     )
     parser.add_argument("--db", default="data/db/ratings.sqlite")
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only normalize snapshots newer than the last normalized one",
+    )
     args = parser.parse_args()
 
     db_path = Path(args.db)
@@ -115,7 +321,10 @@ def main() -> int:
             )
 
         conn.execute("BEGIN IMMEDIATE")
-        changes = normalize_counter_history(conn, dry_run=args.dry_run)
+        incremental = args.incremental and load_watermark(conn) is not None
+        changes = normalize_counter_history(
+            conn, dry_run=args.dry_run, incremental=incremental
+        )
         if args.dry_run:
             conn.rollback()
         else:
@@ -140,7 +349,8 @@ def main() -> int:
     details = ", ".join(
         f"{column}={count}" for column, count in sorted(changes.items())
     ) or "none"
-    print(f"Counter normalization {mode} {total} cells; {details}")
+    scope = "new snapshots" if incremental else "full history"
+    print(f"Counter normalization ({scope}) {mode} {total} cells; {details}")
     return 0
 
 
@@ -38,8 +38,13 @@ def validate_snapshot(path: Path) -> int:
         for hero in data.values()
         if isinstance(hero, dict)
     )
+    print(check_name_distribution(names, len(data)))
+    return 0
+
+
+def check_name_distribution(names: Counter, total: int) -> str:
+    """Raise RuntimeError for a snapshot whose names look like a UI label."""
     names.pop("", None)
-    total = len(data)
     if total == 0 or not names:
         raise RuntimeError("Snapshot has no player names")
 
@@ -58,11 +63,10 @@ def validate_snapshot(path: Path) -> int:
             f"for {count}/{total} profiles ({ratio:.1%})"
         )
 
-    print(
+    return (
         f"OK: snapshot name distribution; players={total}, "
         f"unique_names={len(names)}, most_common={count} ({ratio:.2%})"
     )
-    return 0
 
 
 def table_exists(conn: sqlite3.Connection, name: str) -> bool:
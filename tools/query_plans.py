@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Check the query plans of every SQL statement the web app issues.
+
+The app is driven through all of its routes, modes and rating parameters
+against a generated database while a trace callback records each statement
+with its bound values. Every distinct statement is then run through
+``EXPLAIN QUERY PLAN``. Full scans of the large tables and temp B-tree sorts
+are compared with the accepted plans in ``tests/fixtures/query_plans.json``;
+anything not accepted there is reported with a diff of the two plans.
+``--update`` rewrites the accepted plans after a deliberate change.
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import re
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory.sql_metrics import SqlMetrics, fingerprint, statement_id  # noqa: E402
+from tools.generate_ratings_db import SyntheticDbConfig, generate_database  # noqa: E402
+
+BASELINE_PATH = ROOT / "tests" / "fixtures" / "query_plans.json"
+PLAN_DB_CONFIG = SyntheticDbConfig(players=3000, snapshots=6, seed=7)
+WATCHED_TABLES = frozenset({"observations", "best_growth", "text_values", "players"})
+MODES = ("Общий", "Прирост", "Лучшие (приросты)")
+
+_SOURCE_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w.]*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+_SCAN_RE = re.compile(r"^SCAN ([A-Za-z_]\w*)")
+_SUBQUERY_RE = re.compile(r"\((?:subquery|join)-\d+\)")
+_SKIPPED_PREFIXES = ("PRAGMA", "ATTACH", "CREATE TEMP", "BEGIN", "COMMIT", "ROLLBACK")
+
+
+class _StatementCollector(SqlMetrics):
+    """Records the expanded SQL of every statement run on the app's connections."""
+
+    def __init__(self) -> None:
+        super().__init__(slow_ms=float("inf"), explain=False)
+        self.statements: dict[str, str] = {}
+
+    def wrap(self, conn: Any) -> Any:
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, sql: str) -> None:
+        text = " ".join(sql.split())
+        if text.upper().startswith(_SKIPPED_PREFIXES) or text.upper().startswith("EXPLAIN"):
+            return
+        self.statements.setdefault(statement_id(fingerprint(text)), text)
+
+
+def _urls(fixture: dict[str, Any], param_options: list[str], params_for_mode) -> list[str]:
+    latest, previous, oldest = fixture["latest"], fixture["previous"], fixture["oldest"]
+    urls = []
+    for mode in MODES:
+        for param in params_for_mode(mode, param_options):
+            for level in ("Все", str(fixture["level"])):
+                query = {"mode": mode, "param": param, "level": level, "page": 2, "file": latest}
+                if mode == "Прирост":
+                    query.update(file1=oldest, file2=latest)
+                urls.append("/?" + urlencode(query))
+        search = {"mode": mode, "param": "Слава", "q": fixture["fragment"], "file": latest}
+        if mode == "Прирост":
+            search.update(file1=previous, file2=latest)
+        urls.append("/api/player_search?" + urlencode(search))
+    urls += [
+        "/?" + urlencode({"mode": "Общий", "param": "Слава", "file": oldest}),
+        "/api/level_players?" + urlencode({"snapshot_id": latest, "level": fixture["level"], "page": 2}),
+        "/api/player_suggest?" + urlencode({"snapshot": latest, "q": fixture["fragment"]}),
+        "/api/player_suggest_all?" + urlencode({"q": fixture["fragment"]}),
+        "/profile?" + urlencode({"nickname": fixture["name"]}),
+        "/profile?" + urlencode({"nickname": str(fixture["pid"]), "file1": oldest, "file2": latest}),
+        "/profile?" + urlencode({"nickname": "нет такого игрока"}),
+    ]
+    return urls
+
+
+def collect_statements(db_path: Path) -> dict[str, str]:
+    """Drive every route against ``db_path`` and return the statements run, by id."""
+    import app as web
+    from tools.benchmark_queries import query_fixtures
+
+    fixture = query_fixtures(db_path)
+    collector = _StatementCollector()
+    old = web.DB_PATH, web.SQL_METRICS
+    web.DB_PATH, web.SQL_METRICS = str(db_path), collector
+    web._QUERY_CACHE.clear()
+    try:
+        client = web.app.test_client()
+        for url in _urls(fixture, web.param_options, web.params_for_mode):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned HTTP {response.status_code}")
+    finally:
+        web.DB_PATH, web.SQL_METRICS = old
+        web._QUERY_CACHE.clear()
+    return collector.statements
+
+
+def _aliases(sql: str, views: dict[str, str]) -> dict[str, set[str]]:
+    """Map every table name and alias in ``sql`` and the views it reads to base tables."""
+    aliases: dict[str, set[str]] = {}
+    pending = [sql]
+    seen_views: set[str] = set()
+    while pending:
+        for table, alias in _SOURCE_RE.findall(pending.pop()):
+            table = table.split(".")[-1].lower()
+            targets = {table}
+            if table in views and table not in seen_views:
+                seen_views.add(table)
+                pending.append(views[table])
+            for name in (table, alias.lower()):
+                if name:
+                    aliases.setdefault(name, set()).update(targets)
+    return aliases
+
+
+def explain(conn: sqlite3.Connection, sql: str, views: dict[str, str]) -> tuple[list[str], list[str]]:
+    """Return the normalized plan of ``sql`` and the lines that need to be accepted."""
+    plan = [_SUBQUERY_RE.sub("(subquery)", str(row[3])) for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    aliases = _aliases(sql, views)
+    flagged = []
+    for line in plan:
+        if line.startswith("USE TEMP B-TREE"):
+            flagged.append(line)
+            continue
+        match = _SCAN_RE.match(line)
+        if match and aliases.get(match.group(1).lower(), set()) & WATCHED_TABLES:
+            flagged.append(line)
+    return plan, flagged
+
+
+def check_plans(db_path: Path, statements: dict[str, str], baseline: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    """Explain ``statements`` and list readable failures for plan lines not in ``baseline``."""
+    conn = sqlite3.connect(f"file:{db_path.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        views = {
+            str(name).lower(): str(sql)
+            for name, sql in conn.execute("SELECT name,sql FROM sqlite_master WHERE type='view'")
+        }
+        current: dict[str, Any] = {}
+        failures = []
+        for key, sql in sorted(statements.items()):
+            plan, flagged = explain(conn, sql, views)
+            current[key] = {"sql": fingerprint(sql), "plan": plan, "accepted": flagged}
+            accepted = baseline.get(key, {}).get("accepted", [])
+            unexpected = list((Counter(flagged) - Counter(accepted)).elements())
+            if not unexpected:
+                continue
+            diff = difflib.unified_diff(
+                baseline.get(key, {}).get("plan", []), plan, "accepted plan", "current plan", lineterm=""
+            )
+            failures.append(
+                f"{key}: unexpected {', '.join(repr(line) for line in unexpected)}\n"
+                f"  sql: {fingerprint(sql)[:400]}\n  " + "\n  ".join(diff)
+            )
+    finally:
+        conn.close()
+    return current, failures
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def run(db_path: Path | None = None, baseline_path: Path = BASELINE_PATH) -> tuple[dict[str, Any], list[str]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        if db_path is None:
+            db_path = Path(tmp) / "plans.sqlite"
+            generate_database(db_path, PLAN_DB_CONFIG)
+        statements = collect_statements(db_path)
+        return check_plans(db_path, statements, load_baseline(baseline_path))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the query plans of the web app's SQL")
+    parser.add_argument("--db", help="Database to explain against (default: a generated one)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update", action="store_true", help="Accept the current plans as the baseline")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    current, failures = run(Path(args.db) if args.db else None, Path(args.baseline))
+    if args.update:
+        Path(args.baseline).write_text(
+            json.dumps(current, ensure_ascii=False, indent=1, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"OK: accepted the plans of {len(current)} statements in {args.baseline}")
+        return 0
+    for failure in failures:
+        print(failure, end="\n\n")
+    if failures:
+        print(f"ERROR: {len(failures)} of {len(current)} statements have unexpected scans or sorts", file=sys.stderr)
+        return 1
+    print(f"OK: {len(current)} statements use accepted plans")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
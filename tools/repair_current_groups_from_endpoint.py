@@ -9,6 +9,7 @@ import os
 import random
 import sqlite3
 import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -24,6 +25,7 @@ import aiohttp
 
 import collect_api_first as bulk
 import get_data as legacy
+from forglory.adaptive_limit import AdaptiveLimiter, retry_after_seconds
 from forglory.parsing import parse_hero, profile_url_matches
 from forglory.schema import parse_int
 
@@ -203,7 +205,7 @@ def endpoint_groups(
 
 async def request_profile(
     session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
+    limiter: AdaptiveLimiter,
     domain: str,
     pid: int,
     fallback_name: str | None,
@@ -213,12 +215,19 @@ async def request_profile(
     last_error = "unknown error"
     diagnostic_html = None
     for attempt in range(1, max(1, retries) + 1):
+        retry_after: float | None = None
         try:
-            async with semaphore:
+            async with limiter:
+                started = time.monotonic()
                 async with session.get(url, allow_redirects=True) as response:
                     text = await response.text(errors="replace")
                     status = int(response.status)
                     final_url = str(response.url)
+                    if status == 429 or 500 <= status <= 599:
+                        retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                        limiter.on_throttle(retry_after)
+                    else:
+                        limiter.on_success(time.monotonic() - started)
             if status != 200:
                 last_error = f"HTTP {status}"
             elif not profile_url_matches(final_url, pid):
@@ -236,12 +245,14 @@ async def request_profile(
                     diagnostic_html = text
         except asyncio.TimeoutError:
             last_error = "timeout"
+            limiter.on_throttle()
         except aiohttp.ClientError as exc:
             last_error = f"network error: {exc}"
+            limiter.on_throttle()
         except Exception as exc:  # defensive: keep one bad profile from killing the batch
             last_error = f"unexpected error: {exc!r}"
         if attempt < max(1, retries):
-            await asyncio.sleep((2 ** (attempt - 1)) + random.random())
+            await asyncio.sleep(max(retry_after or 0.0, (2 ** (attempt - 1)) + random.random()))
     return ProfileResult(pid, None, last_error, diagnostic_html)
 
 
@@ -258,13 +269,13 @@ async def profile_groups_async(
         old.unlink(missing_ok=True)
 
     timeout = aiohttp.ClientTimeout(total=35, connect=10, sock_read=22)
+    limiter = AdaptiveLimiter(max(1, concurrency), maximum=max(1, concurrency) * 2)
     connector = aiohttp.TCPConnector(
-        limit=max(concurrency + 10, 30),
-        limit_per_host=max(concurrency, 20),
+        limit=max(limiter.maximum + 10, 30),
+        limit_per_host=max(limiter.maximum, 20),
         ttl_dns_cache=600,
         keepalive_timeout=30,
     )
-    semaphore = asyncio.Semaphore(max(1, concurrency))
     values: dict[int, GroupValue] = {}
     failures: list[dict[str, Any]] = []
     diagnostic_count = 0
@@ -279,7 +290,7 @@ async def profile_groups_async(
             asyncio.create_task(
                 request_profile(
                     session,
-                    semaphore,
+                    limiter,
                     domain,
                     pid,
                     name,
@@ -305,11 +316,12 @@ async def profile_groups_async(
                     )
             if completed % 500 == 0 or completed == len(tasks):
                 LOG.info(
-                    "Profile group progress %s/%s: success=%s, failed=%s",
+                    "Profile group progress %s/%s: success=%s, failed=%s, concurrency=%s",
                     completed,
                     len(tasks),
                     len(values),
                     len(failures),
+                    limiter.current_limit,
                 )
     return values, failures
 
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Give named clans and brotherhoods without a game ID their fallback ID.
+
+Render runs the same repair after every download. The workflow runs it on
+the restored database before keeping it as the patch base and on the built
+database before it is published and diffed, so the published files are
+already repaired. The repair on Render then changes no rows and the local
+content digest stays on the published patch chain.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from forglory import _repair_missing_group_ids  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Repair missing clan and brotherhood game IDs")
+    parser.add_argument("--db", default="data/db/ratings.sqlite")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    clans, brotherhoods = _repair_missing_group_ids(Path(args.db))
+    print(f"OK: {args.db} group identifiers repaired; clans={clans}, brotherhoods={brotherhoods}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
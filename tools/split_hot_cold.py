@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.build_db import init_db  # noqa: E402
+
+HOT_MIN_TS_KEY = "hot_min_ts"
+DB_ROLE_KEY = "db_role"
+
+
+def table_columns(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    return [str(row[1]) for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def copy_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    where: str = "",
+    params: tuple = (),
+) -> int:
+    """Copy ``src.table`` into ``main.table`` by column name, not position."""
+    target = table_columns(conn, "main", table)
+    source = set(table_columns(conn, "src", table))
+    columns = ",".join(column for column in target if column in source)
+    cursor = conn.execute(
+        f"INSERT INTO main.{table}({columns}) SELECT {columns} FROM src.{table} {where}",
+        params,
+    )
+    return max(0, cursor.rowcount)
+
+
+def _create(path: Path, source: Path) -> sqlite3.Connection:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    # URI mode on the main connection lets ATTACH open the source read-only.
+    conn = sqlite3.connect(f"file:{path.resolve().as_posix()}", uri=True)
+    init_db(conn)
+    conn.execute("ATTACH DATABASE ? AS src", (f"file:{source.resolve().as_posix()}?mode=ro",))
+    return conn
+
+
+def _finish(conn: sqlite3.Connection, role: str, hot_min_ts: int) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO schema_meta(key,value) VALUES(?,?)",
+        ((DB_ROLE_KEY, role), (HOT_MIN_TS_KEY, str(hot_min_ts))),
+    )
+    conn.execute("COMMIT")
+    conn.execute("DETACH DATABASE src")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode=DELETE")
+    check = conn.execute("PRAGMA quick_check").fetchone()[0]
+    if check != "ok":
+        raise RuntimeError(f"{role} database quick_check failed: {check}")
+
+
+def split_database(source: Path, hot_path: Path, cold_path: Path, hot_days: float) -> dict[str, int]:
+    """Write a hot DB with recent observations and a cold DB with the rest.
+
+    The hot DB keeps every table the web tier reads, including the whole
+    snapshot catalog, so only requests for snapshots older than
+    ``schema_meta.hot_min_ts`` need the cold archive attached.
+    """
+    probe = sqlite3.connect(f"file:{source.resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        latest = probe.execute("SELECT MAX(ts) FROM snapshots").fetchone()[0]
+        if latest is None:
+            raise RuntimeError(f"No snapshots in {source}")
+        boundary = int(latest) - int(max(0.0, hot_days) * 86400)
+        row = probe.execute(
+            """
+            SELECT MIN(ts) FROM snapshots
+            WHERE ts>=?
+               OR snapshot_id IN (SELECT best_snapshot_id FROM best_growth)
+            """,
+            (boundary,),
+        ).fetchone()
+        hot_min_ts = int(row[0])
+    finally:
+        probe.close()
+
+    hot_tmp = hot_path.with_name(hot_path.name + ".tmp")
+    cold_tmp = cold_path.with_name(cold_path.name + ".tmp")
+    stats: dict[str, int] = {"hot_min_ts": hot_min_ts}
+
+    hot = _create(hot_tmp, source)
+    try:
+        hot.execute("BEGIN IMMEDIATE")
+        copy_rows(hot, "schema_meta", "WHERE key NOT IN ('schema_version')")
+        stats["snapshots"] = copy_rows(hot, "snapshots")
+        copy_rows(hot, "text_values")
+        stats["players"] = copy_rows(hot, "players")
+        copy_rows(hot, "scan_state")
+        copy_rows(
+            hot,
+            "collection_failures",
+            "WHERE snapshot_id IN (SELECT snapshot_id FROM src.snapshots WHERE ts>=?)",
+            (hot_min_ts,),
+        )
+        stats["hot_observations"] = copy_rows(
+            hot,
+            "observations",
+            "WHERE snapshot_id IN (SELECT snapshot_id FROM src.snapshots WHERE ts>=?)",
+            (hot_min_ts,),
+        )
+        stats["best_growth"] = copy_rows(hot, "best_growth")
+        _finish(hot, "hot", hot_min_ts)
+    finally:
+        hot.close()
+
+    cold = _create(cold_tmp, source)
+    try:
+        cold.execute("BEGIN IMMEDIATE")
+        stats["cold_snapshots"] = copy_rows(cold, "snapshots", "WHERE ts<?", (hot_min_ts,))
+        copy_rows(
+            cold,
+            "text_values",
+            """
+            WHERE text_id IN (
+                SELECT o.name_id FROM src.observations o
+                JOIN src.snapshots s ON s.snapshot_id=o.snapshot_id WHERE s.ts<?1
+                UNION SELECT o.clan_name_id FROM src.observations o
+                JOIN src.snapshots s ON s.snapshot_id=o.snapshot_id WHERE s.ts<?1
+                UNION SELECT o.brotherhood_name_id FROM src.observations o
+                JOIN src.snapshots s ON s.snapshot_id=o.snapshot_id WHERE s.ts<?1
+            )
+            """,
+            (hot_min_ts,),
+        )
+        stats["cold_observations"] = copy_rows(
+            cold,
+            "observations",
+            "WHERE snapshot_id IN (SELECT snapshot_id FROM src.snapshots WHERE ts<?)",
+            (hot_min_ts,),
+        )
+        _finish(cold, "cold", hot_min_ts)
+    finally:
+        cold.close()
+
+    os.replace(hot_tmp, hot_path)
+    os.replace(cold_tmp, cold_path)
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Split the ratings database into a recent hot DB and a cold history archive"
+    )
+    parser.add_argument("--db", default="data/db/ratings.sqlite")
+    parser.add_argument("--hot-out", default="data/db/ratings-hot.sqlite")
+    parser.add_argument("--cold-out", default="data/db/ratings-cold.sqlite")
+    parser.add_argument(
+        "--hot-days",
+        type=float,
+        default=32.0,
+        help="Days of observations kept in the hot DB; keep above the best-growth window",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    stats = split_database(Path(args.db), Path(args.hot_out), Path(args.cold_out), args.hot_days)
+    print(
+        "OK: hot={hot}, cold={cold}; snapshots={snapshots}, cold_snapshots={cold_snapshots}, "
+        "hot_observations={hot_observations}, cold_observations={cold_observations}, "
+        "hot_min_ts={hot_min_ts}".format(hot=args.hot_out, cold=args.cold_out, **stats)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())